@@ -1,36 +1,86 @@
 import sys
-import MetaTrader5 as mt5
 import pandas as pd
 import time
 import numpy as np
 import datetime
+import functools
+import copy
 import requests
 import json
+import logging
+import logging.handlers
+import queue
+import hashlib
+import heapq
+import math
 import os # Import modul os untuk manipulasi jalur file
-
-from ta.momentum import RSIIndicator
-from ta.volume import OnBalanceVolumeIndicator
+import platform
+import tempfile
+import timeit
+import argparse
+import asyncio
+import threading
+import http.server
+import sqlite3
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from collections import deque, namedtuple
+from itertools import islice, product
+from dataclasses import dataclass, field
+from types import MappingProxyType, SimpleNamespace
+
+import joblib
+import sklearn
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from PyQt6.QtWidgets import (
-    QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QTextEdit,
+    QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QPlainTextEdit,
     QGroupBox, QGridLayout, QSizePolicy, QLineEdit, QDoubleSpinBox, QComboBox,
-    QDialog, QDialogButtonBox, QMessageBox
+    QDialog, QDialogButtonBox, QMessageBox, QToolButton, QCheckBox
 )
-from PyQt6.QtCore import QTimer, Qt
-
-from ta.trend import MACD, EMAIndicator, SMAIndicator
-from ta.volatility import BollingerBands, AverageTrueRange
-
-# Inisialisasi koneksi MT5
-# Penting: Pastikan MetaTrader 5 sedang berjalan dan Anda sudah login ke akun.
-if not mt5.initialize():
-    print("FATAL ERROR: Gagal terhubung ke MetaTrader 5. Pastikan MT5 berjalan dan akun login.")
-    print("Aplikasi akan keluar.")
-    sys.exit()
+from PyQt6.QtCore import QObject, Qt, QTimer, pyqtSignal
+
+try:
+    import MetaTrader5 as mt5
+    MT5_AVAILABLE = True
+except ImportError:
+    # Paket MetaTrader5 hanya tersedia di Windows. Tanpa paket ini bot tetap bisa berjalan
+    # dengan SimulatedBroker; konstanta di bawah memakai nilai yang sama dengan paket resmi.
+    MT5_AVAILABLE = False
+    mt5 = SimpleNamespace(
+        TIMEFRAME_M1=1, TIMEFRAME_M5=5, TIMEFRAME_M15=15, TIMEFRAME_M30=30,
+        TIMEFRAME_H1=16385, TIMEFRAME_H4=16388, TIMEFRAME_D1=16408,
+        ORDER_TYPE_BUY=0, ORDER_TYPE_SELL=1, ORDER_TYPE_BUY_LIMIT=2, ORDER_TYPE_SELL_LIMIT=3,
+        ORDER_TYPE_BUY_STOP=4, ORDER_TYPE_SELL_STOP=5, ORDER_TYPE_BUY_STOP_LIMIT=6, ORDER_TYPE_SELL_STOP_LIMIT=7,
+        TRADE_ACTION_DEAL=1, TRADE_ACTION_PENDING=5, TRADE_ACTION_SLTP=6, TRADE_ACTION_MODIFY=7, TRADE_ACTION_REMOVE=8,
+        ORDER_FILLING_FOK=0, ORDER_FILLING_IOC=1, ORDER_FILLING_RETURN=2,
+        ORDER_TIME_GTC=0, ORDER_TIME_DAY=1, ORDER_TIME_SPECIFIED=2, ORDER_TIME_SPECIFIED_DAY=3,
+        SYMBOL_TRADE_MODE_FULL=4,
+        DEAL_TYPE_BUY=0, DEAL_TYPE_SELL=1,
+        DEAL_ENTRY_IN=0, DEAL_ENTRY_OUT=1, DEAL_ENTRY_INOUT=2, DEAL_ENTRY_OUT_BY=3,
+        DEAL_REASON_CLIENT=0, DEAL_REASON_MOBILE=1, DEAL_REASON_WEB=2, DEAL_REASON_EXPERT=3,
+        DEAL_REASON_SL=4, DEAL_REASON_TP=5, DEAL_REASON_SO=6,
+        TRADE_RETCODE_REQUOTE=10004, TRADE_RETCODE_REJECT=10006, TRADE_RETCODE_CANCEL=10007,
+        TRADE_RETCODE_PLACED=10008, TRADE_RETCODE_DONE=10009, TRADE_RETCODE_DONE_PARTIAL=10010,
+        TRADE_RETCODE_ERROR=10011, TRADE_RETCODE_TIMEOUT=10012, TRADE_RETCODE_INVALID=10013,
+        TRADE_RETCODE_INVALID_VOLUME=10014, TRADE_RETCODE_INVALID_PRICE=10015, TRADE_RETCODE_INVALID_STOPS=10016,
+        TRADE_RETCODE_TRADE_DISABLED=10017, TRADE_RETCODE_MARKET_CLOSED=10018, TRADE_RETCODE_NO_MONEY=10019,
+        TRADE_RETCODE_PRICE_CHANGED=10020, TRADE_RETCODE_PRICE_OFF=10021, TRADE_RETCODE_INVALID_EXPIRATION=10022,
+        TRADE_RETCODE_ORDER_CHANGED=10023, TRADE_RETCODE_TOO_MANY_REQUESTS=10024, TRADE_RETCODE_NO_CHANGES=10025,
+        TRADE_RETCODE_SERVER_DISABLES_AT=10026, TRADE_RETCODE_CLIENT_DISABLES_AT=10027, TRADE_RETCODE_LOCKED=10028,
+        TRADE_RETCODE_FROZEN=10029, TRADE_RETCODE_INVALID_FILL=10030, TRADE_RETCODE_CONNECTION=10031,
+        TRADE_RETCODE_ONLY_REAL=10032, TRADE_RETCODE_LIMIT_ORDERS=10033, TRADE_RETCODE_LIMIT_VOLUME=10034,
+        TRADE_RETCODE_INVALID_ORDER=10035, TRADE_RETCODE_POSITION_CLOSED=10036,
+    )
+
+# Broker aktif (MT5Broker atau SimulatedBroker). Koneksi dibuka di entry point melalui connect_broker(),
+# bukan saat modul diimpor, sehingga modul bisa dipakai tanpa terminal MT5.
+broker = None
 
 # Konfigurasi Global untuk simbol dan timeframe
-symbol = "XAUUSD"
+symbol = "XAUUSD" # Simbol utama: ditampilkan di GUI (bisa diubah dengan --symbols)
+TRADING_SYMBOLS = [symbol] # Semua simbol yang dipindai engine; masing-masing punya SymbolPipeline sendiri
+SYMBOL_PIPELINE_WORKERS = 4 # Jumlah maksimum simbol yang dianalisis bersamaan dalam satu siklus
 
 # Timeframe untuk berbagai strategi
 AI_TRADING_TIMEFRAME = mt5.TIMEFRAME_M5
@@ -61,1960 +111,8064 @@ SNIPER_COOLDOWN_SECONDS = 30 # Cooldown 30 detik setelah trade sniper
 # Menggunakan os.path.join untuk membuat jalur yang portabel dan eksplisit
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SETTINGS_FILE = os.path.join(BASE_DIR, "trading_settings.json")
+MODEL_DIR = os.path.join(BASE_DIR, "models") # Artefak model AI yang sudah dilatih (lihat ModelStore)
+RECORDER_DIR = os.path.join(BASE_DIR, "market_data") # Rekaman tick dan candle (lihat MarketRecorder)
+LOG_DIR = os.path.join(BASE_DIR, "logs") # File log berotasi (lihat EngineLog)
+LEDGER_FILE = os.path.join(BASE_DIR, "trade_ledger.db") # Buku besar SQLite order, fill, dan trade (lihat TradeLedger)
+BENCHMARK_DIR = os.path.join(BASE_DIR, "benchmarks") # Baseline dan hasil terakhir micro-benchmark (lihat run_benchmarks)
+BENCHMARK_BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json") # Di-commit ke repo agar CI punya pembanding
+BENCHMARK_LATEST_FILE = os.path.join(BENCHMARK_DIR, "latest.json") # Hasil run terakhir (tidak di-commit)
+OPTIMIZER_DIR = os.path.join(BASE_DIR, "optimizer") # Cache hasil dan ranking optimasi parameter (lihat run_scalping_optimization)
+
+# Konfigurasi broker simulasi (SimulatedBroker)
+SIM_TICKS_PER_BAR = 4 # Jumlah tick sintetis per candle (open, high/low, low/high, close) jika file tick tidak ada
+SIM_DEFAULT_SPREAD_POINTS = 20 # Spread (poin) jika data candle tidak memiliki kolom spread
+SIM_DEFAULT_BALANCE = 10000.0
+SIM_DEFAULT_LEVERAGE = 100
+SIM_WARMUP_SECONDS = 8 * 24 * 3600 # Riwayat sebelum jam simulasi dimulai (cukup untuk training 2000 candle M5 dan SMA50 H1)
+SIM_SYMBOL_DEFAULTS = { # Spesifikasi kontrak simbol simulasi (meniru XAUUSD pada broker MT5 umumnya)
+    'point': 0.01,
+    'digits': 2,
+    'trade_contract_size': 100.0,
+    'volume_min': 0.01,
+    'volume_max': 100.0,
+    'volume_step': 0.01,
+}
+
+# Format candle yang dikembalikan copy_rates_from_pos (sama dengan paket MetaTrader5)
+RATES_DTYPE = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+                        ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
+
+# Nama timeframe untuk file data rekaman SimulatedBroker (misalnya XAUUSD_M5.csv)
+TIMEFRAME_NAMES = {
+    mt5.TIMEFRAME_M1: "M1", mt5.TIMEFRAME_M5: "M5", mt5.TIMEFRAME_M15: "M15", mt5.TIMEFRAME_M30: "M30",
+    mt5.TIMEFRAME_H1: "H1", mt5.TIMEFRAME_H4: "H4", mt5.TIMEFRAME_D1: "D1",
+}
+
+
+def timeframe_seconds(timeframe):
+    """
+    Mengembalikan durasi satu candle (detik) untuk konstanta timeframe MT5.
+    Timeframe menit disimpan apa adanya, jam diberi flag 0x4000, minggu 0x8000, dan bulan 0xC000.
+    Args:
+        timeframe (int): Timeframe MT5 (misalnya mt5.TIMEFRAME_M5).
+    Returns:
+        int: Durasi candle dalam detik (bulan diperkirakan 30 hari).
+    """
+    units = timeframe & 0x3FFF
+    if timeframe & 0xC000 == 0xC000:
+        return units * 30 * 86400
+    if timeframe & 0x8000:
+        return units * 7 * 86400
+    if timeframe & 0x4000:
+        return units * 3600
+    return units * 60
 
 
-class TradingSettingsDialog(QDialog):
+def epoch_seconds(column):
+    """Mengubah kolom waktu (detik epoch atau teks tanggal) menjadi array detik epoch int64."""
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype=np.int64)
+    return pd.to_datetime(column).to_numpy().astype('datetime64[s]').astype(np.int64)
+
+
+def cli_day(text):
+    """Tipe argparse untuk tanggal YYYY-MM-DD (UTC). Returns: int: Awal hari dalam detik epoch."""
+    try:
+        day = datetime.datetime.strptime(text, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tanggal tidak valid (format YYYY-MM-DD): {text}")
+    return int(day.replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+def read_rates_csv(path):
     """
-    Dialog UI untuk mengatur parameter trading bot.
-    Memungkinkan pengguna untuk mengubah ukuran lot, risiko, TP/SL, dll.
+    Membaca file candle CSV rekaman menjadi array RATES_DTYPE yang terurut waktu.
+    Args:
+        path (str): File dengan kolom time, open, high, low, close (tick_volume, spread, real_volume opsional).
+    Returns:
+        numpy.ndarray: Candle dengan format yang sama seperti copy_rates_from_pos.
     """
-    def __init__(self, parent=None, settings={}):
+    df = pd.read_csv(path)
+    rates = np.zeros(len(df), dtype=RATES_DTYPE)
+    rates['time'] = epoch_seconds(df['time'])
+    for column in ('open', 'high', 'low', 'close'):
+        rates[column] = df[column].to_numpy(dtype=float)
+    for column, default in (('tick_volume', 0), ('spread', SIM_DEFAULT_SPREAD_POINTS), ('real_volume', 0)):
+        if column in df.columns:
+            rates[column] = df[column].to_numpy()
+        else:
+            rates[column] = default
+    return np.sort(rates, order='time')
+
+
+def resample_rates(rates, period):
+    """
+    Menggabungkan candle ke periode yang lebih besar (open pertama, high/low ekstrem, close terakhir).
+    Args:
+        rates (numpy.ndarray): Candle RATES_DTYPE terurut waktu.
+        period (int): Durasi candle tujuan dalam detik.
+    Returns:
+        numpy.ndarray: Candle RATES_DTYPE pada periode baru.
+    """
+    buckets = rates['time'] - rates['time'] % period
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(rates)]
+    out = np.zeros(len(starts), dtype=RATES_DTYPE)
+    out['time'] = buckets[starts]
+    out['open'] = rates['open'][starts]
+    out['high'] = np.maximum.reduceat(rates['high'], starts)
+    out['low'] = np.minimum.reduceat(rates['low'], starts)
+    out['close'] = rates['close'][ends - 1]
+    out['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+    out['spread'] = rates['spread'][starts]
+    out['real_volume'] = np.add.reduceat(rates['real_volume'], starts)
+    return out
+
+
+def slice_rates(rates, start=None, end=None, count=None):
+    """
+    Memotong candle terurut waktu ke rentang [start, end] (detik epoch, inklusif) lalu `count` candle terakhir.
+    Returns:
+        numpy.ndarray: Potongan `rates` (view, bukan salinan).
+    """
+    a = 0 if start is None else int(np.searchsorted(rates['time'], start, side='left'))
+    b = len(rates) if end is None else int(np.searchsorted(rates['time'], end, side='right'))
+    if count is not None:
+        a = max(a, b - count)
+    return rates[a:max(a, b)]
+
+
+def load_recorded_rates(data_dir, symbol_name, timeframe, start=None, end=None, count=None):
+    """
+    Memuat candle rekaman <SIMBOL>_<TF>.csv dari `data_dir`, atau dari rekaman MarketRecorder
+    (<data_dir>/<SIMBOL>/<TF>/...) jika file CSV tidak ada. Jika timeframe tersebut tidak ada,
+    candle dibentuk dari timeframe lebih kecil terbesar yang tersedia.
+    Dari rekaman MarketRecorder hanya rentang yang diminta yang disalin ke memori; tanpa rentang sama sekali,
+    yang dimuat adalah RECORDER_DEFAULT_WINDOW_DAYS hari terakhir, bukan seluruh riwayat.
+    Args:
+        start, end (int, optional): Batas waktu inklusif dalam detik epoch.
+        count (int, optional): Hanya `count` candle terakhir (pada `timeframe`) dalam rentang.
+    Returns:
+        numpy.ndarray or None: Candle RATES_DTYPE, atau None jika tidak ada data yang cocok.
+    """
+    recorder = MarketRecorder(data_dir)
+    candidates = []
+    for tf, name in TIMEFRAME_NAMES.items():
+        if timeframe_seconds(tf) > timeframe_seconds(timeframe):
+            continue
+        path = os.path.join(data_dir, f"{symbol_name}_{name}.csv")
+        if os.path.exists(path):
+            candidates.append((timeframe_seconds(tf), 1, lambda path=path: read_rates_csv(path)))
+        elif recorder.days(symbol_name, name):
+            candidates.append((timeframe_seconds(tf), 0, tf))
+    if not candidates:
+        return None
+    base_seconds, from_csv, source = max(candidates, key=lambda candidate: candidate[:2]) # Timeframe terbesar yang bisa dipakai
+    period = timeframe_seconds(timeframe)
+    if from_csv:
+        rates = source()
+    else:
+        if start is None and end is None and count is None:
+            start = recorder.window_start(symbol_name, TIMEFRAME_NAMES[source])
+        # `count` berlaku pada timeframe tujuan: dari timeframe dasar dibaca count * rasio candle (+1 untuk candle awal terpotong)
+        base_count = None if count is None else (count + 1) * (period // base_seconds)
+        rates = recorder.read_rates(symbol_name, source, start, end, base_count)
+    if base_seconds != period:
+        rates = resample_rates(rates, period)
+    return slice_rates(rates, start, end, count)
+
+
+class BrokerAdapter:
+    """
+    Antarmuka broker yang dipakai bot. Mencakup semua panggilan MT5 yang dibutuhkan
+    (data candle, tick, info simbol/akun, posisi, dan pengiriman order) dengan signature dan
+    bentuk hasil yang sama seperti paket MetaTrader5, sehingga implementasinya dapat ditukar
+    antara terminal MT5 sungguhan dan simulator.
+    """
+    def initialize(self):
+        """Membuka koneksi ke broker. Returns: bool: True jika berhasil."""
+        raise NotImplementedError
+
+    def shutdown(self):
+        """Menutup koneksi ke broker."""
+        raise NotImplementedError
+
+    def last_error(self):
+        """Returns: tuple: (kode, deskripsi) error terakhir."""
+        raise NotImplementedError
+
+    def period_seconds(self, timeframe):
+        """Returns: int: Durasi satu candle timeframe dalam detik."""
+        return timeframe_seconds(timeframe)
+
+    def copy_rates_from_pos(self, symbol_name, timeframe, start_pos, count):
+        """Returns: numpy.ndarray or None: `count` candle terakhir mulai dari posisi `start_pos`."""
+        raise NotImplementedError
+
+    def symbol_info(self, symbol_name):
+        """Returns: SymbolInfo or None: Spesifikasi simbol."""
+        raise NotImplementedError
+
+    def symbol_info_tick(self, symbol_name):
+        """Returns: Tick or None: Tick terakhir simbol."""
+        raise NotImplementedError
+
+    def positions_get(self, symbol=None, ticket=None):
+        """Returns: tuple or None: Posisi terbuka (difilter per simbol atau tiket)."""
+        raise NotImplementedError
+
+    def history_deals_get(self, date_from, date_to):
+        """Returns: tuple or None: Deal (eksekusi) dengan waktu server di antara `date_from` dan `date_to`."""
+        raise NotImplementedError
+
+    def account_info(self):
+        """Returns: AccountInfo or None: Info akun trading."""
+        raise NotImplementedError
+
+    def order_send(self, request):
+        """Returns: OrderSendResult or None: Hasil eksekusi permintaan trading."""
+        raise NotImplementedError
+
+    def order_calc_margin(self, action, symbol_name, volume, price):
+        """Returns: float or None: Margin yang dibutuhkan (mata uang akun)."""
+        raise NotImplementedError
+
+
+class MT5Broker(BrokerAdapter):
+    """
+    Implementasi BrokerAdapter untuk terminal MetaTrader 5 sungguhan (hanya Windows).
+    Semua panggilan diteruskan langsung ke paket MetaTrader5.
+    """
+    def __init__(self, **login_kwargs):
         """
-        Inisialisasi dialog pengaturan.
         Args:
-            parent: Parent widget (biasanya jendela utama bot).
-            settings (dict): Kamus berisi pengaturan trading saat ini untuk ditampilkan sebagai default.
+            **login_kwargs: Argumen opsional untuk mt5.initialize (path, login, password, server).
         """
-        super().__init__(parent)
-        self.setWindowTitle("⚙️ Pengaturan Trading")
-        self.setGeometry(200, 200, 400, 450)
-        
-        self.layout = QGridLayout(self)
+        self._login_kwargs = login_kwargs
 
-        self.lot_size_input = QDoubleSpinBox(); self.lot_size_input.setRange(0.01, 100.0); self.lot_size_input.setSingleStep(0.01)
-        self.risk_percent_input = QDoubleSpinBox(); self.risk_percent_input.setRange(0.1, 10.0); self.risk_percent_input.setSingleStep(0.1)
-        
-        self.target_profit_usd_input = QDoubleSpinBox(); self.target_profit_usd_input.setRange(0.1, 1000.0); self.target_profit_usd_input.setSingleStep(0.1)
-        self.target_loss_usd_input = QDoubleSpinBox(); self.target_loss_usd_input.setRange(1.0, 5000.0); self.target_loss_usd_input.setSingleStep(1.0)
+    def initialize(self):
+        if not MT5_AVAILABLE:
+            return False
+        return mt5.initialize(**self._login_kwargs)
 
-        self.tp_pips_input = QDoubleSpinBox(); self.tp_pips_input.setRange(1, 1000); self.tp_pips_input.setSingleStep(1)
-        self.sl_pips_input = QDoubleSpinBox(); self.sl_pips_input.setRange(1, 1000); self.sl_pips_input.setSingleStep(1)
-        self.max_hold_duration_input = QDoubleSpinBox(); self.max_hold_duration_input.setRange(1, 120); self.max_hold_duration_input.setSingleStep(1)
-        self.entry_method_combo = QComboBox(); self.entry_method_combo.addItems(["Instant", "Pending Order", "Stop Limit", "Market on Close"])
-        self.retry_input = QDoubleSpinBox(); self.retry_input.setRange(0, 10); self.retry_input.setSingleStep(1)
-        self.max_spread_input = QDoubleSpinBox(); self.max_spread_input.setRange(1, 200); self.max_spread_input.setSingleStep(1)
-        
-        self.min_tick_volume_scalping_input = QDoubleSpinBox(); self.min_tick_volume_scalping_input.setRange(0, 5000); self.min_tick_volume_scalping_input.setSingleStep(100); self.min_tick_volume_scalping_input.setValue(100)
-        self.scalping_pattern_confidence_input = QDoubleSpinBox(); self.scalping_pattern_confidence_input.setRange(0.0, 1.0); self.scalping_pattern_confidence_input.setSingleStep(0.05); self.scalping_pattern_confidence_input.setValue(0.7)
+    def shutdown(self):
+        if MT5_AVAILABLE:
+            mt5.shutdown()
 
-        # Mengatur nilai awal input berdasarkan pengaturan yang diterima
-        self.lot_size_input.setValue(settings.get('lot_size', 0.1))
-        self.risk_percent_input.setValue(settings.get('risk_percent', 1.0))
-        self.target_profit_usd_input.setValue(settings.get('target_profit_usd', 1.0))
-        self.target_loss_usd_input.setValue(settings.get('target_loss_usd', 30.0))
-        self.tp_pips_input.setValue(settings.get('tp_pips', 50))
-        self.sl_pips_input.setValue(settings.get('sl_pips', 30))
-        self.max_hold_duration_input.setValue(settings.get('max_hold_duration', 15))
-        self.entry_method_combo.setCurrentText(settings.get('entry_method', "Instant"))
-        self.retry_input.setValue(settings.get('max_retry', 3))
-        self.max_spread_input.setValue(settings.get('max_spread', 50))
-        self.min_tick_volume_scalping_input.setValue(settings.get('min_tick_volume_scalping', 100))
-        self.scalping_pattern_confidence_input.setValue(settings.get('scalping_pattern_confidence', 0.7))
+    def last_error(self):
+        if not MT5_AVAILABLE:
+            return (-1, "Paket MetaTrader5 tidak terpasang")
+        return mt5.last_error()
 
-        # Menambahkan label dan input ke layout grid
-        row = 0
-        self.layout.addWidget(QLabel("Ukuran Lot:"), row, 0); self.layout.addWidget(self.lot_size_input, row, 1); row += 1
-        self.layout.addWidget(QLabel("Risiko per Trade (%):"), row, 0); self.layout.addWidget(self.risk_percent_input, row, 1); row += 1
-        self.layout.addWidget(QLabel("Target Profit ($):"), row, 0); self.layout.addWidget(self.target_profit_usd_input, row, 1); row += 1
-        self.layout.addWidget(QLabel("Target Loss ($):"), row, 0); self.layout.addWidget(self.target_loss_usd_input, row, 1); row += 1
-        self.layout.addWidget(QLabel("TP (Pips):"), row, 0); self.layout.addWidget(self.tp_pips_input, row, 1); row += 1
-        self.layout.addWidget(QLabel("SL (Pips):"), row, 0); self.layout.addWidget(self.sl_pips_input, row, 1); row += 1
-        self.layout.addWidget(QLabel("Max Hold (min):"), row, 0); self.layout.addWidget(self.max_hold_duration_input, row, 1); row += 1
-        self.layout.addWidget(QLabel("Metode Entry:"), row, 0); self.layout.addWidget(self.entry_method_combo, row, 1); row += 1
-        self.layout.addWidget(QLabel("Max Retry:"), row, 0); self.layout.addWidget(self.retry_input, row, 1); row += 1
-        self.layout.addWidget(QLabel("Max Spread (points):"), row, 0); self.layout.addWidget(self.max_spread_input, row, 1); row += 1
-        self.layout.addWidget(QLabel("Min Tick Volume (Scalping):"), row, 0); self.layout.addWidget(self.min_tick_volume_scalping_input, row, 1); row += 1
-        self.layout.addWidget(QLabel("Conf. Pola (Scalping):"), row, 0); self.layout.addWidget(self.scalping_pattern_confidence_input, row, 1); row += 1
+    def copy_rates_from_pos(self, symbol_name, timeframe, start_pos, count):
+        return mt5.copy_rates_from_pos(symbol_name, timeframe, start_pos, count)
 
-        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
-        button_box.accepted.connect(self.accept)
-        button_box.rejected.connect(self.reject)
-        self.layout.addWidget(button_box, row, 0, 1, 2)
-        self.setLayout(self.layout)
+    def symbol_info(self, symbol_name):
+        return mt5.symbol_info(symbol_name)
 
-    def get_settings(self):
+    def symbol_info_tick(self, symbol_name):
+        return mt5.symbol_info_tick(symbol_name)
+
+    def positions_get(self, symbol=None, ticket=None):
+        if ticket is not None:
+            return mt5.positions_get(ticket=ticket)
+        if symbol is not None:
+            return mt5.positions_get(symbol=symbol)
+        return mt5.positions_get()
+
+    def history_deals_get(self, date_from, date_to):
+        return mt5.history_deals_get(date_from, date_to)
+
+    def account_info(self):
+        return mt5.account_info()
+
+    def order_send(self, request):
+        return mt5.order_send(request)
+
+    def order_calc_margin(self, action, symbol_name, volume, price):
+        return mt5.order_calc_margin(action, symbol_name, volume, price)
+
+
+# Struktur hasil SimulatedBroker, dengan nama field yang sama seperti struktur paket MetaTrader5
+SimTick = namedtuple('SimTick', 'time bid ask last volume time_msc flags volume_real')
+SimSymbolInfo = namedtuple('SimSymbolInfo', 'name visible trade_mode point digits spread trade_contract_size '
+                                            'trade_stops_level volume_min volume_max volume_step bid ask')
+SimAccountInfo = namedtuple('SimAccountInfo', 'login leverage balance profit equity margin margin_free margin_level currency')
+SimPosition = namedtuple('SimPosition', 'ticket time time_msc type magic identifier reason volume price_open '
+                                        'sl tp price_current swap profit symbol comment')
+SimOrder = namedtuple('SimOrder', 'ticket time_setup type type_time expiration magic volume_initial '
+                                  'price_open price_stoplimit sl tp symbol comment')
+SimDeal = namedtuple('SimDeal', 'ticket order time time_msc type entry magic position_id reason volume price '
+                                'commission swap profit symbol comment')
+SimTradeRequest = namedtuple('SimTradeRequest', 'action magic order symbol volume price stoplimit sl tp deviation '
+                                                'type type_filling type_time expiration comment position position_by')
+SimOrderSendResult = namedtuple('SimOrderSendResult', 'retcode deal order volume price bid ask comment request_id request')
+
+
+class SimulatedBroker(BrokerAdapter):
+    """
+    Broker simulasi in-process yang memutar ulang candle/tick rekaman dari file.
+    Dipakai untuk menjalankan bot, load test, dan benchmark latensi tanpa terminal MT5.
+
+    File data di `data_dir`:
+        <SIMBOL>_<TF>.csv   Candle (time, open, high, low, close, tick_volume, spread, real_volume),
+                            misalnya XAUUSD_M1.csv. Timeframe yang tidak ada dibentuk dari timeframe
+                            terkecil yang tersedia. Kolom time berupa detik epoch atau teks tanggal.
+        <SIMBOL>_ticks.csv  Opsional: tick (time atau time_msc, bid, ask). Jika tidak ada, tick
+                            disintesis dari candle terkecil (SIM_TICKS_PER_BAR tick per candle).
+
+    Jam simulasi maju secara manual (step/advance_to) untuk run yang deterministik, atau mengikuti
+    jam dinding dikali `speed` saat bot dijalankan secara live dengan --broker sim.
+    Setiap tick memeriksa order pending (limit/stop/stop-limit, kedaluwarsa) dan SL/TP posisi;
+    SL/TP dieksekusi pada harga levelnya. Margin dihitung dari ukuran kontrak dan leverage.
+    """
+    def __init__(self, data_dir, symbols=None, balance=SIM_DEFAULT_BALANCE, leverage=SIM_DEFAULT_LEVERAGE,
+                 start_time=None, speed=None, symbol_specs=None, end_time=None):
         """
-        Mengambil semua nilai pengaturan dari input dialog dan mengembalikannya dalam bentuk kamus.
+        Inisialisasi simulator.
+        Args:
+            data_dir (str): Direktori file data rekaman.
+            symbols (list, optional): Simbol yang dimuat; default semua simbol yang punya file candle.
+            balance (float): Saldo awal akun.
+            leverage (int): Leverage akun.
+            start_time (int, optional): Waktu mulai simulasi (detik epoch); default SIM_WARMUP_SECONDS
+                setelah data pertama (maksimal di tengah data) agar training dan indikator langsung punya riwayat.
+            speed (float, optional): Kelipatan kecepatan replay terhadap jam dinding; None untuk jam manual.
+            symbol_specs (dict, optional): Override spesifikasi per simbol (lihat SIM_SYMBOL_DEFAULTS).
+            end_time (int, optional): Akhir data yang dimuat (detik epoch). Dari rekaman MarketRecorder hanya
+                [start_time - SIM_WARMUP_SECONDS, end_time] yang dimuat; tanpa start_time, hanya
+                RECORDER_DEFAULT_WINDOW_DAYS hari terakhir.
+        """
+        self.data_dir = data_dir
+        self.balance = float(balance)
+        self.leverage = leverage
+        self.speed = speed
+        self._symbols_filter = symbols
+        self._symbol_specs = symbol_specs or {}
+        self._start_time = start_time
+        self._end_time = end_time
+        self._lock = threading.RLock()
+        self._error = (1, "Success")
+        self._connected = False
+
+    # --- Pemuatan data ---
+    def initialize(self):
+        with self._lock:
+            if self._connected:
+                return True
+            try:
+                self._load()
+            except (OSError, ValueError) as e:
+                self._error = (-1, f"Gagal memuat data simulasi: {e}")
+                return False
+            self._connected = True
+            return True
+
+    def shutdown(self):
+        with self._lock:
+            self._connected = False
+
+    def last_error(self):
+        return self._error
+
+    def _load(self):
+        """Memuat semua file candle/tick dari data_dir dan menyiapkan state simulasi."""
+        self._rates = {} # (simbol, timeframe) -> array RATES_DTYPE
+        self._base_timeframe = {} # simbol -> timeframe terkecil yang direkam
+        name_to_tf = {name: tf for tf, name in TIMEFRAME_NAMES.items()}
+        for filename in sorted(os.listdir(self.data_dir)):
+            stem, ext = os.path.splitext(filename)
+            if ext.lower() != '.csv' or '_' not in stem:
+                continue
+            symbol_name, tf_name = stem.rsplit('_', 1)
+            timeframe = name_to_tf.get(tf_name.upper())
+            if timeframe is None or (self._symbols_filter and symbol_name not in self._symbols_filter):
+                continue
+            self._add_rates(symbol_name, timeframe,
+                            slice_rates(read_rates_csv(os.path.join(self.data_dir, filename)), end=self._end_time))
+        # Rekaman MarketRecorder: <data_dir>/<SIMBOL>/<TF>/<hari>/ (dipakai jika tidak ada CSV untuk pasangan yang sama)
+        recorder = MarketRecorder(self.data_dir)
+        for symbol_name in sorted(os.listdir(self.data_dir)):
+            if not os.path.isdir(os.path.join(self.data_dir, symbol_name)) or \
+                    (self._symbols_filter and symbol_name not in self._symbols_filter):
+                continue
+            for timeframe, tf_name in TIMEFRAME_NAMES.items():
+                if (symbol_name, timeframe) not in self._rates and recorder.days(symbol_name, tf_name):
+                    if self._start_time is not None:
+                        window_start = int(self._start_time) - SIM_WARMUP_SECONDS
+                    else:
+                        window_start = recorder.window_start(symbol_name, tf_name)
+                    rates = recorder.read_rates(symbol_name, timeframe, window_start, self._end_time)
+                    if len(rates):
+                        self._add_rates(symbol_name, timeframe, rates)
+        if not self._base_timeframe:
+            raise ValueError(f"tidak ada file candle <SIMBOL>_<TF>.csv atau rekaman MarketRecorder di {self.data_dir}")
+
+        self._specs = {}
+        self._ticks = {} # simbol -> (time_msc, bid, ask)
+        for symbol_name, base in self._base_timeframe.items():
+            spec = dict(SIM_SYMBOL_DEFAULTS)
+            spec.update(self._symbol_specs.get(symbol_name, {}))
+            self._specs[symbol_name] = spec
+            tick_file = os.path.join(self.data_dir, f"{symbol_name}_ticks.csv")
+            if os.path.exists(tick_file):
+                self._ticks[symbol_name] = self._read_ticks(tick_file)
+            else:
+                self._ticks[symbol_name] = self._synthesize_ticks(self._rates[(symbol_name, base)], base, spec['point'])
+
+        # Timeline gabungan semua tick (milidetik), jam simulasi bergerak di atasnya
+        self._timeline = np.unique(np.concatenate([ticks[0] for ticks in self._ticks.values()]))
+        if self._start_time is not None:
+            start_msc = int(self._start_time) * 1000
+        else:
+            first, last = int(self._timeline[0]), int(self._timeline[-1])
+            start_msc = first + min(SIM_WARMUP_SECONDS * 1000, (last - first) // 2)
+        self._cursor = max(0, int(np.searchsorted(self._timeline, start_msc, side='right')) - 1)
+        self.now_msc = int(self._timeline[self._cursor])
+        self._tick_index = {s: self._tick_index_at(s, self.now_msc) for s in self._ticks}
+        self._wall_start = time.monotonic()
+        self._sim_start_msc = self.now_msc
+
+        self._positions = {} # ticket -> dict posisi
+        self._orders = {} # ticket -> dict order pending
+        self.deals = [] # Riwayat SimDeal (eksekusi buka/tutup)
+        self._next_ticket = 1
+
+    def _add_rates(self, symbol_name, timeframe, rates):
+        """Mendaftarkan candle satu (simbol, timeframe) dan memperbarui timeframe dasar simbol."""
+        self._rates[(symbol_name, timeframe)] = rates
+        base = self._base_timeframe.get(symbol_name)
+        if base is None or timeframe_seconds(timeframe) < timeframe_seconds(base):
+            self._base_timeframe[symbol_name] = timeframe
+
+    def _read_ticks(self, path):
+        """Membaca file tick CSV menjadi tuple array (time_msc, bid, ask)."""
+        df = pd.read_csv(path)
+        if 'time_msc' in df.columns:
+            time_msc = df['time_msc'].to_numpy(dtype=np.int64)
+        else:
+            time_msc = epoch_seconds(df['time']) * 1000
+        order = np.argsort(time_msc, kind='stable')
+        return (time_msc[order], df['bid'].to_numpy(dtype=float)[order], df['ask'].to_numpy(dtype=float)[order])
+
+    @staticmethod
+    def _synthesize_ticks(rates, timeframe, point):
+        """
+        Membentuk tick dari candle: open, lalu low/high (low dulu untuk candle naik), lalu close,
+        tersebar merata di dalam durasi candle.
+        """
+        period_msc = timeframe_seconds(timeframe) * 1000
+        bullish = rates['close'] >= rates['open']
+        path = np.stack([
+            rates['open'],
+            np.where(bullish, rates['low'], rates['high']),
+            np.where(bullish, rates['high'], rates['low']),
+            rates['close'],
+        ], axis=1)[:, :SIM_TICKS_PER_BAR]
+        offsets = np.arange(path.shape[1]) * (period_msc // path.shape[1])
+        time_msc = (rates['time'][:, None] * 1000 + offsets[None, :]).ravel()
+        bid = path.ravel()
+        ask = bid + np.repeat(rates['spread'].astype(float), path.shape[1]) * point
+        return (time_msc, bid, ask)
+
+    def _rates_for(self, symbol_name, timeframe):
+        """Candle rekaman untuk (simbol, timeframe); dibentuk dari timeframe terkecil jika belum ada."""
+        key = (symbol_name, timeframe)
+        rates = self._rates.get(key)
+        if rates is None:
+            base = self._base_timeframe.get(symbol_name)
+            if base is None or timeframe_seconds(timeframe) < timeframe_seconds(base):
+                return None
+            rates = resample_rates(self._rates[(symbol_name, base)], timeframe_seconds(timeframe))
+            self._rates[key] = rates
+        return rates
+
+    # --- Jam simulasi ---
+    def _tick_index_at(self, symbol_name, time_msc):
+        return int(np.searchsorted(self._ticks[symbol_name][0], time_msc, side='right')) - 1
+
+    def step(self):
+        """
+        Memajukan jam simulasi ke tick berikutnya dan memproses order/SL/TP.
         Returns:
-            dict: Kamus berisi pengaturan trading yang diatur oleh pengguna.
+            bool: False jika data rekaman sudah habis.
         """
-        return {
-            'lot_size': self.lot_size_input.value(),
-            'risk_percent': self.risk_percent_input.value(),
-            'target_profit_usd': self.target_profit_usd_input.value(),
-            'target_loss_usd': self.target_loss_usd_input.value(),
-            'tp_pips': self.tp_pips_input.value(),
-            'sl_pips': self.sl_pips_input.value(),
-            'max_hold_duration': self.max_hold_duration_input.value(),
-            'entry_method': self.entry_method_combo.currentText(),
-            'max_retry': self.retry_input.value(),
-            'max_spread': self.max_spread_input.value(),
-            'min_tick_volume_scalping': self.min_tick_volume_scalping_input.value(),
-            'scalping_pattern_confidence': self.scalping_pattern_confidence_input.value()
-        }
+        with self._lock:
+            if self._cursor + 1 >= len(self._timeline):
+                return False
+            self._cursor += 1
+            self.now_msc = int(self._timeline[self._cursor])
+            for symbol_name in self._ticks:
+                index = self._tick_index_at(symbol_name, self.now_msc)
+                if index != self._tick_index[symbol_name]:
+                    self._tick_index[symbol_name] = index
+                    if index >= 0:
+                        self._on_tick(symbol_name)
+            return True
 
-class TradingBotGUI(QWidget):
-    """
-    Kelas utama untuk GUI AI Trading Bot.
-    Mengelola tampilan, interaksi pengguna, dan logika trading.
-    """
-    def __init__(self):
+    def advance_to(self, time_seconds):
         """
-        Inisialisasi jendela GUI utama bot.
+        Memajukan jam simulasi tick demi tick sampai `time_seconds` (detik epoch).
+        Returns:
+            int: Jumlah tick yang diproses.
         """
-        super().__init__()
-        self.setWindowTitle("🔥 AI TRADING BOT - XAUUSD REALTIME")
-        self.resize(1000, 800)
+        target_msc = int(time_seconds * 1000)
+        steps = 0
+        with self._lock:
+            while self._cursor + 1 < len(self._timeline) and self._timeline[self._cursor + 1] <= target_msc:
+                self.step()
+                steps += 1
+        return steps
+
+    def _sync(self):
+        """Dalam mode replay live (speed diset), menyusulkan jam simulasi ke jam dinding."""
+        if self.speed is not None and self._connected:
+            elapsed_msc = (time.monotonic() - self._wall_start) * 1000 * self.speed
+            self.advance_to((self._sim_start_msc + elapsed_msc) / 1000)
+
+    def _current_tick(self, symbol_name):
+        """Returns: tuple or None: (time_msc, bid, ask) tick terakhir simbol pada jam simulasi."""
+        ticks = self._ticks.get(symbol_name)
+        index = self._tick_index.get(symbol_name, -1)
+        if ticks is None or index < 0:
+            return None
+        return int(ticks[0][index]), float(ticks[1][index]), float(ticks[2][index])
+
+    # --- Data pasar ---
+    def copy_rates_from_pos(self, symbol_name, timeframe, start_pos, count):
+        with self._lock:
+            self._sync()
+            rates = self._rates_for(symbol_name, timeframe)
+            tick = self._current_tick(symbol_name)
+            if rates is None or tick is None:
+                self._error = (-2, f"Data {symbol_name} {timeframe} tidak tersedia")
+                return None
+            now = tick[0] // 1000
+            current = int(np.searchsorted(rates['time'], now, side='right')) - 1 - start_pos
+            if current < 0:
+                return np.zeros(0, dtype=RATES_DTYPE)
+            out = rates[max(0, current - count + 1):current + 1].copy()
+            if start_pos == 0:
+                self._form_current_bar(symbol_name, timeframe, out[-1:], tick)
+            return out
+
+    def _form_current_bar(self, symbol_name, timeframe, bar, tick):
+        """Memotong candle yang sedang terbentuk ke tick yang sudah terjadi (tanpa melihat masa depan)."""
+        period = timeframe_seconds(timeframe)
+        bar_time = int(bar['time'][0])
+        times, bids = self._ticks[symbol_name][0], self._ticks[symbol_name][1]
+        first = int(np.searchsorted(times, bar_time * 1000, side='left'))
+        last = self._tick_index[symbol_name] + 1
+        if last <= first:
+            return
+        seen = bids[first:last]
+        bar['high'] = max(float(bar['open'][0]), float(seen.max()))
+        bar['low'] = min(float(bar['open'][0]), float(seen.min()))
+        bar['close'] = tick[1]
+        elapsed = min(1.0, (tick[0] / 1000 - bar_time) / period)
+        bar['tick_volume'] = int(bar['tick_volume'][0] * elapsed)
+
+    def symbol_info(self, symbol_name):
+        with self._lock:
+            self._sync()
+            spec = self._specs.get(symbol_name)
+            tick = self._current_tick(symbol_name)
+            if spec is None or tick is None:
+                return None
+            return SimSymbolInfo(
+                name=symbol_name, visible=True, trade_mode=mt5.SYMBOL_TRADE_MODE_FULL,
+                point=spec['point'], digits=spec['digits'],
+                spread=int(round((tick[2] - tick[1]) / spec['point'])),
+                trade_contract_size=spec['trade_contract_size'], trade_stops_level=0,
+                volume_min=spec['volume_min'], volume_max=spec['volume_max'], volume_step=spec['volume_step'],
+                bid=tick[1], ask=tick[2],
+            )
 
-        # Inisialisasi area output log terlebih dahulu
-        # Ini penting agar self.log_output sudah ada saat load_settings() dipanggil
-        self.log_output = QTextEdit()
-        self.log_output.setReadOnly(True)
-        self.log_output.setStyleSheet("font-family: Consolas; font-size: 11px;")
+    def symbol_info_tick(self, symbol_name):
+        with self._lock:
+            self._sync()
+            tick = self._current_tick(symbol_name)
+            if tick is None:
+                return None
+            return SimTick(time=tick[0] // 1000, bid=tick[1], ask=tick[2], last=0.0, volume=0,
+                           time_msc=tick[0], flags=0, volume_real=0.0)
+
+    # --- Akun dan posisi ---
+    def _profit(self, position, close_price):
+        direction = 1 if position['type'] == mt5.ORDER_TYPE_BUY else -1
+        contract = self._specs[position['symbol']]['trade_contract_size']
+        return direction * (close_price - position['price_open']) * position['volume'] * contract
+
+    def _close_price(self, position):
+        tick = self._current_tick(position['symbol'])
+        return tick[1] if position['type'] == mt5.ORDER_TYPE_BUY else tick[2]
+
+    def _used_margin(self):
+        return sum((self._margin(p["symbol"], p["volume"], p["price_open"]) for p in self._positions.values()), 0.0)
+
+    def _margin(self, symbol_name, volume, price):
+        return volume * self._specs[symbol_name]['trade_contract_size'] * price / self.leverage
+
+    def _equity(self):
+        return self.balance + sum(self._profit(p, self._close_price(p)) for p in self._positions.values())
+
+    def positions_get(self, symbol=None, ticket=None):
+        with self._lock:
+            self._sync()
+            result = []
+            for position in self._positions.values():
+                if symbol is not None and position['symbol'] != symbol:
+                    continue
+                if ticket is not None and position['ticket'] != ticket:
+                    continue
+                price_current = self._close_price(position)
+                result.append(SimPosition(
+                    ticket=position['ticket'], time=position['time_msc'] // 1000, time_msc=position['time_msc'],
+                    type=position['type'], magic=position['magic'], identifier=position['ticket'], reason=0,
+                    volume=position['volume'], price_open=position['price_open'], sl=position['sl'],
+                    tp=position['tp'], price_current=price_current, swap=0.0,
+                    profit=self._profit(position, price_current), symbol=position['symbol'],
+                    comment=position['comment'],
+                ))
+            return tuple(result)
+
+    def history_deals_get(self, date_from, date_to):
+        def to_msc(value):
+            return int(value.timestamp() * 1000) if isinstance(value, datetime.datetime) else int(value) * 1000
+        with self._lock:
+            self._sync()
+            start, end = to_msc(date_from), to_msc(date_to)
+            return tuple(deal for deal in self.deals if start <= deal.time_msc <= end)
+
+    def account_info(self):
+        with self._lock:
+            self._sync()
+            equity = self._equity()
+            margin = self._used_margin()
+            return SimAccountInfo(
+                login=0, leverage=self.leverage, balance=self.balance, profit=equity - self.balance,
+                equity=equity, margin=margin, margin_free=equity - margin,
+                margin_level=(equity / margin * 100) if margin > 0 else 0.0, currency="USD",
+            )
+
+    def order_calc_margin(self, action, symbol_name, volume, price):
+        with self._lock:
+            if symbol_name not in self._specs:
+                return None
+            return self._margin(symbol_name, volume, price)
+
+    # --- Eksekusi order ---
+    def order_send(self, request):
+        with self._lock:
+            self._sync()
+            req = SimTradeRequest(**{field: request.get(field, "" if field in ("symbol", "comment") else 0)
+                                     for field in SimTradeRequest._fields})
+            if not req.symbol and req.position in self._positions:
+                req = req._replace(symbol=self._positions[req.position]['symbol'])
+            tick = self._current_tick(req.symbol)
+            if tick is None:
+                return self._result(mt5.TRADE_RETCODE_INVALID, req)
+
+            if req.action == mt5.TRADE_ACTION_DEAL:
+                if req.position:
+                    return self._close_by_request(req, tick)
+                return self._open_market(req, tick)
+            if req.action == mt5.TRADE_ACTION_PENDING:
+                return self._place_pending(req, tick)
+            if req.action == mt5.TRADE_ACTION_SLTP:
+                position = self._positions.get(req.position)
+                if position is None:
+                    return self._result(mt5.TRADE_RETCODE_POSITION_CLOSED, req)
+                if not self._stops_valid(position['type'], req.sl, req.tp, tick):
+                    return self._result(mt5.TRADE_RETCODE_INVALID_STOPS, req)
+                position['sl'], position['tp'] = float(req.sl), float(req.tp)
+                return self._result(mt5.TRADE_RETCODE_DONE, req, tick=tick)
+            if req.action == mt5.TRADE_ACTION_REMOVE:
+                if self._orders.pop(req.order, None) is None:
+                    return self._result(mt5.TRADE_RETCODE_INVALID_ORDER, req)
+                return self._result(mt5.TRADE_RETCODE_DONE, req, order=req.order, tick=tick)
+            return self._result(mt5.TRADE_RETCODE_INVALID, req)
+
+    def _result(self, retcode, req, deal=0, order=0, volume=0.0, price=0.0, tick=None):
+        comment = "Request executed" if retcode == mt5.TRADE_RETCODE_DONE else "Request rejected"
+        return SimOrderSendResult(retcode=retcode, deal=deal, order=order, volume=volume, price=price,
+                                  bid=tick[1] if tick else 0.0, ask=tick[2] if tick else 0.0,
+                                  comment=comment, request_id=0, request=req)
+
+    def _volume_valid(self, symbol_name, volume):
+        spec = self._specs[symbol_name]
+        if volume < spec['volume_min'] - 1e-9 or volume > spec['volume_max'] + 1e-9:
+            return False
+        steps = volume / spec['volume_step']
+        return abs(steps - round(steps)) < 1e-6
 
-        # Inisialisasi pengaturan trading dengan nilai default
-        self.trading_settings = {
-            'lot_size': 0.1,
-            'risk_percent': 1.0,
-            'target_profit_usd': 1.0,
-            'target_loss_usd': 30.0,
-            'tp_pips': 50,
-            'sl_pips': 30,
-            'max_hold_duration': 15,
-            'entry_method': "Instant",
-            'max_retry': 3,
-            'max_spread': 50,
-            'min_tick_volume_scalping': 100,
-            'scalping_pattern_confidence': 0.7
+    @staticmethod
+    def _stops_valid(order_type, sl, tp, tick):
+        """SL/TP posisi beli harus di bawah/atas bid; posisi jual di atas/bawah ask."""
+        if order_type == mt5.ORDER_TYPE_BUY:
+            return not (sl and sl >= tick[1]) and not (tp and tp <= tick[1])
+        return not (sl and sl <= tick[2]) and not (tp and tp >= tick[2])
+
+    def _take_ticket(self):
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    def _open_market(self, req, tick):
+        if req.type not in (mt5.ORDER_TYPE_BUY, mt5.ORDER_TYPE_SELL):
+            return self._result(mt5.TRADE_RETCODE_INVALID, req)
+        if not self._volume_valid(req.symbol, req.volume):
+            return self._result(mt5.TRADE_RETCODE_INVALID_VOLUME, req)
+        fill_price = tick[2] if req.type == mt5.ORDER_TYPE_BUY else tick[1]
+        point = self._specs[req.symbol]['point']
+        if req.price and abs(req.price - fill_price) > (req.deviation or 0) * point + 1e-9:
+            return self._result(mt5.TRADE_RETCODE_REQUOTE, req, tick=tick)
+        if not self._stops_valid(req.type, req.sl, req.tp, tick):
+            return self._result(mt5.TRADE_RETCODE_INVALID_STOPS, req, tick=tick)
+        if self._margin(req.symbol, req.volume, fill_price) > self._equity() - self._used_margin():
+            return self._result(mt5.TRADE_RETCODE_NO_MONEY, req, tick=tick)
+        order_ticket = self._take_ticket()
+        deal_ticket = self._open_position(order_ticket, req.symbol, req.type, req.volume, fill_price,
+                                          req.sl, req.tp, req.magic, req.comment)
+        return self._result(mt5.TRADE_RETCODE_DONE, req, deal=deal_ticket, order=order_ticket,
+                            volume=req.volume, price=fill_price, tick=tick)
+
+    def _open_position(self, order_ticket, symbol_name, order_type, volume, price, sl, tp, magic, comment):
+        """Membuka posisi baru dan mencatat deal masuk. Returns: int: Tiket deal."""
+        self._positions[order_ticket] = {
+            'ticket': order_ticket, 'symbol': symbol_name, 'type': order_type, 'volume': float(volume),
+            'price_open': float(price), 'sl': float(sl or 0.0), 'tp': float(tp or 0.0),
+            'magic': magic or 0, 'comment': comment or "", 'time_msc': self.now_msc,
         }
-        self.load_settings() # Memuat pengaturan yang tersimpan saat inisialisasi
+        deal_type = mt5.DEAL_TYPE_BUY if order_type == mt5.ORDER_TYPE_BUY else mt5.DEAL_TYPE_SELL
+        return self._record_deal(order_ticket, order_ticket, deal_type, mt5.DEAL_ENTRY_IN,
+                                 volume, price, 0.0, symbol_name, magic, mt5.DEAL_REASON_EXPERT, comment)
+
+    def _record_deal(self, order_ticket, position_id, deal_type, entry, volume, price, profit,
+                     symbol_name, magic, reason, comment):
+        deal_ticket = self._take_ticket()
+        self.deals.append(SimDeal(
+            ticket=deal_ticket, order=order_ticket, time=self.now_msc // 1000, time_msc=self.now_msc,
+            type=deal_type, entry=entry, magic=magic or 0, position_id=position_id, reason=reason,
+            volume=float(volume), price=float(price), commission=0.0, swap=0.0, profit=profit,
+            symbol=symbol_name, comment=comment or "",
+        ))
+        return deal_ticket
+
+    def _close_position(self, position, volume, price, reason, comment=""):
+        """Menutup (sebagian) posisi pada `price` dan merealisasikan profit ke saldo. Returns: int: Tiket deal."""
+        closed = dict(position, volume=volume)
+        profit = self._profit(closed, price)
+        self.balance += profit
+        position['volume'] = round(position['volume'] - volume, 8)
+        if position['volume'] <= 1e-9:
+            del self._positions[position['ticket']]
+        deal_type = mt5.DEAL_TYPE_SELL if position['type'] == mt5.ORDER_TYPE_BUY else mt5.DEAL_TYPE_BUY
+        return self._record_deal(self._take_ticket(), position['ticket'], deal_type, mt5.DEAL_ENTRY_OUT,
+                                 volume, price, profit, position['symbol'], position['magic'], reason, comment)
+
+    def _close_by_request(self, req, tick):
+        position = self._positions.get(req.position)
+        if position is None:
+            return self._result(mt5.TRADE_RETCODE_POSITION_CLOSED, req, tick=tick)
+        opposite = mt5.ORDER_TYPE_SELL if position['type'] == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
+        if req.type != opposite:
+            return self._result(mt5.TRADE_RETCODE_INVALID, req, tick=tick)
+        if req.volume > position['volume'] + 1e-9 or not self._volume_valid(req.symbol, req.volume):
+            return self._result(mt5.TRADE_RETCODE_INVALID_VOLUME, req, tick=tick)
+        price = self._close_price(position)
+        point = self._specs[req.symbol]['point']
+        if req.price and abs(req.price - price) > (req.deviation or 0) * point + 1e-9:
+            return self._result(mt5.TRADE_RETCODE_REQUOTE, req, tick=tick)
+        deal_ticket = self._close_position(position, req.volume, price, mt5.DEAL_REASON_EXPERT, req.comment)
+        return self._result(mt5.TRADE_RETCODE_DONE, req, deal=deal_ticket, order=self.deals[-1].order,
+                            volume=req.volume, price=price, tick=tick)
+
+    def _place_pending(self, req, tick):
+        bid, ask = tick[1], tick[2]
+        valid_price = {
+            mt5.ORDER_TYPE_BUY_LIMIT: req.price < ask,
+            mt5.ORDER_TYPE_SELL_LIMIT: req.price > bid,
+            mt5.ORDER_TYPE_BUY_STOP: req.price > ask,
+            mt5.ORDER_TYPE_SELL_STOP: req.price < bid,
+            mt5.ORDER_TYPE_BUY_STOP_LIMIT: req.price > ask and 0 < req.stoplimit < req.price,
+            mt5.ORDER_TYPE_SELL_STOP_LIMIT: req.price < bid and req.stoplimit > req.price,
+        }.get(req.type)
+        if valid_price is None:
+            return self._result(mt5.TRADE_RETCODE_INVALID, req, tick=tick)
+        if not valid_price:
+            return self._result(mt5.TRADE_RETCODE_INVALID_PRICE, req, tick=tick)
+        if not self._volume_valid(req.symbol, req.volume):
+            return self._result(mt5.TRADE_RETCODE_INVALID_VOLUME, req, tick=tick)
+        expiration = req.expiration
+        if isinstance(expiration, datetime.datetime):
+            expiration = int(expiration.timestamp())
+        if req.type_time == mt5.ORDER_TIME_SPECIFIED and expiration and expiration * 1000 <= self.now_msc:
+            return self._result(mt5.TRADE_RETCODE_INVALID_EXPIRATION, req, tick=tick)
+        ticket = self._take_ticket()
+        self._orders[ticket] = {
+            'ticket': ticket, 'symbol': req.symbol, 'type': req.type, 'volume': float(req.volume),
+            'price': float(req.price), 'stoplimit': float(req.stoplimit or 0.0), 'sl': float(req.sl or 0.0),
+            'tp': float(req.tp or 0.0), 'magic': req.magic or 0, 'comment': req.comment or "",
+            'type_time': req.type_time, 'expiration': int(expiration or 0), 'time_msc': self.now_msc,
+        }
+        return self._result(mt5.TRADE_RETCODE_DONE, req, order=ticket, volume=req.volume, tick=tick)
+
+    def orders_get(self, symbol=None):
+        """Returns: tuple: Order pending yang masih aktif (sebagai SimOrder)."""
+        with self._lock:
+            self._sync()
+            return tuple(
+                SimOrder(ticket=o['ticket'], time_setup=o['time_msc'] // 1000, type=o['type'],
+                         type_time=o['type_time'], expiration=o['expiration'], magic=o['magic'],
+                         volume_initial=o['volume'], price_open=o['price'], price_stoplimit=o['stoplimit'],
+                         sl=o['sl'], tp=o['tp'], symbol=o['symbol'], comment=o['comment'])
+                for o in self._orders.values() if symbol is None or o['symbol'] == symbol
+            )
 
-        self.setup_ui() # Membangun semua komponen UI
-        
-        self.data_timer = QTimer()
-        self.data_timer.timeout.connect(self.update_market_data)
-        self.data_timer.start(1000)
-        
-        self.analysis_timer = QTimer()
-        self.analysis_timer.timeout.connect(self.run_analysis)
-        
-        self.news_timer = QTimer()
-        self.news_timer.timeout.connect(self.check_economic_news)
-        self.news_timer.start(30000)
+    def _on_tick(self, symbol_name):
+        """Memproses order pending dan SL/TP untuk simbol pada tick terbaru."""
+        tick = self._current_tick(symbol_name)
+        _, bid, ask = tick
+
+        for order in [o for o in self._orders.values() if o['symbol'] == symbol_name]:
+            if order['type_time'] == mt5.ORDER_TIME_SPECIFIED and order['expiration'] and \
+               self.now_msc >= order['expiration'] * 1000:
+                del self._orders[order['ticket']] # Kedaluwarsa
+                continue
+            order_type = order['type']
+            if order_type == mt5.ORDER_TYPE_BUY_STOP_LIMIT and ask >= order['price']:
+                order.update(type=mt5.ORDER_TYPE_BUY_LIMIT, price=order['stoplimit'])
+                continue
+            if order_type == mt5.ORDER_TYPE_SELL_STOP_LIMIT and bid <= order['price']:
+                order.update(type=mt5.ORDER_TYPE_SELL_LIMIT, price=order['stoplimit'])
+                continue
+            if order_type in (mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_BUY_STOP):
+                triggered = ask <= order['price'] if order_type == mt5.ORDER_TYPE_BUY_LIMIT else ask >= order['price']
+                side, fill_price = mt5.ORDER_TYPE_BUY, ask
+            elif order_type in (mt5.ORDER_TYPE_SELL_LIMIT, mt5.ORDER_TYPE_SELL_STOP):
+                triggered = bid >= order['price'] if order_type == mt5.ORDER_TYPE_SELL_LIMIT else bid <= order['price']
+                side, fill_price = mt5.ORDER_TYPE_SELL, bid
+            else:
+                continue
+            if not triggered:
+                continue
+            del self._orders[order['ticket']]
+            if self._margin(symbol_name, order['volume'], fill_price) > self._equity() - self._used_margin():
+                continue # Margin tidak cukup saat order terpicu: order dibatalkan
+            self._open_position(order['ticket'], symbol_name, side, order['volume'], fill_price,
+                                order['sl'], order['tp'], order['magic'], order['comment'])
+
+        for position in [p for p in self._positions.values() if p['symbol'] == symbol_name]:
+            sl, tp = position['sl'], position['tp']
+            if position['type'] == mt5.ORDER_TYPE_BUY:
+                hit_sl, hit_tp = sl and bid <= sl, tp and bid >= tp
+            else:
+                hit_sl, hit_tp = sl and ask >= sl, tp and ask <= tp
+            if hit_sl:
+                self._close_position(position, position['volume'], sl, mt5.DEAL_REASON_SL, "sl")
+            elif hit_tp:
+                self._close_position(position, position['volume'], tp, mt5.DEAL_REASON_TP, "tp")
 
-        self.train_model()
-        self.check_economic_news()
 
-        self.set_mode("Monitoring")
+def create_broker(kind="mt5", **kwargs):
+    """
+    Membuat BrokerAdapter sesuai jenisnya.
+    Args:
+        kind (str): "mt5" untuk terminal MetaTrader 5, "sim" untuk SimulatedBroker.
+        **kwargs: Diteruskan ke konstruktor broker (misalnya data_dir dan speed untuk simulator).
+    Returns:
+        BrokerAdapter: Broker yang belum diinisialisasi.
+    """
+    if kind == "mt5":
+        return MT5Broker(**kwargs)
+    if kind == "sim":
+        return SimulatedBroker(**kwargs)
+    raise ValueError(f"Jenis broker tidak dikenal: {kind}")
+
 
-    def save_settings(self):
+def connect_broker(adapter):
+    """
+    Menginisialisasi broker dan menjadikannya broker aktif untuk seluruh bot.
+    Args:
+        adapter (BrokerAdapter): Broker yang akan dipakai.
+    Returns:
+        bool: True jika koneksi berhasil.
+    """
+    global broker
+    if not adapter.initialize():
+        return False
+    broker = ProfiledBroker(adapter)
+    return True
+
+
+# Konfigurasi profiler tahap (lihat StageProfiler)
+PROFILER_ENABLED = False # Sampling span dimatikan secara default (overhead hanya satu pengecekan flag); --profile atau panel GUI
+PROFILER_WINDOW = 500 # Jumlah sampel terakhir per tahap untuk statistik bergulir
+PROFILER_DUMP_SECONDS = 30 # Interval penulisan statistik tahap ke PROFILER_FILE selama sampling aktif
+PROFILER_FILE = os.path.join(LOG_DIR, "stage_metrics.json")
+PROFILER_UI_REFRESH_MS = 1000 # Interval refresh panel profiler di GUI (hanya saat panel dibuka)
+
+
+class _Span:
+    """Context manager satu pengukuran tahap (dibuat oleh StageProfiler.span saat sampling aktif)."""
+    __slots__ = ('profiler', 'stage', 'started')
+
+    def __init__(self, profiler, stage):
+        self.profiler = profiler
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class StageProfiler:
+    """
+    Statistik durasi bergulir per tahap (pengambilan data, indikator, inferensi, strategi, order).
+    Saat sampling dimatikan, span() mengembalikan context manager kosong yang dipakai ulang, sehingga
+    instrumentasi di jalur panas hanya berupa satu pengecekan flag.
+    """
+    def __init__(self, enabled=PROFILER_ENABLED, window=PROFILER_WINDOW):
         """
-        Menyimpan pengaturan trading saat ini ke file JSON.
+        Args:
+            enabled (bool): Sampling aktif sejak awal.
+            window (int): Jumlah sampel terakhir per tahap yang disimpan.
         """
-        try:
-            with open(SETTINGS_FILE, 'w') as f:
-                json.dump(self.trading_settings, f, indent=4)
-            self.log("Pengaturan berhasil disimpan.")
-            QMessageBox.information(self, "Pengaturan Tersimpan", "Pengaturan trading Anda telah berhasil disimpan!")
-        except IOError as e:
-            self.log(f"Error menyimpan pengaturan: {e}")
-            QMessageBox.warning(self, "Error Menyimpan Pengaturan", f"Gagal menyimpan pengaturan: {e}\nPastikan Anda memiliki izin tulis di direktori:\n{os.path.dirname(SETTINGS_FILE)}")
-        except Exception as e:
-            self.log(f"Error tidak dikenal saat menyimpan pengaturan: {e}")
-            QMessageBox.critical(self, "Error", f"Terjadi kesalahan tak terduga saat menyimpan pengaturan: {e}")
+        self.enabled = enabled
+        self.window = window
+        self._samples = {} # tahap -> deque durasi (detik) terakhir
+        self._counts = {} # tahap -> jumlah sampel sejak reset
+        self._lock = threading.Lock()
 
+    def set_enabled(self, enabled):
+        """Menyalakan atau mematikan sampling; statistik yang sudah ada tetap disimpan."""
+        self.enabled = bool(enabled)
 
-    def load_settings(self):
+    def span(self, stage):
         """
-        Memuat pengaturan trading dari file JSON.
-        Jika file tidak ditemukan atau ada kesalahan, pengaturan default akan digunakan.
+        Args:
+            stage (str): Nama tahap, misalnya "mt5.copy_rates_from_pos".
+        Returns:
+            Context manager yang mengukur blok `with` jika sampling aktif.
         """
-        try:
-            with open(SETTINGS_FILE, 'r') as f:
-                loaded_settings = json.load(f)
-                self.trading_settings.update(loaded_settings)
-            self.log("Pengaturan berhasil dimuat.")
-        except FileNotFoundError:
-            self.log(f"File pengaturan '{SETTINGS_FILE}' tidak ditemukan. Menggunakan pengaturan default.")
-        except json.JSONDecodeError as e:
-            self.log(f"Error membaca file pengaturan (JSON tidak valid): {e}. Menggunakan pengaturan default.")
-        except Exception as e:
-            self.log(f"Error tidak dikenal saat memuat pengaturan: {e}. Menggunakan pengaturan default.")
+        return _Span(self, stage) if self.enabled else nullcontext()
+
+    def record(self, stage, seconds):
+        """Mencatat satu durasi (detik) untuk tahap."""
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    def reset(self):
+        """Menghapus semua statistik."""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+    def summary(self):
+        """
+        Returns:
+            dict: Tahap -> count (sejak reset), window, last_ms, mean_ms, p50_ms, p95_ms, max_ms, total_ms
+            (jumlah durasi di jendela), terurut dari total_ms terbesar.
+        """
+        with self._lock:
+            snapshot = {stage: (list(samples), self._counts[stage]) for stage, samples in self._samples.items()}
+        stats = {}
+        for stage, (samples, count) in snapshot.items():
+            values = np.asarray(samples) * 1000
+            p50, p95 = np.percentile(values, [50, 95])
+            stats[stage] = {
+                'count': count,
+                'window': len(values),
+                'last_ms': float(values[-1]),
+                'mean_ms': float(values.mean()),
+                'p50_ms': float(p50),
+                'p95_ms': float(p95),
+                'max_ms': float(values.max()),
+                'total_ms': float(values.sum()),
+            }
+        return dict(sorted(stats.items(), key=lambda item: item[1]['total_ms'], reverse=True))
 
-    def setup_ui(self):
+    def format_summary(self):
         """
-        Membangun semua elemen UI (label, tombol, grup box, dll.)
-        dan menempatkannya dalam tata letak.
+        Returns:
+            str: Tabel teks statistik tahap (dipakai panel GUI dan log).
         """
-        self.layout = QVBoxLayout(self)
-        
-        header = QHBoxLayout()
-        self.status_label = QLabel("🟢 BOT READY | Mode: Stopped")
-        self.status_label.setStyleSheet("font-size: 14px; font-weight: bold;")
-        self.winrate_label = QLabel("Winrate: 0% (0/0)")
-        self.winrate_label.setStyleSheet("font-size: 14px; font-weight: bold; color: blue;")
-        header.addWidget(self.status_label, 70)
-        header.addWidget(self.winrate_label, 30)
-        self.layout.addLayout(header)
+        stats = self.summary()
+        if not stats:
+            return "Belum ada sampel." if self.enabled else "Sampling profiler tidak aktif."
+        width = max(len(stage) for stage in stats)
+        lines = [f"{'Tahap':<{width}} {'n':>7} {'terakhir':>9} {'rata2':>9} {'p50':>9} {'p95':>9} {'max':>9} {'total':>10}  (ms)"]
+        for stage, st in stats.items():
+            lines.append(f"{stage:<{width}} {st['count']:>7} {st['last_ms']:>9.2f} {st['mean_ms']:>9.2f} "
+                         f"{st['p50_ms']:>9.2f} {st['p95_ms']:>9.2f} {st['max_ms']:>9.2f} {st['total_ms']:>10.1f}")
+        return "\n".join(lines)
+
+    def dump(self, path=PROFILER_FILE):
+        """
+        Menulis statistik tahap ke file JSON (atomic replace).
+        Args:
+            path (str): File tujuan.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = {'updated': datetime.datetime.now().isoformat(timespec='seconds'), 'window': self.window,
+                   'enabled': self.enabled, 'stages': self.summary()}
+        with open(path + ".tmp", 'w') as f:
+            json.dump(payload, f, indent=2)
+        os.replace(path + ".tmp", path)
 
-        analysis_box = QGroupBox("📊 Analisis Pasar (Teknikal)")
-        analysis_layout = QGridLayout()
-        
-        self.price_label = QLabel("Harga: -")
-        self.rsi_label = QLabel("RSI: -")
-        self.macd_label = QLabel("MACD: -")
-        self.ema_label = QLabel("EMA20/50: -")
-        self.bb_label = QLabel("Lebar BB: -")
-        self.atr_label = QLabel("ATR: -")
-        self.trend_label = QLabel("Tren M5: -")
-        self.obv_label = QLabel("Tren OBV: -")
-        self.higher_tf_trend_label = QLabel("Tren H1: -")
-        self.snr_label = QLabel("SNR: N/A")
-        self.liquidity_label = QLabel("Likuiditas: N/A")
-        self.overall_analysis_label = QLabel("Analisis Realtime: Menunggu...")
-        self.last_trade_result_label = QLabel("Hasil Trade Terakhir: N/A") # Label baru
-        self.last_trade_result_label.setStyleSheet("font-weight: bold; color: black;") # Default color
-        
-        # Apply initial styling to all labels for consistency
-        for lbl in [self.price_label, self.rsi_label, self.macd_label,
-                     self.ema_label, self.bb_label, self.atr_label, self.trend_label,
-                     self.obv_label, self.higher_tf_trend_label, self.snr_label,
-                     self.liquidity_label, self.overall_analysis_label, self.last_trade_result_label]:
-            lbl.setStyleSheet("font-weight: bold;")
-            
-        # Row 0: Price and BB Width
-        analysis_layout.addWidget(QLabel("🟢 Harga:"), 0, 0)
-        analysis_layout.addWidget(self.price_label, 0, 1)
-        analysis_layout.addWidget(QLabel("📌 Lebar BB:"), 0, 2)
-        analysis_layout.addWidget(self.bb_label, 0, 3)
 
-        # Row 1: RSI and ATR
-        analysis_layout.addWidget(QLabel("📈 RSI:"), 1, 0)
-        analysis_layout.addWidget(self.rsi_label, 1, 1)
-        analysis_layout.addWidget(QLabel("📌 ATR:"), 1, 2)
-        analysis_layout.addWidget(self.atr_label, 1, 3)
+profiler = StageProfiler() # Profiler tahap global, dipakai oleh ProfiledBroker, @profiled, dan span di jalur panas
 
-        # Row 2: MACD and M5 Trend
-        analysis_layout.addWidget(QLabel("📊 MACD Hist:"), 2, 0) # Changed label to be more specific
-        analysis_layout.addWidget(self.macd_label, 2, 1)
-        analysis_layout.addWidget(QLabel("📌 Tren M5:"), 2, 2)
-        analysis_layout.addWidget(self.trend_label, 2, 3)
 
-        # Row 3: EMA and OBV Trend
-        analysis_layout.addWidget(QLabel("📉 EMA20/50:"), 3, 0) # Changed label to be more specific
-        analysis_layout.addWidget(self.ema_label, 3, 1)
-        analysis_layout.addWidget(QLabel("⚖️ Tren OBV:"), 3, 2)
-        analysis_layout.addWidget(self.obv_label, 3, 3)
+def profiled(stage):
+    """
+    Decorator yang mengukur seluruh pemanggilan fungsi sebagai tahap `stage` di profiler global.
+    Args:
+        stage (str): Nama tahap.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(stage, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+class ProfiledBroker:
+    """
+    Pembungkus BrokerAdapter yang mengukur setiap panggilan data/order. Jumlah panggilan, kegagalan (hasil None),
+    dan latensi selalu dicatat di `calls` (dibaca exporter metrik); span profiler tahap "mt5.<nama>" hanya
+    dicatat saat sampling aktif. Atribut lain (initialize, shutdown, kontrol jam simulator, dll.)
+    diteruskan langsung ke adapter.
+    """
+    def __init__(self, adapter):
+        self.adapter = adapter
+        self.calls = LatencyStats()
 
-        # Row 4: Higher TF Trend and SNR
-        analysis_layout.addWidget(QLabel("⬆️ Tren H1:"), 4, 0)
-        analysis_layout.addWidget(self.higher_tf_trend_label, 4, 1)
-        analysis_layout.addWidget(QLabel("📍 SNR:"), 4, 2)
-        analysis_layout.addWidget(self.snr_label, 4, 3)
+    def __getattr__(self, name):
+        return getattr(self.adapter, name)
 
-        # Row 5: Liquidity and Overall Analysis
-        analysis_layout.addWidget(QLabel("💧 Likuiditas:"), 5, 0)
-        analysis_layout.addWidget(self.liquidity_label, 5, 1)
-        analysis_layout.addWidget(QLabel("⚡ Analisis Realtime:"), 5, 2)
-        analysis_layout.addWidget(self.overall_analysis_label, 5, 3)
+    def _call(self, name, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            self.calls.record(name, elapsed, failed=result is None)
+            if profiler.enabled:
+                profiler.record("mt5." + name, elapsed)
 
-        # Row 6: Last Trade Result (spanning across columns for visibility)
-        analysis_layout.addWidget(QLabel("🏆 Hasil Trade Terakhir:"), 6, 0)
-        analysis_layout.addWidget(self.last_trade_result_label, 6, 1, 1, 3) # Span across 3 columns
-        
-        analysis_box.setLayout(analysis_layout)
-        self.layout.addWidget(analysis_box)
+    def copy_rates_from_pos(self, symbol_name, timeframe, start_pos, count):
+        return self._call("copy_rates_from_pos", self.adapter.copy_rates_from_pos, symbol_name, timeframe, start_pos, count)
 
-        news_box = QGroupBox("📰 Analisis Berita (Fundamental)")
-        news_layout = QGridLayout()
+    def symbol_info(self, symbol_name):
+        return self._call("symbol_info", self.adapter.symbol_info, symbol_name)
 
-        self.news_impact_label = QLabel("Dampak Saat Ini: None")
-        self.news_impact_label.setStyleSheet("font-weight: bold;")
-        self.next_news_label = QLabel("Berita Selanjutnya: N/A")
-        self.next_news_label.setStyleSheet("font-weight: bold;")
-        self.news_status_label = QLabel("Status: Mengecek...")
-        self.news_status_label.setStyleSheet("font-weight: bold;")
+    def symbol_info_tick(self, symbol_name):
+        return self._call("symbol_info_tick", self.adapter.symbol_info_tick, symbol_name)
 
-        news_layout.addWidget(QLabel("⚡ Dampak Berita:"), 0, 0)
-        news_layout.addWidget(self.news_impact_label, 0, 1)
-        news_layout.addWidget(QLabel("📅 Berita Selanjutnya:"), 1, 0)
-        news_layout.addWidget(self.next_news_label, 1, 1)
-        news_layout.addWidget(QLabel("ℹ️ Status Berita:"), 2, 0)
-        news_layout.addWidget(self.news_status_label, 2, 1)
+    def positions_get(self, symbol=None, ticket=None):
+        return self._call("positions_get", self.adapter.positions_get, symbol=symbol, ticket=ticket)
 
-        news_box.setLayout(news_layout)
-        self.layout.addWidget(news_box)
+    def history_deals_get(self, date_from, date_to):
+        return self._call("history_deals_get", self.adapter.history_deals_get, date_from, date_to)
 
-        settings_box = QGroupBox("⚙️ Pengaturan Trading")
-        settings_layout = QHBoxLayout()
-        self.settings_button = QPushButton("Buka Pengaturan")
-        self.settings_button.setStyleSheet("background-color: #607D8B; color: white; font-weight: bold;")
-        self.settings_button.clicked.connect(self.open_settings_dialog)
-        settings_layout.addWidget(self.settings_button)
-        settings_box.setLayout(settings_layout)
-        self.layout.addWidget(settings_box)
+    def account_info(self):
+        return self._call("account_info", self.adapter.account_info)
 
-        account_box = QGroupBox("💼 Info Akun")
-        account_layout = QGridLayout()
-        
-        self.balance_label = QLabel("Balance: -")
-        self.equity_label = QLabel("Equity: -")
-        self.margin_label = QLabel("Margin: -")
-        self.free_margin_label = QLabel("Free Margin: -")
-        self.positions_label = QLabel("Open Positions: -")
-        self.profit_label = QLabel("Current Profit: -")
-        
-        for lbl in [self.balance_label, self.equity_label, self.margin_label,
-                     self.free_margin_label, self.positions_label, self.profit_label]:
-            lbl.setStyleSheet("font-weight: bold;")
-            
-        account_layout.addWidget(QLabel("💰 Balance:"), 0, 0)
-        account_layout.addWidget(self.balance_label, 0, 1)
-        account_layout.addWidget(QLabel("📊 Equity:"), 1, 0)
-        account_layout.addWidget(self.equity_label, 1, 1)
-        account_layout.addWidget(QLabel("💳 Margin:"), 2, 0)
-        account_layout.addWidget(self.margin_label, 2, 1)
-        account_layout.addWidget(QLabel("🆓 Free Margin:"), 0, 2)
-        account_layout.addWidget(self.free_margin_label, 0, 3)
-        account_layout.addWidget(QLabel("📌 Positions:"), 1, 2)
-        account_layout.addWidget(self.positions_label, 1, 3)
-        account_layout.addWidget(QLabel("💰 Current Profit:"), 2, 2)
-        account_layout.addWidget(self.profit_label, 2, 3)
-        
-        account_box.setLayout(account_layout)
-        self.layout.addWidget(account_box)
+    def order_send(self, request):
+        return self._call("order_send", self.adapter.order_send, request)
 
-        control_box = QGroupBox("⚙️ Control Panel")
-        control_layout = QHBoxLayout()
-        
-        self.start_monitoring_button = QPushButton("👁️ Mulai Monitoring")
-        self.start_monitoring_button.setStyleSheet("background-color: #607D8B; color: white; font-weight: bold;")
-        self.start_monitoring_button.clicked.connect(self.toggle_monitoring_mode)
+    def order_calc_margin(self, action, symbol_name, volume, price):
+        return self._call("order_calc_margin", self.adapter.order_calc_margin, action, symbol_name, volume, price)
 
-        self.start_ai_long_button = QPushButton("🚀 Mulai AI Long Trade")
-        self.start_ai_long_button.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
-        self.start_ai_long_button.clicked.connect(self.toggle_ai_long_trade_mode)
 
-        self.start_scalping_button = QPushButton("⚡ Mulai Scalping")
-        self.start_scalping_button.setStyleSheet("background-color: #FFC107; color: black; font-weight: bold;")
-        self.start_scalping_button.clicked.connect(self.toggle_scalping_mode)
-        
-        # Tombol baru untuk mode Sniper
-        self.start_sniper_button = QPushButton("🎯 Mulai Sniper")
-        self.start_sniper_button.setStyleSheet("background-color: #9C27B0; color: white; font-weight: bold;")
-        self.start_sniper_button.clicked.connect(self.toggle_sniper_mode)
+# Konfigurasi cache candle (lihat BarCache)
+BAR_CACHE_CAPACITY = 500 # Jumlah candle minimum yang disimpan per (simbol, timeframe)
+BAR_CACHE_REFRESH_SECONDS = 0.5 # Jeda minimum antar refresh ke terminal untuk cache yang sama
 
-        self.train_button = QPushButton("🤖 Latih Model")
-        self.train_button.setStyleSheet("background-color: #2196F3; color: white; font-weight: bold;")
-        self.train_button.clicked.connect(self.train_model)
-        
-        self.close_all_button = QPushButton("❌ Tutup Semua")
-        self.close_all_button.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
-        self.close_all_button.clicked.connect(self.close_all_positions)
-        self.close_all_button.setToolTip("Tutup semua posisi yang terbuka segera")
+# Kolom indikator yang dihitung secara inkremental untuk setiap candle (lihat StreamingIndicators)
+INDICATOR_COLUMNS = ['rsi', 'macd', 'macd_signal', 'macd_hist', 'ema20', 'ema50',
+                     'bb_upper', 'bb_lower', 'bb_middle', 'bb_width', 'atr', 'obv', 'obv_sma',
+                     'sma20', 'sma50']
+ROLLING_RESYNC_INTERVAL = 1000 # Hitung ulang jumlah berjalan secara penuh setiap N candle untuk mencegah drift
 
-        control_layout.addWidget(self.start_monitoring_button)
-        control_layout.addWidget(self.start_ai_long_button)
-        control_layout.addWidget(self.start_scalping_button)
-        control_layout.addWidget(self.start_sniper_button) # Tambahkan tombol sniper
-        control_layout.addWidget(self.train_button)
-        control_layout.addWidget(self.close_all_button)
-        control_box.setLayout(control_layout)
-        self.layout.addWidget(control_box)
 
-        # Menambahkan log_output ke layout
-        self.layout.addWidget(self.log_output)
+class _EmaState:
+    """
+    EMA rekursif (adjust=False) dengan min_periods, setara dengan `ewm(...).mean()` yang dipakai `ta`.
+    Nilai NaN dilewati sehingga seed EMA adalah nilai valid pertama.
+    """
+    __slots__ = ('alpha', 'min_periods', 'value', 'count', '_saved')
 
-        self.update_market_data()
-        self.update_account_info()
-        self.setLayout(self.layout)
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = math.nan
+        self.count = 0
+        self._saved = (math.nan, 0)
 
-    def set_mode(self, mode):
+    def push(self, x, revise=False):
         """
-        Mengatur mode operasi bot dan memperbarui tampilan UI yang sesuai.
-        Args:
-            mode (str): Mode baru ('Stopped', 'Monitoring', 'AI_Long_Trade', 'Scalping_Bot', 'Sniper_Bot').
+        Menambahkan nilai candle baru, atau merevisi nilai candle terakhir jika `revise` True.
+        Returns:
+            float: Nilai EMA, atau NaN jika jumlah data belum mencapai min_periods.
         """
-        global current_mode, is_running
-        
-        self.analysis_timer.stop()
-        
-        self.start_monitoring_button.setText("👁️ Mulai Monitoring")
-        self.start_monitoring_button.setStyleSheet("background-color: #607D8B; color: white; font-weight: bold;")
-        self.start_ai_long_button.setText("🚀 Mulai AI Long Trade")
-        self.start_ai_long_button.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
-        self.start_scalping_button.setText("⚡ Mulai Scalping")
-        self.start_scalping_button.setStyleSheet("background-color: #FFC107; color: black; font-weight: bold;")
-        self.start_sniper_button.setText("🎯 Mulai Sniper") # Reset sniper button
-        self.start_sniper_button.setStyleSheet("background-color: #9C27B0; color: white; font-weight: bold;")
+        if revise:
+            self.value, self.count = self._saved
+        else:
+            self._saved = (self.value, self.count)
+        if not math.isnan(x):
+            self.value = x if self.count == 0 else (1.0 - self.alpha) * self.value + self.alpha * x
+            self.count += 1
+        return self.value if self.count >= self.min_periods else math.nan
 
-        current_mode = mode
-        if mode == "Stopped":
-            is_running = False
-            self.status_label.setText("🔴 BOT STOPPED")
-            self.log("Mode: Bot dihentikan.")
 
-        elif mode == "Monitoring":
-            is_running = True
-            self.analysis_timer.start(5000)
-            self.status_label.setText("🟢 BOT MONITORING")
-            self.start_monitoring_button.setText("⛔ Hentikan Monitoring")
-            self.start_monitoring_button.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
-            self.log("Mode: Monitoring (Analisis Berita & Teknikal saja).")
-            self.run_analysis()
+class _RollingState:
+    """
+    Jendela bergulir dengan jumlah dan jumlah kuadrat berjalan (digeser terhadap nilai acuan
+    agar presisi tetap terjaga) untuk rata-rata dan standar deviasi (ddof=0).
+    """
+    __slots__ = ('window', 'values', '_sum', '_sumsq', '_shift', '_pushes')
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._shift = None
+        self._pushes = 0
+
+    def _add(self, x, sign):
+        d = x - self._shift
+        self._sum += sign * d
+        self._sumsq += sign * d * d
+
+    def _resync(self):
+        self._shift = math.fsum(self.values) / len(self.values)
+        self._sum = math.fsum(x - self._shift for x in self.values)
+        self._sumsq = math.fsum((x - self._shift) ** 2 for x in self.values)
+
+    def push(self, x, revise=False):
+        """Menambahkan nilai candle baru, atau mengganti nilai candle terakhir jika `revise` True."""
+        if self._shift is None:
+            self._shift = x
+        if revise and self.values:
+            self._add(self.values[-1], -1.0)
+            self.values[-1] = x
+            self._add(x, 1.0)
+            return
+        if len(self.values) == self.window:
+            self._add(self.values[0], -1.0)
+        self.values.append(x)
+        self._add(x, 1.0)
+        self._pushes += 1
+        if self._pushes % ROLLING_RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def mean(self):
+        """Rata-rata jendela, atau NaN jika jendela belum penuh."""
+        if len(self.values) < self.window:
+            return math.nan
+        return self._shift + self._sum / self.window
+
+    def std(self):
+        """Standar deviasi populasi (ddof=0) jendela, atau NaN jika jendela belum penuh."""
+        if len(self.values) < self.window:
+            return math.nan
+        mean_shifted = self._sum / self.window
+        return math.sqrt(max(self._sumsq / self.window - mean_shifted * mean_shifted, 0.0))
+
+
+class _WilderAtrState:
+    """
+    ATR dengan smoothing Wilder, setara dengan `ta.volatility.AverageTrueRange`:
+    nilai 0 sebelum `window` candle, lalu rata-rata sederhana sebagai seed.
+    """
+    __slots__ = ('window', 'count', 'seed', 'value', '_saved')
+
+    def __init__(self, window):
+        self.window = window
+        self.count = 0
+        self.seed = 0.0
+        self.value = 0.0
+        self._saved = (0, 0.0, 0.0)
+
+    def push(self, true_range, revise=False):
+        """Menambahkan true range candle baru (atau merevisi candle terakhir) dan mengembalikan ATR."""
+        if revise:
+            self.count, self.seed, self.value = self._saved
+        else:
+            self._saved = (self.count, self.seed, self.value)
+        self.count += 1
+        if self.count < self.window:
+            self.seed += true_range
+            return 0.0
+        if self.count == self.window:
+            self.seed += true_range
+            self.value = self.seed / self.window
+        else:
+            self.value = (self.value * (self.window - 1) + true_range) / self.window
+        return self.value
 
-        elif mode == "AI_Long_Trade":
-            if model is None:
-                self.log("Model belum dilatih! Harap latih model terlebih dahulu.")
-                self.set_mode("Stopped")
-                return
-            is_running = True
-            self.analysis_timer.start(60000)
-            self.status_label.setText("🟢 BOT BERJALAN | Mode: AI Long Trade")
-            self.start_ai_long_button.setText("⛔ Hentikan AI Long Trade")
-            self.start_ai_long_button.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
-            self.log("Mode: AI Long Trade diaktifkan. Analisis setiap 60 detik.")
 
-        elif mode == "Scalping_Bot":
-            is_running = True
-            self.analysis_timer.start(5000)
-            self.status_label.setText("🟢 BOT BERJALAN | Mode: Scalping")
-            self.start_scalping_button.setText("⛔ Hentikan Scalping")
-            self.start_scalping_button.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
-            self.log("Mode: Scalping diaktifkan. Analisis setiap 5 detik.")
-        
-        elif mode == "Sniper_Bot": # Mode baru
-            is_running = True
-            self.analysis_timer.start(3000) # Cek lebih sering untuk sniper
-            self.status_label.setText("🟢 BOT BERJALAN | Mode: Sniper")
-            self.start_sniper_button.setText("⛔ Hentikan Sniper")
-            self.start_sniper_button.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
-            self.log("Mode: Sniper diaktifkan. Analisis setiap 3 detik.")
-            
-    def toggle_monitoring_mode(self):
-        """Mengubah antara mode Monitoring dan Stopped."""
-        if current_mode == "Monitoring":
-            self.set_mode("Stopped")
+class StreamingIndicators:
+    """
+    Mesin indikator inkremental untuk RSI(14), MACD(12/26/9), EMA20/50, Bollinger Bands(20, 2),
+    ATR(14), OBV (+SMA10) dan SMA20/50.
+    Setiap candle baru atau revisi candle terakhir diproses dalam O(1) dengan menyimpan state
+    berjalan (rata-rata Wilder, seed EMA, jumlah bergulir, OBV kumulatif). Nilainya sama dengan
+    implementasi `ta` pada deret yang sama (dalam batas toleransi floating point), kecuali OBV yang
+    dihitung sebagai float bertanda sehingga tidak overflow pada kolom tick_volume bertipe uint64.
+    """
+    def __init__(self):
+        self._rsi_up = _EmaState(1.0 / 14, 14)
+        self._rsi_down = _EmaState(1.0 / 14, 14)
+        self._ema_fast = _EmaState(2.0 / (12 + 1), 12)
+        self._ema_slow = _EmaState(2.0 / (26 + 1), 26)
+        self._macd_signal = _EmaState(2.0 / (9 + 1), 9)
+        self._ema20 = _EmaState(2.0 / (20 + 1), 20)
+        self._ema50 = _EmaState(2.0 / (50 + 1), 50)
+        self._close20 = _RollingState(20) # Dipakai bersama oleh Bollinger Bands dan SMA20
+        self._close50 = _RollingState(50)
+        self._atr = _WilderAtrState(14)
+        self._obv_window = _RollingState(10)
+        self._obv = 0.0
+        self._obv_before = 0.0 # OBV sampai candle sebelum candle terakhir
+        self._last_close = None
+        self._close_before = None # Close candle sebelum candle terakhir
+        self.count = 0
+
+    def update(self, high, low, close, volume, revise=False):
+        """
+        Memproses satu candle.
+        Args:
+            high, low, close (float): Harga candle.
+            volume (float): Tick volume candle.
+            revise (bool): True jika candle ini adalah revisi dari candle terakhir yang masih terbentuk.
+        Returns:
+            tuple: Nilai indikator sesuai urutan INDICATOR_COLUMNS (NaN jika belum cukup data).
+        """
+        if not revise or self.count == 0:
+            revise = False
+            self._close_before = self._last_close
+            self._obv_before = self._obv
+            self.count += 1
+        prev_close = self._close_before
+        self._last_close = close
+
+        if prev_close is None:
+            up = down = 0.0
+            true_range = high - low
+            self._obv = self._obv_before + volume
         else:
-            self.set_mode("Monitoring")
-
-    def toggle_ai_long_trade_mode(self):
-        """Mengubah antara mode AI Long Trade dan Stopped."""
-        if current_mode == "AI_Long_Trade":
-            self.set_mode("Stopped")
+            diff = close - prev_close
+            up = diff if diff > 0 else 0.0
+            down = -diff if diff < 0 else 0.0
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            self._obv = self._obv_before + (-volume if close < prev_close else volume)
+
+        avg_up = self._rsi_up.push(up, revise)
+        avg_down = self._rsi_down.push(down, revise)
+        if math.isnan(avg_down):
+            rsi = math.nan
+        elif avg_down == 0:
+            rsi = 100.0
         else:
-            self.set_mode("AI_Long_Trade")
+            rsi = 100.0 - 100.0 / (1.0 + avg_up / avg_down)
 
-    def toggle_scalping_mode(self):
-        """Mengubah antara mode Scalping dan Stopped."""
-        if current_mode == "Scalping_Bot":
-            self.set_mode("Stopped")
-        else:
-            self.set_mode("Scalping_Bot")
+        ema_fast = self._ema_fast.push(close, revise)
+        ema_slow = self._ema_slow.push(close, revise)
+        macd = ema_fast - ema_slow
+        macd_signal = self._macd_signal.push(macd, revise)
 
-    def toggle_sniper_mode(self): # Fungsi baru untuk toggle mode Sniper
-        """Mengubah antara mode Sniper dan Stopped."""
-        if current_mode == "Sniper_Bot":
-            self.set_mode("Stopped")
-        else:
-            self.set_mode("Sniper_Bot")
+        self._close20.push(close, revise)
+        self._close50.push(close, revise)
+        bb_middle = self._close20.mean()
+        bb_std = self._close20.std()
+        bb_upper = bb_middle + 2 * bb_std
+        bb_lower = bb_middle - 2 * bb_std
 
-    def open_settings_dialog(self):
+        atr = self._atr.push(true_range, revise)
+        self._obv_window.push(self._obv, revise)
+
+        return (rsi, macd, macd_signal, macd - macd_signal,
+                self._ema20.push(close, revise), self._ema50.push(close, revise),
+                bb_upper, bb_lower, bb_middle, (bb_upper - bb_lower) / bb_middle,
+                atr, self._obv, self._obv_window.mean(),
+                bb_middle, self._close50.mean())
+
+
+def compute_indicator_array(high, low, close, volume, engine=None):
+    """
+    Menjalankan StreamingIndicators atas seluruh deret candle.
+    Args:
+        high, low, close, volume (array-like): Deret harga dan tick volume.
+        engine (StreamingIndicators, optional): Engine yang akan dilanjutkan; engine baru jika None.
+    Returns:
+        numpy.ndarray: Array (n, len(INDICATOR_COLUMNS)) berisi nilai indikator per candle.
+    """
+    engine = engine if engine is not None else StreamingIndicators()
+    values = np.full((len(close), len(INDICATOR_COLUMNS)), np.nan)
+    update = engine.update
+    for i, (h, l, c, v) in enumerate(zip(np.asarray(high, dtype=float).tolist(), np.asarray(low, dtype=float).tolist(),
+                                         np.asarray(close, dtype=float).tolist(), np.asarray(volume, dtype=float).tolist())):
+        values[i] = update(h, l, c, v)
+    return values
+
+
+# Parameter pola candlestick (lihat CANDLE_PATTERNS)
+PATTERN_SMALL_BODY_ATR = 0.3 # Body "kecil" jika kurang dari N x ATR (hammer, shooting star, dst.)
+PATTERN_LONG_WICK_BODY = 2.0 # Sumbu "panjang" jika lebih dari N x body
+
+CandlePattern = namedtuple('CandlePattern', 'func bars')
+CANDLE_PATTERNS = {} # Nama pola -> CandlePattern; diisi oleh decorator candle_pattern
+
+
+class CandleArrays:
+    """
+    Deret OHLC (+ATR) sebagai array NumPy, beserta turunan yang dipakai bersama oleh fungsi pola
+    (body, sumbu atas/bawah, body kecil, nilai candle sebelumnya). Setiap turunan dihitung sekali saat
+    pertama diminta, sehingga memindai banyak pola tetap satu lintasan vektor per turunan.
+    """
+    def __init__(self, open_, high, low, close, atr=None):
         """
-        Membuka dialog pengaturan trading dan menyimpan pengaturan jika diterima.
+        Args:
+            open_, high, low, close (array-like): Deret harga dengan panjang sama.
+            atr (array-like, optional): ATR per candle; pola yang butuh ATR bernilai False jika None/NaN.
         """
-        # Pastikan dialog dibuka dengan pengaturan yang sedang aktif
-        dialog = TradingSettingsDialog(self, self.trading_settings)
-        if dialog.exec() == QDialogButtonBox.StandardButton.Ok:
-            self.trading_settings = dialog.get_settings()
-            self.save_settings()
-
-    def update_market_data(self):
+        self.open = np.asarray(open_, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.atr = np.full(len(self.close), np.nan) if atr is None else np.asarray(atr, dtype=np.float64)
+        self._shifted = {}
+
+    @classmethod
+    def from_rates(cls, rates, atr=None):
+        """CandleArrays dari array RATES_DTYPE (format copy_rates_from_pos)."""
+        return cls(rates['open'], rates['high'], rates['low'], rates['close'], atr)
+
+    @classmethod
+    def from_frame(cls, df, window=None):
         """
-        Mengambil data pasar terbaru dari MT5, menghitung indikator teknikal,
-        dan memperbarui label di UI. Fungsi ini berjalan setiap detik.
+        CandleArrays dari DataFrame candle (kolom open/high/low/close, dan atr jika ada).
+        Args:
+            window (int, optional): Hanya `window` candle terakhir.
         """
-        try:
-            tick = mt5.symbol_info_tick(symbol)
-            if tick is None:
-                self.log("Gagal mendapatkan data tick. Mencoba menyambung kembali ke MT5.")
-                if not mt5.initialize():
-                    self.log("FATAL: Gagal re-initialize MT5. Aplikasi mungkin tidak berfungsi.")
-                return
-                
-            self.price_label.setText(f"{tick.ask:.2f}")
-            
-            rates_m5 = mt5.copy_rates_from_pos(symbol, AI_TRADING_TIMEFRAME, 0, 200)
-            if rates_m5 is None:
-                self.log("Gagal mendapatkan data candle M5 untuk display.")
-                return
-                
-            df_m5 = pd.DataFrame(rates_m5)
-            df_m5['time'] = pd.to_datetime(df_m5['time'], unit='s')
-            
-            df_m5['rsi'] = RSIIndicator(df_m5['close'], window=14).rsi()
-            macd = MACD(df_m5['close'])
-            df_m5['macd'] = macd.macd()
-            df_m5['macd_signal'] = macd.macd_signal()
-            df_m5['macd_hist'] = macd.macd_diff()
-            df_m5['ema20'] = EMAIndicator(df_m5['close'], window=20).ema_indicator()
-            df_m5['ema50'] = EMAIndicator(df_m5['close'], window=50).ema_indicator()
-            bb = BollingerBands(df_m5['close'], window=20, window_dev=2)
-            df_m5['bb_upper'] = bb.bollinger_hband()
-            df_m5['bb_lower'] = bb.bollinger_lband()
-            df_m5['bb_middle'] = bb.bollinger_mavg()
-            df_m5['bb_width'] = (df_m5['bb_upper'] - df_m5['bb_lower']) / df_m5['bb_middle']
-            df_m5['atr'] = AverageTrueRange(df_m5['high'], df_m5['low'], df_m5['close'], window=14).average_true_range()
-            
-            if 'tick_volume' in df_m5.columns and not df_m5['tick_volume'].isnull().all():
-                df_m5['obv'] = OnBalanceVolumeIndicator(df_m5['close'], df_m5['tick_volume']).on_balance_volume()
-                if len(df_m5) > 10:
-                    obv_sma = SMAIndicator(df_m5['obv'], window=10).sma_indicator()
-                    current_obv = df_m5['obv'].iloc[-1]
-                    current_obv_sma = obv_sma.iloc[-1]
-                    
-                    if current_obv > current_obv_sma:
-                        self.obv_label.setText("Naik ▲")
-                        self.obv_label.setStyleSheet("color: green; font-weight: bold;")
-                    elif current_obv < current_obv_sma:
-                        self.obv_label.setText("Turun ▼")
-                        self.obv_label.setStyleSheet("color: red; font-weight: bold;")
-                    else:
-                        self.obv_label.setText("Datar ↔")
-                        self.obv_label.setStyleSheet("color: gray; font-weight: bold;")
-                else:
-                    self.obv_label.setText("N/A (Data kurang)")
-                    self.obv_label.setStyleSheet("color: gray; font-weight: bold;")
-            else:
-                self.log("Peringatan: 'tick_volume' tidak ditemukan di data M5 untuk OBV. Pastikan MT5 menyediakan volume.")
-                df_m5['obv'] = np.nan
-                self.obv_label.setText("N/A (No Volume)")
-                self.obv_label.setStyleSheet("color: gray; font-weight: bold;")
-
-            last_m5 = df_m5.iloc[-1]
-            
-            # Enhanced RSI color logic
-            rsi_val = last_m5['rsi']
-            self.rsi_label.setText(f"{rsi_val:.2f}")
-            if rsi_val < 30:
-                self.rsi_label.setStyleSheet("color: blue; font-weight: bold;") # Oversold
-            elif rsi_val > 70:
-                self.rsi_label.setStyleSheet("color: red; font-weight: bold;") # Overbought
-            else:
-                self.rsi_label.setStyleSheet("color: green; font-weight: bold;") # Neutral
-
-            # Enhanced MACD Histogram color logic
-            macd_hist_val = last_m5['macd_hist']
-            self.macd_label.setText(f"{macd_hist_val:.4f}")
-            if macd_hist_val > 0:
-                self.macd_label.setStyleSheet("color: green; font-weight: bold;")
-            elif macd_hist_val < 0:
-                self.macd_label.setStyleSheet("color: red; font-weight: bold;")
-            else:
-                self.macd_label.setStyleSheet("color: gray; font-weight: bold;")
+        rows = slice(-window, None) if window else slice(None)
+        atr = df['atr'].to_numpy()[rows] if 'atr' in df.columns else None
+        return cls(df['open'].to_numpy()[rows], df['high'].to_numpy()[rows], df['low'].to_numpy()[rows],
+                   df['close'].to_numpy()[rows], atr)
 
-            self.ema_label.setText(f"{last_m5['ema20']:.2f}/{last_m5['ema50']:.2f}")
-            self.bb_label.setText(f"{last_m5['bb_width']:.4f}")
-            self.atr_label.setText(f"{last_m5['atr']:.2f}")
-            
-            if last_m5['close'] > last_m5['ema20'] and last_m5['ema20'] > last_m5['ema50']:
-                self.trend_label.setText("Naik Kuat ▲▲")
-                self.trend_label.setStyleSheet("color: green; font-weight: bold;")
-            elif last_m5['close'] > last_m5['ema20']:
-                self.trend_label.setText("Naik ▲")
-                self.trend_label.setStyleSheet("color: darkgreen; font-weight: bold;")
-            elif last_m5['close'] < last_m5['ema20'] and last_m5['ema20'] < last_m5['ema50']:
-                self.trend_label.setText("Turun Kuat ▼▼")
-                self.trend_label.setStyleSheet("color: red; font-weight: bold;")
-            elif last_m5['close'] < last_m5['ema20']:
-                self.trend_label.setText("Turun ▼")
-                self.trend_label.setStyleSheet("color: darkred; font-weight: bold;")
-            else:
-                self.trend_label.setText("Sideways ↔")
-                self.trend_label.setStyleSheet("color: gray; font-weight: bold;")
+    def __len__(self):
+        return len(self.close)
 
-            higher_tf_for_display = AI_HIGHER_TIMEFRAME
-            if current_mode == "AI_Long_Trade":
-                higher_tf_for_display = AI_HIGHER_TIMEFRAME
-            elif current_mode == "Scalping_Bot":
-                higher_tf_for_display = SCALPING_HIGHER_TIMEFRAME
-            elif current_mode == "Sniper_Bot": # Gunakan timeframe yang sesuai untuk sniper
-                higher_tf_for_display = SNIPER_HIGHER_TIMEFRAME
-
-            rates_higher_tf = mt5.copy_rates_from_pos(symbol, higher_tf_for_display, 0, 50)
-            if rates_higher_tf is None:
-                self.log(f"Gagal mendapatkan data candle untuk {higher_tf_for_display}.")
-                self.higher_tf_trend_label.setText("N/A")
-                return
-                
-            df_higher_tf = pd.DataFrame(rates_higher_tf)
-            df_higher_tf['time'] = pd.to_datetime(df_higher_tf['time'], unit='s')
-            
-            df_higher_tf['sma20'] = SMAIndicator(df_higher_tf['close'], window=20).sma_indicator()
-            df_higher_tf['sma50'] = SMAIndicator(df_higher_tf['close'], window=50).sma_indicator()
-            df_higher_tf = df_higher_tf.dropna()
+    @functools.cached_property
+    def body(self):
+        return np.abs(self.close - self.open)
 
-            if not df_higher_tf.empty:
-                last_higher_tf = df_higher_tf.iloc[-1]
-                if last_higher_tf['sma20'] > last_higher_tf['sma50']:
-                    self.higher_tf_trend_label.setText("Up Trend ▲")
-                    self.higher_tf_trend_label.setStyleSheet("color: green; font-weight: bold;")
-                elif last_higher_tf['sma20'] < last_higher_tf['sma50']:
-                    self.higher_tf_trend_label.setText("Down Trend ▼")
-                    self.higher_tf_trend_label.setStyleSheet("color: red; font-weight: bold;")
-                else:
-                    self.higher_tf_trend_label.setText("Sideways ↔")
-                    self.higher_tf_trend_label.setStyleSheet("color: gray; font-weight: bold;")
-            else:
-                self.higher_tf_trend_label.setText("N/A")
-                self.higher_tf_trend_label.setStyleSheet("color: gray; font-weight: bold;")
-            
-            if len(df_m5) >= 20:
-                recent_high = df_m5['high'].iloc[-20:].max()
-                recent_low = df_m5['low'].iloc[-20:].min()
-                current_close = df_m5['close'].iloc[-1]
-                
-                distance_to_high = abs(current_close - recent_high)
-                distance_to_low = abs(current_close - recent_low)
-                
-                current_atr = df_m5['atr'].iloc[-1] if not df_m5['atr'].isnull().iloc[-1] else 0.5
-                
-                snr_status = "N/A"
-                if current_atr > 0:
-                    if distance_to_high < (0.5 * current_atr) and current_close < recent_high:
-                        snr_status = f"Dekat R: {recent_high:.2f}"
-                        self.snr_label.setStyleSheet("color: orange; font-weight: bold;")
-                    elif distance_to_low < (0.5 * current_atr) and current_close > recent_low:
-                        snr_status = f"Dekat S: {recent_low:.2f}"
-                        self.snr_label.setStyleSheet("color: blue; font-weight: bold;")
-                    else:
-                        snr_status = "Antara S/R"
-                        self.snr_label.setStyleSheet("color: black; font-weight: bold;")
-                self.snr_label.setText(snr_status)
-            else:
-                self.snr_label.setText("N/A (Data kurang)")
-                self.snr_label.setStyleSheet("color: gray; font-weight: bold;")
-
-            current_spread_points = (tick.ask - tick.bid) / mt5.symbol_info(symbol).point
-            avg_tick_volume_m5 = df_m5['tick_volume'].mean() if 'tick_volume' in df_m5.columns and not df_m5['tick_volume'].isnull().all() else 0
-
-            liquidity_status = "N/A"
-            if current_spread_points <= self.trading_settings['max_spread'] * 0.5 and avg_tick_volume_m5 > self.trading_settings['min_tick_volume_scalping'] * 5:
-                liquidity_status = "Sangat Baik"
-                self.liquidity_label.setStyleSheet("color: green; font-weight: bold;")
-            elif current_spread_points <= self.trading_settings['max_spread'] and avg_tick_volume_m5 > self.trading_settings['min_tick_volume_scalping']:
-                liquidity_status = "Baik"
-                self.liquidity_label.setStyleSheet("color: darkgreen; font-weight: bold;")
-            else:
-                liquidity_status = "Rendah"
-                self.liquidity_label.setStyleSheet("color: red; font-weight: bold;")
-            self.liquidity_label.setText(liquidity_status)
+    @functools.cached_property
+    def upper_wick(self):
+        return self.high - np.maximum(self.open, self.close)
 
-            self.update_account_info()
-            self.update_overall_analysis()
+    @functools.cached_property
+    def lower_wick(self):
+        return np.minimum(self.open, self.close) - self.low
 
-        except Exception as e:
-            self.log(f"Error memperbarui data pasar: {str(e)}")
+    @functools.cached_property
+    def small_body(self):
+        """Body lebih kecil dari PATTERN_SMALL_BODY_ATR x ATR (False jika ATR NaN atau 0)."""
+        return self.body < self.atr * PATTERN_SMALL_BODY_ATR
 
-    def update_account_info(self):
+    def prev(self, column, lag=1):
         """
-        Mengambil informasi akun dari MT5 dan memperbarui label di UI.
+        Returns:
+            numpy.ndarray: Kolom `column` digeser `lag` candle; candle awal tanpa pendahulu bernilai NaN
+                (sehingga semua perbandingan dengannya False).
         """
-        try:
-            account = mt5.account_info()
-            if account:
-                self.balance_label.setText(f"${account.balance:.2f}")
-                self.equity_label.setText(f"${account.equity:.2f}")
-                self.margin_label.setText(f"${account.margin:.2f}")
-                self.free_margin_label.setText(f"${account.margin_free:.2f}")
-                
-                positions = mt5.positions_get(symbol=symbol)
-                if positions is None or len(positions) == 0:
-                    self.positions_label.setText("0")
-                    self.profit_label.setText("$0.00")
-                    self.profit_label.setStyleSheet("color: black; font-weight: bold;")
-                else:
-                    self.positions_label.setText(f"{len(positions)}")
-                    
-                    total_profit = 0.0
-                    for pos in positions:
-                        total_profit += pos.profit
-                                            
-                    self.profit_label.setText(f"${total_profit:.2f}")
-                    
-                    if total_profit > 0:
-                        self.profit_label.setStyleSheet("color: green; font-weight: bold;")
-                        self.equity_label.setStyleSheet("color: green; font-weight: bold;")
-                    elif total_profit < 0:
-                        self.profit_label.setStyleSheet("color: red; font-weight: bold;")
-                        self.equity_label.setStyleSheet("color: red; font-weight: bold;")
-                    else:
-                        self.profit_label.setStyleSheet("color: black; font-weight: bold;")
-                        self.equity_label.setStyleSheet("color: black; font-weight: bold;")
-                    
-        except Exception as e:
-            self.log(f"Error memperbarui info akun: {str(e)}")
+        key = (column, lag)
+        if key not in self._shifted:
+            values = getattr(self, column)
+            shifted = np.full(len(values), np.nan)
+            shifted[lag:] = values[:len(values) - lag]
+            self._shifted[key] = shifted
+        return self._shifted[key]
 
-    def update_overall_analysis(self):
-        """
-        Menentukan dan menampilkan analisis keseluruhan chart (naik/turun/sideways/volatil)
-        berdasarkan analisis teknikal (tren). Berita hanya untuk informasi, bukan logika trading.
-        """
-        m5_trend = self.trend_label.text().split(' ')[0]
-        h1_trend = self.higher_tf_trend_label.text().split(' ')[0]
-        # news_impact = current_news_impact # Dihapus: news_impact tidak lagi digunakan untuk logika trading
-        
-        overall_status = "Tidak Yakin ↔"
-        status_color = "gray"
 
-        # Logika analisis keseluruhan sekarang hanya berdasarkan indikator teknikal
-        if ("Naik" in m5_trend or "Up" in m5_trend) and ("Up" in h1_trend):
-            overall_status = "Potensi Naik Kuat ⬆️⬆️"
-            status_color = "green"
-        elif ("Turun" in m5_trend or "Down" in m5_trend) and ("Down" in h1_trend):
-            overall_status = "Potensi Turun Kuat ⬇️⬇️"
-            status_color = "red"
-        elif ("Naik" in m5_trend or "Up" in h1_trend):
-            overall_status = "Potensi Naik ⬆️"
-            status_color = "darkgreen"
-        elif ("Turun" in m5_trend or "Down" in h1_trend):
-            overall_status = "Potensi Turun ⬇️"
-            status_color = "darkred"
-        else:
-            overall_status = "Sideways/Konsolidasi ↔"
-            status_color = "blue"
+def candle_pattern(name, bars=1):
+    """
+    Decorator yang mendaftarkan fungsi pola ke CANDLE_PATTERNS. Fungsi menerima CandleArrays dan
+    mengembalikan mask boolean sepanjang array, di mana candle ke-i hanya boleh memakai candle i-bars+1..i.
+    Args:
+        name (str): Nama pola.
+        bars (int): Jumlah candle yang dibutuhkan pola (panjang jendela pada mode candle terakhir).
+    """
+    def register(func):
+        CANDLE_PATTERNS[name] = CandlePattern(func, bars)
+        return func
+    return register
 
-        self.overall_analysis_label.setText(overall_status)
-        self.overall_analysis_label.setStyleSheet(f"font-weight: bold; color: {status_color};")
 
+@candle_pattern("bullish_engulfing", bars=2)
+def _bullish_engulfing(k):
+    """Candle bullish yang body-nya menelan body candle bearish sebelumnya."""
+    prev_open, prev_close = k.prev('open'), k.prev('close')
+    return (k.close > k.open) & (prev_close < prev_open) & (k.close >= prev_open) & (k.open <= prev_close)
 
-    def train_model(self):
-        """
-        Melatih model RandomForestClassifier menggunakan data historis M5.
-        Model ini digunakan untuk strategi AI Long Trade.
-        """
-        global model
-        self.log("Memulai pelatihan model...")
-        
-        try:
-            rates = mt5.copy_rates_from_pos(symbol, AI_TRADING_TIMEFRAME, 0, 2000)
-            if rates is None:
-                self.log("Gagal mendapatkan data historis M5 untuk pelatihan model.")
-                return
-                
-            df = pd.DataFrame(rates)
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            
-            df['rsi'] = RSIIndicator(df['close'], window=14).rsi()
-            macd = MACD(df['close'])
-            df['macd'] = macd.macd()
-            df['macd_signal'] = macd.macd_signal()
-            df['macd_hist'] = macd.macd_diff()
-            df['ema20'] = EMAIndicator(df['close'], window=20).ema_indicator()
-            df['ema50'] = EMAIndicator(df['close'], window=50).ema_indicator()
-            bb = BollingerBands(df['close'], window=20, window_dev=2)
-            df['bb_upper'] = bb.bollinger_hband()
-            df['bb_lower'] = bb.bollinger_lband()
-            df['bb_middle'] = bb.bollinger_mavg()
-            df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / df['bb_middle']
-            df['atr'] = AverageTrueRange(df['high'], df['low'], df['close'], window=14).average_true_range()
-            
-            if 'tick_volume' in df.columns and not df['tick_volume'].isnull().all():
-                df['obv'] = OnBalanceVolumeIndicator(df['close'], df['tick_volume']).on_balance_volume()
-            else:
-                self.log("Peringatan: 'tick_volume' tidak ditemukan di data M5 untuk OBV saat training. Menggunakan nilai nol untuk OBV.")
-                df['obv'] = 0
 
-            df['target'] = (df['close'].shift(-1) > df['close']).astype(int)
-            df = df.dropna()
-            
-            if df.empty:
-                self.log("Data tidak cukup setelah perhitungan indikator untuk melatih model.")
-                return
+@candle_pattern("bearish_engulfing", bars=2)
+def _bearish_engulfing(k):
+    """Candle bearish yang body-nya menelan body candle bullish sebelumnya."""
+    prev_open, prev_close = k.prev('open'), k.prev('close')
+    return (k.close < k.open) & (prev_close > prev_open) & (k.close <= prev_open) & (k.open >= prev_close)
 
-            X = df[['open', 'high', 'low', 'close', 'rsi', 'macd', 'macd_signal',
-                     'macd_hist', 'ema20', 'ema50', 'bb_width', 'atr', 'obv']]
-            y = df['target']
-            
-            if len(X) < 2:
-                self.log("Data terlalu sedikit untuk melakukan train-test split. Tingkatkan jumlah data historis.")
-                return
 
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
-            
-            if X_train.empty or X_test.empty:
-                self.log("Train atau test set kosong setelah split. Sesuaikan ukuran data historis atau test_size.")
-                return
+@candle_pattern("hammer")
+def _hammer(k):
+    """Body kecil di atas, sumbu bawah panjang, sumbu atas pendek (bentuk yang sama dengan hanging man)."""
+    return k.small_body & (k.lower_wick > PATTERN_LONG_WICK_BODY * k.body) & (k.upper_wick < k.body)
 
-            model = RandomForestClassifier(n_estimators=200, max_depth=10, random_state=42)
-            model.fit(X_train, y_train)
-            
-            train_score = model.score(X_train, y_train)
-            test_score = model.score(X_test, y_test)
-            
-            self.log(f"Pelatihan model selesai. Akurasi: Train={train_score:.2f}, Test={test_score:.2f}")
-            self.status_label.setText("🟢 BOT READY | Model dilatih")
-            
-        except Exception as e:
-            self.log(f"Error melatih model: {str(e)}")
-            self.status_label.setText("🔴 BOT ERROR | Pelatihan gagal")
 
-    def close_all_positions(self):
+@candle_pattern("inverted_hammer")
+def _inverted_hammer(k):
+    """Body kecil di bawah, sumbu atas panjang, sumbu bawah pendek (bentuk yang sama dengan shooting star)."""
+    return k.small_body & (k.upper_wick > PATTERN_LONG_WICK_BODY * k.body) & (k.lower_wick < k.body)
+
+
+def scan_patterns(candles, names=None):
+    """
+    Menghitung mask pola untuk seluruh candle sekaligus (untuk backtest dan pemindaian banyak simbol).
+    Args:
+        candles (CandleArrays): Candle yang dipindai.
+        names (iterable, optional): Nama pola; semua pola di CANDLE_PATTERNS jika None.
+    Returns:
+        dict: Nama pola -> numpy.ndarray bool sepanjang candle.
+    """
+    return {name: np.asarray(CANDLE_PATTERNS[name].func(candles), dtype=bool)
+            for name in (names if names is not None else CANDLE_PATTERNS)}
+
+
+def last_bar_patterns(df, names=None):
+    """
+    Mode live: pola pada candle terakhir saja. Hanya jendela terakhir sepanjang kebutuhan pola terpanjang
+    yang dipindai, sehingga biayanya tetap berapa pun panjang DataFrame.
+    Args:
+        df (DataFrame): Candle (open/high/low/close, dan atr untuk pola berbasis ATR).
+        names (iterable, optional): Nama pola; semua pola di CANDLE_PATTERNS jika None.
+    Returns:
+        dict: Nama pola -> bool.
+    """
+    names = tuple(names if names is not None else CANDLE_PATTERNS)
+    if len(df) == 0:
+        return {name: False for name in names}
+    window = max(CANDLE_PATTERNS[name].bars for name in names)
+    return {name: bool(mask[-1]) for name, mask in scan_patterns(CandleArrays.from_frame(df, window), names).items()}
+
+
+class BarCache:
+    """
+    Cache candle untuk satu pasangan (simbol, timeframe) yang disimpan dalam ring buffer
+    yang dialokasikan di awal.
+    Buffer berukuran dua kali kapasitas sehingga jendela data selalu bersebelahan di memori;
+    saat ujung buffer tercapai, `capacity` candle terakhir disalin kembali ke awal (O(1) teramortisasi).
+    Hanya candle yang lebih baru dari timestamp terakhir yang diambil dari MT5, dan candle
+    yang masih terbentuk ditambal (patch) di tempat.
+    Setiap cache memiliki StreamingIndicators sendiri; nilai indikator disimpan di buffer paralel
+    dan diperbarui hanya untuk candle yang baru atau berubah.
+    """
+    def __init__(self, symbol_name, timeframe, capacity=BAR_CACHE_CAPACITY):
         """
-        Menutup semua posisi trading yang terbuka untuk simbol yang sedang diperdagangkan.
+        Inisialisasi cache candle.
+        Args:
+            symbol_name (str): Nama simbol, misalnya "XAUUSD".
+            timeframe (int): Timeframe MT5 (misalnya mt5.TIMEFRAME_M5).
+            capacity (int): Jumlah maksimum candle yang disimpan.
         """
-        try:
-            positions = mt5.positions_get(symbol=symbol)
-            if positions is None or len(positions) == 0:
-                self.log("Tidak ada posisi terbuka untuk ditutup.")
-                return
-                
-            self.log(f"Mencoba menutup {len(positions)} posisi...")
-            
-            for position in positions:
-                self.close_position(position)
-                
-            self.update_account_info()
-            self.update_winrate()
-            
-        except Exception as e:
-            self.log(f"Error closing positions: {str(e)}")
+        self.symbol = symbol_name
+        self.timeframe = timeframe
+        self.capacity = capacity
+        self._buffer = None # Dialokasikan saat data pertama diterima (dtype mengikuti hasil MT5)
+        self._values = None # Nilai indikator per candle, sejajar dengan _buffer
+        self.indicators = StreamingIndicators()
+        self._start = 0
+        self._end = 0
+        self._last_refresh = 0.0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def last_time(self):
+        """Timestamp (detik epoch) candle terakhir di cache, atau None jika cache kosong."""
+        if self._end == self._start:
+            return None
+        return int(self._buffer['time'][self._end - 1])
 
-    def update_winrate(self):
+    def reload(self):
         """
-        Memperbarui dan menampilkan persentase kemenangan di UI.
+        Mengambil ulang seluruh jendela candle dari MT5 dan mengisi ulang buffer.
+        Returns:
+            int or None: Jumlah candle yang dimuat, atau None jika gagal.
         """
-        total = win_count + loss_count
-        if total > 0:
-            winrate = (win_count / total) * 100
-            self.winrate_label.setText(f"Winrate: {winrate:.1f}% ({win_count}/{total})")
-            if winrate >= 50:
-                self.winrate_label.setStyleSheet("color: green; font-weight: bold;")
+        rates = broker.copy_rates_from_pos(self.symbol, self.timeframe, 0, self.capacity)
+        if rates is None or len(rates) == 0:
+            return None
+        if self._buffer is None or self._buffer.dtype != rates.dtype or len(self._buffer) < 2 * self.capacity:
+            self._buffer = np.zeros(2 * self.capacity, dtype=rates.dtype)
+            self._values = np.full((2 * self.capacity, len(INDICATOR_COLUMNS)), np.nan)
+        count = len(rates)
+        self._buffer[:count] = rates
+        self.indicators = StreamingIndicators()
+        with profiler.span("indicators.reload"):
+            self._values[:count] = compute_indicator_array(rates['high'], rates['low'], rates['close'],
+                                                           rates['tick_volume'], self.indicators)
+        self._start = 0
+        self._end = count
+        self._last_refresh = time.monotonic()
+        return count
+
+    @profiled("indicators.update")
+    def _update_indicators(self, row, revise=False):
+        """Memperbarui state indikator dengan satu candle dan mengembalikan nilainya."""
+        return self.indicators.update(float(row['high']), float(row['low']), float(row['close']),
+                                      float(row['tick_volume']), revise)
+
+    def _append(self, row):
+        """Menambahkan satu candle baru ke ujung ring buffer."""
+        if self._end == len(self._buffer):
+            # Geser jendela terakhir ke awal buffer agar view tetap bersebelahan
+            keep = self.capacity - 1
+            self._buffer[:keep] = self._buffer[self._end - keep:self._end]
+            self._values[:keep] = self._values[self._end - keep:self._end]
+            self._start = 0
+            self._end = keep
+        self._buffer[self._end] = row
+        self._values[self._end] = self._update_indicators(row)
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def update(self, tick_time=None):
+        """
+        Menyinkronkan cache dengan MT5 secara inkremental.
+        Hanya candle setelah timestamp terakhir (ditambah candle terakhir yang masih terbentuk)
+        yang diambil. Jika ada celah yang tidak tertutup, cache dimuat ulang.
+        Args:
+            tick_time (int, optional): Waktu tick terbaru (detik epoch, waktu server) untuk
+                memperkirakan jumlah candle yang terlewat.
+        Returns:
+            int or None: Jumlah candle baru yang ditambahkan (0 jika hanya candle terakhir yang
+            diperbarui), atau None jika gagal mengambil data.
+        """
+        last_time = self.last_time
+        if last_time is None:
+            return self.reload()
+
+        missing = 0
+        if tick_time is not None:
+            missing = max(0, (int(tick_time) - last_time) // broker.period_seconds(self.timeframe))
+        count = missing + 2 # Candle terakhir di cache + candle yang sedang terbentuk
+        if count > self.capacity:
+            return self.reload()
+
+        rates = broker.copy_rates_from_pos(self.symbol, self.timeframe, 0, count)
+        if rates is None or len(rates) == 0:
+            return None
+        if int(rates['time'][0]) > last_time:
+            # Ada candle yang terlewat di antara cache dan data baru
+            return self.reload()
+
+        appended = 0
+        for row in rates:
+            row_time = int(row['time'])
+            if row_time < last_time:
+                continue
+            if row_time == last_time:
+                if self._buffer[self._end - 1] != row:
+                    self._buffer[self._end - 1] = row # Patch candle yang masih terbentuk
+                    self._values[self._end - 1] = self._update_indicators(row, revise=True)
             else:
-                self.winrate_label.setStyleSheet("color: red; font-weight: bold;")
-        else:
-            self.winrate_label.setText("Winrate: 0% (0/0)")
-            self.winrate_label.setStyleSheet("color: blue; font-weight: bold;")
+                self._append(row)
+                last_time = row_time
+                appended += 1
+        self._last_refresh = time.monotonic()
+        return appended
 
+    def refresh(self, tick_time=None, max_age=BAR_CACHE_REFRESH_SECONDS):
+        """
+        Memperbarui cache hanya jika refresh terakhir lebih lama dari `max_age` detik.
+        Returns:
+            bool: True jika cache berisi data yang dapat dipakai.
+        """
+        if len(self) > 0 and time.monotonic() - self._last_refresh < max_age:
+            return True
+        if self.update(tick_time) is None:
+            return len(self) > 0
+        return True
 
-    def calculate_lot_size_by_risk(self, risk_amount_usd, sl_pips_for_trade, current_price):
+    def view(self, count=None):
         """
-        Menghitung ukuran lot yang tepat berdasarkan jumlah uang yang bersedia dirisikokan
-        dan Stop Loss dalam pips. Ini memastikan manajemen risiko yang konsisten.
+        Mengembalikan view read-only (tanpa salinan) dari `count` candle terakhir.
         Args:
-            risk_amount_usd (float): Jumlah maksimum USD yang bersedia dirisikokan per trade.
-            sl_pips_for_trade (float): Jarak Stop Loss dalam pips untuk trade ini.
-            current_price (float): Harga masuk pasar saat ini (digunakan untuk mendapatkan info simbol).
+            count (int, optional): Jumlah candle; None untuk seluruh isi cache.
         Returns:
-            float: Ukuran lot yang dihitung, dibulatkan ke volume step yang valid.
+            numpy.ndarray: Array terstruktur dengan field yang sama seperti copy_rates_from_pos.
         """
-        symbol_info = mt5.symbol_info(symbol)
-        if symbol_info is None:
-            self.log(f"Gagal mendapatkan info simbol untuk {symbol} di calculate_lot_size_by_risk.")
-            return 0.0
+        if self._buffer is None:
+            return None
+        start = self._start if count is None else max(self._start, self._end - count)
+        rates = self._buffer[start:self._end]
+        rates.flags.writeable = False
+        return rates
 
-        cost_per_pip_per_lot = 10.0 # Standard $10 per pip per lot untuk XAUUSD
+    def indicator_view(self, count=None):
+        """
+        Mengembalikan view read-only nilai indikator untuk `count` candle terakhir.
+        Returns:
+            numpy.ndarray: Array (n, len(INDICATOR_COLUMNS)) yang sejajar dengan view().
+        """
+        if self._values is None:
+            return None
+        start = self._start if count is None else max(self._start, self._end - count)
+        values = self._values[start:self._end]
+        values.flags.writeable = False
+        return values
 
-        if sl_pips_for_trade <= 0:
-            self.log("ERROR: SL Pips untuk perhitungan lot harus lebih dari nol.")
-            return 0.0
 
-        risk_per_lot_at_sl = sl_pips_for_trade * cost_per_pip_per_lot
+class MarketDataCache:
+    """
+    Registri BarCache per (simbol, timeframe).
+    Dipakai bersama oleh tampilan, strategi, dan eksekusi order agar candle tidak diambil ulang
+    dari terminal setiap kali dibutuhkan. Aman dipakai dari beberapa thread engine sekaligus;
+    setiap BarCache punya lock sendiri sehingga pipeline simbol yang berbeda tidak saling menunggu.
+    Data yang dikembalikan selalu berupa salinan.
+    """
+    def __init__(self, capacity=BAR_CACHE_CAPACITY):
+        self.capacity = capacity
+        self._caches = {} # (simbol, timeframe) -> (BarCache, lock)
+        self._lock = threading.Lock() # Hanya melindungi registri
+
+    def _entry(self, symbol_name, timeframe, count):
+        key = (symbol_name, timeframe)
+        with self._lock:
+            entry = self._caches.get(key)
+            if entry is None:
+                entry = (BarCache(symbol_name, timeframe, max(self.capacity, count)), threading.RLock())
+                self._caches[key] = entry
+        return entry
+
+    @staticmethod
+    def _ensure_capacity(cache, count):
+        if count > cache.capacity:
+            cache.capacity = count
+            cache.reload()
+
+    def get_cache(self, symbol_name, timeframe, count=0):
+        """
+        Mengambil (atau membuat) BarCache untuk pasangan (simbol, timeframe).
+        Jika `count` melebihi kapasitas cache yang ada, cache diperbesar dan dimuat ulang.
+        """
+        cache, lock = self._entry(symbol_name, timeframe, count)
+        with lock:
+            self._ensure_capacity(cache, count)
+        return cache
 
-        if risk_per_lot_at_sl == 0:
-            self.log("ERROR: Risiko per lot di SL adalah nol. Tidak dapat menghitung lot.")
-            return 0.0
+    def rates(self, symbol_name, timeframe, count, tick_time=None):
+        """
+        Mengembalikan `count` candle terakhir sebagai array terstruktur (pengganti
+        broker.copy_rates_from_pos(symbol, timeframe, 0, count)).
+        Returns:
+            numpy.ndarray or None: Salinan candle, atau None jika data tidak tersedia.
+        """
+        cache, lock = self._entry(symbol_name, timeframe, count)
+        with lock:
+            self._ensure_capacity(cache, count)
+            if not cache.refresh(tick_time):
+                return None
+            return cache.view(count).copy()
 
-        calculated_lot_size = risk_amount_usd / risk_per_lot_at_sl
+    def frame(self, symbol_name, timeframe, count, tick_time=None):
+        """
+        Sama seperti rates(), tetapi dikembalikan sebagai DataFrame dengan kolom 'time' berupa datetime
+        dan kolom indikator dari INDICATOR_COLUMNS.
+        Returns:
+            DataFrame or None: Data candle beserta indikator, atau None jika data tidak tersedia.
+        """
+        cache, lock = self._entry(symbol_name, timeframe, count)
+        with lock:
+            self._ensure_capacity(cache, count)
+            if not cache.refresh(tick_time):
+                return None
+            rates = cache.view(count).copy()
+            values = cache.indicator_view(count).copy()
+        return rates_to_frame(rates, values)
 
-        min_lot = symbol_info.volume_min
-        max_lot = symbol_info.volume_max
-        step_lot = symbol_info.volume_step
+    def timeframes(self, symbol_name):
+        """Daftar timeframe yang sedang di-cache untuk simbol."""
+        with self._lock:
+            return [timeframe for (name, timeframe) in list(self._caches) if name == symbol_name]
 
-        calculated_lot_size = max(min_lot, min(calculated_lot_size, max_lot))
-        calculated_lot_size = round(calculated_lot_size / step_lot) * step_lot
-        
-        self.log(f"Perhitungan Lot: Risiko=${risk_amount_usd:.2f}, SL={sl_pips_for_trade} pips, Lot Dihitung={calculated_lot_size:.2f}")
+    def closed_rates(self, symbol_name, timeframe, after_time=None):
+        """
+        Candle yang sudah selesai (tanpa candle terakhir yang masih terbentuk) dari cache, tanpa refresh ke terminal.
+        Args:
+            after_time (int, optional): Hanya candle dengan waktu lebih besar dari ini (detik epoch).
+        Returns:
+            numpy.ndarray: Salinan candle (bisa kosong).
+        """
+        with self._lock:
+            entry = self._caches.get((symbol_name, timeframe))
+        if entry is None:
+            return np.zeros(0, dtype=RATES_DTYPE)
+        cache, lock = entry
+        with lock:
+            rates = cache.view()
+            if rates is None or len(rates) < 2:
+                return np.zeros(0, dtype=RATES_DTYPE)
+            closed = rates[:-1]
+            if after_time is not None:
+                closed = closed[np.searchsorted(closed['time'], after_time, side='right'):]
+            return closed.copy()
+
+
+# Konfigurasi perekam data pasar (lihat MarketRecorder)
+RECORDER_ENABLED = True # Rekam setiap tick yang di-poll dan candle yang sudah selesai ke RECORDER_DIR
+RECORDER_TICK_STREAM = "ticks" # Nama stream tick; stream candle memakai nama timeframe (M1, M5, ...)
+RECORDER_TICK_COLUMNS = {'time_msc': np.int64, 'bid': np.float64, 'ask': np.float64,
+                         'last': np.float64, 'volume': np.float64}
+RECORDER_BAR_COLUMNS = {'time': np.int64, 'open': np.float64, 'high': np.float64, 'low': np.float64,
+                        'close': np.float64, 'tick_volume': np.int64, 'spread': np.int64, 'real_volume': np.int64}
+RECORDER_DEFAULT_WINDOW_DAYS = 365 # Jendela default (hari terakhir rekaman) untuk backtest/optimasi/simulator tanpa rentang eksplisit
+
+
+class MarketRecorder:
+    """
+    Perekam tick dan candle ke file kolom biner append-only, dipecah per hari (UTC).
+    Layout: <direktori>/<SIMBOL>/<stream>/<YYYY-MM-DD>/<kolom>.bin, stream = "ticks" atau nama timeframe.
+    Setiap kolom adalah array int64/float64 little-endian tanpa header sehingga dibaca dengan numpy.memmap:
+    pembacaan hanya menyalin rentang yang diminta, bukan seluruh riwayat.
+    Jika proses berhenti di tengah penulisan, panjang kolom bisa berbeda; pembaca memakai panjang
+    terpendek dan penulis memotong kolom ke panjang itu sebelum menambah data.
+    """
+    def __init__(self, directory=RECORDER_DIR):
+        """
+        Args:
+            directory (str): Direktori akar rekaman.
+        """
+        self.directory = directory
+        self._last_time = {} # (simbol, stream) -> timestamp terakhir yang sudah tersimpan
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stream_name(timeframe):
+        """Nama stream candle untuk timeframe MT5 (misalnya "M5")."""
+        return TIMEFRAME_NAMES.get(timeframe, str(timeframe))
+
+    @staticmethod
+    def _schema(stream):
+        if stream == RECORDER_TICK_STREAM:
+            return RECORDER_TICK_COLUMNS, 'time_msc', 1000 # Tick memakai milidetik
+        return RECORDER_BAR_COLUMNS, 'time', 1
+
+    def days(self, symbol_name, stream):
+        """
+        Returns:
+            list: Hari yang tersedia (string YYYY-MM-DD), terurut.
+        """
+        path = os.path.join(self.directory, symbol_name, stream)
+        return sorted(os.listdir(path)) if os.path.isdir(path) else []
+
+    @staticmethod
+    def _day_length(day_dir, schema):
+        """Jumlah baris lengkap di satu hari (panjang kolom terpendek)."""
+        lengths = []
+        for column, dtype in schema.items():
+            path = os.path.join(day_dir, column + ".bin")
+            lengths.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+        return min(lengths)
+
+    def open_day(self, symbol_name, stream, day):
+        """
+        Membuka satu hari rekaman sebagai memmap read-only.
+        Returns:
+            dict: Nama kolom -> numpy.memmap (atau array kosong jika hari tersebut kosong).
+        """
+        schema, _, _ = self._schema(stream)
+        day_dir = os.path.join(self.directory, symbol_name, stream, day)
+        n = self._day_length(day_dir, schema)
+        if n == 0:
+            return {column: np.zeros(0, dtype=dtype) for column, dtype in schema.items()}
+        return {column: np.memmap(os.path.join(day_dir, column + ".bin"), dtype=dtype, mode='r', shape=(n,))
+                for column, dtype in schema.items()}
+
+    def last_time(self, symbol_name, stream):
+        """
+        Returns:
+            int or None: Timestamp terakhir yang tersimpan (detik untuk candle, milidetik untuk tick).
+        """
+        key = (symbol_name, stream)
+        if key not in self._last_time:
+            _, time_column, _ = self._schema(stream)
+            last = None
+            for day in reversed(self.days(symbol_name, stream)):
+                times = self.open_day(symbol_name, stream, day)[time_column]
+                if len(times):
+                    last = int(times[-1])
+                    break
+            self._last_time[key] = last
+        return self._last_time[key]
+
+    def _append(self, symbol_name, stream, columns):
+        """
+        Menambahkan baris baru (waktu naik) ke stream; baris yang tidak lebih baru dari rekaman terakhir dilewati.
+        Returns:
+            int: Jumlah baris yang ditulis.
+        """
+        schema, time_column, scale = self._schema(stream)
+        with self._lock:
+            times = np.asarray(columns[time_column], dtype=np.int64)
+            last = self.last_time(symbol_name, stream)
+            start = 0 if last is None else int(np.searchsorted(times, last, side='right'))
+            if start >= len(times):
+                return 0
+            days = times[start:] // (86400 * scale)
+            bounds = np.flatnonzero(np.r_[True, days[1:] != days[:-1], True])
+            for a, b in zip(bounds[:-1], bounds[1:]):
+                day = datetime.datetime.fromtimestamp(int(days[a]) * 86400, datetime.timezone.utc).strftime('%Y-%m-%d')
+                day_dir = os.path.join(self.directory, symbol_name, stream, day)
+                os.makedirs(day_dir, exist_ok=True)
+                n = self._day_length(day_dir, schema)
+                for column, dtype in schema.items():
+                    path = os.path.join(day_dir, column + ".bin")
+                    with open(path, 'ab') as f:
+                        if f.tell() != n * np.dtype(dtype).itemsize:
+                            f.truncate(n * np.dtype(dtype).itemsize) # Buang sisa penulisan yang terputus
+                        values = np.asarray(columns[column])[start + a:start + b]
+                        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+            self._last_time[(symbol_name, stream)] = int(times[-1])
+            return len(times) - start
+
+    def append_bars(self, symbol_name, timeframe, rates):
+        """
+        Merekam candle yang sudah selesai.
+        Args:
+            rates (numpy.ndarray): Candle RATES_DTYPE terurut waktu.
+        Returns:
+            int: Jumlah candle baru yang ditulis.
+        """
+        if rates is None or len(rates) == 0:
+            return 0
+        return self._append(symbol_name, self.stream_name(timeframe), {column: rates[column] for column in RECORDER_BAR_COLUMNS})
 
-        return calculated_lot_size
+    def append_ticks(self, symbol_name, ticks):
+        """
+        Merekam tick (struktur Tick MT5 atau SimTick) terurut waktu.
+        Returns:
+            int: Jumlah tick baru yang ditulis.
+        """
+        if not ticks:
+            return 0
+        columns = {
+            'time_msc': [getattr(t, 'time_msc', 0) or t.time * 1000 for t in ticks],
+            'bid': [t.bid for t in ticks],
+            'ask': [t.ask for t in ticks],
+            'last': [getattr(t, 'last', 0.0) for t in ticks],
+            'volume': [getattr(t, 'volume', 0) for t in ticks],
+        }
+        return self._append(symbol_name, RECORDER_TICK_STREAM, columns)
 
-    def execute_trade(self, signal, price, df, lot_size_override=None, tp_pips_override=None, sl_pips_override=None):
+    def segments(self, symbol_name, stream, start=None, end=None, count=None):
         """
-        Mengeksekusi order trading (BUY/SELL) dengan parameter yang ditentukan.
-        Ini adalah fungsi inti untuk membuka posisi.
+        View lazy atas rentang waktu stream: satu potongan memmap per hari, tanpa menyalin data.
+        Hanya hari yang beririsan dengan rentang yang dibuka, sehingga riwayat bertahun-tahun bisa
+        diiterasi per hari (misalnya untuk agregasi) tanpa dimuat ke memori.
         Args:
-            signal (int): 1 untuk BUY, 0 untuk SELL.
-            price (float): Harga eksekusi order (ask untuk BUY, bid untuk SELL).
-            df (DataFrame): DataFrame data candle terbaru untuk logging indikator.
-            lot_size_override (float, optional): Ukuran lot yang akan digunakan, jika tidak, pakai dari pengaturan.
-            tp_pips_override (float, optional): TP dalam pips, jika tidak, pakai dari pengaturan.
-            sl_pips_override (float, optional): SL dalam pips, jika tidak, pakai dari pengaturan.
+            start, end (int, optional): Batas waktu inklusif dalam detik epoch.
+            count (int, optional): Hanya `count` baris terakhir dalam rentang.
         Returns:
-            mt5.TradeRequestResult or None: Hasil dari operasi order_send MT5.
+            list: Dict nama kolom -> potongan numpy.memmap read-only per hari, terurut waktu.
         """
-        try:
-            lot_size = lot_size_override if lot_size_override is not None else self.trading_settings['lot_size']
-            tp_pips = tp_pips_override if tp_pips_override is not None else self.trading_settings['tp_pips']
-            sl_pips = sl_pips_override if sl_pips_override is not None else self.trading_settings['sl_pips']
-            
-            entry_method = self.trading_settings['entry_method']
-            max_retry = self.trading_settings['max_retry']
-            
-            symbol_info = mt5.symbol_info(symbol)
-            if symbol_info is None:
-                self.log(f"Gagal mendapatkan info simbol untuk {symbol}")
-                return None
-                
-            point = symbol_info.point
-            pip_value = point * 10 # 1 pip = 10 points for XAUUSD typically
-            
-            if signal == 1: # BUY
-                take_profit_price = price + tp_pips * pip_value
-                stop_loss_price = price - sl_pips * pip_value
-                order_type = mt5.ORDER_TYPE_BUY
-            else: # SELL
-                take_profit_price = price - tp_pips * pip_value
-                stop_loss_price = price + sl_pips * pip_value
-                order_type = mt5.ORDER_TYPE_SELL
-            
-            last_row = df.iloc[-1]
-            self.log(f"📊 INDICATORS for Trade:")
-            self.log(f"    Harga: {last_row['close']:.2f}, RSI: {last_row['rsi']:.2f}, MACD Hist: {last_row['macd_hist']:.4f}")
-            self.log(f"    EMA: {last_row['ema20']:.2f}/{last_row['ema50']:.2f}, BB Width: {last_row['bb_width']:.4f}, ATR: {last_row['atr']:.2f}")
-            self.log(f"    OBV: {last_row.get('obv', 'N/A')}")
-            
-            if entry_method == "Instant":
-                result = self.execute_instant_order(order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry)
-            elif entry_method == "Pending Order":
-                result = self.execute_pending_order(order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry)
-            elif entry_method == "Stop Limit":
-                result = self.execute_stop_limit_order(order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry)
-            elif entry_method == "Market on Close":
-                result = self.execute_market_on_close(order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry)
-                
-            return result
-                
-        except Exception as e:
-            self.log(f"Error dalam eksekusi trade: {str(e)}")
-            return None
-
-    def execute_instant_order(self, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry=3):
+        schema, time_column, scale = self._schema(stream)
+        lo = None if start is None else int(start) * scale
+        hi = None if end is None else int(end) * scale + (scale - 1)
+        if count is not None and count <= 0:
+            return []
+        selected = []
+        total = 0
+        for day in reversed(self.days(symbol_name, stream)):
+            day_start = int(datetime.datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=datetime.timezone.utc).timestamp()) * scale
+            if hi is not None and day_start > hi:
+                continue
+            if lo is not None and day_start + 86400 * scale <= lo:
+                break
+            columns = self.open_day(symbol_name, stream, day)
+            times = columns[time_column]
+            a = 0 if lo is None else int(np.searchsorted(times, lo, side='left'))
+            b = len(times) if hi is None else int(np.searchsorted(times, hi, side='right'))
+            if count is not None:
+                a = max(a, b - (count - total)) # Hari paling awal yang dipilih hanya diambil sisanya
+            if b > a:
+                selected.append({column: values[a:b] for column, values in columns.items()})
+                total += b - a
+            if count is not None and total >= count:
+                break
+        selected.reverse()
+        return selected
+
+    def read(self, symbol_name, stream, start=None, end=None, count=None):
         """
-        Mengeksekusi order instan (Market Execution).
-        Melakukan pengecekan spread, margin, dan mencoba kembali jika terjadi requote.
+        Membaca rentang waktu dari stream. Hanya hari yang beririsan dengan rentang yang dibuka (memmap),
+        dan hanya baris dalam rentang/`count` yang disalin ke memori (lihat segments()).
         Args:
-            order_type (int): Tipe order MT5 (mt5.ORDER_TYPE_BUY atau mt5.ORDER_TYPE_SELL).
-            price (float): Harga eksekusi yang diinginkan.
-            lot_size (float): Ukuran lot.
-            take_profit_price (float): Harga Take Profit.
-            stop_loss_price (float): Harga Stop Loss.
-            max_retry (int): Jumlah maksimum percobaan jika order gagal karena requote/perubahan harga.
+            start, end (int, optional): Batas waktu inklusif dalam detik epoch.
+            count (int, optional): Hanya `count` baris terakhir dalam rentang.
         Returns:
-            mt5.TradeRequestResult or None: Hasil dari operasi order_send.
+            dict: Nama kolom -> numpy.ndarray.
         """
-        account = mt5.account_info()
-        if account is None:
-            self.log("❌ Gagal mendapatkan info akun.")
-            return None
-            
-        symbol_info = mt5.symbol_info(symbol)
-        if symbol_info is None:
-            self.log(f"❌ Gagal mendapatkan info simbol untuk {symbol}.")
+        schema, _, _ = self._schema(stream)
+        selected = self.segments(symbol_name, stream, start, end, count)
+        return {column: np.concatenate([part[column] for part in selected]) if selected else np.zeros(0, dtype=dtype)
+                for column, dtype in schema.items()}
+
+    def window_start(self, symbol_name, stream, days=RECORDER_DEFAULT_WINDOW_DAYS):
+        """
+        Returns:
+            int or None: Awal jendela `days` hari terakhir rekaman (detik epoch), atau None jika stream kosong.
+        """
+        last = self.last_time(symbol_name, stream)
+        if last is None:
             return None
-            
-        point = symbol_info.point
-        
-        if not symbol_info.visible or not symbol_info.trade_mode == mt5.SYMBOL_TRADE_MODE_FULL:
-            self.log("❌ Simbol tidak tersedia untuk trading.")
-            return None
-            
-        spread = symbol_info.ask - symbol_info.bid
-        current_spread_points = spread / point
-        if current_spread_points > self.trading_settings['max_spread']:
-            self.log(f"❌ Spread terlalu lebar: {current_spread_points:.1f} poin (maks {self.trading_settings['max_spread']:.1f}).")
-            return None
-            
-        if order_type == mt5.ORDER_TYPE_BUY:
-            required_margin = mt5.order_calc_margin(
-                mt5.ORDER_TYPE_BUY, symbol, lot_size, symbol_info.ask
-            )
-        else:
-            required_margin = mt5.order_calc_margin(
-                mt5.ORDER_TYPE_SELL, symbol, lot_size, symbol_info.bid
-            )
-            
-        if required_margin is None:
-            self.log("❌ Gagal menghitung margin yang dibutuhkan.")
-            return None
-            
-        if account.margin_free < required_margin:
-            self.log(f"❌ Margin tidak cukup. Dibutuhkan: ${required_margin:.2f}, Tersedia: ${account.margin_free:.2f}.")
-            return None
-            
-        for attempt in range(max_retry + 1):
-            tick = mt5.symbol_info_tick(symbol)
-            if tick is None:
-                self.log("Gagal mendapatkan tick terbaru saat retry untuk instant order.")
-                time.sleep(0.5)
-                continue
+        _, _, scale = self._schema(stream)
+        return last // scale - days * 86400
 
-            current_price_for_order = tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid
-                
-            request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": symbol,
-                "volume": lot_size,
-                "type": order_type,
-                "price": current_price_for_order,
-                "sl": stop_loss_price,
-                "tp": take_profit_price,
-                "deviation": 10,
-                "magic": 123456,
-                "comment": f"AI Instant Entry (Attempt {attempt+1})",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_FOK,
-            }
-            
-            result = mt5.order_send(request)
-            
-            if result is None:
-                self.log(f"❌ Hasil order_send (Instant) adalah None. Kemungkinan masalah koneksi atau server. Percobaan {attempt+1}/{max_retry}")
-                if attempt < max_retry:
-                    time.sleep(1)
-                    continue
-                else:
-                    return None
+    def read_rates(self, symbol_name, timeframe, start=None, end=None, count=None):
+        """
+        Membaca candle rekaman sebagai array RATES_DTYPE (format copy_rates_from_pos).
+        Returns:
+            numpy.ndarray: Candle terurut waktu (bisa kosong).
+        """
+        columns = self.read(symbol_name, self.stream_name(timeframe), start, end, count)
+        rates = np.zeros(len(columns['time']), dtype=RATES_DTYPE)
+        for column in RECORDER_BAR_COLUMNS:
+            rates[column] = columns[column]
+        return rates
+
+
+# Konfigurasi buku besar trade (lihat TradeLedger)
+LEDGER_ENABLED = True # Catat setiap order, fill, modifikasi, dan penutupan posisi ke LEDGER_FILE
+LEDGER_BATCH_SIZE = 500 # Maksimum event per transaksi tulis
+LEDGER_FLUSH_SECONDS = 1.0 # Jeda maksimum event menunggu di antrean sebelum ditulis
+LEDGER_ROLLUP_KEYS = ('day', 'mode', 'strategy', 'symbol') # Kolom yang boleh dipakai untuk mengelompokkan rollup
+LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    kind TEXT NOT NULL,
+    mode TEXT,
+    strategy TEXT,
+    symbol TEXT,
+    path TEXT,
+    ticket INTEGER,
+    position_id INTEGER,
+    order_type INTEGER,
+    volume REAL,
+    price REAL,
+    sl REAL,
+    tp REAL,
+    retcode INTEGER,
+    latency_ms REAL,
+    profit REAL,
+    model_version TEXT,
+    indicators TEXT,
+    comment TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events(time);
+CREATE INDEX IF NOT EXISTS idx_events_strategy_time ON events(strategy, time);
+CREATE INDEX IF NOT EXISTS idx_events_symbol_time ON events(symbol, time);
+CREATE INDEX IF NOT EXISTS idx_events_position ON events(position_id, kind);
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    position_id INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    model_version TEXT,
+    open_time REAL,
+    close_time REAL NOT NULL,
+    volume REAL,
+    price_open REAL,
+    profit REAL NOT NULL,
+    reason TEXT,
+    indicators TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_close_time ON trades(close_time);
+CREATE INDEX IF NOT EXISTS idx_trades_strategy_time ON trades(strategy, close_time);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol_time ON trades(symbol, close_time);
+CREATE TABLE IF NOT EXISTS rollups (
+    day TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    trades INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    gross_profit REAL NOT NULL,
+    gross_loss REAL NOT NULL,
+    PRIMARY KEY (day, mode, strategy, symbol)
+) WITHOUT ROWID;
+"""
+
+
+class TradeLedger:
+    """
+    Buku besar trade persisten di SQLite: setiap order (termasuk modifikasi SL/TP), fill beserta konteks entry
+    (strategi, model, indikator), dan penutupan posisi beserta P&L-nya.
+    Pemanggil hanya menaruh event ke antrean; satu thread penulis menyimpannya per batch dalam satu transaksi,
+    sehingga jalur order tidak pernah menunggu disk. Setiap trade yang ditutup juga menambah baris rollup harian
+    per (mode, strategi, simbol), sehingga winrate dan dashboard tidak perlu memindai tabel trade.
+    Kolom `mode` membedakan akun "live" (MT5) dan "sim" (SimulatedBroker) di file yang sama.
+    """
+    def __init__(self, path=LEDGER_FILE, mode="live", batch_size=LEDGER_BATCH_SIZE, flush_seconds=LEDGER_FLUSH_SECONDS,
+                 on_error=None):
+        """
+        Args:
+            path (str): File database SQLite.
+            mode (str): Jenis akun yang dicatat ("live" atau "sim").
+            batch_size (int): Maksimum event per transaksi.
+            flush_seconds (float): Jeda maksimum event di antrean sebelum ditulis.
+            on_error (callable, optional): Dipanggil dengan pesan saat satu batch gagal ditulis
+                (default: print ke konsol).
+        """
+        self.path = path
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.on_error = on_error
+        self.write_errors = 0 # Batch yang gagal ditulis (event di dalamnya dibuang)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._writer = None
+        self._lock = threading.Lock()
+        self._reader = None
+        self._totals = {'trades': 0, 'wins': 0, 'losses': 0, 'profit': 0.0}
+        self.last_result = None # "Win"/"Loss" trade terakhir yang tercatat untuk mode ini
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL") # Pembaca (dashboard) tidak memblokir penulis
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def open(self):
+        """Membuat skema bila perlu, memuat total dari rollup, dan menjalankan thread penulis."""
+        if self._thread is not None:
+            return
+        self._reader = self._connect()
+        self._reader.executescript(LEDGER_SCHEMA)
+        trades, wins, losses, profit = self._reader.execute(
+            "SELECT COALESCE(SUM(trades), 0), COALESCE(SUM(wins), 0), COALESCE(SUM(losses), 0), "
+            "COALESCE(SUM(gross_profit + gross_loss), 0.0) FROM rollups WHERE mode = ?", (self.mode,)).fetchone()
+        last = self._reader.execute("SELECT profit FROM trades WHERE mode = ? ORDER BY close_time DESC LIMIT 1",
+                                    (self.mode,)).fetchone()
+        with self._lock:
+            self._totals = {'trades': trades, 'wins': wins, 'losses': losses, 'profit': profit}
+            self.last_result = None if last is None else ("Win" if last[0] > 0 else "Loss")
+        # Koneksi penulis dibuka di sini agar kegagalan muncul ke pemanggil, bukan mematikan thread penulis
+        self._writer = self._connect()
+        self._thread = threading.Thread(target=self._write_loop, name="trade-ledger", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Menulis semua event yang tersisa lalu menghentikan thread penulis."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._writer.close()
+        self._writer = None
+        self._reader.close()
+        self._reader = None
+
+    def flush(self):
+        """Menunggu sampai semua event di antrean sudah tersimpan."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _put(self, kind, row):
+        if self._thread is not None:
+            self._queue.put((kind, row))
+
+    def record_order(self, path, request, result, latency, strategy=None):
+        """
+        Mencatat satu panggilan order_send (termasuk retry yang gagal dan modifikasi SL/TP).
+        Args:
+            path (str): Jalur order (misalnya "Instant", "Close", "Modify SL/TP").
+            request (dict): Request order_send.
+            result: Hasil order_send, atau None.
+            latency (float): Latensi order_send dalam detik.
+            strategy (str, optional): Strategi/mode bot yang mengirim order.
+        """
+        modify = request.get('action') in (mt5.TRADE_ACTION_SLTP, mt5.TRADE_ACTION_MODIFY)
+        self._put("event", {
+            'time': time.time(), 'kind': "modify" if modify else "order", 'strategy': strategy,
+            'symbol': request.get('symbol'), 'path': path,
+            'ticket': None if result is None else (result.order or None),
+            'position_id': request.get('position') or None, 'order_type': request.get('type'),
+            'volume': request.get('volume'), 'price': request.get('price'),
+            'sl': request.get('sl'), 'tp': request.get('tp'),
+            'retcode': None if result is None else result.retcode, 'latency_ms': latency * 1000,
+            'comment': request.get('comment'),
+        })
+
+    def record_fill(self, symbol_name, strategy, result, model_version=None, indicators=None):
+        """
+        Mencatat entry yang tereksekusi (atau order pending yang ditempatkan) beserta konteksnya.
+        Tiket order menjadi ID posisi, sehingga penutupan posisi dapat dihubungkan ke entry ini.
+        Args:
+            symbol_name (str): Simbol.
+            strategy (str): Strategi/mode bot.
+            result: Hasil order_send dengan retcode DONE atau PLACED.
+            model_version (str, optional): Artefak/versi model aktif.
+            indicators (dict, optional): Nilai indikator candle terakhir saat entry.
+        """
+        request = getattr(result, 'request', None)
+        self._put("event", {
+            'time': time.time(), 'kind': "fill" if result.retcode == mt5.TRADE_RETCODE_DONE else "placed",
+            'strategy': strategy, 'symbol': symbol_name, 'ticket': result.order, 'position_id': result.order,
+            'order_type': getattr(request, 'type', None), 'volume': result.volume, 'price': result.price,
+            'sl': getattr(request, 'sl', None), 'tp': getattr(request, 'tp', None), 'retcode': result.retcode,
+            'model_version': model_version, 'indicators': indicators,
+        })
+
+    def record_close(self, trade):
+        """
+        Mencatat posisi yang tertutup penuh dan memperbarui total di memori (O(1)).
+        Strategi, model, dan indikator diambil dari fill entry posisi tersebut oleh thread penulis.
+        Args:
+            trade (ClosedTrade): Posisi yang ditutup.
+        """
+        with self._lock:
+            self._totals['trades'] += 1
+            self._totals['wins' if trade.profit > 0 else 'losses'] += 1
+            self._totals['profit'] += trade.profit
+            self.last_result = "Win" if trade.profit > 0 else "Loss"
+        self._put("close", {'time': time.time(), 'trade': trade})
+
+    def totals(self):
+        """
+        Returns:
+            dict: trades, wins, losses, profit untuk mode ledger ini (dari rollup + trade sesi ini).
+        """
+        with self._lock:
+            return dict(self._totals)
 
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
-                self.handle_order_result(result, "Instant", attempt+1)
-                return result
-            elif result.retcode in [mt5.TRADE_RETCODE_REQUOTE, mt5.TRADE_RETCODE_PRICE_CHANGED]:
-                self.log(f"🔄 Harga berubah. Mencoba lagi (Percobaan {attempt+1}/{max_retry})...")
-                time.sleep(0.5)
-                continue
-            else:
-                self.handle_order_result(result, "Instant", attempt+1)
-                return result
-                
-        return result
+    def _report_error(self, message):
+        if self.on_error is None:
+            print(message)
+            return
+        try:
+            self.on_error(message)
+        except Exception:
+            print(message)
+
+    def _write_loop(self):
+        conn = self._writer
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for item in batch:
+                        if item is None:
+                            continue
+                        kind, row = item
+                        if kind == "event":
+                            self._insert_event(conn, row)
+                        else:
+                            self._insert_close(conn, row)
+            except Exception as e:
+                # Batch dibuang (transaksi di-rollback) tetapi thread tetap hidup agar flush()/close() tidak menggantung
+                self.write_errors += 1
+                self._report_error(f"⚠️ Gagal menulis {len(batch)} event ke buku besar trade: {type(e).__name__}: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
 
-    def execute_pending_order(self, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry=3):
+    def _insert_event(self, conn, row):
+        row = dict(row, mode=self.mode)
+        if row.get('indicators') is not None:
+            row['indicators'] = json.dumps(row['indicators'])
+        columns = ", ".join(row)
+        conn.execute(f"INSERT INTO events ({columns}) VALUES ({', '.join('?' * len(row))})", tuple(row.values()))
+
+    def _insert_close(self, conn, row):
+        trade, close_time = row['trade'], row['time']
+        entry = conn.execute(
+            "SELECT time, strategy, model_version, price, indicators FROM events "
+            "WHERE position_id = ? AND kind IN ('fill', 'placed') AND mode = ? ORDER BY id DESC LIMIT 1",
+            (trade.position_id, self.mode)).fetchone()
+        open_time, strategy, model_version, price_open, indicators = entry or (None, None, None, None, None)
+        strategy = strategy or "eksternal" # Posisi yang tidak dibuka bot (manual/EA lain)
+        conn.execute(
+            "INSERT INTO events (time, kind, mode, strategy, symbol, position_id, volume, profit, comment) "
+            "VALUES (?, 'close', ?, ?, ?, ?, ?, ?, ?)",
+            (close_time, self.mode, strategy, trade.symbol, trade.position_id, trade.volume, trade.profit, trade.reason))
+        conn.execute(
+            "INSERT INTO trades (position_id, mode, strategy, symbol, model_version, open_time, close_time, volume, "
+            "price_open, profit, reason, indicators) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (trade.position_id, self.mode, strategy, trade.symbol, model_version, open_time, close_time,
+             trade.volume, price_open, trade.profit, trade.reason, indicators))
+        win = trade.profit > 0
+        conn.execute(
+            "INSERT INTO rollups (day, mode, strategy, symbol, trades, wins, losses, gross_profit, gross_loss) "
+            "VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?) ON CONFLICT (day, mode, strategy, symbol) DO UPDATE SET "
+            "trades = trades + 1, wins = wins + excluded.wins, losses = losses + excluded.losses, "
+            "gross_profit = gross_profit + excluded.gross_profit, gross_loss = gross_loss + excluded.gross_loss",
+            (datetime.datetime.fromtimestamp(close_time, datetime.timezone.utc).strftime('%Y-%m-%d'),
+             self.mode, strategy, trade.symbol, int(win), int(not win),
+             trade.profit if win else 0.0, 0.0 if win else trade.profit))
+
+    def rollup(self, group_by=('strategy', 'symbol'), since_day=None, mode=None):
         """
-        Mengeksekusi order pending (Limit Order).
-        Akan ditempatkan di harga tertentu, di bawah harga saat ini untuk BUY LIMIT,
-        atau di atas harga saat ini untuk SELL LIMIT.
+        Statistik trade teragregasi dari tabel rollup (tidak memindai tabel trade).
         Args:
-            order_type (int): Tipe order MT5 (mt5.ORDER_TYPE_BUY atau mt5.ORDER_TYPE_SELL).
-            price (float): Harga saat ini (digunakan untuk menentukan harga limit).
-            lot_size (float): Ukuran lot.
-            take_profit_price (float): Harga Take Profit.
-            stop_loss_price (float): Harga Stop Loss.
-            max_retry (int): Jumlah maksimum percobaan.
+            group_by (tuple): Kolom pengelompokan, subset dari LEDGER_ROLLUP_KEYS.
+            since_day (str, optional): Hari UTC pertama (YYYY-MM-DD) yang dihitung.
+            mode (str, optional): Mode akun; default mode ledger ini.
         Returns:
-            mt5.TradeRequestResult or None: Hasil dari operasi order_send.
+            list: Dict per kelompok dengan kolom group_by, trades, wins, losses, gross_profit, gross_loss,
+                profit, dan winrate.
         """
-        symbol_info = mt5.symbol_info(symbol)
-        if symbol_info is None:
-            self.log(f"Gagal mendapatkan info simbol untuk {symbol} saat pending order.")
-            return None
-        point = symbol_info.point
+        unknown = set(group_by) - set(LEDGER_ROLLUP_KEYS)
+        if unknown:
+            raise ValueError(f"Kolom rollup tidak dikenal: {', '.join(sorted(unknown))}")
+        keys = ", ".join(group_by)
+        sql = (f"SELECT {keys + ', ' if keys else ''}SUM(trades), SUM(wins), SUM(losses), SUM(gross_profit), "
+               f"SUM(gross_loss) FROM rollups WHERE mode = ?")
+        params = [mode or self.mode]
+        if since_day is not None:
+            sql += " AND day >= ?"
+            params.append(since_day)
+        if keys:
+            sql += f" GROUP BY {keys} ORDER BY {keys}"
+        conn = self._reader
+        if conn is None:
+            conn = self._connect()
+            conn.executescript(LEDGER_SCHEMA)
+        try:
+            with self._lock:
+                rows = conn.execute(sql, params).fetchall()
+        finally:
+            if conn is not self._reader:
+                conn.close()
+        summary = []
+        for row in rows:
+            trades, wins, losses, gross_profit, gross_loss = row[len(group_by):]
+            if not trades:
+                continue
+            summary.append(dict(zip(group_by, row), trades=trades, wins=wins, losses=losses,
+                                gross_profit=gross_profit, gross_loss=gross_loss,
+                                profit=gross_profit + gross_loss, winrate=wins / trades))
+        return summary
 
-        if order_type == mt5.ORDER_TYPE_BUY:
-            pending_type = mt5.ORDER_TYPE_BUY_LIMIT
-            entry_price = price - (10 * point) # Example: 1 pip below current price
-        else:
-            pending_type = mt5.ORDER_TYPE_SELL_LIMIT
-            entry_price = price + (10 * point) # Example: 1 pip above current price
-            
-        for attempt in range(max_retry + 1):
-            request = {
-                "action": mt5.TRADE_ACTION_PENDING,
-                "symbol": symbol,
-                "volume": lot_size,
-                "type": pending_type,
-                "price": entry_price,
-                "sl": stop_loss_price,
-                "tp": take_profit_price,
-                "deviation": 10,
-                "magic": 123456,
-                "comment": f"AI Pending Entry (Attempt {attempt+1})",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC, # Immediate or Cancel
-            }
-            
-            result = mt5.order_send(request)
-            
-            if result is None:
-                self.log(f"❌ Hasil order_send (Pending) adalah None. Kemungkinan masalah koneksi atau server. Percobaan {attempt+1}/{max_retry}")
-                if attempt < max_retry:
-                    time.sleep(1)
-                    continue
-                else:
-                    return None
-            
-            if result.retcode == mt5.TRADE_RETCODE_DONE or attempt == max_retry:
-                self.handle_order_result(result, "Pending", attempt+1)
-                return result
-                
-            time.sleep(1)
-            self.log(f"🔄 Retry {attempt+1}/{max_retry} for Pending Order...")
-            
-        return result
 
-    def execute_stop_limit_order(self, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry=3):
+# Fitur candle M5 yang dipakai model AI Long Trade (training dan inferensi)
+AI_FEATURE_COLUMNS = ['open', 'high', 'low', 'close', 'rsi', 'macd', 'macd_signal',
+                      'macd_hist', 'ema20', 'ema50', 'bb_width', 'atr', 'obv']
+# Hyperparameter RandomForestClassifier untuk model arah AI Long Trade
+AI_MODEL_PARAMS = {'n_estimators': 200, 'max_depth': 10, 'random_state': 42}
+
+
+def rates_to_frame(rates, indicator_values):
+    """
+    Menggabungkan candle dan nilai indikator menjadi DataFrame (kolom 'time' berupa datetime).
+    Args:
+        rates (numpy.ndarray): Candle RATES_DTYPE.
+        indicator_values (numpy.ndarray): Array (n, len(INDICATOR_COLUMNS)) yang sejajar dengan `rates`.
+    Returns:
+        DataFrame: Data candle beserta kolom INDICATOR_COLUMNS.
+    """
+    df = pd.DataFrame(rates)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    for i, column in enumerate(INDICATOR_COLUMNS):
+        df[column] = indicator_values[:, i]
+    return df
+
+
+def direction_dataset(df):
+    """
+    Menyiapkan fitur dan target model arah: target 1 jika close candle berikutnya lebih tinggi.
+    Baris dengan indikator kosong (warm-up) dibuang.
+    Args:
+        df (DataFrame): Candle beserta indikator (lihat rates_to_frame).
+    Returns:
+        tuple: (X DataFrame dengan kolom AI_FEATURE_COLUMNS, y Series target).
+    """
+    df = df.copy()
+    df['target'] = (df['close'].shift(-1) > df['close']).astype(int)
+    df = df.dropna()
+    return df[AI_FEATURE_COLUMNS], df['target']
+
+
+def build_direction_model(n_jobs=None):
+    """Membuat RandomForestClassifier baru dengan AI_MODEL_PARAMS."""
+    return RandomForestClassifier(n_jobs=n_jobs, **AI_MODEL_PARAMS)
+
+
+def train_direction_model(df):
+    """
+    Melatih RandomForestClassifier untuk memprediksi arah candle berikutnya (1 = naik, 0 = turun).
+    Args:
+        df (DataFrame): Candle M5 beserta indikator (lihat rates_to_frame).
+    Returns:
+        tuple: (model, akurasi train, akurasi test).
+    Raises:
+        ValueError: Jika data tidak cukup untuk training; pesan siap ditampilkan ke log.
+    """
+    X, y = direction_dataset(df)
+
+    if X.empty:
+        raise ValueError("Data tidak cukup setelah perhitungan indikator untuk melatih model.")
+
+    if len(X) < 2:
+        raise ValueError("Data terlalu sedikit untuk melakukan train-test split. Tingkatkan jumlah data historis.")
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
+
+    if X_train.empty or X_test.empty:
+        raise ValueError("Train atau test set kosong setelah split. Sesuaikan ukuran data historis atau test_size.")
+
+    trained_model = build_direction_model()
+    trained_model.fit(X_train, y_train)
+    return trained_model, trained_model.score(X_train, y_train), trained_model.score(X_test, y_test)
+
+
+class CompiledForest:
+    """
+    Versi inferensi cepat dari RandomForestClassifier terlatih.
+    Semua pohon diratakan menjadi array node NumPy yang bersebelahan (fitur, threshold, anak kiri/kanan,
+    probabilitas leaf). Traversal dilakukan untuk semua pohon sekaligus, satu langkah kedalaman per
+    iterasi; leaf menunjuk ke dirinya sendiri sehingga jumlah iterasi tetap (= kedalaman maksimum).
+    Kelas dan probabilitas dihitung dalam satu panggilan tanpa validasi input sklearn.
+    Hasilnya sama dengan predict()/predict_proba() model aslinya.
+    """
+    def __init__(self, forest):
         """
-        Mengeksekusi order Stop Limit.
-        Order Stop Limit membutuhkan dua harga: harga stop (trigger) dan harga limit (eksekusi).
         Args:
-            order_type (int): Tipe order MT5 (mt5.ORDER_TYPE_BUY atau mt5.ORDER_TYPE_SELL).
-            price (float): Harga saat ini.
-            lot_size (float): Ukuran lot.
-            take_profit_price (float): Harga Take Profit.
-            stop_loss_price (float): Harga Stop Loss.
-            max_retry (int): Jumlah maksimum percobaan.
+            forest (RandomForestClassifier): Model terlatih (satu output).
+        """
+        self.source = forest
+        self.classes_ = np.asarray(forest.classes_)
+        self.n_features = forest.n_features_in_
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset, depth = 0, 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            nodes = np.arange(n_nodes)
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            values = tree.value[:, 0, :]
+            probas.append(values / values.sum(axis=1, keepdims=True))
+            offset += n_nodes
+            depth = max(depth, tree.max_depth)
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        # Kolom 0 = anak kanan, kolom 1 = anak kiri: children[node, x <= threshold]
+        self.children = np.column_stack([np.concatenate(rights), np.concatenate(lefts)]).astype(np.intp)
+        self.proba = np.concatenate(probas)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.depth = depth
+
+    def predict_proba(self, X):
+        """
+        Args:
+            X (numpy.ndarray): Vektor fitur (n_features,) atau matriks (n_samples, n_features),
+                urutan kolom sama dengan saat training. Nilai dibulatkan ke float32 seperti sklearn.
         Returns:
-            mt5.TradeRequestResult or None: Hasil dari operasi order_send.
+            numpy.ndarray: Probabilitas per kelas, (n_classes,) untuk vektor atau (n_samples, n_classes).
         """
-        symbol_info = mt5.symbol_info(symbol)
-        if symbol_info is None:
-            self.log(f"Gagal mendapatkan info simbol untuk {symbol} saat stop limit order.")
-            return None
-        point = symbol_info.point
+        X = np.asarray(X, dtype=np.float32)
+        feature, threshold, children = self.feature, self.threshold, self.children
+        node = self.roots
+        if X.ndim == 1: # Jalur satu vektor (inferensi live): tanpa indeks baris
+            for _ in range(self.depth):
+                node = children[node, (X[feature[node]] <= threshold[node]).view(np.int8)]
+            return self.proba[node].mean(axis=0)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(node, (len(X), len(node)))
+        for _ in range(self.depth):
+            node = children[node, (X[rows, feature[node]] <= threshold[node]).view(np.int8)]
+        return self.proba[node].mean(axis=1)
+
+    def predict(self, X):
+        """
+        Returns:
+            tuple: (kelas, probabilitas) — kelas dengan probabilitas tertinggi beserta array probabilitasnya.
+        """
+        proba = self.predict_proba(X)
+        return self.classes_[np.argmax(proba, axis=-1)], proba
 
-        if order_type == mt5.ORDER_TYPE_BUY:
-            stop_limit_type = mt5.ORDER_TYPE_BUY_STOP_LIMIT
-            stop_price = price + (10 * point)  # Price at which stop limit becomes active
-            limit_price = price + (5 * point)   # Limit price for the buy
-        else:
-            stop_limit_type = mt5.ORDER_TYPE_SELL_STOP_LIMIT
-            stop_price = price - (10 * point)  # Price at which stop limit becomes active
-            limit_price = price - (5 * point)   # Limit price for the sell
-            
-        for attempt in range(max_retry + 1):
-            request = {
-                "action": mt5.TRADE_ACTION_PENDING,
-                "symbol": symbol,
-                "volume": lot_size,
-                "type": stop_limit_type,
-                "price": limit_price,
-                "stoplimit": stop_price, # This is the trigger price for STOP_LIMIT orders
-                "sl": stop_loss_price,
-                "tp": take_profit_price,
-                "deviation": 10,
-                "magic": 123456,
-                "comment": f"AI Stop Limit Entry (Attempt {attempt+1})",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC,
-            }
-            
-            result = mt5.order_send(request)
-            
-            if result is None:
-                self.log(f"❌ Hasil order_send (Stop Limit) adalah None. Kemungkinan masalah koneksi atau server. Percobaan {attempt+1}/{max_retry}")
-                if attempt < max_retry:
-                    time.sleep(1)
-                    continue
-                else:
-                    return None
 
-            if result.retcode == mt5.TRADE_RETCODE_DONE or attempt == max_retry:
-                self.handle_order_result(result, "Stop Limit", attempt+1)
-                return result
-                
-            time.sleep(1)
-            self.log(f"🔄 Retry {attempt+1}/{max_retry} for Stop Limit Order...")
-                
-        return result
+def lot_size_for_risk(risk_amount_usd, sl_pips, volume_min, volume_max, volume_step, cost_per_pip_per_lot=10.0):
+    """
+    Menghitung ukuran lot agar kerugian di SL sama dengan `risk_amount_usd`,
+    dibatasi volume min/maks dan dibulatkan ke volume step. Bekerja untuk skalar maupun array NumPy.
+    Args:
+        risk_amount_usd (float or numpy.ndarray): Risiko maksimum per trade (USD).
+        sl_pips (float or numpy.ndarray): Jarak Stop Loss dalam pips (harus > 0).
+        volume_min, volume_max, volume_step (float): Batas volume simbol.
+        cost_per_pip_per_lot (float): Nilai 1 pip untuk 1 lot (USD); $10 untuk XAUUSD.
+    Returns:
+        float or numpy.ndarray: Ukuran lot.
+    """
+    lot = np.clip(risk_amount_usd / (sl_pips * cost_per_pip_per_lot), volume_min, volume_max)
+    return np.round(lot / volume_step) * volume_step
+
+
+# Konfigurasi cache metadata broker (lihat BrokerMetadataCache)
+SYMBOL_SPEC_TTL_SECONDS = 3600 # Properti kontrak (point, digits, volume_min/max/step) hampir tidak pernah berubah
+SYMBOL_QUOTE_TTL_SECONDS = 1.0 # Field volatil SymbolInfo (bid/ask/spread): paling lama satu siklus data
+ACCOUNT_TTL_SECONDS = 1.0 # Info akun; dibuang lebih awal setelah order dieksekusi
+
+# Pelacakan posisi dan deal (lihat PositionTracker)
+DEAL_POLL_INTERVAL_SECONDS = 0.5 # Jeda minimum antar polling riwayat deal ke terminal
+POSITION_RESYNC_SECONDS = 15 # Daftar posisi penuh diambil ulang paling lambat setiap N detik (SL/TP diubah manual, swap)
+DEAL_HISTORY_LOOKBACK_SECONDS = 86400 # Jendela riwayat deal (waktu server) sebelum ada deal yang terlihat
 
-    def execute_market_on_close(self, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry=3):
+
+class TTLCache:
+    """
+    Cache key -> nilai dengan masa berlaku per entri dan penghitung hit/miss.
+    Nilai None dari loader tidak di-cache, sehingga kegagalan broker dicoba ulang pada panggilan berikutnya.
+    """
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
         """
-        Mengeksekusi order "Market on Close".
-        Jika waktu saat ini sangat dekat dengan penutupan candle, order akan dieksekusi sebagai order instan.
-        Jika tidak, order pending akan ditempatkan dan akan kadaluarsa pada penutupan candle.
         Args:
-            order_type (int): Tipe order MT5 (mt5.ORDER_TYPE_BUY atau mt5.ORDER_TYPE_SELL).
-            price (float): Harga saat ini.
-            lot_size (float): Ukuran lot.
-            take_profit_price (float): Harga Take Profit.
-            stop_loss_price (float): Harga Stop Loss.
-            max_retry (int): Jumlah maksimum percobaan.
+            key: Kunci cache.
+            loader (callable): Dipanggil tanpa argumen untuk memuat nilai jika entri tidak ada atau kedaluwarsa.
         Returns:
-            mt5.TradeRequestResult or None: Hasil dari operasi order.
+            Nilai dari cache atau loader.
         """
-        rates = mt5.copy_rates_from_pos(symbol, AI_TRADING_TIMEFRAME, 0, 1)
-        if rates is None:
-            self.log("Gagal mendapatkan data candle untuk Market on Close.")
-            return None
-            
-        candle_time = pd.to_datetime(rates[0]['time'], unit='s')
-        current_time = datetime.datetime.now()
-        time_diff = (current_time - candle_time).total_seconds()
-        
-        # If very close to candle close, execute as instant order
-        if time_diff > (mt5.period_seconds(AI_TRADING_TIMEFRAME) - 10):
-            self.log("Melakukan Market on Close sebagai Instant Order (dekat penutupan candle).")
-            return self.execute_instant_order(order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry)
-        else:
-            # Place a pending order expiring at the next candle close
-            expiration = candle_time + datetime.timedelta(seconds=mt5.period_seconds(AI_TRADING_TIMEFRAME))
-            
-            for attempt in range(max_retry + 1):
-                request = {
-                    "action": mt5.TRADE_ACTION_PENDING,
-                    "symbol": symbol,
-                    "volume": lot_size,
-                    "type": mt5.ORDER_TYPE_BUY_LIMIT if order_type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_SELL_LIMIT,
-                    "price": price,
-                    "sl": stop_loss_price,
-                    "tp": take_profit_price,
-                    "deviation": 10,
-                    "magic": 123456,
-                    "comment": f"AI Market on Close (Attempt {attempt+1})",
-                    "type_time": mt5.ORDER_TIME_SPECIFIED,
-                    "type_filling": mt5.ORDER_FILLING_IOC,
-                    "expiration": int(expiration.timestamp())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = loader()
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self, key=None):
+        """Membuang satu entri, atau semua entri jika key None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class BrokerMetadataCache:
+    """
+    Lapisan cache di depan panggilan IPC broker yang datanya jarang berubah. Info simbol dipisah menjadi
+    properti kontrak statis (spec, TTL panjang) dan field volatil bid/ask/spread (quote, TTL satu siklus);
+    info akun di-cache singkat dan dibuang setelah order. Tick untuk order tidak pernah di-cache.
+    """
+    def __init__(self):
+        self._specs = TTLCache(SYMBOL_SPEC_TTL_SECONDS)
+        self._quotes = TTLCache(SYMBOL_QUOTE_TTL_SECONDS)
+        self._accounts = TTLCache(ACCOUNT_TTL_SECONDS)
+
+    def spec(self, symbol_name):
+        """
+        Returns:
+            SymbolInfo or None: Info simbol untuk properti kontrak (point, digits, volume_*, trade_mode).
+                Field bid/ask/spread di objek ini bisa basi; gunakan quote() untuk itu.
+        """
+        return self._specs.get(symbol_name, lambda: broker.symbol_info(symbol_name))
+
+    def quote(self, symbol_name):
+        """
+        Returns:
+            SymbolInfo or None: Info simbol dengan bid/ask/spread paling lama SYMBOL_QUOTE_TTL_SECONDS.
+        """
+        def load():
+            info = broker.symbol_info(symbol_name)
+            if info is not None:
+                self._specs.put(symbol_name, info)
+            return info
+        return self._quotes.get(symbol_name, load)
+
+    def account(self):
+        """Returns: AccountInfo or None: Info akun, paling lama ACCOUNT_TTL_SECONDS."""
+        return self._accounts.get(None, broker.account_info)
+
+    def invalidate_account(self):
+        """Membuang info akun yang di-cache (setelah order mengubah margin/posisi)."""
+        self._accounts.invalidate()
+
+    def invalidate(self):
+        """Membuang semua entri (misalnya setelah koneksi broker disambung ulang)."""
+        for cache in (self._specs, self._quotes, self._accounts):
+            cache.invalidate()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Nama cache ('spec', 'quote', 'account') -> (hit, miss).
+        """
+        return {name: (cache.hits, cache.misses)
+                for name, cache in (('spec', self._specs), ('quote', self._quotes), ('account', self._accounts))}
+
+
+# Alasan penutupan posisi (DEAL_REASON_*) untuk statistik dan log
+DEAL_REASON_NAMES = {
+    mt5.DEAL_REASON_SL: "sl",
+    mt5.DEAL_REASON_TP: "tp",
+    mt5.DEAL_REASON_SO: "stop_out",
+    mt5.DEAL_REASON_EXPERT: "expert",
+    mt5.DEAL_REASON_CLIENT: "manual",
+    mt5.DEAL_REASON_MOBILE: "manual",
+    mt5.DEAL_REASON_WEB: "manual",
+}
+CLOSING_DEAL_ENTRIES = (mt5.DEAL_ENTRY_OUT, mt5.DEAL_ENTRY_OUT_BY, mt5.DEAL_ENTRY_INOUT)
+
+# Posisi yang sudah ditutup penuh, hasil agregasi semua deal keluar-nya
+ClosedTrade = namedtuple('ClosedTrade', 'position_id symbol volume profit reason')
+
+
+class PositionTracker:
+    """
+    State posisi terbuka dan statistik trade yang diperbarui secara inkremental dari riwayat deal.
+    Setiap sync hanya meminta deal sejak deal terakhir yang sudah dilihat (tiket deal selalu naik);
+    daftar posisi penuh (satu positions_get untuk semua simbol) hanya diambil saat ada deal baru, setelah order
+    engine sendiri, atau setiap POSITION_RESYNC_SECONDS. Di antaranya profit mengambang dihitung ulang dari
+    tick snapshot. Profit mengambang, profit terealisasi, win/loss, dan jumlah penutupan per alasan
+    (SL, TP, stop out, manual, expert) dipelihara sebagai agregat O(1) per perubahan.
+    """
+    def __init__(self, symbols, on_close=None, poll_seconds=DEAL_POLL_INTERVAL_SECONDS,
+                 resync_seconds=POSITION_RESYNC_SECONDS, lookback_seconds=DEAL_HISTORY_LOOKBACK_SECONDS):
+        """
+        Args:
+            symbols (iterable): Simbol yang dilacak; posisi dan deal simbol lain diabaikan.
+            on_close (callable, optional): Dipanggil sebagai on_close(ClosedTrade) di luar lock
+                untuk setiap posisi yang tertutup penuh.
+            poll_seconds (float): Jeda minimum antar polling riwayat deal.
+            resync_seconds (float): Umur maksimum daftar posisi penuh.
+            lookback_seconds (int): Jendela riwayat deal sebelum deal pertama terlihat.
+        """
+        self.symbols = set(symbols)
+        self.on_close = on_close
+        self.poll_seconds = poll_seconds
+        self.resync_seconds = resync_seconds
+        self.lookback_seconds = lookback_seconds
+        self._lock = threading.RLock()
+        self._positions = None # Tiket -> posisi; None sampai daftar pertama berhasil diambil
+        self._by_symbol = {} # Simbol -> {tiket: posisi}
+        self._profits = {} # Tiket -> profit mengambang yang sudah masuk agregat
+        self._symbol_profit = {}
+        self._dirty = True
+        self._fetched_at = 0.0
+        self._polled_at = 0.0
+        self._reference_time = None # Waktu server terbaru (dari tick) sebagai acuan jendela riwayat deal
+        self._last_ticket = None # Tiket deal terakhir yang sudah diterapkan; None sebelum baseline
+        self._last_deal_time = None
+        self._pending = {} # ID posisi -> [simbol, volume, profit, alasan] deal keluar yang belum final
+        self.floating_profit = 0.0
+        self.realized_profit = 0.0
+        self.wins = 0
+        self.losses = 0
+        self.closes_by_reason = {}
+        self.last_trade = None
+        self.deals_applied = 0
+        self.deal_polls = 0
+        self.full_fetches = 0
+
+    def invalidate(self):
+        """Menandai daftar posisi basi (setelah order engine sendiri) sehingga sync berikutnya mengambil ulang."""
+        with self._lock:
+            self._dirty = True
+
+    def sync(self, reference_time=None, force=False):
+        """
+        Menerapkan deal baru dan, bila perlu, mengambil ulang daftar posisi.
+        Args:
+            reference_time (int, optional): Waktu server terbaru (tick.time).
+            force (bool): Abaikan jeda polling.
+        """
+        closed = []
+        with self._lock:
+            if reference_time is not None:
+                self._reference_time = max(reference_time, self._reference_time or 0)
+            now = time.monotonic()
+            if not force and not self._dirty and now - self._polled_at < self.poll_seconds:
+                return
+            self._polled_at = now
+            new_deals = self._poll_deals()
+            if (self._positions is None or new_deals or self._dirty
+                    or now - self._fetched_at >= self.resync_seconds):
+                self._fetch_positions(now)
+            if self._positions is not None:
+                closed = self._finalize_closed()
+        for trade in closed:
+            if self.on_close is not None:
+                self.on_close(trade)
+
+    def _poll_deals(self):
+        """Mengambil deal sejak deal terakhir yang dilihat. Returns: int: Jumlah deal baru yang diterapkan."""
+        if self._reference_time is None:
+            return 0
+        start = self._last_deal_time if self._last_deal_time is not None else self._reference_time - self.lookback_seconds
+        end = self._reference_time + self.lookback_seconds
+        deals = broker.history_deals_get(datetime.datetime.fromtimestamp(start, tz=datetime.timezone.utc),
+                                         datetime.datetime.fromtimestamp(end, tz=datetime.timezone.utc))
+        self.deal_polls += 1
+        if deals is None:
+            return 0
+        baseline = self._last_ticket is None
+        last_ticket = self._last_ticket or 0
+        applied = 0
+        for deal in sorted(deals, key=lambda d: d.ticket):
+            if deal.ticket <= last_ticket:
+                continue
+            last_ticket = deal.ticket
+            self._last_deal_time = deal.time
+            if baseline or deal.symbol not in self.symbols:
+                continue # Deal sebelum engine mulai, atau simbol yang tidak dilacak
+            applied += 1
+            if deal.entry in CLOSING_DEAL_ENTRIES:
+                self._apply_closing_deal(deal)
+        self._last_ticket = last_ticket
+        self.deals_applied += applied
+        return applied
+
+    def _apply_closing_deal(self, deal):
+        profit = deal.profit + deal.swap + deal.commission
+        self.realized_profit += profit
+        pending = self._pending.setdefault(deal.position_id, [deal.symbol, 0.0, 0.0, None])
+        pending[1] += deal.volume
+        pending[2] += profit
+        pending[3] = DEAL_REASON_NAMES.get(deal.reason, "lainnya")
+
+    def _finalize_closed(self):
+        """Memfinalkan posisi dengan deal keluar yang sudah tidak ada di daftar posisi (bukan tutup sebagian)."""
+        closed = []
+        for position_id in [pid for pid in self._pending if pid not in self._positions]:
+            symbol_name, volume, profit, reason = self._pending.pop(position_id)
+            trade = ClosedTrade(position_id, symbol_name, volume, profit, reason)
+            if profit > 0:
+                self.wins += 1
+            else:
+                self.losses += 1
+            self.closes_by_reason[reason] = self.closes_by_reason.get(reason, 0) + 1
+            self.last_trade = trade
+            closed.append(trade)
+        return closed
+
+    def _fetch_positions(self, now):
+        """Mengambil daftar posisi penuh dan menerapkan selisihnya (posisi baru, berubah, dan hilang)."""
+        positions = broker.positions_get()
+        self.full_fetches += 1
+        if positions is None:
+            return
+        fresh = {position.ticket: position for position in positions if position.symbol in self.symbols}
+        if self._positions is None:
+            self._positions = {}
+        for ticket in [t for t in self._positions if t not in fresh]:
+            self._remove(ticket)
+        for position in fresh.values():
+            self._store(position)
+        self._fetched_at = now
+        self._dirty = False
+
+    def _store(self, position):
+        self._positions[position.ticket] = position
+        self._by_symbol.setdefault(position.symbol, {})[position.ticket] = position
+        delta = position.profit - self._profits.get(position.ticket, 0.0)
+        self._profits[position.ticket] = position.profit
+        self.floating_profit += delta
+        self._symbol_profit[position.symbol] = self._symbol_profit.get(position.symbol, 0.0) + delta
+
+    def _remove(self, ticket):
+        position = self._positions.pop(ticket)
+        self._by_symbol.get(position.symbol, {}).pop(ticket, None)
+        profit = self._profits.pop(ticket, 0.0)
+        self.floating_profit -= profit
+        self._symbol_profit[position.symbol] = self._symbol_profit.get(position.symbol, 0.0) - profit
+
+    def _revalue(self, position, tick, symbol_info):
+        """
+        Menghitung ulang harga dan profit mengambang posisi dari tick, seperti yang dilakukan terminal.
+        Returns:
+            Posisi dengan price_current dan profit baru, atau posisi asli jika tidak dapat disalin.
+        """
+        replace = getattr(position, '_replace', None)
+        if replace is None:
+            return position
+        is_buy = position.type == mt5.ORDER_TYPE_BUY
+        price = tick.bid if is_buy else tick.ask
+        tick_size = getattr(symbol_info, 'trade_tick_size', 0) or 0
+        tick_value = getattr(symbol_info, 'trade_tick_value', 0) or 0
+        value_per_price = tick_value / tick_size if tick_size > 0 and tick_value > 0 else symbol_info.trade_contract_size
+        profit = (1 if is_buy else -1) * (price - position.price_open) * position.volume * value_per_price
+        return replace(price_current=price, profit=profit)
+
+    def positions(self, symbol_name, tick=None, symbol_info=None):
+        """
+        Posisi terbuka satu simbol, setelah sync dengan riwayat deal.
+        Args:
+            symbol_name (str): Nama simbol.
+            tick (Tick, optional): Tick terbaru; jika diberikan bersama symbol_info, profit mengambang
+                dihitung ulang dari tick ini tanpa mengambil ulang daftar posisi.
+            symbol_info (SymbolInfo, optional): Info simbol (trade_contract_size / trade_tick_*).
+        Returns:
+            tuple: Posisi terbuka, atau None jika daftar posisi belum pernah berhasil diambil.
+        """
+        self.sync(reference_time=tick.time if tick is not None else None)
+        with self._lock:
+            if self._positions is None:
+                return None
+            current = list(self._by_symbol.get(symbol_name, {}).values())
+            if tick is not None and symbol_info is not None:
+                current = [self._revalue(position, tick, symbol_info) for position in current]
+                for position in current:
+                    self._store(position)
+            return tuple(current)
+
+    def all_positions(self, refresh=False, reference_time=None):
+        """
+        Args:
+            refresh (bool): Ambil ulang daftar posisi sebelum dikembalikan (misalnya sebelum menutup semua posisi).
+            reference_time (int, optional): Waktu server terbaru (tick.time), lihat sync().
+        Returns:
+            tuple: Posisi terbuka semua simbol yang dilacak.
+        """
+        if refresh:
+            self.invalidate()
+        self.sync(reference_time=reference_time)
+        with self._lock:
+            return tuple((self._positions or {}).values())
+
+    def symbol_profit(self, symbol_name):
+        """Returns: float: Total profit mengambang posisi simbol terakhir yang diketahui."""
+        with self._lock:
+            return self._symbol_profit.get(symbol_name, 0.0)
+
+    def stats(self):
+        """
+        Returns:
+            dict: open_positions, floating_profit, realized_profit, wins, losses, closes_by_reason,
+                last_trade, deals_applied, deal_polls, full_fetches.
+        """
+        with self._lock:
+            return {
+                'open_positions': len(self._positions or ()),
+                'floating_profit': self.floating_profit,
+                'realized_profit': self.realized_profit,
+                'wins': self.wins,
+                'losses': self.losses,
+                'closes_by_reason': dict(self.closes_by_reason),
+                'last_trade': self.last_trade,
+                'deals_applied': self.deals_applied,
+                'deal_polls': self.deal_polls,
+                'full_fetches': self.full_fetches,
+            }
+
+
+# Timeframe dan jumlah candle yang dimasukkan ke MarketSnapshot untuk setiap mode.
+# Mencakup kebutuhan tampilan (M5 + timeframe tren yang sesuai mode) dan strategi yang aktif.
+SNAPSHOT_TIMEFRAMES = {
+    "AI_Long_Trade": {AI_TRADING_TIMEFRAME: 200, AI_HIGHER_TIMEFRAME: 50},
+    "Scalping_Bot": {AI_TRADING_TIMEFRAME: 200, SCALPING_TIMEFRAME: 50, SCALPING_HIGHER_TIMEFRAME: 50},
+    "Sniper_Bot": {AI_TRADING_TIMEFRAME: 200, SNIPER_TRADING_TIMEFRAME: 50, SNIPER_HIGHER_TIMEFRAME: 50},
+}
+DEFAULT_SNAPSHOT_TIMEFRAMES = {AI_TRADING_TIMEFRAME: 200, AI_HIGHER_TIMEFRAME: 50}
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """
+    Potret pasar yang tidak dapat diubah, dibangun satu kali per siklus analisis.
+    Tampilan dan strategi membaca data yang sama (tick, info simbol, candle + indikator,
+    posisi, dan akun) sehingga keputusan tidak didasarkan pada harga yang berbeda dengan
+    yang ditampilkan, dan tidak ada panggilan MT5 berulang dalam satu siklus.
+    """
+    symbol: str
+    mode: str
+    created_at: datetime.datetime
+    tick: object
+    symbol_info: object
+    account: object
+    positions: tuple
+    bars: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    @property
+    def has_open_position(self):
+        return len(self.positions) > 0
+
+    @property
+    def spread_points(self):
+        """Spread saat ini dalam poin berdasarkan tick di snapshot."""
+        return (self.tick.ask - self.tick.bid) / self.symbol_info.point
+
+    def frame(self, timeframe, count=None):
+        """
+        Mengembalikan salinan DataFrame candle + indikator untuk timeframe tertentu.
+        Salinan dikembalikan agar pemanggil bebas memodifikasinya tanpa mengubah snapshot.
+        Args:
+            timeframe (int): Timeframe MT5.
+            count (int, optional): Jumlah candle terakhir; None untuk semua yang ada di snapshot.
+        Returns:
+            DataFrame or None: Data candle, atau None jika timeframe tidak ada di snapshot.
+        """
+        df = self.bars.get(timeframe)
+        if df is None:
+            return None
+        if count is not None:
+            df = df.iloc[-count:]
+        return df.copy()
+
+
+def build_market_snapshot(market_data, symbol_name, mode, metadata=None, tracker=None):
+    """
+    Mengambil tick, info simbol, akun, posisi, dan candle (dari cache) satu kali dan
+    membungkusnya dalam MarketSnapshot.
+    Args:
+        market_data (MarketDataCache): Cache candle yang dipakai bersama.
+        symbol_name (str): Simbol yang dianalisis.
+        mode (str): Mode bot saat ini (menentukan timeframe yang dimuat).
+        metadata (BrokerMetadataCache, optional): Cache info simbol dan akun; tanpa cache jika None.
+        tracker (PositionTracker, optional): Sumber posisi terbuka; positions_get langsung jika None.
+    Returns:
+        tuple: (MarketSnapshot or None, str or None) - snapshot, atau pesan kesalahan jika gagal.
+    """
+    tick = broker.symbol_info_tick(symbol_name)
+    if tick is None:
+        return None, "Gagal mendapatkan data tick."
+    info = metadata.spec(symbol_name) if metadata is not None else broker.symbol_info(symbol_name)
+    if info is None:
+        return None, f"Gagal mendapatkan info simbol untuk {symbol_name}."
+    account = metadata.account() if metadata is not None else broker.account_info()
+    if account is None:
+        return None, "Gagal mendapatkan info akun."
+    if tracker is not None:
+        positions = tracker.positions(symbol_name, tick, info)
+    else:
+        positions = broker.positions_get(symbol=symbol_name)
+
+    bars = {}
+    for timeframe, count in SNAPSHOT_TIMEFRAMES.get(mode, DEFAULT_SNAPSHOT_TIMEFRAMES).items():
+        df = market_data.frame(symbol_name, timeframe, count, tick.time)
+        if df is None:
+            return None, f"Gagal mendapatkan data candle untuk timeframe {timeframe}."
+        bars[timeframe] = df
+
+    snapshot = MarketSnapshot(
+        symbol=symbol_name,
+        mode=mode,
+        created_at=datetime.datetime.now(),
+        tick=tick,
+        symbol_info=info,
+        account=account,
+        positions=tuple(positions) if positions is not None else (),
+        bars=MappingProxyType(bars),
+    )
+    return snapshot, None
+
+
+# Interval loop engine (detik)
+DATA_POLL_INTERVAL_SECONDS = 1 # Pembaruan data pasar & akun untuk tampilan
+NEWS_CHECK_INTERVAL_SECONDS = 30 # Pengecekan berita ekonomi
+ANALYSIS_INTERVAL_SECONDS = { # Interval analisis per mode; mode yang tidak ada di sini tidak menjalankan analisis
+    "Monitoring": 5,
+    "AI_Long_Trade": 60,
+    "Scalping_Bot": 5,
+    "Sniper_Bot": 3, # Cek lebih sering untuk sniper
+}
+
+# Pemicu analisis berbasis event (lihat AnalysisScheduler). Interval di atas menjadi batas tunggu maksimum:
+# analisis tetap berjalan jika tidak ada event selama interval tersebut.
+ANALYSIS_BAR_TRIGGERS = { # Analisis segera setelah candle timeframe ini ditutup
+    "AI_Long_Trade": AI_TRADING_TIMEFRAME, # Model dilatih pada candle M5 yang sudah selesai
+    "Scalping_Bot": SCALPING_TIMEFRAME,
+    "Sniper_Bot": SNIPER_TRADING_TIMEFRAME,
+}
+ANALYSIS_TICK_TRIGGER_POINTS = { # Analisis jika harga tengah bergerak sejauh ini (poin) sejak analisis terakhir
+    "Scalping_Bot": 50,
+    "Sniper_Bot": 30,
+}
+SCHEDULER_POLL_SECONDS = 0.25 # Interval polling tick untuk mendeteksi candle baru dan pergerakan harga
+SCHEDULER_LATENESS_MAX_US = 10 * 60 * 1000 * 1000 # Keterlambatan maksimum yang dibedakan di histogram
+
+# Konfigurasi metrik eksekusi order (lihat ExecutionStats)
+HISTOGRAM_SUB_BUCKET_BITS = 6 # 64 sub-bucket per pangkat dua: resolusi relatif ~3%
+ORDER_LATENCY_MAX_US = 60 * 1000 * 1000 # Latensi maksimum yang dibedakan (60 detik, dalam mikrodetik)
+ORDER_SLIPPAGE_MAX_POINTS = 100000 # Slippage maksimum (poin) yang dibedakan, ke dua arah
+
+
+class LogLinearHistogram:
+    """
+    Histogram bergaya HDR dengan memori tetap: bucket linear untuk nilai kecil, lalu setiap pangkat dua
+    dibagi menjadi 2^(HISTOGRAM_SUB_BUCKET_BITS - 1) sub-bucket, sehingga galat relatif persentil konstan
+    di seluruh rentang. Nilai integer di [0, max_value], atau [-max_value, max_value] jika signed (nilai
+    negatif disimpan sebagai cermin bucket positif); nilai di luar rentang dijepit ke tepi.
+    """
+    def __init__(self, max_value, signed=False, sub_bucket_bits=HISTOGRAM_SUB_BUCKET_BITS):
+        """
+        Args:
+            max_value (int): Nilai absolut terbesar yang dibedakan.
+            signed (bool): True untuk menerima nilai negatif.
+            sub_bucket_bits (int): Presisi (jumlah bit sub-bucket).
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub = 1 << sub_bucket_bits
+        self._half = self._sub // 2
+        self._max = int(max_value)
+        self._zero = self._index(self._max) + 1 if signed else 0 # Indeks bucket untuk nilai 0
+        self.counts = np.zeros(self._zero + self._index(self._max) + 1, dtype=np.int64)
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self._sub:
+            return value
+        exponent = value.bit_length() - self.sub_bucket_bits
+        return exponent * self._half + (value >> exponent)
+
+    def _value_at(self, index):
+        """Nilai tengah bucket magnitudo `index`."""
+        if index < self._sub:
+            return float(index)
+        exponent = index // self._half - 1
+        mantissa = index - exponent * self._half
+        return ((mantissa << exponent) + ((mantissa + 1) << exponent) - 1) / 2.0
+
+    def record(self, value):
+        """Merekam satu nilai (dibulatkan ke integer)."""
+        value = int(round(value))
+        if value >= 0 or not self._zero:
+            self.counts[self._zero + self._index(min(max(value, 0), self._max))] += 1
+        else:
+            # -1 -> magnitudo 0, sehingga bucket negatif tidak bertumpuk dengan bucket nol
+            self.counts[self._zero - 1 - self._index(min(-value - 1, self._max - 1))] += 1
+        self.total += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """
+        Menambahkan isi histogram lain (misalnya dari thread atau sesi lain) ke histogram ini.
+        Args:
+            other (LogLinearHistogram): Histogram dengan max_value, signed, dan sub_bucket_bits yang sama.
+        Raises:
+            ValueError: Jika tata letak bucket kedua histogram berbeda.
+        """
+        if (other._max, other._zero, other.sub_bucket_bits) != (self._max, self._zero, self.sub_bucket_bits):
+            raise ValueError("Histogram dengan rentang atau presisi berbeda tidak dapat digabung")
+        if other.total == 0:
+            return
+        self.counts += other.counts
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percent):
+        """
+        Args:
+            percent (float): Persentil 0-100.
+        Returns:
+            float or None: Nilai pada persentil tersebut, atau None jika histogram kosong.
+        """
+        if self.total == 0:
+            return None
+        rank = max(1, int(math.ceil(self.total * percent / 100.0)))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        if index >= self._zero:
+            value = self._value_at(index - self._zero)
+        else:
+            value = -(self._value_at(self._zero - 1 - index) + 1)
+        return float(min(max(value, self.min), self.max))
+
+
+class ExecutionStats:
+    """
+    Metrik eksekusi order per jalur (Instant, Pending Order, Stop Limit, Market on Close, Close, Modify SL/TP):
+    latensi kirim-sampai-ack order_send, jumlah retry sampai order berhasil, distribusi retcode, dan slippage
+    dalam poin (positif = merugikan) terhadap harga yang diputuskan strategi. Memori tetap (LogLinearHistogram).
+    Aman dipakai dari beberapa thread.
+    """
+    def __init__(self):
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def _path(self, path):
+        stats = self._paths.get(path)
+        if stats is None:
+            stats = {
+                'latency_us': LogLinearHistogram(ORDER_LATENCY_MAX_US),
+                'slippage_points': LogLinearHistogram(ORDER_SLIPPAGE_MAX_POINTS, signed=True),
+                'retries': LogLinearHistogram(1000),
+                'retcodes': {},
+            }
+            self._paths[path] = stats
+        return stats
+
+    def record(self, path, latency_seconds, retcode, slippage_points=None, retries=None):
+        """
+        Merekam satu panggilan order_send.
+        Args:
+            path (str): Jalur order.
+            latency_seconds (float): Durasi panggilan order_send.
+            retcode (int or None): Retcode hasil (None jika order_send mengembalikan None).
+            slippage_points (float, optional): Slippage eksekusi, jika order tereksekusi.
+            retries (int, optional): Jumlah retry sebelum order berhasil.
+        """
+        with self._lock:
+            stats = self._path(path)
+            stats['latency_us'].record(latency_seconds * 1e6)
+            stats['retcodes'][retcode] = stats['retcodes'].get(retcode, 0) + 1
+            if slippage_points is not None:
+                stats['slippage_points'].record(slippage_points)
+            if retries is not None:
+                stats['retries'].record(retries)
+
+    def merge(self, other):
+        """
+        Menggabungkan metrik dari ExecutionStats lain ke instance ini, per jalur.
+        Args:
+            other (ExecutionStats): Metrik yang akan ditambahkan.
+        """
+        with other._lock:
+            paths = copy.deepcopy(other._paths)
+        with self._lock:
+            for path, other_stats in paths.items():
+                stats = self._path(path)
+                for key in ('latency_us', 'slippage_points', 'retries'):
+                    stats[key].merge(other_stats[key])
+                for retcode, count in other_stats['retcodes'].items():
+                    stats['retcodes'][retcode] = stats['retcodes'].get(retcode, 0) + count
+
+    def summary(self):
+        """
+        Returns:
+            dict: Jalur -> {'count', 'latency_ms': (p50, p95, p99), 'slippage_points': (p50, p95, p99),
+                'retries': (p50, p95, p99), 'retcodes': {retcode: jumlah}}.
+        """
+        def percentiles(histogram, scale=1.0):
+            values = [histogram.percentile(p) for p in (50, 95, 99)]
+            return tuple(None if v is None else v * scale for v in values)
+
+        with self._lock:
+            return {
+                path: {
+                    'count': stats['latency_us'].total,
+                    'latency_ms': percentiles(stats['latency_us'], 1e-3),
+                    'slippage_points': percentiles(stats['slippage_points']),
+                    'retries': percentiles(stats['retries']),
+                    'retcodes': dict(stats['retcodes']),
+                }
+                for path, stats in self._paths.items()
+            }
+
+
+class LatencyStats:
+    """
+    Jumlah, kegagalan, total durasi, dan distribusi latensi (LogLinearHistogram, mikrodetik) per nama operasi,
+    misalnya panggilan broker atau siklus loop engine. Memori tetap dan aman dipakai dari beberapa thread.
+    """
+    def __init__(self, max_us=ORDER_LATENCY_MAX_US):
+        """
+        Args:
+            max_us (int): Latensi terbesar yang dibedakan (mikrodetik).
+        """
+        self.max_us = max_us
+        self._ops = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, failed=False):
+        """
+        Merekam satu operasi.
+        Args:
+            name (str): Nama operasi.
+            seconds (float): Durasi (detik).
+            failed (bool): True jika operasi gagal.
+        """
+        with self._lock:
+            stats = self._ops.get(name)
+            if stats is None:
+                stats = self._ops[name] = {'histogram': LogLinearHistogram(self.max_us), 'failures': 0, 'sum': 0.0}
+            stats['histogram'].record(seconds * 1e6)
+            stats['sum'] += seconds
+            if failed:
+                stats['failures'] += 1
+
+    def summary(self, quantiles=(0.5, 0.95, 0.99)):
+        """
+        Returns:
+            dict: Nama -> {'count', 'failures', 'sum_seconds', 'quantiles': {kuantil: detik}}.
+        """
+        with self._lock:
+            return {
+                name: {
+                    'count': stats['histogram'].total,
+                    'failures': stats['failures'],
+                    'sum_seconds': stats['sum'],
+                    'quantiles': {q: stats['histogram'].percentile(q * 100) / 1e6 for q in quantiles},
                 }
+                for name, stats in self._ops.items() if stats['histogram'].total
+            }
+
+
+class AnalysisScheduler:
+    """
+    Menentukan kapan siklus analisis dijalankan untuk mode aktif, berdasarkan tick simbol utama:
+    "bar" saat candle ANALYSIS_BAR_TRIGGERS ditutup (tick pertama di candle baru), "tick" saat harga tengah
+    bergerak ANALYSIS_TICK_TRIGGER_POINTS poin, dan "interval" jika tidak ada event selama
+    ANALYSIS_INTERVAL_SECONDS. Keterlambatan callback terhadap event pemicunya dicatat per jenis pemicu.
+    """
+    def __init__(self):
+        self.mode = None
+        self._bar_start = None
+        self._last_mid = None
+        self._due = None
+        self._lateness = {}
+        self._lock = threading.Lock()
+
+    def reset(self, mode, now):
+        """
+        Memulai ulang pemicu untuk mode baru.
+        Args:
+            mode (str): Mode bot.
+            now (float): Waktu time.monotonic() saat ini.
+        """
+        self.mode = mode
+        self._bar_start = None
+        self._last_mid = None
+        interval = ANALYSIS_INTERVAL_SECONDS.get(mode)
+        self._due = now + interval if interval is not None else None
+
+    @property
+    def active(self):
+        """True jika mode aktif menjalankan analisis."""
+        return self.mode in ANALYSIS_INTERVAL_SECONDS
+
+    @property
+    def needs_ticks(self):
+        """True jika mode aktif memakai pemicu candle atau pergerakan harga (tick perlu di-poll)."""
+        return self.mode in ANALYSIS_BAR_TRIGGERS or self.mode in ANALYSIS_TICK_TRIGGER_POINTS
+
+    def wait_seconds(self, now):
+        """Lama menunggu sebelum poll() berikutnya."""
+        until_due = max(0.0, self._due - now) if self._due is not None else None
+        if self.needs_ticks:
+            return SCHEDULER_POLL_SECONDS if until_due is None else min(SCHEDULER_POLL_SECONDS, until_due)
+        return until_due
+
+    def poll(self, now, tick=None, point=None):
+        """
+        Args:
+            now (float): Waktu time.monotonic() saat ini.
+            tick (Tick, optional): Tick terbaru simbol utama.
+            point (float, optional): Ukuran poin simbol utama.
+        Returns:
+            tuple or None: (pemicu, waktu deteksi monotonic, keterlambatan deteksi dalam detik), atau None.
+                Untuk "bar", keterlambatan deteksi adalah jarak waktu tick pertama dari penutupan candle.
+        """
+        if tick is not None:
+            timeframe = ANALYSIS_BAR_TRIGGERS.get(self.mode)
+            if timeframe is not None:
+                period = timeframe_seconds(timeframe)
+                bar_start = tick.time - tick.time % period
+                if self._bar_start is None:
+                    self._bar_start = bar_start
+                elif bar_start > self._bar_start:
+                    self._bar_start = bar_start
+                    tick_seconds = tick.time_msc / 1000.0 if getattr(tick, 'time_msc', 0) else float(tick.time)
+                    return self._fire("bar", now, max(0.0, tick_seconds - bar_start), tick)
+
+            threshold = ANALYSIS_TICK_TRIGGER_POINTS.get(self.mode)
+            if threshold is not None and point:
+                mid = (tick.bid + tick.ask) / 2
+                if self._last_mid is None:
+                    self._last_mid = mid
+                elif abs(mid - self._last_mid) / point >= threshold:
+                    return self._fire("tick", now, 0.0, tick)
+
+        if self._due is not None and now >= self._due:
+            return self._fire("interval", now, now - self._due, tick)
+        return None
+
+    def _fire(self, trigger, now, detection_lag, tick):
+        interval = ANALYSIS_INTERVAL_SECONDS.get(self.mode)
+        self._due = now + interval if interval is not None else None
+        if tick is not None:
+            self._last_mid = (tick.bid + tick.ask) / 2
+        return trigger, now, detection_lag
+
+    def record_lateness(self, trigger, seconds):
+        """Mencatat keterlambatan satu callback analisis terhadap event pemicunya."""
+        with self._lock:
+            histogram = self._lateness.get(trigger)
+            if histogram is None:
+                histogram = self._lateness[trigger] = LogLinearHistogram(SCHEDULER_LATENESS_MAX_US)
+            histogram.record(seconds * 1e6)
+
+    def lateness_summary(self):
+        """
+        Returns:
+            dict: Pemicu -> {'count', 'lateness_ms': (p50, p95, p99)}.
+        """
+        with self._lock:
+            return {trigger: {'count': histogram.total,
+                              'lateness_ms': tuple(histogram.percentile(p) / 1000.0 for p in (50, 95, 99))}
+                    for trigger, histogram in self._lateness.items()}
+
+
+# Konfigurasi eksekusi order (lihat OrderExecutor)
+ORDER_RETRY_BACKOFF_FACTOR = 2.0 # Jeda retry dikalikan faktor ini setiap percobaan ulang
+ORDER_RETRY_MAX_DELAY_SECONDS = 5.0 # Batas atas jeda retry
+
+# Penutupan massal posisi (lihat TradingEngine.close_all_positions)
+CLOSE_ALL_WORKERS = 8 # Maksimum order penutupan yang dikirim bersamaan
+CLOSE_ALL_MAX_ATTEMPTS = 5 # Percobaan per tiket, masing-masing dengan tick baru
+CLOSE_ALL_RETRY_DELAY_SECONDS = 0.1 # Jeda dasar sebelum percobaan ulang satu tiket (dikalikan ORDER_RETRY_BACKOFF_FACTOR)
+CLOSE_RETRY_RETCODES = (mt5.TRADE_RETCODE_REQUOTE, mt5.TRADE_RETCODE_PRICE_CHANGED, mt5.TRADE_RETCODE_PRICE_OFF,
+                        mt5.TRADE_RETCODE_TIMEOUT, mt5.TRADE_RETCODE_CONNECTION, mt5.TRADE_RETCODE_TOO_MANY_REQUESTS)
+
+# Hasil penutupan satu tiket: volume diminta/tertutup, jumlah percobaan, retcode terakhir, dan durasi (detik)
+CloseResult = namedtuple('CloseResult', 'ticket symbol volume closed attempts retcode elapsed')
+
+
+class _OrderJob:
+    """Satu order di antrean OrderExecutor: generator langkah order beserta Future hasilnya."""
+    def __init__(self, label, steps):
+        self.label = label
+        self.steps = steps
+        self.future = Future()
+        self.retries = 0
+        self.started = False
+
+
+class OrderExecutor:
+    """
+    Worker eksekusi order dengan antrean. Setiap order adalah generator yang menjalankan satu percobaan
+    order_send per langkah dan menghasilkan (yield) jeda sebelum percobaan berikutnya. Worker tidak pernah
+    tidur di tengah order: order yang sedang menunggu retry dikembalikan ke antrean dengan waktu siap,
+    sehingga order lain tetap diproses selama backoff. Jeda dasar dikalikan ORDER_RETRY_BACKOFF_FACTOR
+    setiap retry (maksimum ORDER_RETRY_MAX_DELAY_SECONDS).
+    Hasil dikembalikan lewat concurrent.futures.Future (gunakan add_done_callback untuk callback).
+    """
+    def __init__(self, name="order-execution"):
+        """
+        Args:
+            name (str): Nama thread worker.
+        """
+        self._jobs = [] # Heap (waktu siap, urutan, _OrderJob)
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, steps, label="Order"):
+        """
+        Memasukkan order ke antrean.
+        Args:
+            steps (generator): Generator langkah order (yield jeda detik, return hasil akhir).
+            label (str): Nama order untuk log/error.
+        Returns:
+            concurrent.futures.Future: Future hasil akhir order.
+        Raises:
+            RuntimeError: Jika executor sudah dihentikan.
+        """
+        job = _OrderJob(label, steps)
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("OrderExecutor sudah dihentikan")
+            self._push(job, time.monotonic())
+        return job.future
+
+    def pending(self):
+        """Jumlah order yang masih di antrean (termasuk yang menunggu retry)."""
+        with self._condition:
+            return len(self._jobs)
+
+    def shutdown(self, wait=True, timeout=5.0):
+        """
+        Menghentikan worker. Order yang masih di antrean dibatalkan (Future-nya selesai dengan hasil None).
+        Args:
+            wait (bool): Tunggu worker selesai memproses langkah yang sedang berjalan.
+            timeout (float): Batas waktu menunggu (detik).
+        """
+        with self._condition:
+            self._stopped = True
+            jobs, self._jobs = self._jobs, []
+            self._condition.notify_all()
+        for _, _, job in jobs:
+            job.steps.close()
+            if not job.future.cancel():
+                job.future.set_result(None)
+        if wait and threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def _push(self, job, ready_at):
+        self._sequence += 1
+        heapq.heappush(self._jobs, (ready_at, self._sequence, job))
+        self._condition.notify()
+
+    def _next_job(self):
+        """Menunggu sampai ada order yang siap dijalankan. Returns: _OrderJob, atau None jika dihentikan."""
+        with self._condition:
+            while not self._stopped:
+                if self._jobs:
+                    wait = self._jobs[0][0] - time.monotonic()
+                    if wait <= 0:
+                        return heapq.heappop(self._jobs)[2]
+                    self._condition.wait(wait)
+                else:
+                    self._condition.wait()
+            return None
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._step(job)
+
+    def _step(self, job):
+        """Menjalankan satu percobaan order, lalu menyelesaikan Future atau menjadwalkan retry."""
+        if not job.started:
+            job.started = True
+            if not job.future.set_running_or_notify_cancel():
+                job.steps.close()
+                return
+        try:
+            delay = next(job.steps)
+        except StopIteration as stop:
+            job.future.set_result(stop.value)
+            return
+        except Exception as e:
+            job.future.set_exception(e)
+            return
+        delay = min(float(delay) * ORDER_RETRY_BACKOFF_FACTOR ** job.retries, ORDER_RETRY_MAX_DELAY_SECONDS)
+        job.retries += 1
+        with self._condition:
+            if self._stopped:
+                job.steps.close()
+                job.future.set_result(None)
+                return
+            self._push(job, time.monotonic() + delay)
+
+
+# Pengaturan trading default (ditimpa oleh isi SETTINGS_FILE jika ada)
+DEFAULT_TRADING_SETTINGS = {
+    'lot_size': 0.1,
+    'risk_percent': 1.0,
+    'target_profit_usd': 1.0,
+    'target_loss_usd': 30.0,
+    'tp_pips': 50,
+    'sl_pips': 30,
+    'max_hold_duration': 15,
+    'entry_method': "Instant",
+    'max_retry': 3,
+    'max_spread': 50,
+    'min_tick_volume_scalping': 100,
+    'scalping_pattern_confidence': 0.7,
+    'scalping_rsi_oversold': 30, # Entry BUY Scalping jika RSI M1 di bawah nilai ini
+    'scalping_rsi_overbought': 70, # Entry SELL Scalping jika RSI M1 di atas nilai ini
+    'scalping_max_profit_multiplier': 4.0, # Target profit max = target_profit_usd x pengali (min $2)
+    'scalping_bep_offset_pips': 0.5, # Jarak SL Break Even Plus dari harga entry (pips)
+    'scalping_min_sl_pips': 2 # Batas bawah SL dinamis berbasis ATR (pips)
+}
+
+
+# Konfigurasi backtest
+BACKTEST_AI_TRAIN_BARS = 2000 # Candle M5 awal yang dipakai melatih model sebelum periode backtest (CLI)
+BACKTEST_SEED = 42 # Seed untuk target profit acak scalping agar hasil backtest dapat diulang
+
+
+@dataclass
+class BacktestResult:
+    """
+    Hasil satu run backtest.
+    Attributes:
+        strategy (str): Nama strategi ("Scalping_Bot" atau "AI_Long_Trade").
+        trades (DataFrame): Satu baris per trade (waktu, arah, lot, harga, profit, alasan keluar).
+        initial_balance (float): Saldo awal.
+        bars (int): Jumlah candle yang dievaluasi.
+        elapsed (float): Durasi run (detik).
+    """
+    strategy: str
+    trades: pd.DataFrame
+    initial_balance: float
+    bars: int
+    elapsed: float
+
+    def summary(self):
+        """
+        Returns:
+            dict: Ringkasan performa (jumlah trade, winrate, profit bersih, profit factor, drawdown maksimum).
+        """
+        profits = self.trades['profit'].to_numpy() if len(self.trades) else np.zeros(0)
+        wins = int((profits > 0).sum())
+        gross_profit = float(profits[profits > 0].sum())
+        gross_loss = float(-profits[profits <= 0].sum())
+        balance = self.initial_balance + np.cumsum(profits)
+        peak = np.maximum.accumulate(np.r_[self.initial_balance, balance])
+        return {
+            'strategy': self.strategy,
+            'bars': self.bars,
+            'trades': len(profits),
+            'wins': wins,
+            'losses': len(profits) - wins,
+            'winrate': (wins / len(profits) * 100) if len(profits) else 0.0,
+            'net_profit': float(profits.sum()),
+            'profit_factor': (gross_profit / gross_loss) if gross_loss > 0 else float('inf') if gross_profit > 0 else 0.0,
+            'max_drawdown': float((peak - np.r_[self.initial_balance, balance]).max()),
+            'final_balance': float(balance[-1]) if len(balance) else self.initial_balance,
+            'elapsed': self.elapsed,
+        }
+
+
+class Backtester:
+    """
+    Backtest historis untuk strategi Scalping dan AI Long Trade dengan aturan entry/exit yang sama
+    seperti TradingEngine.
+    Indikator dihitung sekali untuk seluruh riwayat (compute_indicator_array, sama dengan cache live)
+    dan sinyal entry dihitung sebagai mask NumPy; hanya jalur posisi yang terbuka yang diiterasi
+    candle demi candle. Strategi dievaluasi pada setiap penutupan candle timeframe utamanya (M1 untuk
+    Scalping, M5 untuk AI) dengan harga close sebagai bid; SL/TP broker diperiksa di dalam candle
+    memakai high/low (SL didahulukan jika keduanya tersentuh di candle yang sama).
+    """
+    def __init__(self, settings=None, balance=SIM_DEFAULT_BALANCE, leverage=SIM_DEFAULT_LEVERAGE,
+                 symbol_spec=None, seed=BACKTEST_SEED):
+        """
+        Args:
+            settings (dict, optional): Override pengaturan trading (default DEFAULT_TRADING_SETTINGS).
+            balance (float): Saldo awal.
+            leverage (int): Leverage akun untuk pengecekan margin saat entry.
+            symbol_spec (dict, optional): Override spesifikasi simbol (lihat SIM_SYMBOL_DEFAULTS).
+            seed (int): Seed generator acak untuk target profit scalping.
+        """
+        self.settings = dict(DEFAULT_TRADING_SETTINGS)
+        self.settings.update(settings or {})
+        self.spec = dict(SIM_SYMBOL_DEFAULTS)
+        self.spec.update(symbol_spec or {})
+        self.initial_balance = float(balance)
+        self.leverage = leverage
+        self.seed = seed
+
+    @staticmethod
+    def indicators(rates):
+        """Menghitung INDICATOR_COLUMNS untuk seluruh candle. Returns: dict: kolom -> array."""
+        values = compute_indicator_array(rates['high'], rates['low'], rates['close'], rates['tick_volume'])
+        return {column: values[:, i] for i, column in enumerate(INDICATOR_COLUMNS)}
+
+    @staticmethod
+    def higher_tf_trend(higher_rates, higher_period, close_times):
+        """
+        Tren timeframe lebih tinggi (SMA20 vs SMA50) yang diketahui pada setiap waktu `close_times`,
+        hanya dari candle yang sudah selesai.
+        Returns:
+            numpy.ndarray: 1 = Up Trend, -1 = Down Trend, 0 = Sideways (termasuk saat SMA belum tersedia).
+        """
+        values = compute_indicator_array(higher_rates['high'], higher_rates['low'], higher_rates['close'],
+                                         higher_rates['tick_volume'])
+        sma20 = values[:, INDICATOR_COLUMNS.index('sma20')]
+        sma50 = values[:, INDICATOR_COLUMNS.index('sma50')]
+        trend = np.sign(np.nan_to_num(sma20 - sma50))
+        completed = np.searchsorted(higher_rates['time'] + higher_period, close_times, side='right') - 1
+        return np.where(completed >= 0, trend[np.maximum(completed, 0)], 0)
+
+    def _has_margin(self, volume, price, balance):
+        """Pengecekan margin seperti execute_instant_order (tanpa posisi lain yang terbuka)."""
+        return volume * self.spec['trade_contract_size'] * price / self.leverage <= balance
+
+    def _profit(self, side, volume, entry_price, exit_price):
+        direction = 1 if side == 1 else -1
+        return direction * (exit_price - entry_price) * volume * self.spec['trade_contract_size']
+
+    def _run(self, strategy, rates, period, entry_mask, open_trade, exit_rule, started):
+        """
+        Menjalankan jalur posisi: lompat ke kandidat entry berikutnya saat flat, lalu iterasi candle
+        sampai posisi tertutup oleh SL/TP broker atau aturan exit strategi.
+        Args:
+            open_trade (callable): open_trade(i, balance) -> dict posisi atau None.
+            exit_rule (callable): exit_rule(position, j, bid, ask) -> alasan keluar atau None.
+            started (float): time.perf_counter() saat run dimulai (termasuk perhitungan indikator).
+        """
+        point = self.spec['point']
+        close, high, low = rates['close'], rates['high'], rates['low']
+        spread = rates['spread'] * point
+        close_times = rates['time'] + period
+        candidates = np.flatnonzero(entry_mask)
+        balance = self.initial_balance
+        trades = []
+        i = 0
+        n = len(rates)
+        while True:
+            k = np.searchsorted(candidates, i)
+            if k >= len(candidates):
+                break
+            i = int(candidates[k])
+            position = open_trade(i, balance)
+            if position is None:
+                i += 1
+                continue
+            position['entry_index'] = i
+            exit_price, reason, j = None, None, i + 1
+            while j < n:
+                # SL/TP broker di dalam candle (bid dari high/low, ask = bid + spread)
+                sl, tp = position['sl'], position['tp']
+                if position['side'] == 1:
+                    if sl and low[j] <= sl:
+                        exit_price, reason = min(rates['open'][j], sl), "sl"
+                    elif tp and high[j] >= tp:
+                        exit_price, reason = max(rates['open'][j], tp), "tp"
+                else:
+                    if sl and high[j] + spread[j] >= sl:
+                        exit_price, reason = max(rates['open'][j] + spread[j], sl), "sl"
+                    elif tp and low[j] + spread[j] <= tp:
+                        exit_price, reason = min(rates['open'][j] + spread[j], tp), "tp"
+                if reason is not None:
+                    break
+                bid, ask = close[j], close[j] + spread[j]
+                reason = exit_rule(position, j, bid, ask)
+                if reason is not None:
+                    exit_price = bid if position['side'] == 1 else ask
+                    break
+                j += 1
+            if reason is None:
+                j = n - 1
+                exit_price, reason = (close[j] if position['side'] == 1 else close[j] + spread[j]), "end"
+            profit = self._profit(position['side'], position['volume'], position['price'], exit_price)
+            balance += profit
+            trades.append({
+                'entry_time': pd.to_datetime(close_times[i], unit='s'),
+                'exit_time': pd.to_datetime(close_times[j], unit='s'),
+                'side': "BUY" if position['side'] == 1 else "SELL",
+                'volume': position['volume'],
+                'entry_price': position['price'],
+                'exit_price': exit_price,
+                'sl': position['sl'],
+                'tp': position['tp'],
+                'profit': profit,
+                'reason': reason,
+                'bars_held': j - i,
+            })
+            # Setelah SL/TP di dalam candle, evaluasi di penutupan candle yang sama sudah bisa entry lagi
+            i = j if reason in ("sl", "tp") else j + 1
+        columns = ['entry_time', 'exit_time', 'side', 'volume', 'entry_price', 'exit_price',
+                   'sl', 'tp', 'profit', 'reason', 'bars_held']
+        return BacktestResult(strategy=strategy, trades=pd.DataFrame(trades, columns=columns),
+                              initial_balance=self.initial_balance, bars=n,
+                              elapsed=time.perf_counter() - started)
+
+    def run_scalping(self, m1_rates, m5_rates):
+        """
+        Backtest strategi Scalping (lihat TradingEngine._run_scalping_strategy): entry RSI M1 oversold/overbought
+        searah filter tren SMA20/50 M5, SL dinamis dari ATR, target profit acak antara min dan max USD,
+        exit pada rugi/profit USD, engulfing berlawanan, BEP+ dan max_hold_duration.
+        Args:
+            m1_rates (numpy.ndarray): Candle M1 RATES_DTYPE.
+            m5_rates (numpy.ndarray): Candle M5 RATES_DTYPE untuk filter tren.
+        Returns:
+            BacktestResult: Hasil backtest.
+        """
+        started = time.perf_counter()
+        s = self.settings
+        point = self.spec['point']
+        pip = point * 10
+        period = timeframe_seconds(SCALPING_TIMEFRAME)
+        min_profit = s.get('target_profit_usd', 0.3)
+        max_profit = max(min_profit * s['scalping_max_profit_multiplier'], 2.0)
+        max_loss = s.get('target_loss_usd', 2.0)
+        max_hold_seconds = s['max_hold_duration'] * 60
+        bep_offset = s['scalping_bep_offset_pips'] * pip
+
+        ind = self.indicators(m1_rates)
+        close_times = m1_rates['time'] + period
+        trend = self.higher_tf_trend(m5_rates, timeframe_seconds(SCALPING_HIGHER_TIMEFRAME), close_times)
+        rsi = ind['rsi']
+        valid = ~(np.isnan(rsi) | np.isnan(ind['atr']) | np.isnan(ind['obv']))
+        side = np.zeros(len(m1_rates), dtype=np.int8)
+        spread_ok = m1_rates['spread'] <= s['max_spread'] # Order instan ditolak jika spread terlalu lebar
+        side[valid & spread_ok & (rsi < s['scalping_rsi_oversold']) & (trend >= 0)] = 1 # Oversold dalam tren naik/sideways
+        side[valid & spread_ok & (rsi > s['scalping_rsi_overbought']) & (trend <= 0)] = -1 # Overbought dalam tren turun/sideways
+
+        c = m1_rates['close']
+        patterns = scan_patterns(CandleArrays.from_rates(m1_rates, ind['atr']), ('bullish_engulfing', 'bearish_engulfing'))
+        bullish_engulfing, bearish_engulfing = patterns['bullish_engulfing'], patterns['bearish_engulfing']
+
+        sl_pips = np.maximum(np.round(np.nan_to_num(ind['atr'], nan=0.5) * 10 / point), s['scalping_min_sl_pips'])
+        lots = lot_size_for_risk(max_loss, sl_pips, self.spec['volume_min'], self.spec['volume_max'],
+                                 self.spec['volume_step'])
+        spread = m1_rates['spread'] * point
+        rng = np.random.default_rng(self.seed)
+
+        def open_trade(i, balance):
+            lot = float(lots[i])
+            if lot <= 0:
+                return None
+            target_profit = rng.uniform(min_profit, max_profit)
+            tp_pips = round(target_profit / (lot * 10.0))
+            price = c[i] + spread[i] if side[i] == 1 else c[i]
+            if tp_pips <= 0 or not self._has_margin(lot, price, balance):
+                return None # TP di harga entry (stops tidak valid) atau margin tidak cukup: order ditolak broker
+            if side[i] == 1:
+                return {'side': 1, 'volume': lot, 'price': price,
+                        'sl': price - sl_pips[i] * pip, 'tp': price + tp_pips * pip}
+            return {'side': -1, 'volume': lot, 'price': price,
+                    'sl': price + sl_pips[i] * pip, 'tp': price - tp_pips * pip}
+
+        def exit_rule(position, j, bid, ask):
+            profit = self._profit(position['side'], position['volume'], position['price'],
+                                  bid if position['side'] == 1 else ask)
+            if profit <= -max_loss:
+                return "max_loss"
+            if profit >= min_profit:
+                if profit >= max_profit:
+                    return "max_profit"
+                if position['side'] == 1 and bearish_engulfing[j]:
+                    return "engulfing"
+                if position['side'] == -1 and bullish_engulfing[j]:
+                    return "engulfing"
+                # Break Even Plus: geser SL ke entry + scalping_bep_offset_pips setelah profit minimal 1 pip
+                entry = position['price']
+                pips_gain = (bid - entry) / pip if position['side'] == 1 else (entry - ask) / pip
+                if position['side'] == 1:
+                    needs_bep = position['sl'] < entry + bep_offset or position['sl'] == 0.0
+                else:
+                    needs_bep = position['sl'] > entry - bep_offset or position['sl'] == 0.0
+                if pips_gain >= 1 and needs_bep:
+                    position['sl'] = entry + position['side'] * bep_offset
+            if close_times[j] - close_times[position['entry_index']] >= max_hold_seconds:
+                return "max_hold"
+            return None
+
+        return self._run("Scalping_Bot", m1_rates, period, side != 0, open_trade, exit_rule, started)
+
+    def run_ai_long_trade(self, m5_rates, h1_rates, trained_model):
+        """
+        Backtest strategi AI Long Trade (lihat TradingEngine._run_ai_long_trade_strategy): prediksi model
+        untuk semua candle dalam satu panggilan, entry saat keyakinan >= 70% searah tren SMA20/50 H1 dan
+        spread wajar, exit pada target profit/rugi USD, sinyal AI berbalik dan batas waktu hold.
+        Args:
+            m5_rates (numpy.ndarray): Candle M5 RATES_DTYPE.
+            h1_rates (numpy.ndarray): Candle H1 RATES_DTYPE untuk filter tren.
+            trained_model: Classifier terlatih dengan fitur AI_FEATURE_COLUMNS.
+        Returns:
+            BacktestResult: Hasil backtest.
+        """
+        started = time.perf_counter()
+        s = self.settings
+        point = self.spec['point']
+        pip = point * 10
+        period = timeframe_seconds(AI_TRADING_TIMEFRAME)
+        max_hold_seconds = s['max_hold_duration'] * 4 * 60
+
+        ind = self.indicators(m5_rates)
+        features = np.column_stack([m5_rates[col] if col in ('open', 'high', 'low', 'close') else ind[col]
+                                    for col in AI_FEATURE_COLUMNS]).astype(float)
+        valid = ~np.isnan(np.column_stack([ind[col] for col in INDICATOR_COLUMNS])).any(axis=1)
+        signal = np.full(len(m5_rates), -1)
+        confidence = np.zeros(len(m5_rates))
+        if valid.any():
+            proba = trained_model.predict_proba(pd.DataFrame(features[valid], columns=AI_FEATURE_COLUMNS))
+            signal[valid] = trained_model.classes_[np.argmax(proba, axis=1)]
+            confidence[valid] = proba.max(axis=1)
+
+        close_times = m5_rates['time'] + period
+        trend = self.higher_tf_trend(h1_rates, timeframe_seconds(AI_HIGHER_TIMEFRAME), close_times)
+        liquidity_is_good = m5_rates['spread'] <= s['max_spread'] * 0.75
+        entry_mask = valid & (confidence >= 0.70) & liquidity_is_good & \
+            (((signal == 1) & (trend == 1)) | ((signal == 0) & (trend == -1)))
+        c = m5_rates['close']
+        spread = m5_rates['spread'] * point
+
+        def open_trade(i, balance):
+            risk_amount = balance * (s['risk_percent'] / 100.0)
+            lot = float(lot_size_for_risk(risk_amount, s['sl_pips'], self.spec['volume_min'],
+                                          self.spec['volume_max'], self.spec['volume_step']))
+            price = c[i] + spread[i] if signal[i] == 1 else c[i]
+            if lot <= 0 or not self._has_margin(lot, price, balance):
+                return None
+            if signal[i] == 1:
+                return {'side': 1, 'volume': lot, 'price': price,
+                        'sl': price - s['sl_pips'] * pip, 'tp': price + s['tp_pips'] * pip}
+            return {'side': -1, 'volume': lot, 'price': price,
+                    'sl': price + s['sl_pips'] * pip, 'tp': price - s['tp_pips'] * pip}
+
+        def exit_rule(position, j, bid, ask):
+            profit = self._profit(position['side'], position['volume'], position['price'],
+                                  bid if position['side'] == 1 else ask)
+            if profit <= -s['target_loss_usd']:
+                return "max_loss"
+            if profit >= s['target_profit_usd']:
+                return "target_profit"
+            opposite = (position['side'] == 1 and signal[j] == 0) or (position['side'] == -1 and signal[j] == 1)
+            if opposite and confidence[j] >= 0.65 and profit > 0:
+                return "ai_reversal"
+            if close_times[j] - close_times[position['entry_index']] >= max_hold_seconds and profit < 0:
+                return "max_hold"
+            return None
+
+        return self._run("AI_Long_Trade", m5_rates, period, entry_mask, open_trade, exit_rule, started)
+
+
+def run_backtest_cli(strategy, data_dir, symbol_name=None, start=None, end=None):
+    """
+    Menjalankan backtest dari file data rekaman dan mencetak ringkasannya (dipakai oleh --backtest).
+    Untuk AI_Long_Trade, model dilatih pada BACKTEST_AI_TRAIN_BARS candle M5 pertama dan
+    backtest berjalan pada sisa data.
+    Args:
+        strategy (str): "Scalping_Bot" atau "AI_Long_Trade".
+        data_dir (str): Direktori file candle rekaman (format sama dengan SimulatedBroker).
+        symbol_name (str, optional): Simbol; default simbol global.
+        start, end (int, optional): Rentang data (detik epoch, inklusif); lihat load_recorded_rates.
+    Returns:
+        BacktestResult or None: Hasil backtest, atau None jika data tidak tersedia.
+    """
+    symbol_name = symbol_name or symbol
+    backtester = Backtester()
+    if os.path.exists(SETTINGS_FILE):
+        with open(SETTINGS_FILE, 'r') as f:
+            backtester.settings.update(json.load(f))
+
+    if strategy == "Scalping_Bot":
+        base = load_recorded_rates(data_dir, symbol_name, SCALPING_TIMEFRAME, start, end)
+        higher = load_recorded_rates(data_dir, symbol_name, SCALPING_HIGHER_TIMEFRAME, start, end)
+        if base is None or higher is None:
+            print(f"Data candle {symbol_name} tidak ditemukan di {data_dir}.")
+            return None
+        result = backtester.run_scalping(base, higher)
+    else:
+        base = load_recorded_rates(data_dir, symbol_name, AI_TRADING_TIMEFRAME, start, end)
+        higher = load_recorded_rates(data_dir, symbol_name, AI_HIGHER_TIMEFRAME, start, end)
+        if base is None or higher is None or len(base) <= BACKTEST_AI_TRAIN_BARS:
+            print(f"Data candle {symbol_name} tidak cukup di {data_dir}.")
+            return None
+        train_rates = base[:BACKTEST_AI_TRAIN_BARS]
+        values = compute_indicator_array(train_rates['high'], train_rates['low'], train_rates['close'],
+                                         train_rates['tick_volume'])
+        trained_model, train_score, test_score = train_direction_model(rates_to_frame(train_rates, values))
+        print(f"Model dilatih pada {len(train_rates)} candle M5. Akurasi: Train={train_score:.2f}, Test={test_score:.2f}")
+        result = backtester.run_ai_long_trade(base[BACKTEST_AI_TRAIN_BARS:], higher, trained_model)
+
+    stats = result.summary()
+    print(f"📈 Backtest {stats['strategy']}: {stats['bars']} candle dalam {stats['elapsed']:.2f} detik")
+    print(f"    Trade: {stats['trades']} | Win: {stats['wins']} | Loss: {stats['losses']} | Winrate: {stats['winrate']:.1f}%")
+    print(f"    Profit bersih: ${stats['net_profit']:.2f} | Profit factor: {stats['profit_factor']:.2f} | "
+          f"Max drawdown: ${stats['max_drawdown']:.2f} | Saldo akhir: ${stats['final_balance']:.2f}")
+    if len(result.trades):
+        print(f"    Alasan keluar: {result.trades['reason'].value_counts().to_dict()}")
+    return result
+
+
+# Konfigurasi walk-forward training (lihat run_walk_forward)
+WALK_FORWARD_TRAIN_BARS = 20000 # Panjang jendela training per fold (candle M5, ~70 hari)
+WALK_FORWARD_TEST_BARS = 2000 # Panjang jendela evaluasi out-of-sample per fold
+WALK_FORWARD_LATENCY_SAMPLES = 50 # Jumlah prediksi satu baris untuk mengukur latensi inferensi live
+
+_walk_forward_data = None # (X, y) NumPy di proses worker, diisi oleh _init_walk_forward_worker
+
+
+def walk_forward_folds(n_rows, train_bars=WALK_FORWARD_TRAIN_BARS, test_bars=WALK_FORWARD_TEST_BARS, step=None):
+    """
+    Membagi data menjadi fold walk-forward dengan jendela training bergulir.
+    Fold ke-k dilatih pada [start, start + train_bars) dan diuji pada [start + train_bars, +test_bars).
+    Args:
+        n_rows (int): Jumlah baris dataset.
+        train_bars (int): Panjang jendela training.
+        test_bars (int): Panjang jendela test.
+        step (int, optional): Pergeseran antar fold; default test_bars (jendela test tidak tumpang tindih).
+    Returns:
+        list: Daftar tuple (train_start, train_end, test_end) dalam indeks baris.
+    """
+    step = step or test_bars
+    folds = []
+    start = 0
+    while start + train_bars + test_bars <= n_rows:
+        folds.append((start, start + train_bars, start + train_bars + test_bars))
+        start += step
+    return folds
+
+
+def _init_walk_forward_worker(X, y):
+    """Initializer ProcessPoolExecutor: menyimpan dataset sekali per proses worker."""
+    global _walk_forward_data
+    _walk_forward_data = (X, y)
+
+
+def _run_walk_forward_fold(fold):
+    """
+    Melatih dan mengevaluasi satu fold di proses worker.
+    Args:
+        fold (tuple): (nomor fold, train_start, train_end, test_end).
+    Returns:
+        dict: Akurasi train/test, durasi fit, dan latensi inferensi fold ini.
+    """
+    number, train_start, train_end, test_end = fold
+    X, y = _walk_forward_data
+    X_train, y_train = X[train_start:train_end], y[train_start:train_end]
+    X_test, y_test = X[train_end:test_end], y[train_end:test_end]
+
+    fold_model = build_direction_model(n_jobs=1) # Paralelisme ada di level fold, bukan di dalam forest
+    started = time.perf_counter()
+    fold_model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    test_accuracy = float((fold_model.predict(X_test) == y_test).mean())
+    batch_seconds = time.perf_counter() - started
+
+    # Latensi satu baris seperti inferensi live di _run_ai_long_trade_strategy
+    samples = []
+    for row in X_test[-WALK_FORWARD_LATENCY_SAMPLES:]:
+        started = time.perf_counter()
+        fold_model.predict_proba(row.reshape(1, -1))
+        samples.append(time.perf_counter() - started)
+
+    compiled = CompiledForest(fold_model)
+    compiled_samples = []
+    for row in X_test[-WALK_FORWARD_LATENCY_SAMPLES:]:
+        started = time.perf_counter()
+        compiled.predict(row)
+        compiled_samples.append(time.perf_counter() - started)
+
+    return {
+        'fold': number,
+        'train_start': train_start,
+        'train_end': train_end,
+        'test_end': test_end,
+        'train_accuracy': float((fold_model.predict(X_train) == y_train).mean()),
+        'test_accuracy': test_accuracy,
+        'fit_seconds': fit_seconds,
+        'batch_inference_us_per_row': batch_seconds / max(len(X_test), 1) * 1e6,
+        'single_inference_ms': float(np.median(samples)) * 1000 if samples else float('nan'),
+        'compiled_inference_us': float(np.median(compiled_samples)) * 1e6 if compiled_samples else float('nan'),
+    }
+
+
+@dataclass
+class WalkForwardReport:
+    """
+    Hasil walk-forward training.
+    Attributes:
+        folds (DataFrame): Satu baris per fold (waktu jendela, akurasi, durasi fit, latensi inferensi).
+        workers (int): Jumlah proses worker yang dipakai.
+        elapsed (float): Durasi total (detik), termasuk persiapan dataset.
+    """
+    folds: pd.DataFrame
+    workers: int
+    elapsed: float
+
+    def summary(self):
+        """
+        Returns:
+            dict: Rata-rata akurasi test, total durasi fit, dan latensi inferensi median.
+        """
+        if self.folds.empty:
+            return {'folds': 0, 'workers': self.workers, 'elapsed': self.elapsed}
+        return {
+            'folds': len(self.folds),
+            'workers': self.workers,
+            'mean_test_accuracy': float(self.folds['test_accuracy'].mean()),
+            'min_test_accuracy': float(self.folds['test_accuracy'].min()),
+            'total_fit_seconds': float(self.folds['fit_seconds'].sum()),
+            'single_inference_ms': float(self.folds['single_inference_ms'].median()),
+            'compiled_inference_us': float(self.folds['compiled_inference_us'].median()),
+            'elapsed': self.elapsed,
+        }
+
+
+def run_walk_forward(rates, train_bars=WALK_FORWARD_TRAIN_BARS, test_bars=WALK_FORWARD_TEST_BARS,
+                     step=None, workers=None):
+    """
+    Walk-forward training dan evaluasi model arah AI pada riwayat panjang.
+    Indikator dan dataset dihitung sekali, lalu fold dilatih paralel di ProcessPoolExecutor
+    (satu fold per proses, semua core dipakai secara default).
+    Args:
+        rates (numpy.ndarray): Candle RATES_DTYPE (timeframe AI_TRADING_TIMEFRAME).
+        train_bars, test_bars, step: Lihat walk_forward_folds.
+        workers (int, optional): Jumlah proses; default os.cpu_count().
+    Returns:
+        WalkForwardReport: Hasil per fold.
+    Raises:
+        ValueError: Jika data tidak cukup untuk satu fold pun.
+    """
+    started = time.perf_counter()
+    values = compute_indicator_array(rates['high'], rates['low'], rates['close'], rates['tick_volume'])
+    X, y = direction_dataset(rates_to_frame(rates, values))
+    folds = walk_forward_folds(len(X), train_bars, test_bars, step)
+    if not folds:
+        raise ValueError(f"Data tidak cukup untuk walk-forward: {len(X)} baris, dibutuhkan minimal {train_bars + test_bars}.")
+
+    times = pd.to_datetime(rates['time'], unit='s')[X.index]
+    X_values, y_values = X.to_numpy(dtype=float), y.to_numpy()
+    workers = min(workers or os.cpu_count() or 1, len(folds))
+    jobs = [(k + 1,) + fold for k, fold in enumerate(folds)]
+    if workers == 1:
+        _init_walk_forward_worker(X_values, y_values)
+        results = [_run_walk_forward_fold(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_walk_forward_worker,
+                                 initargs=(X_values, y_values)) as pool:
+            results = list(pool.map(_run_walk_forward_fold, jobs))
+
+    report = pd.DataFrame(results)
+    report.insert(1, 'train_from', times[report['train_start']])
+    report.insert(2, 'test_from', times[report['train_end']])
+    report.insert(3, 'test_to', times[report['test_end'] - 1])
+    return WalkForwardReport(folds=report.drop(columns=['train_start', 'train_end', 'test_end']),
+                             workers=workers, elapsed=time.perf_counter() - started)
+
+
+def run_walk_forward_cli(data_dir, workers=None, symbol_name=None, start=None, end=None):
+    """
+    Menjalankan walk-forward dari file data rekaman dan mencetak hasil per fold (dipakai oleh --walk-forward).
+    Args:
+        data_dir (str): Direktori file candle rekaman (format sama dengan SimulatedBroker).
+        workers (int, optional): Jumlah proses worker.
+        symbol_name (str, optional): Simbol; default simbol global.
+        start, end (int, optional): Rentang data (detik epoch, inklusif); lihat load_recorded_rates.
+    Returns:
+        WalkForwardReport or None: Hasil, atau None jika data tidak tersedia/tidak cukup.
+    """
+    symbol_name = symbol_name or symbol
+    rates = load_recorded_rates(data_dir, symbol_name, AI_TRADING_TIMEFRAME, start, end)
+    if rates is None:
+        print(f"Data candle {symbol_name} tidak ditemukan di {data_dir}.")
+        return None
+    try:
+        report = run_walk_forward(rates, workers=workers)
+    except ValueError as e:
+        print(str(e))
+        return None
+
+    for fold in report.folds.itertuples():
+        print(f"Fold {fold.fold:>3} | Test {fold.test_from:%Y-%m-%d %H:%M} - {fold.test_to:%Y-%m-%d %H:%M} | "
+              f"Akurasi Train={fold.train_accuracy:.2f} Test={fold.test_accuracy:.2f} | "
+              f"Fit {fold.fit_seconds:.1f}s | Inferensi {fold.single_inference_ms:.2f} ms "
+              f"(terkompilasi {fold.compiled_inference_us:.0f} µs)")
+    stats = report.summary()
+    print(f"🧠 Walk-forward {symbol_name}: {stats['folds']} fold, {len(rates)} candle, {stats['workers']} proses, "
+          f"{stats['elapsed']:.1f} detik")
+    print(f"    Akurasi test rata-rata: {stats['mean_test_accuracy']:.3f} (min {stats['min_test_accuracy']:.3f}) | "
+          f"Total fit: {stats['total_fit_seconds']:.1f}s | Inferensi median: {stats['single_inference_ms']:.2f} ms "
+          f"(terkompilasi {stats['compiled_inference_us']:.0f} µs)")
+    return report
+
+
+# Konfigurasi optimasi parameter Scalping (lihat run_scalping_optimization)
+OPTIMIZER_CACHE_VERSION = 1 # Naikkan jika logika Backtester.run_scalping berubah agar cache lama diabaikan
+OPTIMIZER_RANDOM_SAMPLES = 200 # Jumlah kombinasi default untuk random search
+OPTIMIZER_MIN_TRADES = 30 # Kombinasi dengan trade lebih sedikit diranking di bawah (profit factor belum bermakna)
+OPTIMIZER_TOP_ROWS = 20 # Jumlah baris ranking teratas yang dicetak oleh --optimize
+SCALPING_PARAM_SPACE = { # Ruang pencarian default: kunci DEFAULT_TRADING_SETTINGS -> kandidat nilai
+    'scalping_rsi_oversold': [20, 25, 30, 35],
+    'scalping_rsi_overbought': [65, 70, 75, 80],
+    'scalping_max_profit_multiplier': [2.0, 3.0, 4.0, 6.0],
+    'scalping_bep_offset_pips': [0.0, 0.5, 1.0],
+    'scalping_min_sl_pips': [2, 5, 10],
+    'target_profit_usd': [0.3, 0.5, 1.0, 2.0],
+    'target_loss_usd': [2.0, 5.0, 10.0, 30.0],
+    'max_hold_duration': [5, 15, 30, 60],
+    'max_spread': [20, 30, 50],
+}
+
+_optimizer_data = None # (m1_rates, m5_rates, balance, seed) di proses worker, diisi oleh _init_optimizer_worker
+
+
+@dataclass
+class OptimizationReport:
+    """
+    Hasil optimasi parameter.
+    Attributes:
+        table (DataFrame): Satu baris per kombinasi, terurut dari terbaik (rank 1); kolom parameter
+            ditambah trades, winrate, net_profit, profit_factor, max_drawdown, trades_per_day.
+        evaluated (int): Jumlah kombinasi yang dibacktest pada run ini.
+        cached (int): Jumlah kombinasi yang diambil dari cache.
+        workers (int): Jumlah proses worker yang dipakai.
+        elapsed (float): Durasi total (detik).
+    """
+    table: pd.DataFrame
+    evaluated: int
+    cached: int
+    workers: int
+    elapsed: float
+
+
+def scalping_param_candidates(space=None, method="random", samples=OPTIMIZER_RANDOM_SAMPLES, seed=BACKTEST_SEED):
+    """
+    Membuat daftar kombinasi parameter dari ruang pencarian.
+    Args:
+        space (dict, optional): Nama parameter -> daftar kandidat nilai; default SCALPING_PARAM_SPACE.
+        method (str): "grid" (semua kombinasi) atau "random" (sampel acak tanpa duplikat).
+        samples (int): Jumlah kombinasi untuk random search.
+        seed (int): Seed random search agar kandidat dapat diulang (dan cache terpakai ulang).
+    Returns:
+        list: Daftar dict parameter.
+    """
+    space = space or SCALPING_PARAM_SPACE
+    keys = list(space)
+    if method == "grid":
+        return [dict(zip(keys, values)) for values in product(*(space[key] for key in keys))]
+
+    sizes = [len(space[key]) for key in keys]
+    total = math.prod(sizes)
+    rng = np.random.default_rng(seed)
+    candidates = []
+    for index in rng.permutation(total)[:samples]: # Prefix permutasi tetap: menambah samples memperluas sampel lama
+        index = int(index)
+        params = {}
+        for key, size in zip(reversed(keys), reversed(sizes)): # Dekode indeks campuran-radix ke satu nilai per parameter
+            index, position = divmod(index, size)
+            params[key] = space[key][position]
+        candidates.append({key: params[key] for key in keys})
+    return candidates
+
+
+def optimizer_params_hash(settings, balance, seed):
+    """
+    Hash stabil dari pengaturan lengkap satu kombinasi (kunci cache optimasi).
+    Args:
+        settings (dict): Pengaturan trading efektif (default + file pengaturan + parameter kandidat).
+        balance (float): Saldo awal backtest.
+        seed (int): Seed backtest.
+    Returns:
+        str: 16 karakter hex SHA-256.
+    """
+    payload = json.dumps({'version': OPTIMIZER_CACHE_VERSION, 'settings': settings, 'balance': balance, 'seed': seed},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _init_optimizer_worker(m1_rates, m5_rates, balance, seed):
+    """Initializer ProcessPoolExecutor: menyimpan data candle sekali per proses worker."""
+    global _optimizer_data
+    _optimizer_data = (m1_rates, m5_rates, balance, seed)
+
+
+def _run_optimizer_trial(settings):
+    """
+    Membacktest satu kombinasi parameter di proses worker.
+    Args:
+        settings (dict): Pengaturan trading efektif untuk kombinasi ini.
+    Returns:
+        dict: trades, winrate, net_profit, profit_factor, max_drawdown, trades_per_day.
+    """
+    m1_rates, m5_rates, balance, seed = _optimizer_data
+    stats = Backtester(settings, balance=balance, seed=seed).run_scalping(m1_rates, m5_rates).summary()
+    days = max((m1_rates['time'][-1] - m1_rates['time'][0]) / 86400, 1 / 1440) if len(m1_rates) else 1.0
+    return {
+        'trades': stats['trades'],
+        'winrate': stats['winrate'],
+        'net_profit': stats['net_profit'],
+        'profit_factor': stats['profit_factor'],
+        'max_drawdown': stats['max_drawdown'],
+        'trades_per_day': stats['trades'] / days,
+    }
+
+
+def run_scalping_optimization(m1_rates, m5_rates, space=None, method="random", samples=OPTIMIZER_RANDOM_SAMPLES,
+                              workers=None, settings=None, balance=SIM_DEFAULT_BALANCE, seed=BACKTEST_SEED,
+                              cache_dir=OPTIMIZER_DIR):
+    """
+    Grid/random search parameter Scalping (threshold RSI, pengali profit max, offset BEP+, SL minimum,
+    target profit/rugi USD, max_hold_duration, max_spread) dengan Backtester.run_scalping.
+    Kombinasi dibacktest paralel di ProcessPoolExecutor (data candle dikirim sekali per proses).
+    Hasil disimpan per hash parameter di file cache per data (JSON Lines, ditulis segera setelah
+    setiap kombinasi selesai), sehingga rerun atau run yang terputus hanya menghitung kombinasi baru.
+    Args:
+        m1_rates (numpy.ndarray): Candle M1 RATES_DTYPE.
+        m5_rates (numpy.ndarray): Candle M5 RATES_DTYPE untuk filter tren.
+        space (dict, optional): Ruang pencarian; default SCALPING_PARAM_SPACE.
+        method (str): "grid" atau "random".
+        samples (int): Jumlah kombinasi untuk random search.
+        workers (int, optional): Jumlah proses; default os.cpu_count().
+        settings (dict, optional): Pengaturan dasar untuk parameter di luar ruang pencarian.
+        balance (float): Saldo awal backtest.
+        seed (int): Seed sampling dan target profit acak backtest.
+        cache_dir (str, optional): Direktori cache; None untuk menonaktifkan cache.
+    Returns:
+        OptimizationReport: Tabel ranking (profit factor tertinggi dahulu, kombinasi dengan trade
+        kurang dari OPTIMIZER_MIN_TRADES di bawah).
+    """
+    started = time.perf_counter()
+    base = dict(DEFAULT_TRADING_SETTINGS)
+    base.update(settings or {})
+    candidates = scalping_param_candidates(space, method, samples, seed)
+    jobs = [(params, {**base, **params}) for params in candidates]
+    hashes = [optimizer_params_hash(job_settings, balance, seed) for _, job_settings in jobs]
+
+    cache, cache_file, torn_tail = {}, None, False
+    if cache_dir:
+        data_hash = hashlib.sha256(np.ascontiguousarray(m1_rates).tobytes() +
+                                   np.ascontiguousarray(m5_rates).tobytes()).hexdigest()[:16]
+        cache_file = os.path.join(cache_dir, f"scalping_{data_hash}.jsonl")
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r') as f:
+                for line in f:
+                    torn_tail = not line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                        cache[entry['hash']] = entry['stats']
+                    except (json.JSONDecodeError, KeyError):
+                        continue # Baris terpotong dari run yang dihentikan paksa
+
+    cached = sum(1 for h in set(hashes) if h in cache)
+    pending = list({h: job_settings for h, (_, job_settings) in zip(hashes, jobs) if h not in cache}.items())
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+
+    if pending:
+        if cache_file:
+            os.makedirs(cache_dir, exist_ok=True)
+        sink = open(cache_file, 'a') if cache_file else None
+        if sink and torn_tail:
+            sink.write("\n") # Jangan menyambung entri baru ke baris terpotong
+        try:
+            if workers == 1:
+                _init_optimizer_worker(m1_rates, m5_rates, balance, seed)
+                results = (_run_optimizer_trial(job_settings) for _, job_settings in pending)
+                pool = None
+            else:
+                pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_optimizer_worker,
+                                           initargs=(m1_rates, m5_rates, balance, seed))
+                results = pool.map(_run_optimizer_trial, [job_settings for _, job_settings in pending])
+            try:
+                for (h, _), stats in zip(pending, results):
+                    cache[h] = stats
+                    if sink:
+                        sink.write(json.dumps({'hash': h, 'stats': stats}) + "\n")
+                        sink.flush()
+            finally:
+                if pool:
+                    pool.shutdown(cancel_futures=True)
+        finally:
+            if sink:
+                sink.close()
+
+    table = pd.DataFrame([{**params, **cache[h]} for (params, _), h in zip(jobs, hashes)])
+    table = table.drop_duplicates(subset=list(candidates[0]) if candidates else None)
+    if not table.empty:
+        table['_enough_trades'] = table['trades'] >= OPTIMIZER_MIN_TRADES
+        table = table.sort_values(['_enough_trades', 'profit_factor', 'net_profit'], ascending=False)
+        table = table.drop(columns='_enough_trades').reset_index(drop=True)
+        table.insert(0, 'rank', range(1, len(table) + 1))
+    return OptimizationReport(table=table, evaluated=len(pending), cached=cached, workers=workers,
+                              elapsed=time.perf_counter() - started)
+
+
+def run_optimize_cli(method, data_dir, samples=OPTIMIZER_RANDOM_SAMPLES, workers=None, space_file=None,
+                     symbol_name=None, start=None, end=None):
+    """
+    Menjalankan optimasi parameter Scalping dari file data rekaman, mencetak ranking teratas,
+    dan menyimpan ranking lengkap ke CSV di OPTIMIZER_DIR (dipakai oleh --optimize).
+    Args:
+        method (str): "grid" atau "random".
+        data_dir (str): Direktori file candle rekaman (format sama dengan SimulatedBroker).
+        samples (int): Jumlah kombinasi untuk random search.
+        workers (int, optional): Jumlah proses worker.
+        space_file (str, optional): File JSON ruang pencarian (parameter -> daftar nilai); default SCALPING_PARAM_SPACE.
+        symbol_name (str, optional): Simbol; default simbol global.
+        start, end (int, optional): Rentang data (detik epoch, inklusif); lihat load_recorded_rates.
+    Returns:
+        OptimizationReport or None: Hasil, atau None jika data/ruang pencarian tidak tersedia.
+    """
+    symbol_name = symbol_name or symbol
+    m1_rates = load_recorded_rates(data_dir, symbol_name, SCALPING_TIMEFRAME, start, end)
+    m5_rates = load_recorded_rates(data_dir, symbol_name, SCALPING_HIGHER_TIMEFRAME, start, end)
+    if m1_rates is None or m5_rates is None:
+        print(f"Data candle {symbol_name} tidak ditemukan di {data_dir}.")
+        return None
+    space = None
+    if space_file:
+        try:
+            with open(space_file, 'r') as f:
+                space = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Gagal membaca ruang pencarian {space_file}: {e}")
+            return None
+        unknown = sorted(set(space) - set(DEFAULT_TRADING_SETTINGS))
+        if unknown:
+            print(f"Parameter tidak dikenal di {space_file}: {', '.join(unknown)}")
+            return None
+    settings = {}
+    if os.path.exists(SETTINGS_FILE):
+        with open(SETTINGS_FILE, 'r') as f:
+            settings = json.load(f)
+
+    report = run_scalping_optimization(m1_rates, m5_rates, space=space, method=method, samples=samples,
+                                       workers=workers, settings=settings)
+    print(f"🔧 Optimasi Scalping {symbol_name} ({method}): {len(report.table)} kombinasi, {report.evaluated} dibacktest, "
+          f"{report.cached} dari cache, {report.workers} proses, {report.elapsed:.1f} detik")
+    if report.table.empty:
+        return report
+    with pd.option_context('display.width', 250, 'display.max_columns', None, 'display.float_format', '{:.2f}'.format):
+        print(report.table.head(OPTIMIZER_TOP_ROWS).to_string(index=False))
+    os.makedirs(OPTIMIZER_DIR, exist_ok=True)
+    ranking_file = os.path.join(OPTIMIZER_DIR, f"scalping_{symbol_name}_{method}_ranking.csv")
+    report.table.to_csv(ranking_file, index=False)
+    print(f"    Ranking lengkap disimpan ke {ranking_file}")
+    return report
+
+
+# Konfigurasi artefak model (lihat ModelStore)
+MODEL_ARTIFACT_VERSION = 1 # Naikkan jika format artefak atau cara membangun fitur berubah
+MODEL_TRAIN_BARS = 2000 # Jumlah candle M5 terakhir dari terminal untuk melatih model di train_model
+MODEL_TRAIN_MAX_BARS = 100000 # Jendela training maksimum jika riwayat rekaman (MarketRecorder) tersedia
+MODEL_MAX_AGE_HOURS = 24 # Model dianggap basi jika candle terbaru lebih dari ini setelah akhir data training
+MODEL_ARTIFACTS_KEEP = 5 # Jumlah artefak terbaru per simbol/timeframe yang disimpan
+
+# Konfigurasi retraining model di background (lihat TradingEngine.check_model_health)
+MODEL_CHECK_INTERVAL_SECONDS = 300 # Interval pengecekan umur dan drift model
+MODEL_DRIFT_MIN_BARS = 100 # Jumlah candle setelah data training sebelum akurasi live dinilai
+MODEL_DRIFT_TOLERANCE = 0.05 # Retrain jika akurasi live lebih rendah dari akurasi test dikurangi nilai ini;
+                             # juga batas penolakan model baru yang lebih buruk dari model aktif
+
+
+def data_fingerprint(df):
+    """
+    Sidik jari data training: hash SHA-256 dari waktu dan OHLCV candle.
+    Args:
+        df (DataFrame): Candle (kolom 'time' berupa datetime atau detik epoch).
+    Returns:
+        str: Hash heksadesimal 16 karakter.
+    """
+    values = np.column_stack([epoch_seconds(df['time']).astype(float)] +
+                             [df[column].to_numpy(dtype=float) for column in ('open', 'high', 'low', 'close', 'tick_volume')])
+    return hashlib.sha256(np.ascontiguousarray(values).tobytes()).hexdigest()[:16]
+
+
+class ModelStore:
+    """
+    Penyimpanan artefak model AI di disk.
+    Setiap artefak terdiri dari file model (joblib) dan metadata JSON di sampingnya berisi versi format,
+    simbol/timeframe, daftar fitur, hyperparameter, versi scikit-learn, rentang waktu dan sidik jari
+    data training, serta akurasi. Metadata ditulis terakhir, sehingga artefak yang metadata-nya ada
+    selalu lengkap; pencarian artefak cukup membaca file JSON tanpa memuat model.
+    """
+    def __init__(self, directory=MODEL_DIR, keep=MODEL_ARTIFACTS_KEEP):
+        """
+        Args:
+            directory (str): Direktori artefak.
+            keep (int): Jumlah artefak terbaru per simbol/timeframe yang dipertahankan saat save().
+        """
+        self.directory = directory
+        self.keep = keep
+
+    @staticmethod
+    def _prefix(symbol_name, timeframe):
+        return f"ai_model_{symbol_name}_{TIMEFRAME_NAMES.get(timeframe, timeframe)}_"
+
+    @staticmethod
+    def expected_metadata(symbol_name, timeframe):
+        """Field metadata yang harus sama persis agar artefak bisa dipakai oleh kode saat ini."""
+        return {
+            'version': MODEL_ARTIFACT_VERSION,
+            'symbol': symbol_name,
+            'timeframe': timeframe,
+            'features': list(AI_FEATURE_COLUMNS),
+            'params': dict(AI_MODEL_PARAMS),
+            'sklearn': sklearn.__version__,
+        }
+
+    def save(self, trained_model, df, symbol_name, timeframe, train_score=None, test_score=None):
+        """
+        Menyimpan model beserta metadata, lalu menghapus artefak lama di luar batas `keep`.
+        Args:
+            trained_model: Model terlatih.
+            df (DataFrame): Candle yang dipakai untuk training (untuk rentang waktu dan sidik jari).
+            symbol_name (str): Simbol.
+            timeframe (int): Timeframe candle training.
+            train_score, test_score (float, optional): Akurasi training.
+        Returns:
+            dict: Metadata artefak (termasuk 'path').
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        times = epoch_seconds(df['time'])
+        trained_at = time.time()
+        name = self._prefix(symbol_name, timeframe) + datetime.datetime.fromtimestamp(trained_at).strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.directory, name + ".joblib")
+        meta = self.expected_metadata(symbol_name, timeframe)
+        meta.update({
+            'trained_at': trained_at,
+            'data_from': int(times[0]),
+            'data_to': int(times[-1]),
+            'bars': len(df),
+            'fingerprint': data_fingerprint(df),
+            'train_score': train_score,
+            'test_score': test_score,
+        })
+        joblib.dump(trained_model, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        with open(path + ".json.tmp", 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(path + ".json.tmp", path + ".json")
+        self.prune(symbol_name, timeframe)
+        meta['path'] = path
+        return meta
+
+    def artifacts(self, symbol_name, timeframe):
+        """
+        Returns:
+            list: Metadata artefak yang kompatibel untuk simbol/timeframe, terbaru lebih dulu.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        expected = self.expected_metadata(symbol_name, timeframe)
+        prefix = self._prefix(symbol_name, timeframe)
+        artifacts = []
+        for entry in os.listdir(self.directory):
+            if not (entry.startswith(prefix) and entry.endswith(".joblib.json")):
+                continue
+            path = os.path.join(self.directory, entry[:-len(".json")])
+            try:
+                with open(path + ".json", 'r') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not os.path.exists(path) or any(meta.get(k) != v for k, v in expected.items()):
+                continue
+            meta['path'] = path
+            artifacts.append(meta)
+        return sorted(artifacts, key=lambda meta: meta['trained_at'], reverse=True)
+
+    def load(self, meta):
+        """Memuat model dari artefak yang ditunjuk metadata (hasil artifacts())."""
+        return joblib.load(meta['path'])
+
+    def load_latest(self, symbol_name, timeframe):
+        """
+        Memuat artefak kompatibel terbaru. Artefak yang gagal dimuat dilewati dan dilaporkan ke pemanggil.
+        Returns:
+            tuple: (model, metadata, failures); model dan metadata None jika tidak ada artefak yang bisa dimuat,
+                failures berisi (path, exception) untuk setiap artefak yang gagal dimuat.
+        """
+        failures = []
+        for meta in self.artifacts(symbol_name, timeframe):
+            try:
+                return self.load(meta), meta, failures
+            except Exception as e:
+                failures.append((meta['path'], e))
+        return None, None, failures
+
+    @staticmethod
+    def is_stale(meta, latest_bar_time, max_age_hours=MODEL_MAX_AGE_HOURS):
+        """
+        Model basi jika candle terbaru sudah lebih dari `max_age_hours` setelah akhir data training,
+        atau jika data training lebih baru dari candle terbaru (misalnya replay data lama di simulator).
+        Args:
+            meta (dict): Metadata artefak.
+            latest_bar_time (int): Waktu candle terbaru (detik epoch).
+        Returns:
+            bool: True jika model perlu dilatih ulang.
+        """
+        age = latest_bar_time - meta['data_to']
+        return age < 0 or age > max_age_hours * 3600
+
+    def prune(self, symbol_name, timeframe):
+        """Menghapus artefak simbol/timeframe di luar `keep` terbaru."""
+        prefix = self._prefix(symbol_name, timeframe)
+        names = sorted((entry[:-len(".json")] for entry in os.listdir(self.directory)
+                        if entry.startswith(prefix) and entry.endswith(".joblib.json")), reverse=True)
+        for name in names[self.keep:]:
+            for path in (os.path.join(self.directory, name + ".json"), os.path.join(self.directory, name)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+# Konfigurasi log (lihat EngineLog)
+LOG_LEVEL = "INFO" # Level minimum yang dicatat: DEBUG, INFO, WARNING, ERROR (bisa diubah dengan --log-level)
+LOG_BUFFER_LINES = 5000 # Jumlah baris terakhir yang disimpan di memori dan ditampilkan di GUI
+LOG_UI_FPS = 10 # Frekuensi GUI menarik baris baru dari buffer log
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024 # Ukuran file log sebelum dirotasi
+LOG_FILE_BACKUPS = 5 # Jumlah file log lama yang disimpan
+
+
+class LogBuffer:
+    """
+    Ring buffer baris log dengan nomor urut, sehingga pembaca (GUI) bisa menarik baris baru secara
+    batch tanpa menerima event per baris. Memori dibatasi maxlen baris; baris tertua dibuang.
+    """
+    def __init__(self, maxlen=LOG_BUFFER_LINES):
+        self._lines = deque(maxlen=maxlen)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def append(self, line):
+        with self._lock:
+            self._seq += 1
+            self._lines.append(line)
+
+    def since(self, seq):
+        """
+        Args:
+            seq (int): Nomor urut terakhir yang sudah dibaca (0 untuk semua baris).
+        Returns:
+            tuple: (nomor urut terbaru, daftar baris setelah seq yang masih ada di buffer).
+        """
+        with self._lock:
+            missing = min(self._seq - seq, len(self._lines))
+            if missing <= 0:
+                return self._seq, []
+            return self._seq, list(islice(self._lines, len(self._lines) - missing, None))
+
+
+class EngineLog:
+    """
+    Subsistem log engine: filter level, ring buffer di memori (LogBuffer), dan sink file berotasi yang
+    ditulis secara asinkron oleh thread QueueListener, sehingga thread trading tidak pernah menunggu disk.
+    """
+    def __init__(self, level=LOG_LEVEL, directory=LOG_DIR, filename="trading_bot.log"):
+        """
+        Args:
+            level (str or int): Level minimum yang dicatat.
+            directory (str or None): Direktori file log; None untuk menonaktifkan sink file.
+            filename (str): Nama file log.
+        """
+        self.buffer = LogBuffer()
+        self.level = logging.INFO
+        self.set_level(level)
+        self._logger = logging.Logger("trading_bot") # Tidak didaftarkan global: handler tidak menumpuk antar engine
+        self._listener = None
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                file_handler = logging.handlers.RotatingFileHandler(
+                    os.path.join(directory, filename), maxBytes=LOG_FILE_MAX_BYTES,
+                    backupCount=LOG_FILE_BACKUPS, encoding="utf-8", delay=True)
+                file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s"))
+                log_queue = queue.SimpleQueue()
+                self._logger.addHandler(logging.handlers.QueueHandler(log_queue))
+                self._listener = logging.handlers.QueueListener(log_queue, file_handler)
+                self._listener.start()
+            except OSError as e:
+                print(f"Gagal membuka file log di {directory}: {e}")
+
+    def set_level(self, level):
+        """
+        Args:
+            level (str or int): Nama level ("DEBUG", "INFO", ...) atau konstanta logging.
+        """
+        self.level = logging.getLevelName(level.upper()) if isinstance(level, str) else int(level)
+
+    def enabled(self, level):
+        """True jika pesan dengan level ini akan dicatat; dipakai jalur panas untuk melewati pemformatan pesan."""
+        return level >= self.level
+
+    def write(self, message, level=logging.INFO):
+        """
+        Mencatat pesan ke buffer dan file.
+        Returns:
+            bool: False jika pesan disaring oleh level.
+        """
+        if level < self.level:
+            return False
+        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+        self.buffer.append(f"[{timestamp}] {message}")
+        if self._listener is not None:
+            self._logger.log(level, message)
+        return True
+
+    def close(self):
+        """Menghentikan thread sink file setelah antreannya dikosongkan."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+# Konfigurasi exporter metrik (lihat MetricsExporter)
+METRICS_PORT = None # Port endpoint HTTP /metrics format teks Prometheus; None = nonaktif (--metrics-port)
+METRICS_HOST = "127.0.0.1" # Alamat bind endpoint; hanya lokal secara default
+METRICS_REFRESH_SECONDS = 5 # Interval penyusunan ulang snapshot metrik yang dilayani endpoint
+
+
+def _metric_label_value(value):
+    """Meng-escape nilai label sesuai format teks Prometheus."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_metric(name, metric_type, help_text, samples):
+    """
+    Menyusun satu metrik dalam format teks Prometheus.
+    Args:
+        name (str): Nama metrik.
+        metric_type (str): "gauge", "counter", atau "summary".
+        help_text (str): Deskripsi metrik.
+        samples (list): Tuple (sufiks nama, dict label, nilai); sufiks misalnya "" atau "_sum".
+    Returns:
+        list: Baris teks (kosong jika tidak ada sampel).
+    """
+    if not samples:
+        return []
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for suffix, labels, value in samples:
+        label_text = ",".join(f'{key}="{_metric_label_value(val)}"' for key, val in labels.items())
+        lines.append(f"{name}{suffix}{{{label_text}}} {float(value):.10g}" if label_text
+                     else f"{name}{suffix} {float(value):.10g}")
+    return lines
+
+
+def summary_samples(stats, labels):
+    """
+    Sampel metrik summary (kuantil, _sum, _count) dari satu entri LatencyStats.summary().
+    Args:
+        stats (dict): Statistik satu operasi.
+        labels (dict): Label tambahan.
+    Returns:
+        list: Tuple (sufiks, label, nilai) untuk format_metric.
+    """
+    samples = [("", {**labels, 'quantile': q}, value) for q, value in stats['quantiles'].items()]
+    samples.append(("_sum", labels, stats['sum_seconds']))
+    samples.append(("_count", labels, stats['count']))
+    return samples
+
+
+class MetricsExporter:
+    """
+    Endpoint HTTP lokal (GET /metrics) untuk scraping banyak instance bot.
+    Engine menyusun teks metrik secara berkala lalu memanggil publish(); handler hanya mengirim
+    bytes snapshot terakhir, sehingga scrape tidak pernah menyentuh state atau lock engine.
+    """
+    def __init__(self, host=METRICS_HOST, port=METRICS_PORT):
+        """
+        Args:
+            host (str): Alamat bind.
+            port (int): Port TCP (0 = port acak, lihat `address`).
+        """
+        self.host = host
+        self.port = port
+        self._payload = b"# Metrik belum tersedia\n"
+        self._server = None
+        self._thread = None
+
+    def publish(self, text):
+        """Mengganti snapshot yang dilayani (penggantian referensi, atomic terhadap thread server)."""
+        self._payload = text.encode("utf-8")
+
+    @property
+    def address(self):
+        """(host, port) yang sedang dipakai server, atau None jika belum berjalan."""
+        return self._server.server_address[:2] if self._server else None
+
+    def start(self):
+        """
+        Menjalankan server HTTP di thread daemon.
+        Raises:
+            OSError: Jika port tidak bisa dipakai.
+        """
+        exporter = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                payload = exporter._payload
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass # Scrape rutin tidak dicatat
+
+        self._server = http.server.ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Menghentikan server HTTP."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class SymbolPipeline:
+    """
+    State per simbol di TradingEngine: model AI beserta artefak, cadangan rollback, dan retraining-nya,
+    entry yang sedang diproses, serta snapshot terakhir. Cache candle dan indikator per simbol ada di
+    MarketDataCache (per pasangan simbol/timeframe).
+    """
+    def __init__(self, symbol_name):
+        self.symbol = symbol_name
+        self.model = None
+        self.model_metadata = None # Metadata artefak model yang sedang aktif
+        self.previous_model = None # (model, metadata) sebelum hot-swap terakhir, untuk rollback
+        self.compiled = None # CompiledForest dari model aktif (lihat TradingEngine.compiled_model)
+        self.retrain_future = None
+        self.entry_future = None # Future entry yang sedang diproses (satu entry per simbol sekaligus)
+        self.last_snapshot = None
+
+
+class TradingEngine:
+    """
+    Engine trading tanpa GUI yang berjalan di atas asyncio.
+    Menjalankan loop data pasar, berita, dan analysis/strategi; semua panggilan MT5 yang blocking
+    dijalankan di thread executor sehingga event loop (dan GUI) tidak pernah ikut tertahan.
+    Hasilnya dikirim sebagai aliran event ke subscriber (GUI, logger konsole, dll.) lewat subscribe().
+    """
+    def __init__(self, subscribers=(), log_dir=LOG_DIR):
+        """
+        Inisialisasi engine.
+        Args:
+            subscribers (iterable): Callback subscriber awal, didaftarkan sebelum pengaturan dimuat
+                agar log saat inisialisasi ikut terkirim.
+            log_dir (str or None): Direktori file log; None tanpa file log (misalnya benchmark).
+        """
+        self._subscribers = list(subscribers)
+        self.log_store = EngineLog(LOG_LEVEL, directory=log_dir)
+        self._log_context = threading.local() # Prefiks log per thread pipeline (lihat _run_pipeline)
+        self.trading_settings = dict(DEFAULT_TRADING_SETTINGS)
+        self.load_settings() # Memuat pengaturan yang tersimpan saat inisialisasi
+
+        # Cache candle bersama untuk tampilan, strategi, dan eksekusi order
+        self.market_data = MarketDataCache()
+        self.metadata = BrokerMetadataCache() # Info simbol dan akun (mengurangi panggilan IPC ke terminal)
+        self.recorder = MarketRecorder() if RECORDER_ENABLED else None
+        # Buku besar order/trade; akun simulator dicatat terpisah dari akun MT5 sungguhan
+        account_mode = "sim" if isinstance(getattr(broker, 'adapter', broker), SimulatedBroker) else "live"
+        self.ledger = TradeLedger(LEDGER_FILE, account_mode,
+                                  on_error=lambda message: self.log(message, logging.WARNING)) if LEDGER_ENABLED else None
+        self.model_store = ModelStore()
+        # Satu pipeline per simbol; simbol pertama adalah simbol utama (tampilan dan model global)
+        self.symbols = list(dict.fromkeys(TRADING_SYMBOLS))
+        self.pipelines = {name: SymbolPipeline(name) for name in self.symbols}
+        self.primary = self.pipelines[self.symbols[0]]
+        # Posisi terbuka dan statistik win/loss dari riwayat deal (termasuk penutupan oleh SL/TP/broker)
+        self.position_tracker = PositionTracker(self.symbols, on_close=self._on_position_closed)
+        self.last_snapshot = None # MarketSnapshot simbol utama dari siklus terakhir
+        self.market_state = {} # Hasil analisis teknikal terakhir: nama label -> (teks, warna)
+        self.news_state = {} # Status berita terakhir: nama label -> (teks, warna)
+
+        # Executor terpisah agar polling data pasar tidak menunggu strategi/order yang sedang berjalan
+        self._data_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="market-data")
+        self._trading_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trading")
+        # Pipeline simbol dalam satu siklus analisis berjalan bersamaan, dibatasi SYMBOL_PIPELINE_WORKERS
+        self._pipeline_executor = ThreadPoolExecutor(max_workers=SYMBOL_PIPELINE_WORKERS, thread_name_prefix="symbol-pipeline")
+        # Retraining model berjalan di executor sendiri agar trading tetap jalan selama fit
+        self._model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-training")
+        self._retrain_lock = threading.Lock()
+        # Order dan retry-nya berjalan di worker sendiri agar tidak menahan siklus analisis/manajemen posisi
+        self.order_executor = OrderExecutor()
+        self.execution_stats = ExecutionStats()
+        self.scheduler = AnalysisScheduler()
+        self.cycle_stats = LatencyStats() # Durasi siklus loop engine ("analysis", "market_data") untuk exporter metrik
+        self.metrics_exporter = None
+        self._started_at = time.time()
+        self._loop = None
+        self._stop_event = None
+        self._mode_changed = None
+        self._run_immediately = False
+
+    def subscribe(self, callback):
+        """
+        Mendaftarkan subscriber untuk aliran state engine.
+        Args:
+            callback (callable): Dipanggil sebagai callback(event, payload) dari thread engine.
+                Event: "log", "status", "mode", "market", "account", "news", "trade_stats".
+        """
+        self._subscribers.append(callback)
+
+    def publish(self, event, payload):
+        """
+        Mengirim event ke semua subscriber. Error di subscriber tidak menghentikan engine.
+        Args:
+            event (str): Nama event.
+            payload: Data event.
+        """
+        for callback in list(self._subscribers):
+            try:
+                callback(event, payload)
+            except Exception as e:
+                print(f"Error subscriber engine ({event}): {e}")
+
+    def log(self, message, level=logging.INFO):
+        """
+        Mencatat pesan ke buffer log dan file, lalu mengirimkannya ke semua subscriber.
+        Args:
+            message (str): Pesan yang akan dicatat.
+            level (int): Level logging; pesan di bawah level aktif dibuang.
+        """
+        prefix = getattr(self._log_context, 'prefix', None)
+        if prefix:
+            message = prefix + message
+        if self.log_store.write(message, level):
+            self.publish("log", message)
+
+    def pipeline_for(self, symbol_name=None):
+        """
+        Args:
+            symbol_name (str, optional): Nama simbol; simbol utama jika None.
+        Returns:
+            SymbolPipeline: Pipeline simbol (dibuat jika simbol belum terdaftar).
+        """
+        if symbol_name is None:
+            return self.primary
+        pipeline = self.pipelines.get(symbol_name)
+        if pipeline is None:
+            pipeline = self.pipelines.setdefault(symbol_name, SymbolPipeline(symbol_name))
+        return pipeline
+
+    def log_enabled(self, level):
+        """
+        Args:
+            level (int): Level logging.
+        Returns:
+            bool: True jika pesan dengan level ini akan dicatat.
+        """
+        return self.log_store.enabled(level)
+
+    def save_settings(self):
+        """
+        Menyimpan pengaturan trading saat ini ke file JSON.
+        Raises:
+            Exception: Error penulisan diteruskan ke pemanggil setelah dicatat ke log.
+        """
+        try:
+            with open(SETTINGS_FILE, 'w') as f:
+                json.dump(self.trading_settings, f, indent=4)
+            self.log("Pengaturan berhasil disimpan.")
+        except IOError as e:
+            self.log(f"Error menyimpan pengaturan: {e}")
+            raise
+        except Exception as e:
+            self.log(f"Error tidak dikenal saat menyimpan pengaturan: {e}")
+            raise
+
+    def load_settings(self):
+        """
+        Memuat pengaturan trading dari file JSON.
+        Jika file tidak ditemukan atau ada kesalahan, pengaturan default akan digunakan.
+        """
+        try:
+            with open(SETTINGS_FILE, 'r') as f:
+                loaded_settings = json.load(f)
+                self.trading_settings.update(loaded_settings)
+            self.log("Pengaturan berhasil dimuat.")
+        except FileNotFoundError:
+            self.log(f"File pengaturan '{SETTINGS_FILE}' tidak ditemukan. Menggunakan pengaturan default.")
+        except json.JSONDecodeError as e:
+            self.log(f"Error membaca file pengaturan (JSON tidak valid): {e}. Menggunakan pengaturan default.")
+        except Exception as e:
+            self.log(f"Error tidak dikenal saat memuat pengaturan: {e}. Menggunakan pengaturan default.")
+
+    def set_mode(self, mode):
+        """
+        Mengatur mode operasi bot. Aman dipanggil dari thread mana pun (GUI, CLI, atau engine).
+        Loop analysis langsung dijadwalkan ulang dengan interval mode yang baru.
+        Args:
+            mode (str): Mode baru ('Stopped', 'Monitoring', 'AI_Long_Trade', 'Scalping_Bot', 'Sniper_Bot').
+        """
+        global current_mode, is_running
+
+        if mode == "AI_Long_Trade" and model is None:
+            self.log("Model belum dilatih! Harap latih model terlebih dahulu.")
+            mode = "Stopped"
+
+        current_mode = mode
+        is_running = mode != "Stopped"
+        if mode == "Stopped":
+            self.log("Mode: Bot dihentikan.")
+        elif mode == "Monitoring":
+            self.log("Mode: Monitoring (Analisis Berita & Teknikal saja).")
+        elif mode == "AI_Long_Trade":
+            self.log("Mode: AI Long Trade diaktifkan. Analisis saat candle M5 ditutup (maks. setiap 60 detik).")
+        elif mode == "Scalping_Bot":
+            self.log("Mode: Scalping diaktifkan. Analisis saat candle M1 ditutup atau harga bergerak (maks. setiap 5 detik).")
+        elif mode == "Sniper_Bot":
+            self.log("Mode: Sniper diaktifkan. Analisis saat candle M1 ditutup atau harga bergerak (maks. setiap 3 detik).")
+
+        # Monitoring langsung menjalankan satu analisis tanpa menunggu interval pertama
+        self._run_immediately = mode == "Monitoring"
+        self.publish("mode", mode)
+        if self._mode_changed is not None:
+            self._call_in_loop(self._mode_changed.set)
+
+    def _call_in_loop(self, callback):
+        """Menjadwalkan callback di event loop engine dari thread lain (jika loop sedang berjalan)."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(callback)
+
+    def _call_logged(self, func, *args):
+        """Menjalankan fungsi dan mencatat exception ke log alih-alih menghentikan loop engine."""
+        try:
+            return func(*args)
+        except Exception as e:
+            self.log(f"⚠️ Error di {getattr(func, '__name__', func)}: {e}")
+            return None
+
+    async def _run_blocking(self, executor, func, *args):
+        """Menjalankan fungsi blocking (panggilan MT5/sklearn) di executor tanpa memblokir event loop."""
+        return await self._loop.run_in_executor(executor, self._call_logged, func, *args)
+
+    async def _sleep(self, seconds):
+        """
+        Menunggu selama `seconds` detik atau sampai engine dihentikan.
+        Returns:
+            bool: True jika engine dihentikan selama menunggu.
+        """
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _market_data_loop(self):
+        """Memperbarui data pasar dan info akun untuk subscriber setiap DATA_POLL_INTERVAL_SECONDS."""
+        while not self._stop_event.is_set():
+            started = time.perf_counter()
+            await self._run_blocking(self._data_executor, self.update_market_data)
+            self.cycle_stats.record("market_data", time.perf_counter() - started)
+            if await self._sleep(DATA_POLL_INTERVAL_SECONDS):
+                break
+
+    async def _news_loop(self):
+        """Mengecek berita ekonomi setiap NEWS_CHECK_INTERVAL_SECONDS."""
+        while not self._stop_event.is_set():
+            await self._run_blocking(self._data_executor, self.check_economic_news)
+            if await self._sleep(NEWS_CHECK_INTERVAL_SECONDS):
+                break
+
+    async def _profiler_loop(self):
+        """Menulis statistik profiler tahap ke PROFILER_FILE setiap PROFILER_DUMP_SECONDS selama sampling aktif."""
+        while not self._stop_event.is_set():
+            if await self._sleep(PROFILER_DUMP_SECONDS):
+                break
+            if profiler.enabled:
+                await self._run_blocking(self._data_executor, profiler.dump, PROFILER_FILE)
+
+    async def _model_loop(self):
+        """Mengecek umur dan drift model setiap MODEL_CHECK_INTERVAL_SECONDS (lihat check_model_health)."""
+        while not self._stop_event.is_set():
+            if await self._sleep(MODEL_CHECK_INTERVAL_SECONDS):
+                break
+            await self._run_blocking(self._data_executor, self.check_model_health)
+
+    async def _analysis_loop(self):
+        """
+        Menjalankan run_analysis saat AnalysisScheduler memicu: candle ditutup, harga bergerak, atau interval
+        mode habis. Perubahan mode membangunkan loop ini sehingga pemicu mode baru langsung berlaku.
+        """
+        scheduler = self.scheduler
+        while not self._stop_event.is_set():
+            if scheduler.mode != current_mode:
+                scheduler.reset(current_mode, time.monotonic())
+            if self._run_immediately:
+                self._run_immediately = False
+                trigger = ("mode", time.monotonic(), 0.0)
+            else:
+                trigger = None
+                if scheduler.needs_ticks:
+                    tick, point = await self._run_blocking(self._data_executor, self._poll_tick) or (None, None)
+                    trigger = scheduler.poll(time.monotonic(), tick, point)
+                elif scheduler.active:
+                    trigger = scheduler.poll(time.monotonic())
+                if trigger is None:
+                    try:
+                        # None = tunggu perubahan mode
+                        await asyncio.wait_for(self._mode_changed.wait(), timeout=scheduler.wait_seconds(time.monotonic()))
+                        self._mode_changed.clear()
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+            await self._run_blocking(self._trading_executor, self._run_triggered_analysis, *trigger)
+
+    def _poll_tick(self):
+        """Tick terbaru dan ukuran poin simbol utama untuk AnalysisScheduler."""
+        tick = broker.symbol_info_tick(self.primary.symbol)
+        info = self.metadata.spec(self.primary.symbol)
+        return tick, info.point if info is not None else None
+
+    def _run_triggered_analysis(self, trigger, detected_at, detection_lag):
+        """
+        Menjalankan run_analysis dan mencatat keterlambatannya: jarak event pemicu ke deteksi ditambah
+        antrean sampai callback mulai berjalan.
+        """
+        lateness = detection_lag + (time.monotonic() - detected_at)
+        self.scheduler.record_lateness(trigger, lateness)
+        if self.log_enabled(logging.DEBUG):
+            self.log(f"⏱️ Analisis dipicu '{trigger}', terlambat {lateness * 1000:.0f} ms.", logging.DEBUG)
+        started = time.perf_counter()
+        self.run_analysis()
+        self.cycle_stats.record("analysis", time.perf_counter() - started)
+
+    async def _metrics_loop(self):
+        """Menyusun ulang snapshot metrik exporter setiap METRICS_REFRESH_SECONDS."""
+        while not self._stop_event.is_set():
+            self._call_logged(self.publish_metrics)
+            if await self._sleep(METRICS_REFRESH_SECONDS):
+                break
+
+    def publish_metrics(self):
+        """Menyusun teks metrik dari state engine dan menyerahkannya ke exporter."""
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.publish(self.render_metrics())
+
+    def render_metrics(self):
+        """
+        Menyusun semua metrik engine dalam format teks Prometheus: durasi siklus, panggilan broker,
+        hasil order per retcode, posisi terbuka, akun, winrate, dan versi model.
+        Hanya membaca state di memori (tidak ada panggilan broker).
+        Returns:
+            str: Teks eksposisi.
+        """
+        lines = []
+        lines += format_metric("trading_bot_start_time_seconds", "gauge", "Waktu engine dimulai (epoch).",
+                               [("", {}, self._started_at)])
+        lines += format_metric("trading_bot_mode", "gauge", "Mode bot aktif (1 untuk mode saat ini).",
+                               [("", {'mode': current_mode}, 1)])
+        cycles = self.cycle_stats.summary()
+        lines += format_metric("trading_bot_cycle_duration_seconds", "summary", "Durasi siklus loop engine.",
+                               [sample for loop_name, stats in cycles.items()
+                                for sample in summary_samples(stats, {'loop': loop_name})])
+
+        calls = broker.calls.summary() if isinstance(broker, ProfiledBroker) else {}
+        lines += format_metric("trading_bot_broker_calls_total", "counter", "Jumlah panggilan API broker/MT5.",
+                               [("", {'call': name}, stats['count']) for name, stats in calls.items()])
+        lines += format_metric("trading_bot_broker_call_failures_total", "counter",
+                               "Jumlah panggilan API broker/MT5 yang mengembalikan None.",
+                               [("", {'call': name}, stats['failures']) for name, stats in calls.items()])
+        lines += format_metric("trading_bot_broker_call_duration_seconds", "summary", "Latensi panggilan API broker/MT5.",
+                               [sample for name, stats in calls.items()
+                                for sample in summary_samples(stats, {'call': name})])
+
+        lines += format_metric("trading_bot_orders_total", "counter", "Hasil order_send per jalur dan retcode.",
+                               [("", {'path': path, 'retcode': "none" if retcode is None else retcode,
+                                      'result': "Tidak ada respons" if retcode is None else self.get_error_message(retcode)},
+                                 count)
+                                for path, stats in self.execution_stats.summary().items()
+                                for retcode, count in stats['retcodes'].items()])
+
+        snapshots = [(name, self.pipelines[name].last_snapshot) for name in self.symbols]
+        lines += format_metric("trading_bot_open_positions", "gauge", "Jumlah posisi terbuka per simbol.",
+                               [("", {'symbol': name}, len(snap.positions)) for name, snap in snapshots if snap is not None])
+        lines += format_metric("trading_bot_position_profit", "gauge", "Total profit mengambang posisi terbuka per simbol.",
+                               [("", {'symbol': name}, sum(pos.profit for pos in snap.positions))
+                                for name, snap in snapshots if snap is not None])
+        account = self.last_snapshot.account if self.last_snapshot is not None else None
+        if account is not None:
+            for field_name, help_text in (("balance", "Saldo akun."), ("equity", "Equity akun."),
+                                          ("margin", "Margin terpakai."), ("margin_free", "Free margin.")):
+                lines += format_metric(f"trading_bot_account_{field_name}", "gauge", help_text,
+                                       [("", {}, getattr(account, field_name))])
+
+        lines += format_metric("trading_bot_trades_won_total", "counter", "Jumlah trade yang ditutup profit (win_count).",
+                               [("", {}, win_count)])
+        lines += format_metric("trading_bot_trades_lost_total", "counter", "Jumlah trade yang ditutup rugi (loss_count).",
+                               [("", {}, loss_count)])
+        if win_count + loss_count:
+            lines += format_metric("trading_bot_winrate_ratio", "gauge", "Winrate win_count / (win_count + loss_count).",
+                                   [("", {}, win_count / (win_count + loss_count))])
+        positions = self.position_tracker.stats()
+        lines += format_metric("trading_bot_positions_closed_total", "counter",
+                               "Jumlah posisi yang tertutup penuh per alasan (sl, tp, stop_out, expert, manual).",
+                               [("", {'reason': reason}, count) for reason, count in positions['closes_by_reason'].items()])
+        lines += format_metric("trading_bot_realized_profit", "gauge",
+                               "Profit terealisasi (profit + swap + komisi) dari deal penutupan sejak engine mulai.",
+                               [("", {}, positions['realized_profit'])])
+
+        models = [(name, self.pipelines[name]) for name in self.symbols if self.pipelines[name].model is not None]
+        def meta_of(pipeline):
+            return pipeline.model_metadata or {}
+        lines += format_metric("trading_bot_model_info", "gauge", "Versi model aktif per simbol (artefak dan sidik jari data).",
+                               [("", {'symbol': name,
+                                      'artifact': os.path.basename(meta_of(pipeline).get('path', "")) or "tidak disimpan",
+                                      'fingerprint': meta_of(pipeline).get('fingerprint', ""),
+                                      'version': meta_of(pipeline).get('version', MODEL_ARTIFACT_VERSION)}, 1)
+                                for name, pipeline in models])
+        lines += format_metric("trading_bot_model_trained_timestamp_seconds", "gauge", "Waktu model aktif dilatih (epoch).",
+                               [("", {'symbol': name}, meta_of(pipeline)['trained_at'])
+                                for name, pipeline in models if 'trained_at' in meta_of(pipeline)])
+        lines += format_metric("trading_bot_model_test_accuracy", "gauge", "Akurasi test model aktif saat dilatih.",
+                               [("", {'symbol': name}, meta_of(pipeline)['test_score'])
+                                for name, pipeline in models if meta_of(pipeline).get('test_score') is not None])
+        return "\n".join(lines) + "\n"
+
+    def open_ledger(self):
+        """Membuka buku besar trade dan memulihkan win/loss serta hasil trade terakhir dari rollup-nya."""
+        global win_count, loss_count, last_trade_result
+        if self.ledger is None:
+            return
+        try:
+            self.ledger.open()
+        except sqlite3.Error as e:
+            self.log(f"⚠️ Gagal membuka buku besar trade {self.ledger.path}: {e}. Trade tidak dicatat.", logging.WARNING)
+            self.ledger = None
+            return
+        totals = self.ledger.totals()
+        win_count, loss_count = totals['wins'], totals['losses']
+        if self.ledger.last_result is not None:
+            last_trade_result = self.ledger.last_result
+        self.log(f"📒 Buku besar trade ({self.ledger.mode}): {totals['trades']} trade tercatat, "
+                 f"{totals['wins']} win / {totals['losses']} loss, profit ${totals['profit']:.2f}")
+        self.publish_trade_stats()
+
+    async def run(self, initial_mode="Monitoring"):
+        """
+        Coroutine utama engine. Berjalan sampai stop() dipanggil.
+        Args:
+            initial_mode (str): Mode yang diaktifkan setelah model selesai dilatih.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self._mode_changed = asyncio.Event()
+        self.open_ledger()
+        tasks = [
+            asyncio.create_task(self._market_data_loop()),
+            asyncio.create_task(self._news_loop()),
+        ]
+        if METRICS_PORT is not None:
+            self.metrics_exporter = MetricsExporter(METRICS_HOST, METRICS_PORT)
+            try:
+                self.metrics_exporter.start()
+                host, port = self.metrics_exporter.address
+                self.log(f"📡 Endpoint metrik aktif di http://{host}:{port}/metrics")
+                tasks.append(asyncio.create_task(self._metrics_loop()))
+            except OSError as e:
+                self.log(f"⚠️ Gagal menjalankan endpoint metrik di {METRICS_HOST}:{METRICS_PORT}: {e}", logging.WARNING)
+                self.metrics_exporter = None
+        try:
+            await self._run_blocking(self._trading_executor, self.load_or_train_model)
+            self.set_mode(initial_mode)
+            tasks.append(asyncio.create_task(self._analysis_loop()))
+            tasks.append(asyncio.create_task(self._model_loop()))
+            tasks.append(asyncio.create_task(self._profiler_loop()))
+            await self._stop_event.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._loop = None
+            self._model_executor.shutdown(wait=False, cancel_futures=True)
+            self.order_executor.shutdown()
+            if self.execution_stats.summary() or self.scheduler.lateness_summary():
+                self.log_execution_report()
+            if self.ledger is not None:
+                self.ledger.close()
+            if profiler.enabled:
+                self._call_logged(profiler.dump, PROFILER_FILE)
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.stop()
+            self.log_store.close()
+            self._data_executor.shutdown(wait=True, cancel_futures=True)
+            self._trading_executor.shutdown(wait=True, cancel_futures=True)
+            self._pipeline_executor.shutdown(wait=True, cancel_futures=True)
+
+    def start_in_thread(self, initial_mode="Monitoring"):
+        """
+        Menjalankan engine di thread daemon terpisah (dipakai oleh GUI).
+        Args:
+            initial_mode (str): Mode awal engine.
+        Returns:
+            threading.Thread: Thread yang menjalankan event loop engine.
+        """
+        thread = threading.Thread(target=asyncio.run, args=(self.run(initial_mode),),
+                                  name="trading-engine", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Menghentikan semua loop engine. Aman dipanggil dari thread mana pun."""
+        global is_running
+        is_running = False
+        if self._stop_event is not None:
+            self._call_in_loop(self._stop_event.set)
+            self._call_in_loop(self._mode_changed.set)
+
+    def submit(self, func, *args):
+        """
+        Menjadwalkan aksi pengguna (misalnya train_model atau close_all_positions) di executor trading,
+        berurutan dengan siklus analysis sehingga tidak terjadi order yang saling tumpang tindih.
+        Args:
+            func (callable): Method engine yang akan dijalankan.
+        Returns:
+            concurrent.futures.Future: Future hasil pemanggilan.
+        """
+        return self._trading_executor.submit(self._call_logged, func, *args)
+
+    @profiled("market.build_snapshot")
+    def build_snapshot(self):
+        """
+        Membangun MarketSnapshot untuk siklus ini dan menyimpannya sebagai snapshot terakhir.
+        Returns:
+            MarketSnapshot or None: Snapshot pasar, atau None jika data MT5 tidak tersedia.
+        """
+        snapshot, error = build_market_snapshot(self.market_data, self.primary.symbol, current_mode, self.metadata,
+                                                self.position_tracker)
+        if snapshot is None:
+            self.log(error)
+            return None
+        self.last_snapshot = self.primary.last_snapshot = snapshot
+        return snapshot
+
+    @profiled("market.update_market_data")
+    def update_market_data(self, snapshot=None):
+        """
+        Menganalisis data pasar terbaru dan mengirim hasilnya ke subscriber (event "market" dan "account").
+        Fungsi ini berjalan setiap detik; jika snapshot tidak diberikan, snapshot baru dibangun.
+        Data pasar semua simbol direkam di sini, di mode apa pun (lihat record_symbol_data).
+        Args:
+            snapshot (MarketSnapshot, optional): Snapshot siklus analisis saat ini.
+        """
+        try:
+            if snapshot is None:
+                snapshot = self.build_snapshot()
+            if snapshot is None:
+                self.log("Gagal mendapatkan data pasar. Mencoba menyambung kembali ke MT5.")
+                self.metadata.invalidate()
+                self.position_tracker.invalidate()
+                if not broker.initialize():
+                    self.log("FATAL: Gagal re-initialize MT5. Aplikasi mungkin tidak berfungsi.")
+                return
+            self.record_market_data(snapshot)
+            for name in self.symbols:
+                if name != snapshot.symbol:
+                    self.record_symbol_data(self.pipelines[name])
+            self.market_state = self.analyze_market(snapshot)
+            self.publish("market", self.market_state)
+            self.publish_account(snapshot)
+        except Exception as e:
+            self.log(f"Error memperbarui data pasar: {str(e)}")
+
+    def record_symbol_data(self, pipeline):
+        """
+        Membangun snapshot simbol non-utama dan merekamnya, agar rekaman setiap simbol tidak bolong
+        saat tidak ada pipeline strategi yang berjalan (Monitoring/Stopped).
+        Args:
+            pipeline (SymbolPipeline): Pipeline simbol yang direkam.
+        """
+        if self.recorder is None:
+            return
+        snapshot, error = build_market_snapshot(self.market_data, pipeline.symbol, current_mode, self.metadata,
+                                                self.position_tracker)
+        if snapshot is None:
+            self.log(f"[{pipeline.symbol}] {error}", logging.DEBUG) # Setiap detik; tidak membanjiri log INFO
+            return
+        self.record_market_data(snapshot)
+
+    @profiled("market.record")
+    def record_market_data(self, snapshot):
+        """
+        Merekam tick snapshot dan candle baru yang sudah selesai dari semua timeframe yang di-cache.
+        Candle yang sudah ada di rekaman dilewati, sehingga aman dipanggil setiap poll.
+        Args:
+            snapshot (MarketSnapshot): Snapshot pasar terbaru.
+        """
+        if self.recorder is None:
+            return
+        try:
+            self.recorder.append_ticks(snapshot.symbol, [snapshot.tick])
+            for timeframe in self.market_data.timeframes(snapshot.symbol):
+                last = self.recorder.last_time(snapshot.symbol, self.recorder.stream_name(timeframe))
+                self.recorder.append_bars(snapshot.symbol, timeframe,
+                                          self.market_data.closed_rates(snapshot.symbol, timeframe, last))
+        except Exception as e:
+            self.log(f"⚠️ Gagal merekam data pasar: {str(e)}")
+
+    @profiled("market.analyze")
+    def analyze_market(self, snapshot):
+        """
+        Menghitung status analisis teknikal (harga, indikator, tren, SNR, likuiditas) dari MarketSnapshot.
+        Args:
+            snapshot (MarketSnapshot): Snapshot pasar.
+        Returns:
+            dict: Nama label -> (teks, warna). Warna None berarti gaya label tidak diubah.
+        """
+        state = {}
+        tick = snapshot.tick
+        state['price'] = (f"{tick.ask:.2f}", None)
+
+        df_m5 = snapshot.frame(AI_TRADING_TIMEFRAME, 200)
+        if df_m5 is None:
+            self.log("Gagal mendapatkan data candle M5 untuk display.")
+            return state
+
+        # Indikator sudah dihitung secara inkremental oleh BarCache (StreamingIndicators)
+        if 'tick_volume' in df_m5.columns and not df_m5['tick_volume'].isnull().all():
+            if len(df_m5) > 10:
+                current_obv = df_m5['obv'].iloc[-1]
+                current_obv_sma = df_m5['obv_sma'].iloc[-1]
+
+                if current_obv > current_obv_sma:
+                    state['obv'] = ("Naik ▲", "green")
+                elif current_obv < current_obv_sma:
+                    state['obv'] = ("Turun ▼", "red")
+                else:
+                    state['obv'] = ("Datar ↔", "gray")
+            else:
+                state['obv'] = ("N/A (Data kurang)", "gray")
+        else:
+            self.log("Peringatan: 'tick_volume' tidak ditemukan di data M5 untuk OBV. Pastikan MT5 menyediakan volume.")
+            state['obv'] = ("N/A (No Volume)", "gray")
+
+        last_m5 = df_m5.iloc[-1]
+
+        # Enhanced RSI color logic
+        rsi_val = last_m5['rsi']
+        if rsi_val < 30:
+            state['rsi'] = (f"{rsi_val:.2f}", "blue") # Oversold
+        elif rsi_val > 70:
+            state['rsi'] = (f"{rsi_val:.2f}", "red") # Overbought
+        else:
+            state['rsi'] = (f"{rsi_val:.2f}", "green") # Neutral
+
+        # Enhanced MACD Histogram color logic
+        macd_hist_val = last_m5['macd_hist']
+        if macd_hist_val > 0:
+            state['macd'] = (f"{macd_hist_val:.4f}", "green")
+        elif macd_hist_val < 0:
+            state['macd'] = (f"{macd_hist_val:.4f}", "red")
+        else:
+            state['macd'] = (f"{macd_hist_val:.4f}", "gray")
+
+        state['ema'] = (f"{last_m5['ema20']:.2f}/{last_m5['ema50']:.2f}", None)
+        state['bb'] = (f"{last_m5['bb_width']:.4f}", None)
+        state['atr'] = (f"{last_m5['atr']:.2f}", None)
+
+        if last_m5['close'] > last_m5['ema20'] and last_m5['ema20'] > last_m5['ema50']:
+            state['trend'] = ("Naik Kuat ▲▲", "green")
+        elif last_m5['close'] > last_m5['ema20']:
+            state['trend'] = ("Naik ▲", "darkgreen")
+        elif last_m5['close'] < last_m5['ema20'] and last_m5['ema20'] < last_m5['ema50']:
+            state['trend'] = ("Turun Kuat ▼▼", "red")
+        elif last_m5['close'] < last_m5['ema20']:
+            state['trend'] = ("Turun ▼", "darkred")
+        else:
+            state['trend'] = ("Sideways ↔", "gray")
+
+        higher_tf_for_display = AI_HIGHER_TIMEFRAME
+        if current_mode == "AI_Long_Trade":
+            higher_tf_for_display = AI_HIGHER_TIMEFRAME
+        elif current_mode == "Scalping_Bot":
+            higher_tf_for_display = SCALPING_HIGHER_TIMEFRAME
+        elif current_mode == "Sniper_Bot": # Gunakan timeframe yang sesuai untuk sniper
+            higher_tf_for_display = SNIPER_HIGHER_TIMEFRAME
+
+        df_higher_tf = snapshot.frame(higher_tf_for_display, 50)
+        if df_higher_tf is None:
+            self.log(f"Gagal mendapatkan data candle untuk {higher_tf_for_display}.")
+            state['higher_tf_trend'] = ("N/A", None)
+            return state
+
+        df_higher_tf = df_higher_tf.dropna(subset=['sma20', 'sma50'])
+
+        if not df_higher_tf.empty:
+            last_higher_tf = df_higher_tf.iloc[-1]
+            if last_higher_tf['sma20'] > last_higher_tf['sma50']:
+                state['higher_tf_trend'] = ("Up Trend ▲", "green")
+            elif last_higher_tf['sma20'] < last_higher_tf['sma50']:
+                state['higher_tf_trend'] = ("Down Trend ▼", "red")
+            else:
+                state['higher_tf_trend'] = ("Sideways ↔", "gray")
+        else:
+            state['higher_tf_trend'] = ("N/A", "gray")
+
+        if len(df_m5) >= 20:
+            recent_high = df_m5['high'].iloc[-20:].max()
+            recent_low = df_m5['low'].iloc[-20:].min()
+            current_close = df_m5['close'].iloc[-1]
+
+            distance_to_high = abs(current_close - recent_high)
+            distance_to_low = abs(current_close - recent_low)
+
+            current_atr = df_m5['atr'].iloc[-1] if not df_m5['atr'].isnull().iloc[-1] else 0.5
+
+            state['snr'] = ("N/A", None)
+            if current_atr > 0:
+                if distance_to_high < (0.5 * current_atr) and current_close < recent_high:
+                    state['snr'] = (f"Dekat R: {recent_high:.2f}", "orange")
+                elif distance_to_low < (0.5 * current_atr) and current_close > recent_low:
+                    state['snr'] = (f"Dekat S: {recent_low:.2f}", "blue")
+                else:
+                    state['snr'] = ("Antara S/R", "black")
+        else:
+            state['snr'] = ("N/A (Data kurang)", "gray")
+
+        current_spread_points = snapshot.spread_points
+        avg_tick_volume_m5 = df_m5['tick_volume'].mean() if 'tick_volume' in df_m5.columns and not df_m5['tick_volume'].isnull().all() else 0
+
+        if current_spread_points <= self.trading_settings['max_spread'] * 0.5 and avg_tick_volume_m5 > self.trading_settings['min_tick_volume_scalping'] * 5:
+            state['liquidity'] = ("Sangat Baik", "green")
+        elif current_spread_points <= self.trading_settings['max_spread'] and avg_tick_volume_m5 > self.trading_settings['min_tick_volume_scalping']:
+            state['liquidity'] = ("Baik", "darkgreen")
+        else:
+            state['liquidity'] = ("Rendah", "red")
+
+        state['overall'] = self.overall_analysis(state['trend'][0], state['higher_tf_trend'][0])
+        return state
+
+    def overall_analysis(self, m5_trend_text, h1_trend_text):
+        """
+        Menentukan analisis keseluruhan chart (naik/turun/sideways/volatil)
+        berdasarkan analisis teknikal (tren). Berita hanya untuk informasi, bukan logika trading.
+        Args:
+            m5_trend_text (str): Teks tren M5 dari analyze_market.
+            h1_trend_text (str): Teks tren timeframe lebih tinggi dari analyze_market.
+        Returns:
+            tuple: (status, warna) analisis keseluruhan.
+        """
+        m5_trend = m5_trend_text.split(' ')[0]
+        h1_trend = h1_trend_text.split(' ')[0]
+
+        # Logika analisis keseluruhan hanya berdasarkan indikator teknikal
+        if ("Naik" in m5_trend or "Up" in m5_trend) and ("Up" in h1_trend):
+            return "Potensi Naik Kuat ⬆️⬆️", "green"
+        elif ("Turun" in m5_trend or "Down" in m5_trend) and ("Down" in h1_trend):
+            return "Potensi Turun Kuat ⬇️⬇️", "red"
+        elif ("Naik" in m5_trend or "Up" in h1_trend):
+            return "Potensi Naik ⬆️", "darkgreen"
+        elif ("Turun" in m5_trend or "Down" in h1_trend):
+            return "Potensi Turun ⬇️", "darkred"
+        return "Sideways/Konsolidasi ↔", "blue"
+
+    def publish_account(self, snapshot=None):
+        """
+        Mengirim ringkasan info akun ke subscriber (event "account").
+        Args:
+            snapshot (MarketSnapshot, optional): Jika diberikan, akun dan posisi diambil dari snapshot;
+                jika tidak, diambil langsung dari MT5 (misalnya setelah order dieksekusi).
+        """
+        try:
+            account = snapshot.account if snapshot is not None else self.metadata.account()
+            if not account:
+                return
+            positions = snapshot.positions if snapshot is not None else self.position_tracker.positions(self.primary.symbol)
+            positions = positions or ()
+            self.publish("account", {
+                'balance': account.balance,
+                'equity': account.equity,
+                'margin': account.margin,
+                'margin_free': account.margin_free,
+                'positions': len(positions),
+                'profit': sum(pos.profit for pos in positions),
+            })
+        except Exception as e:
+            self.log(f"Error memperbarui info akun: {str(e)}")
+
+    def _on_position_closed(self, trade):
+        """
+        Callback PositionTracker saat posisi tertutup penuh (oleh bot, SL/TP, stop out, atau manual):
+        mencatatnya ke buku besar, memperbarui win/loss dan hasil trade terakhir, lalu mengirimkannya ke subscriber.
+        Args:
+            trade (ClosedTrade): Posisi yang ditutup.
+        """
+        global win_count, loss_count, last_trade_result
+        if self.ledger is not None:
+            self.ledger.record_close(trade)
+            stats = self.ledger.totals() # Total sepanjang riwayat buku besar, bukan hanya sesi ini
+        else:
+            stats = self.position_tracker.stats()
+        win_count, loss_count = stats['wins'], stats['losses']
+        last_trade_result = "Win" if trade.profit > 0 else "Loss"
+        if trade.reason != "expert": # Penutupan oleh bot sudah dicatat di close_position
+            self.log(f"🏁 Posisi #{trade.position_id} ({trade.symbol}) ditutup oleh {trade.reason.upper()}. "
+                     f"Profit: ${trade.profit:.2f}")
+        self.publish_trade_stats()
+
+    def publish_trade_stats(self):
+        """Mengirim statistik win/loss dan hasil trade terakhir ke subscriber (event "trade_stats")."""
+        self.publish("trade_stats", {
+            'win_count': win_count,
+            'loss_count': loss_count,
+            'last_trade_result': last_trade_result,
+        })
+
+    def train_model(self, pipeline=None):
+        """
+        Melatih model RandomForestClassifier menggunakan data historis M5 dan langsung memakainya.
+        Model ini digunakan untuk strategi AI Long Trade. Dipakai saat belum ada model sama sekali;
+        selama bot berjalan gunakan request_retrain() agar trading tidak tertahan selama fit.
+        Args:
+            pipeline (SymbolPipeline, optional): Pipeline simbol; simbol utama jika None.
+        """
+        pipeline = pipeline or self.primary
+        self.log(f"Memulai pelatihan model {pipeline.symbol}...")
+        result = self._fit_model(pipeline)
+        if result is None:
+            return
+        trained_model, df, train_score, test_score = result
+        self._set_model(pipeline, trained_model, self._save_model(pipeline, trained_model, df, train_score, test_score))
+        self.publish("status", "🟢 BOT READY | Model dilatih")
+
+    def _set_model(self, pipeline, new_model, meta):
+        """Mengaktifkan model pipeline; model simbol utama juga menjadi model global."""
+        global model
+        pipeline.model, pipeline.model_metadata = new_model, meta
+        if pipeline is self.primary:
+            model = new_model
+
+    def _fit_model(self, pipeline):
+        """
+        Mengambil data M5 terbaru dan melatih model baru tanpa mengganti model aktif.
+        Args:
+            pipeline (SymbolPipeline): Pipeline simbol yang dilatih.
+        Returns:
+            tuple or None: (model, df training, akurasi train, akurasi test), atau None jika gagal (sudah dicatat di log).
+        """
+        try:
+            df = self.training_frame(pipeline.symbol)
+            if df is None:
+                self.log("Gagal mendapatkan data historis M5 untuk pelatihan model.")
+                return None
+            
+            # Indikator sama persis dengan yang dipakai saat inferensi (StreamingIndicators di BarCache)
+            if 'tick_volume' not in df.columns or df['tick_volume'].isnull().all():
+                self.log("Peringatan: 'tick_volume' tidak ditemukan di data M5 untuk OBV saat training. Menggunakan nilai nol untuk OBV.")
+                df['obv'] = 0
+
+            try:
+                trained_model, train_score, test_score = train_direction_model(df)
+            except ValueError as e:
+                self.log(str(e))
+                return None
+            
+            self.log(f"Pelatihan model selesai. Akurasi: Train={train_score:.2f}, Test={test_score:.2f}")
+            return trained_model, df, train_score, test_score
+            
+        except Exception as e:
+            self.log(f"Error melatih model: {str(e)}")
+            self.publish("status", "🔴 BOT ERROR | Pelatihan gagal")
+            return None
+
+    def training_frame(self, symbol_name=None):
+        """
+        Data M5 untuk training: MODEL_TRAIN_BARS candle dari terminal, diperpanjang ke belakang dengan riwayat
+        rekaman (MarketRecorder) hingga MODEL_TRAIN_MAX_BARS candle. Indikator dihitung ulang untuk seluruh jendela.
+        Args:
+            symbol_name (str, optional): Simbol; simbol utama jika None.
+        Returns:
+            DataFrame or None: Candle beserta indikator, atau None jika data terminal tidak tersedia.
+        """
+        symbol_name = symbol_name or self.primary.symbol
+        live = self.market_data.rates(symbol_name, AI_TRADING_TIMEFRAME, MODEL_TRAIN_BARS)
+        if live is None or len(live) == 0:
+            return None
+        rates = live
+        if self.recorder is not None and MODEL_TRAIN_MAX_BARS > len(live):
+            recorded = self.recorder.read_rates(symbol_name, AI_TRADING_TIMEFRAME, end=int(live['time'][0]) - 1,
+                                                count=MODEL_TRAIN_MAX_BARS - len(live))
+            if len(recorded):
+                rates = np.concatenate([recorded, live])
+                self.log(f"Training memakai {len(recorded)} candle rekaman + {len(live)} candle terminal.")
+        values = compute_indicator_array(rates['high'], rates['low'], rates['close'], rates['tick_volume'])
+        return rates_to_frame(rates, values)
+
+    def _save_model(self, pipeline, trained_model, df, train_score, test_score):
+        """
+        Menyimpan artefak model. Kegagalan menyimpan hanya dicatat; model tetap bisa dipakai.
+        Returns:
+            dict or None: Metadata artefak, atau None jika gagal disimpan.
+        """
+        try:
+            meta = self.model_store.save(trained_model, df, pipeline.symbol, AI_TRADING_TIMEFRAME, train_score, test_score)
+            self.log(f"💾 Model disimpan: {os.path.basename(meta['path'])} (data {meta['fingerprint']})")
+            return meta
+        except Exception as e:
+            self.log(f"⚠️ Gagal menyimpan artefak model: {str(e)}")
+            return None
+
+    def request_retrain(self, reason="manual", pipeline=None):
+        """
+        Menjadwalkan pelatihan ulang model di background. Aman dipanggil dari thread mana pun;
+        permintaan diabaikan jika pelatihan ulang sebelumnya untuk simbol yang sama masih berjalan.
+        Args:
+            reason (str): Alasan pelatihan ulang (untuk log).
+            pipeline (SymbolPipeline, optional): Pipeline simbol; simbol utama jika None.
+        Returns:
+            concurrent.futures.Future or None: Future pelatihan ulang, atau None jika engine sudah berhenti.
+        """
+        pipeline = pipeline or self.primary
+        with self._retrain_lock:
+            if pipeline.retrain_future is not None and not pipeline.retrain_future.done():
+                self.log(f"Pelatihan ulang model {pipeline.symbol} masih berjalan.")
+                return pipeline.retrain_future
+            try:
+                pipeline.retrain_future = self._model_executor.submit(self._call_logged, self._retrain_in_background,
+                                                                      pipeline, reason)
+            except RuntimeError: # Executor sudah dimatikan (engine berhenti)
+                return None
+            return pipeline.retrain_future
+
+    def _retrain_in_background(self, pipeline, reason):
+        """
+        Melatih model baru di thread model-training lalu menjadwalkan hot-swap di executor trading,
+        sehingga penggantian terjadi di antara dua siklus strategi. Model baru ditolak jika akurasinya
+        pada data holdout lebih buruk dari model aktif (dinilai hanya pada data di luar training model aktif).
+        Args:
+            reason (str): Alasan pelatihan ulang (untuk log).
+        """
+        self.log(f"🔄 Pelatihan ulang model {pipeline.symbol} di background ({reason})...")
+        started = time.perf_counter()
+        result = self._fit_model(pipeline)
+        if result is None:
+            return
+        candidate, df, train_score, test_score = result
+
+        current_model, current_meta = pipeline.model, pipeline.model_metadata
+        if current_model is not None and current_meta is not None:
+            X, y = direction_dataset(df)
+            holdout = X.index[int(len(X) * 0.8):]
+            if len(holdout) and epoch_seconds(df.loc[holdout, 'time'])[0] > current_meta['data_to']:
+                current_score = current_model.score(X.loc[holdout], y.loc[holdout])
+                if test_score < current_score - MODEL_DRIFT_TOLERANCE:
+                    self.log(f"🚫 Model baru ditolak: akurasi holdout {test_score:.2f} < model aktif {current_score:.2f}.")
+                    return
+
+        meta = self._save_model(pipeline, candidate, df, train_score, test_score)
+        try:
+            self._trading_executor.submit(self._call_logged, self._swap_model, pipeline, candidate, meta,
+                                          time.perf_counter() - started)
+        except RuntimeError: # Engine berhenti selama pelatihan
+            pass
+
+    def _swap_model(self, pipeline, new_model, meta, fit_seconds):
+        """
+        Mengganti model aktif secara atomik. Selalu dijalankan di executor trading, sehingga tidak pernah
+        terjadi di tengah siklus analisis (yang menunggu semua pipeline simbol selesai).
+        Model lama disimpan untuk rollback_model().
+        """
+        if pipeline.model is not None:
+            pipeline.previous_model = (pipeline.model, pipeline.model_metadata)
+        self._set_model(pipeline, new_model, meta)
+        self.log(f"🔁 Model {pipeline.symbol} baru aktif (pelatihan {fit_seconds:.1f} detik). Model sebelumnya disimpan untuk rollback.")
+        self.publish("status", "🟢 BOT READY | Model diperbarui")
+
+    def rollback_model(self, pipeline=None):
+        """
+        Mengembalikan model sebelum hot-swap terakhir (model yang sedang aktif menjadi cadangan).
+        Dijalankan lewat submit() agar berurutan dengan siklus strategi.
+        Args:
+            pipeline (SymbolPipeline, optional): Pipeline simbol; simbol utama jika None.
+        Returns:
+            bool: True jika rollback dilakukan.
+        """
+        pipeline = pipeline or self.primary
+        if pipeline.previous_model is None:
+            self.log(f"Tidak ada model {pipeline.symbol} sebelumnya untuk rollback.")
+            return False
+        previous, previous_meta = pipeline.previous_model
+        pipeline.previous_model = (pipeline.model, pipeline.model_metadata)
+        self._set_model(pipeline, previous, previous_meta)
+        name = os.path.basename(previous_meta['path']) if previous_meta else "model tanpa artefak"
+        self.log(f"↩️ Rollback model: {name} aktif kembali.")
+        self.publish("status", "🟢 BOT READY | Model di-rollback")
+        return True
+
+    def compiled_model(self, pipeline=None):
+        """
+        CompiledForest untuk model aktif pipeline. Dikompilasi ulang otomatis saat model diganti
+        (train_model, hot-swap, rollback), sehingga selalu sesuai dengan model pipeline.
+        Args:
+            pipeline (SymbolPipeline, optional): Pipeline simbol; simbol utama jika None.
+        Returns:
+            CompiledForest or None: Model terkompilasi, atau None jika belum ada model.
+        """
+        pipeline = pipeline or self.primary
+        current = pipeline.model
+        if current is None:
+            return None
+        if pipeline.compiled is None or pipeline.compiled.source is not current:
+            pipeline.compiled = CompiledForest(current)
+        return pipeline.compiled
+
+    def check_model_health(self):
+        """
+        Menjadwalkan pelatihan ulang di background untuk setiap simbol yang modelnya basi (ModelStore.is_stale)
+        atau akurasinya pada candle setelah data training turun lebih dari MODEL_DRIFT_TOLERANCE
+        di bawah akurasi test saat dilatih.
+        """
+        for pipeline in list(self.pipelines.values()):
+            self._check_model_health(pipeline)
+
+    def _check_model_health(self, pipeline):
+        current_model, meta = pipeline.model, pipeline.model_metadata
+        if current_model is None:
+            return
+        df = self.market_data.frame(pipeline.symbol, AI_TRADING_TIMEFRAME, MODEL_TRAIN_BARS)
+        if df is None or df.empty:
+            return
+        latest_bar_time = int(epoch_seconds(df['time'])[-1])
+        if meta is None or self.model_store.is_stale(meta, latest_bar_time):
+            self.request_retrain("terjadwal", pipeline)
+            return
+
+        X, y = direction_dataset(df.iloc[:-1]) # Candle terakhir belum selesai; target-nya belum diketahui
+        unseen = epoch_seconds(df.loc[X.index, 'time']) > meta['data_to']
+        if unseen.sum() < MODEL_DRIFT_MIN_BARS or meta.get('test_score') is None:
+            return
+        live_accuracy = current_model.score(X[unseen], y[unseen])
+        if live_accuracy < meta['test_score'] - MODEL_DRIFT_TOLERANCE:
+            self.request_retrain(f"drift: akurasi live {live_accuracy:.2f} vs test {meta['test_score']:.2f}", pipeline)
+
+    def load_or_train_model(self):
+        """
+        Memuat artefak model kompatibel terbaru dari disk saat startup untuk setiap simbol. Tanpa artefak,
+        model simbol utama dilatih langsung dan simbol lain dilatih di background; artefak yang basi
+        (lihat ModelStore.is_stale) tetap dipakai sambil dilatih ulang di background.
+        """
+        for pipeline in list(self.pipelines.values()):
+            self._load_or_train_model(pipeline)
+
+    def _load_or_train_model(self, pipeline):
+        try:
+            loaded_model, meta, failures = self.model_store.load_latest(pipeline.symbol, AI_TRADING_TIMEFRAME)
+        except Exception as e:
+            self.log(f"⚠️ Gagal membaca artefak model {pipeline.symbol}: {str(e)}")
+            loaded_model, meta, failures = None, None, []
+        for path, error in failures:
+            self.log(f"⚠️ Gagal memuat artefak model {os.path.basename(path)}: {str(error)}")
+
+        if meta is None:
+            self.log(f"Tidak ada artefak model {pipeline.symbol} yang kompatibel.")
+            self._train_at_startup(pipeline)
+            return
+
+        latest = broker.copy_rates_from_pos(pipeline.symbol, AI_TRADING_TIMEFRAME, 0, 1)
+        if latest is None or len(latest) == 0:
+            self.log(f"Gagal mendapatkan candle terbaru {pipeline.symbol} untuk memeriksa umur model.")
+            self._train_at_startup(pipeline)
+            return
+
+        self._set_model(pipeline, loaded_model, meta)
+        if self.model_store.is_stale(meta, int(latest['time'][-1])):
+            # Model basi tetap dipakai selama model baru dilatih di background
+            trained_until = datetime.datetime.fromtimestamp(meta['data_to']).strftime('%Y-%m-%d %H:%M')
+            self.log(f"Artefak model {pipeline.symbol} basi (data sampai {trained_until}). Dipakai sementara, melatih ulang di background...")
+            self.request_retrain("model basi", pipeline)
+            return
+
+        self.log(f"📂 Model dimuat dari {os.path.basename(meta['path'])} (data {meta['fingerprint']}, "
+                 f"Test={meta['test_score'] if meta['test_score'] is not None else float('nan'):.2f})")
+        self.publish("status", "🟢 BOT READY | Model dimuat")
+
+    def _train_at_startup(self, pipeline):
+        """Simbol utama dilatih langsung (mode AI butuh model); simbol lain di background agar startup tidak tertahan."""
+        if pipeline is self.primary:
+            self.train_model(pipeline)
+        else:
+            self.request_retrain("belum ada model", pipeline)
+
+    @profiled("order.close_all_positions")
+    def close_all_positions(self):
+        """
+        Menutup semua posisi trading yang terbuka untuk semua simbol yang diperdagangkan engine (flatten darurat).
+        Order penutupan semua tiket dikirim bersamaan (maksimal CLOSE_ALL_WORKERS), masing-masing dengan
+        retry dan harga barunya sendiri (lihat _close_ticket). Posisi, akun, dan statistik trade diperbarui
+        sekali setelah semua tiket selesai, dan durasi per tiket dicatat ke log.
+        Returns:
+            list: CloseResult per tiket (kosong jika tidak ada posisi atau terjadi error).
+        """
+        try:
+            # Tanpa snapshot sebelumnya (misalnya --flatten) pelacak belum punya waktu server, sehingga
+            # deal penutupan tidak akan terhitung; waktu tick simbol utama menjadi baseline polling deal.
+            tick = broker.symbol_info_tick(self.primary.symbol)
+            positions = self.position_tracker.all_positions(refresh=True,
+                                                            reference_time=None if tick is None else tick.time)
+            if len(positions) == 0:
+                self.log("Tidak ada posisi terbuka untuk ditutup.")
+                return []
+
+            self.log(f"Mencoba menutup {len(positions)} posisi secara bersamaan...")
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=min(CLOSE_ALL_WORKERS, len(positions)),
+                                    thread_name_prefix="close-all") as executor:
+                results = list(executor.map(self._close_ticket, positions))
+            elapsed = time.perf_counter() - started
+
+            for result in results:
+                timing = f"{result.attempts} percobaan, {result.elapsed * 1000:.1f} ms"
+                if result.closed >= result.volume - 1e-9:
+                    self.log(f"✅ #{result.ticket} {result.symbol}: {result.closed:.2f} lot ditutup ({timing})")
+                else:
+                    reason = "Tidak ada respons" if result.retcode is None else self.get_error_message(result.retcode)
+                    self.log(f"❌ #{result.ticket} {result.symbol}: {result.closed:.2f}/{result.volume:.2f} lot ditutup, "
+                             f"{reason} ({timing})")
+            done = sum(1 for result in results if result.closed >= result.volume - 1e-9)
+            slowest = max(result.elapsed for result in results)
+            self.log(f"{'✅' if done == len(results) else '⚠️'} {done}/{len(results)} posisi ditutup dalam "
+                     f"{elapsed * 1000:.1f} ms (tiket terlama {slowest * 1000:.1f} ms).")
+
+            self.position_tracker.sync(force=True)
+            self.publish_account()
+            self.publish_trade_stats()
+            return results
+
+        except Exception as e:
+            self.log(f"Error closing positions: {str(e)}")
+            return []
+
+    @profiled("order.calculate_lot_size")
+    def calculate_lot_size_by_risk(self, risk_amount_usd, sl_pips_for_trade, current_price, symbol_info=None):
+        """
+        Menghitung ukuran lot yang tepat berdasarkan jumlah uang yang bersedia dirisikokan
+        dan Stop Loss dalam pips. Ini memastikan manajemen risiko yang konsisten.
+        Args:
+            risk_amount_usd (float): Jumlah maksimum USD yang bersedia dirisikokan per trade.
+            sl_pips_for_trade (float): Jarak Stop Loss dalam pips untuk trade ini.
+            current_price (float): Harga masuk pasar saat ini (digunakan untuk mendapatkan info simbol).
+            symbol_info (mt5.SymbolInfo, optional): Info simbol dari snapshot; diambil dari MT5 jika None.
+        Returns:
+            float: Ukuran lot yang dihitung, dibulatkan ke volume step yang valid.
+        """
+        if symbol_info is None:
+            symbol_info = self.metadata.spec(self.primary.symbol)
+        if symbol_info is None:
+            self.log(f"Gagal mendapatkan info simbol untuk {self.primary.symbol} di calculate_lot_size_by_risk.")
+            return 0.0
+
+        if sl_pips_for_trade <= 0:
+            self.log("ERROR: SL Pips untuk perhitungan lot harus lebih dari nol.")
+            return 0.0
+
+        calculated_lot_size = float(lot_size_for_risk(risk_amount_usd, sl_pips_for_trade, symbol_info.volume_min,
+                                                      symbol_info.volume_max, symbol_info.volume_step))
+        
+        self.log(f"Perhitungan Lot: Risiko=${risk_amount_usd:.2f}, SL={sl_pips_for_trade} pips, Lot Dihitung={calculated_lot_size:.2f}")
+
+        return calculated_lot_size
+
+    @profiled("order.execute_trade")
+    def execute_trade(self, signal, price, df, lot_size_override=None, tp_pips_override=None, sl_pips_override=None, symbol_info=None,
+                      callback=None, symbol_name=None):
+        """
+        Mengeksekusi order trading (BUY/SELL) dengan parameter yang ditentukan.
+        Ini adalah fungsi inti untuk membuka posisi. Order dan retry-nya dijalankan oleh OrderExecutor,
+        sehingga fungsi ini langsung kembali; hanya satu entry per simbol yang diproses dalam satu waktu.
+        Args:
+            signal (int): 1 untuk BUY, 0 untuk SELL.
+            price (float): Harga eksekusi order (ask untuk BUY, bid untuk SELL).
+            df (DataFrame): DataFrame data candle terbaru untuk logging indikator.
+            lot_size_override (float, optional): Ukuran lot yang akan digunakan, jika tidak, pakai dari pengaturan.
+            tp_pips_override (float, optional): TP dalam pips, jika tidak, pakai dari pengaturan.
+            sl_pips_override (float, optional): SL dalam pips, jika tidak, pakai dari pengaturan.
+            symbol_info (mt5.SymbolInfo, optional): Info simbol dari snapshot; diambil dari MT5 jika None.
+            callback (callable, optional): Dipanggil dengan hasil order_send (atau None) setelah order selesai,
+                dari thread worker order.
+            symbol_name (str, optional): Simbol yang diperdagangkan; simbol utama jika None.
+        Returns:
+            concurrent.futures.Future or None: Future hasil order_send MT5, atau None jika order tidak dikirim.
+        """
+        pipeline = self.pipeline_for(symbol_name)
+        symbol_name = pipeline.symbol
+        if pipeline.entry_future is not None and not pipeline.entry_future.done():
+            self.log("⏳ Entry sebelumnya masih diproses. Entry baru dilewati.")
+            return None
+        try:
+            lot_size = lot_size_override if lot_size_override is not None else self.trading_settings['lot_size']
+            tp_pips = tp_pips_override if tp_pips_override is not None else self.trading_settings['tp_pips']
+            sl_pips = sl_pips_override if sl_pips_override is not None else self.trading_settings['sl_pips']
+            
+            entry_method = self.trading_settings['entry_method']
+            max_retry = self.trading_settings['max_retry']
+            
+            if symbol_info is None:
+                symbol_info = self.metadata.spec(symbol_name)
+            if symbol_info is None:
+                self.log(f"Gagal mendapatkan info simbol untuk {symbol_name}")
+                return None
+                
+            point = symbol_info.point
+            pip_value = point * 10 # 1 pip = 10 points for XAUUSD typically
+            
+            if signal == 1: # BUY
+                take_profit_price = price + tp_pips * pip_value
+                stop_loss_price = price - sl_pips * pip_value
+                order_type = mt5.ORDER_TYPE_BUY
+            else: # SELL
+                take_profit_price = price - tp_pips * pip_value
+                stop_loss_price = price + sl_pips * pip_value
+                order_type = mt5.ORDER_TYPE_SELL
+            
+            last_row = df.iloc[-1]
+            self.log(f"📊 INDICATORS for Trade:")
+            self.log(f"    Harga: {last_row['close']:.2f}, RSI: {last_row['rsi']:.2f}, MACD Hist: {last_row['macd_hist']:.4f}")
+            self.log(f"    EMA: {last_row['ema20']:.2f}/{last_row['ema50']:.2f}, BB Width: {last_row['bb_width']:.4f}, ATR: {last_row['atr']:.2f}")
+            self.log(f"    OBV: {last_row.get('obv', 'N/A')}")
+            
+            if entry_method == "Instant":
+                steps = self._instant_order_steps(symbol_name, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry)
+            elif entry_method == "Pending Order":
+                steps = self._pending_order_steps(symbol_name, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry)
+            elif entry_method == "Stop Limit":
+                steps = self._stop_limit_order_steps(symbol_name, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry)
+            elif entry_method == "Market on Close":
+                steps = self._market_on_close_steps(symbol_name, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry)
+            else:
+                self.log(f"Metode entry tidak dikenal: {entry_method}")
+                return None
+
+            entry = None
+            if self.ledger is not None:
+                meta = pipeline.model_metadata or {}
+                entry = {
+                    'symbol_name': symbol_name,
+                    'strategy': current_mode,
+                    'model_version': os.path.basename(meta.get('path', "")) or meta.get('fingerprint'),
+                    'indicators': {column: float(last_row[column]) for column in ['close'] + INDICATOR_COLUMNS
+                                   if column in last_row.index and pd.notna(last_row[column])},
+                }
+
+            future = self.order_executor.submit(steps, entry_method)
+            pipeline.entry_future = future
+            future.add_done_callback(lambda done: self._on_order_done(done, callback, entry))
+            return future
+                
+        except Exception as e:
+            self.log(f"Error dalam eksekusi trade: {str(e)}")
+            return None
+
+    def send_order(self, path, request, reference_price=None, attempt=1):
+        """
+        Mengirim request ke broker.order_send dan merekam latensi, retcode, slippage, dan retry di execution_stats.
+        Args:
+            path (str): Jalur order untuk metrik (misalnya "Instant", "Close").
+            request (dict): Request order_send.
+            reference_price (float, optional): Harga yang diputuskan strategi; default harga di request.
+            attempt (int): Nomor percobaan (1 = tanpa retry).
+        Returns:
+            mt5.TradeRequestResult or None: Hasil order_send.
+        """
+        started = time.perf_counter()
+        result = broker.order_send(request)
+        latency = time.perf_counter() - started
+
+        retcode = None if result is None else result.retcode
+        if retcode in (mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_PLACED, mt5.TRADE_RETCODE_DONE_PARTIAL):
+            self.metadata.invalidate_account()
+            self.position_tracker.invalidate()
+        slippage = retries = None
+        if retcode == mt5.TRADE_RETCODE_DONE:
+            retries = attempt - 1
+            reference = reference_price if reference_price is not None else request.get('price')
+            point = self.symbol_point(request.get('symbol', symbol))
+            if request.get('action') == mt5.TRADE_ACTION_DEAL and reference and result.price and point:
+                direction = 1 if request.get('type') == mt5.ORDER_TYPE_BUY else -1
+                slippage = direction * (result.price - reference) / point
+        self.execution_stats.record(path, latency, retcode, slippage, retries)
+        if self.ledger is not None:
+            self.ledger.record_order(path, request, result, latency, current_mode)
+        return result
+
+    def symbol_point(self, symbol_name):
+        """Ukuran poin simbol (untuk konversi slippage), atau None jika info simbol tidak tersedia."""
+        info = self.metadata.spec(symbol_name)
+        return info.point if info is not None else None
+
+    def log_execution_report(self):
+        """
+        Mencatat ringkasan metrik eksekusi order (p50/p95/p99) per jalur, cache metadata broker, dan
+        keterlambatan jadwal analisis ke log.
+        """
+        summary = self.execution_stats.summary()
+
+        def fmt(values, unit, digits=1):
+            return " / ".join("-" if v is None else f"{v:.{digits}f}" for v in values) + unit
+
+        self.log("--- Statistik Eksekusi Order (p50 / p95 / p99) ---")
+        if not summary:
+            self.log("Belum ada order yang tercatat untuk statistik eksekusi.")
+        for path, stats in summary.items():
+            retcodes = ", ".join(f"{code}: {count}" for code, count in sorted(stats['retcodes'].items(), key=lambda item: -item[1]))
+            self.log(f"{path}: {stats['count']} order | Latensi {fmt(stats['latency_ms'], ' ms', 2)} | "
+                     f"Slippage {fmt(stats['slippage_points'], ' poin')} | Retry {fmt(stats['retries'], '')} | Retcode {retcodes}")
+        cache = " | ".join(f"{name} {hits} hit/{misses} miss" for name, (hits, misses) in self.metadata.stats().items())
+        self.log(f"Cache metadata broker: {cache}")
+        tracker = self.position_tracker.stats()
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in tracker['closes_by_reason'].items()) or "-"
+        self.log(f"Pelacak posisi: {tracker['deal_polls']} polling deal, {tracker['full_fetches']} ambil posisi penuh, "
+                 f"{tracker['deals_applied']} deal | Ditutup per alasan {reasons} | "
+                 f"Profit terealisasi ${tracker['realized_profit']:.2f}")
+        for trigger, stats in self.scheduler.lateness_summary().items():
+            self.log(f"Jadwal analisis '{trigger}': {stats['count']} siklus | Keterlambatan {fmt(stats['lateness_ms'], ' ms', 1)}")
+        if self.ledger is not None:
+            self.ledger.flush()
+            for row in self.ledger.rollup(('strategy',)):
+                self.log(f"Buku besar '{row['strategy']}': {row['trades']} trade | Winrate {row['winrate']:.1%} | "
+                         f"Profit ${row['profit']:.2f}")
+            if self.ledger.write_errors:
+                self.log(f"⚠️ Buku besar: {self.ledger.write_errors} batch gagal ditulis", logging.WARNING)
+        self.log("--------------------------------------------------")
+
+    def _on_order_done(self, future, callback=None, entry=None):
+        """
+        Callback Future order: mencatat error eksekusi, mencatat fill ke buku besar (dengan konteks `entry`
+        dari execute_trade), dan meneruskan hasil ke callback pemanggil.
+        """
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.log(f"Error dalam eksekusi trade: {str(error)}")
+        elif entry is not None and self.ledger is not None:
+            result = future.result()
+            if result is not None and result.retcode in (mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_PLACED):
+                self.ledger.record_fill(result=result, **entry)
+        if callback is not None:
+            try:
+                callback(None if error is not None else future.result())
+            except Exception as e:
+                self.log(f"⚠️ Error di callback order: {e}")
+
+    def _instant_order_steps(self, symbol_name, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry=3, path="Instant"):
+        """
+        Mengeksekusi order instan (Market Execution).
+        Melakukan pengecekan spread, margin, dan mencoba kembali jika terjadi requote.
+        Args:
+            symbol_name (str): Simbol yang diperdagangkan.
+            order_type (int): Tipe order MT5 (mt5.ORDER_TYPE_BUY atau mt5.ORDER_TYPE_SELL).
+            price (float): Harga eksekusi yang diinginkan.
+            lot_size (float): Ukuran lot.
+            take_profit_price (float): Harga Take Profit.
+            stop_loss_price (float): Harga Stop Loss.
+            max_retry (int): Jumlah maksimum percobaan jika order gagal karena requote/perubahan harga.
+            path (str): Nama jalur order untuk execution_stats.
+        Yields:
+            float: Jeda dasar (detik) sebelum percobaan berikutnya (lihat OrderExecutor).
+        Returns:
+            mt5.TradeRequestResult or None: Hasil dari operasi order_send.
+        """
+        account = self.metadata.account()
+        if account is None:
+            self.log("❌ Gagal mendapatkan info akun.")
+            return None
+            
+        symbol_info = self.metadata.quote(symbol_name)
+        if symbol_info is None:
+            self.log(f"❌ Gagal mendapatkan info simbol untuk {symbol_name}.")
+            return None
+            
+        point = symbol_info.point
+        
+        if not symbol_info.visible or not symbol_info.trade_mode == mt5.SYMBOL_TRADE_MODE_FULL:
+            self.log("❌ Simbol tidak tersedia untuk trading.")
+            return None
+            
+        spread = symbol_info.ask - symbol_info.bid
+        current_spread_points = spread / point
+        if current_spread_points > self.trading_settings['max_spread']:
+            self.log(f"❌ Spread terlalu lebar: {current_spread_points:.1f} poin (maks {self.trading_settings['max_spread']:.1f}).")
+            return None
+            
+        if order_type == mt5.ORDER_TYPE_BUY:
+            required_margin = broker.order_calc_margin(
+                mt5.ORDER_TYPE_BUY, symbol_name, lot_size, symbol_info.ask
+            )
+        else:
+            required_margin = broker.order_calc_margin(
+                mt5.ORDER_TYPE_SELL, symbol_name, lot_size, symbol_info.bid
+            )
+            
+        if required_margin is None:
+            self.log("❌ Gagal menghitung margin yang dibutuhkan.")
+            return None
+            
+        if account.margin_free < required_margin:
+            self.log(f"❌ Margin tidak cukup. Dibutuhkan: ${required_margin:.2f}, Tersedia: ${account.margin_free:.2f}.")
+            return None
+            
+        for attempt in range(max_retry + 1):
+            tick = broker.symbol_info_tick(symbol_name)
+            if tick is None:
+                self.log("Gagal mendapatkan tick terbaru saat retry untuk instant order.")
+                yield 0.5
+                continue
+
+            current_price_for_order = tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid
+                
+            request = {
+                "action": mt5.TRADE_ACTION_DEAL,
+                "symbol": symbol_name,
+                "volume": lot_size,
+                "type": order_type,
+                "price": current_price_for_order,
+                "sl": stop_loss_price,
+                "tp": take_profit_price,
+                "deviation": 10,
+                "magic": 123456,
+                "comment": f"AI Instant Entry (Attempt {attempt+1})",
+                "type_time": mt5.ORDER_TIME_GTC,
+                "type_filling": mt5.ORDER_FILLING_FOK,
+            }
+            
+            result = self.send_order(path, request, price, attempt+1)
+            
+            if result is None:
+                self.log(f"❌ Hasil order_send (Instant) adalah None. Kemungkinan masalah koneksi atau server. Percobaan {attempt+1}/{max_retry}")
+                if attempt < max_retry:
+                    yield 1
+                    continue
+                else:
+                    return None
+
+            if result.retcode == mt5.TRADE_RETCODE_DONE:
+                self.handle_order_result(result, "Instant", attempt+1)
+                return result
+            elif result.retcode in [mt5.TRADE_RETCODE_REQUOTE, mt5.TRADE_RETCODE_PRICE_CHANGED]:
+                self.log(f"🔄 Harga berubah. Mencoba lagi (Percobaan {attempt+1}/{max_retry})...")
+                yield 0.5
+                continue
+            else:
+                self.handle_order_result(result, "Instant", attempt+1)
+                return result
+                
+        return result
+
+    def _pending_order_steps(self, symbol_name, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry=3):
+        """
+        Mengeksekusi order pending (Limit Order).
+        Akan ditempatkan di harga tertentu, di bawah harga saat ini untuk BUY LIMIT,
+        atau di atas harga saat ini untuk SELL LIMIT.
+        Args:
+            symbol_name (str): Simbol yang diperdagangkan.
+            order_type (int): Tipe order MT5 (mt5.ORDER_TYPE_BUY atau mt5.ORDER_TYPE_SELL).
+            price (float): Harga saat ini (digunakan untuk menentukan harga limit).
+            lot_size (float): Ukuran lot.
+            take_profit_price (float): Harga Take Profit.
+            stop_loss_price (float): Harga Stop Loss.
+            max_retry (int): Jumlah maksimum percobaan.
+        Yields:
+            float: Jeda dasar (detik) sebelum percobaan berikutnya (lihat OrderExecutor).
+        Returns:
+            mt5.TradeRequestResult or None: Hasil dari operasi order_send.
+        """
+        symbol_info = self.metadata.spec(symbol_name)
+        if symbol_info is None:
+            self.log(f"Gagal mendapatkan info simbol untuk {symbol_name} saat pending order.")
+            return None
+        point = symbol_info.point
+
+        if order_type == mt5.ORDER_TYPE_BUY:
+            pending_type = mt5.ORDER_TYPE_BUY_LIMIT
+            entry_price = price - (10 * point) # Example: 1 pip below current price
+        else:
+            pending_type = mt5.ORDER_TYPE_SELL_LIMIT
+            entry_price = price + (10 * point) # Example: 1 pip above current price
+            
+        for attempt in range(max_retry + 1):
+            request = {
+                "action": mt5.TRADE_ACTION_PENDING,
+                "symbol": symbol_name,
+                "volume": lot_size,
+                "type": pending_type,
+                "price": entry_price,
+                "sl": stop_loss_price,
+                "tp": take_profit_price,
+                "deviation": 10,
+                "magic": 123456,
+                "comment": f"AI Pending Entry (Attempt {attempt+1})",
+                "type_time": mt5.ORDER_TIME_GTC,
+                "type_filling": mt5.ORDER_FILLING_IOC, # Immediate or Cancel
+            }
+            
+            result = self.send_order("Pending Order", request, price, attempt+1)
+            
+            if result is None:
+                self.log(f"❌ Hasil order_send (Pending) adalah None. Kemungkinan masalah koneksi atau server. Percobaan {attempt+1}/{max_retry}")
+                if attempt < max_retry:
+                    yield 1
+                    continue
+                else:
+                    return None
+            
+            if result.retcode == mt5.TRADE_RETCODE_DONE or attempt == max_retry:
+                self.handle_order_result(result, "Pending", attempt+1)
+                return result
+                
+            yield 1
+            self.log(f"🔄 Retry {attempt+1}/{max_retry} for Pending Order...")
+            
+        return result
+
+    def _stop_limit_order_steps(self, symbol_name, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry=3):
+        """
+        Mengeksekusi order Stop Limit.
+        Order Stop Limit membutuhkan dua harga: harga stop (trigger) dan harga limit (eksekusi).
+        Args:
+            symbol_name (str): Simbol yang diperdagangkan.
+            order_type (int): Tipe order MT5 (mt5.ORDER_TYPE_BUY atau mt5.ORDER_TYPE_SELL).
+            price (float): Harga saat ini.
+            lot_size (float): Ukuran lot.
+            take_profit_price (float): Harga Take Profit.
+            stop_loss_price (float): Harga Stop Loss.
+            max_retry (int): Jumlah maksimum percobaan.
+        Yields:
+            float: Jeda dasar (detik) sebelum percobaan berikutnya (lihat OrderExecutor).
+        Returns:
+            mt5.TradeRequestResult or None: Hasil dari operasi order_send.
+        """
+        symbol_info = self.metadata.spec(symbol_name)
+        if symbol_info is None:
+            self.log(f"Gagal mendapatkan info simbol untuk {symbol_name} saat stop limit order.")
+            return None
+        point = symbol_info.point
+
+        if order_type == mt5.ORDER_TYPE_BUY:
+            stop_limit_type = mt5.ORDER_TYPE_BUY_STOP_LIMIT
+            stop_price = price + (10 * point)  # Price at which stop limit becomes active
+            limit_price = price + (5 * point)   # Limit price for the buy
+        else:
+            stop_limit_type = mt5.ORDER_TYPE_SELL_STOP_LIMIT
+            stop_price = price - (10 * point)  # Price at which stop limit becomes active
+            limit_price = price - (5 * point)   # Limit price for the sell
+            
+        for attempt in range(max_retry + 1):
+            request = {
+                "action": mt5.TRADE_ACTION_PENDING,
+                "symbol": symbol_name,
+                "volume": lot_size,
+                "type": stop_limit_type,
+                "price": limit_price,
+                "stoplimit": stop_price, # This is the trigger price for STOP_LIMIT orders
+                "sl": stop_loss_price,
+                "tp": take_profit_price,
+                "deviation": 10,
+                "magic": 123456,
+                "comment": f"AI Stop Limit Entry (Attempt {attempt+1})",
+                "type_time": mt5.ORDER_TIME_GTC,
+                "type_filling": mt5.ORDER_FILLING_IOC,
+            }
+            
+            result = self.send_order("Stop Limit", request, price, attempt+1)
+            
+            if result is None:
+                self.log(f"❌ Hasil order_send (Stop Limit) adalah None. Kemungkinan masalah koneksi atau server. Percobaan {attempt+1}/{max_retry}")
+                if attempt < max_retry:
+                    yield 1
+                    continue
+                else:
+                    return None
+
+            if result.retcode == mt5.TRADE_RETCODE_DONE or attempt == max_retry:
+                self.handle_order_result(result, "Stop Limit", attempt+1)
+                return result
+                
+            yield 1
+            self.log(f"🔄 Retry {attempt+1}/{max_retry} for Stop Limit Order...")
+                
+        return result
+
+    def _market_on_close_steps(self, symbol_name, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry=3):
+        """
+        Mengeksekusi order "Market on Close".
+        Jika waktu saat ini sangat dekat dengan penutupan candle, order akan dieksekusi sebagai order instan.
+        Jika tidak, order pending akan ditempatkan dan akan kadaluarsa pada penutupan candle.
+        Args:
+            symbol_name (str): Simbol yang diperdagangkan.
+            order_type (int): Tipe order MT5 (mt5.ORDER_TYPE_BUY atau mt5.ORDER_TYPE_SELL).
+            price (float): Harga saat ini.
+            lot_size (float): Ukuran lot.
+            take_profit_price (float): Harga Take Profit.
+            stop_loss_price (float): Harga Stop Loss.
+            max_retry (int): Jumlah maksimum percobaan.
+        Yields:
+            float: Jeda dasar (detik) sebelum percobaan berikutnya (lihat OrderExecutor).
+        Returns:
+            mt5.TradeRequestResult or None: Hasil dari operasi order.
+        """
+        rates = self.market_data.rates(symbol_name, AI_TRADING_TIMEFRAME, 1)
+        if rates is None:
+            self.log("Gagal mendapatkan data candle untuk Market on Close.")
+            return None
+            
+        candle_time = pd.to_datetime(rates[0]['time'], unit='s')
+        current_time = datetime.datetime.now()
+        time_diff = (current_time - candle_time).total_seconds()
+        
+        # If very close to candle close, execute as instant order
+        if time_diff > (broker.period_seconds(AI_TRADING_TIMEFRAME) - 10):
+            self.log("Melakukan Market on Close sebagai Instant Order (dekat penutupan candle).")
+            return (yield from self._instant_order_steps(symbol_name, order_type, price, lot_size, take_profit_price, stop_loss_price, max_retry,
+                                                         path="Market on Close"))
+        else:
+            # Place a pending order expiring at the next candle close
+            expiration = candle_time + datetime.timedelta(seconds=broker.period_seconds(AI_TRADING_TIMEFRAME))
+            
+            for attempt in range(max_retry + 1):
+                request = {
+                    "action": mt5.TRADE_ACTION_PENDING,
+                    "symbol": symbol_name,
+                    "volume": lot_size,
+                    "type": mt5.ORDER_TYPE_BUY_LIMIT if order_type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_SELL_LIMIT,
+                    "price": price,
+                    "sl": stop_loss_price,
+                    "tp": take_profit_price,
+                    "deviation": 10,
+                    "magic": 123456,
+                    "comment": f"AI Market on Close (Attempt {attempt+1})",
+                    "type_time": mt5.ORDER_TIME_SPECIFIED,
+                    "type_filling": mt5.ORDER_FILLING_IOC,
+                    "expiration": int(expiration.timestamp())
+                }
+                
+                result = self.send_order("Market on Close", request, price, attempt+1)
+                
+                if result is None:
+                    self.log(f"❌ Hasil order_send (MOC) adalah None. Kemungkinan masalah koneksi atau server. Percobaan {attempt+1}/{max_retry}")
+                    if attempt < max_retry:
+                        yield 1
+                        continue
+                    else:
+                        return None
+
+                if result.retcode == mt5.TRADE_RETCODE_DONE or attempt == max_retry:
+                    self.handle_order_result(result, "Market on Close", attempt+1)
+                    return result
+                        
+                yield 1
+                self.log(f"🔄 Retry {attempt+1}/{max_retry} for Market on Close...")
+                        
+            return result
+
+    def handle_order_result(self, result, order_type, attempt=1):
+        """
+        Memproses hasil dari operasi order_send dan mencatatnya ke log.
+        Args:
+            result (mt5.TradeRequestResult): Objek hasil dari order_send.
+            order_type (str): Tipe order (misalnya, "Instant", "Pending").
+            attempt (int): Nomor percobaan order.
+        """
+        global win_count, loss_count, last_trade_result
+        
+        if result.retcode != mt5.TRADE_RETCODE_DONE:
+            error_msg = self.get_error_message(result.retcode)
+            self.log(f"❌ Gagal mengeksekusi order {order_type} (Percobaan {attempt}): {error_msg}. Retcode: {result.retcode}")
+            last_trade_result = "Gagal"
+        else:
+            self.log(f"🎯 {order_type} {'BELI' if result.request.type==mt5.ORDER_TYPE_BUY else 'JUAL'} @ {result.price:.2f}")
+            self.log(f"    TP: {result.request.tp:.2f} | SL: {result.request.sl:.2f} | Lot: {result.request.volume:.2f}")
+            last_trade_result = "Berhasil"
+            
+        self.publish_account()
+        self.publish_trade_stats() # Perbarui label hasil trade
+
+    @profiled("analysis.check_economic_news")
+    def check_economic_news(self):
+        """
+        Mengecek berita ekonomi yang disimulasikan dan mengirim status dampak berita ke subscriber (event "news").
+        Fungsi ini mensimulasikan pengambilan data berita ekonomi, dalam aplikasi nyata
+        ini akan memanggil API berita eksternal.
+        """
+        global current_news_impact, news_event_time, last_high_impact_news_time
+
+        self.publish("news", {'status': ("Mengecek berita...", "gray")})
+
+        # Simpan dampak berita aktual untuk tujuan tampilan UI saja
+        display_news_impact = "None"
+        display_news_impact_color = "green"
+
+        try:
+            news_data = self._simulate_economic_news()
+
+            next_event_time = None
+            next_event_details = "N/A"
+
+            current_time_wib = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7)))
+
+            news_data.sort(key=lambda x: datetime.datetime.strptime(x['time'], "%Y-%m-%d %H:%M:%S"))
+
+            for news_item in news_data:
+                news_time = datetime.datetime.strptime(news_item['time'], "%Y-%m-%d %H:%M:%S")
+
+                if news_time > current_time_wib.replace(tzinfo=None):
+                    # Ditemukan event berita di masa depan, simpan yang paling awal
+                    if next_event_time is None or news_time < next_event_time:
+                        next_event_time = news_time
+                        next_event_details = f"{news_item['headline']} ({news_item['impact']}) pada {news_time.strftime('%H:%M')}"
+
+                # Cek dampak berita yang aktif HANYA UNTUK TAMPILAN
+                if current_time_wib.replace(tzinfo=None) >= news_time and \
+                   (current_time_wib.replace(tzinfo=None) - news_time).total_seconds() / 60 < news_effect_duration_minutes:
+                    if news_item['impact'] == 'High':
+                        display_news_impact = "TINGGI"
+                        display_news_impact_color = "red"
+                        self.log(f"🔥 BERITA BERDAMPAK TINGGI: {news_item['headline']} pada {news_time.strftime('%H:%M:%S')}")
+                        break # Dampak tinggi menimpa yang lain untuk tampilan
+                    elif news_item['impact'] == 'Medium':
+                        if display_news_impact not in ["TINGGI"]: # Menengah hanya jika tidak ada berita berdampak tinggi yang aktif untuk tampilan
+                            display_news_impact = "MENENGAH"
+                            display_news_impact_color = "darkorange"
+                            self.log(f"🔶 BERITA BERDAMPAK MENENGAH: {news_item['headline']} pada {news_time.strftime('%H:%M:%S')}")
+                    elif news_item['impact'] == 'Low':
+                        if display_news_impact not in ["TINGGI", "MENENGAH"]: # Rendah hanya jika tidak ada berita berdampak tinggi/menengah yang aktif untuk tampilan
+                            display_news_impact = "RENDAH"
+                            display_news_impact_color = "blue"
+                            self.log(f"💡 BERITA BERDAMPAK RENDAH: {news_item['headline']} pada {news_time.strftime('%H:%M:%S')}")
+
+            news_state = {'impact': (f"Dampak Saat Ini: {display_news_impact}", display_news_impact_color)}
+            if next_event_time is None:
+                news_state['next'] = ("Berita Selanjutnya: N/A", "black")
+            else:
+                news_state['next'] = (next_event_details, "orange")
+            news_state['status'] = ("Status: Data berita diperbarui", "darkgreen")
+            self.news_state = news_state
+            self.publish("news", news_state)
+
+        except Exception as e:
+            self.log(f"Error mengambil/memproses berita: {str(e)}")
+            self.publish("news", {'status': ("Status: Error", "red")})
+        finally:
+            # PENTING: Setel ulang current_news_impact ke None untuk memastikan tidak memengaruhi logika trading
+            current_news_impact = "None"
+
+    def _simulate_economic_news(self):
+        """
+        Mensimulasikan pengambilan data berita ekonomi.
+        Dalam aplikasi nyata, fungsi ini akan dihubungkan ke API berita ekonomi (misalnya, ForexFactory, Investing.com).
+        """
+        current_time_wib = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7)))
+        
+        simulated_news = [
+            {"event": "Pernyataan FOMC", "headline": "Ketua Fed Memberikan Pidato Penting", "time": (current_time_wib + datetime.timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "High"},
+            {"event": "Rilis Data CPI", "headline": "Inflasi AS Melonjak, Kekhawatiran Meningkat", "time": (current_time_wib - datetime.timedelta(minutes=2)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "High"},
+            {"event": "Klaim Pengangguran", "headline": "Klaim Pengangguran Mingguan Lebih Rendah dari Perkiraan", "time": (current_time_wib + datetime.timedelta(minutes=30)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "Medium"},
+            {"event": "PMI Manufaktur", "headline": "Sektor Manufaktur Menunjukkan Perlambatan", "time": (current_time_wib - datetime.timedelta(minutes=15)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "Low"},
+            {"event": "Pidato Gubernur Bank Sentral", "headline": "Gubernur Bank Sentral Bahas Kebijakan Moneter", "time": (current_time_wib + datetime.timedelta(minutes=60)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "High"},
+            {"event": "Data Penjualan Ritel", "headline": "Penjualan Ritel Melebihi Ekspektasi, Ekonomi Kuat", "time": (current_time_wib + datetime.timedelta(minutes=120)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "Medium"},
+        ]
+        return simulated_news
+
+    @profiled("analysis.run_analysis")
+    def run_analysis(self):
+        """
+        Fungsi dispatcher yang akan memicu strategi trading berdasarkan mode yang aktif.
+        Juga memastikan analisis fundamental dan teknikal terus diperbarui untuk subscriber.
+        """
+        global current_mode
+        
+        if not is_running:
+            return
+        
+        # Satu snapshot per siklus, dipakai bersama oleh tampilan dan strategi
+        snapshot = self.build_snapshot()
+        if snapshot is None:
+            return
+        self.update_market_data(snapshot)
+        self.check_economic_news() # Update news info for UI
+
+        # Perbarui hasil trade terakhir
+        self.publish_trade_stats()
+        
+        if current_mode in ("AI_Long_Trade", "Scalping_Bot", "Sniper_Bot"):
+            self.run_symbol_pipelines(snapshot)
+        elif current_mode == "Monitoring":
+            market, news = self.market_state, self.news_state
+            def text(state, key):
+                return state.get(key, ("-", None))[0]
+            if not self.log_enabled(logging.INFO):
+                return
+            self.log("--- Mode Monitoring ---")
+            self.log(f"Berita: Dampak Saat Ini: {text(news, 'impact').split(': ')[-1]}")
+            self.log(f"Berita: Selanjutnya: {text(news, 'next').split(': ')[-1]}")
+            self.log(f"M5: Tren {text(market, 'trend')} | RSI {text(market, 'rsi')} | OBV {text(market, 'obv')}")
+            self.log(f"H1: Tren {text(market, 'higher_tf_trend')} | SNR {text(market, 'snr')} | Likuiditas {text(market, 'liquidity')}")
+            self.log(f"Analisis Realtime Chart: {text(market, 'overall')}")
+            self.log("-----------------------")
+        else:
+            self.log(f"Mode tidak dikenal: {current_mode}. Menghentikan analisis.")
+            self.set_mode("Stopped")
+
+    def run_symbol_pipelines(self, primary_snapshot):
+        """
+        Menjalankan strategi mode aktif untuk semua simbol. Setiap simbol membangun snapshot-nya sendiri
+        dan dievaluasi di _pipeline_executor (paling banyak SYMBOL_PIPELINE_WORKERS bersamaan);
+        fungsi ini kembali setelah semua pipeline selesai, sehingga siklus analisis tidak saling tumpang tindih.
+        Args:
+            primary_snapshot (MarketSnapshot): Snapshot simbol utama yang sudah dibangun di siklus ini.
+        """
+        if len(self.symbols) == 1:
+            self._run_strategy(primary_snapshot)
+            return
+
+        started = time.perf_counter()
+        futures = [self._pipeline_executor.submit(self._call_logged, self._run_pipeline, pipeline,
+                                                  primary_snapshot if pipeline is self.primary else None)
+                   for pipeline in (self.pipelines[name] for name in self.symbols)]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - started
+        interval = ANALYSIS_INTERVAL_SECONDS.get(current_mode)
+        if interval is not None and elapsed > interval:
+            self.log(f"⚠️ Siklus {len(self.symbols)} simbol butuh {elapsed:.2f} detik, melebihi interval {interval} detik.",
+                     logging.WARNING)
+
+    def _run_pipeline(self, pipeline, snapshot=None):
+        """
+        Satu siklus pipeline simbol di thread pipeline: snapshot lalu strategi (data pasar semua simbol
+        sudah direkam oleh update_market_data). Log dari thread ini diberi prefiks nama simbol.
+        """
+        self._log_context.prefix = f"[{pipeline.symbol}] "
+        try:
+            if snapshot is None:
+                snapshot, error = build_market_snapshot(self.market_data, pipeline.symbol, current_mode, self.metadata,
+                                                        self.position_tracker)
+                if snapshot is None:
+                    self.log(error)
+                    return
+            pipeline.last_snapshot = snapshot
+            self._run_strategy(snapshot)
+        finally:
+            self._log_context.prefix = None
+
+    def _run_strategy(self, snapshot):
+        """Memanggil strategi mode aktif untuk snapshot satu simbol."""
+        if current_mode == "AI_Long_Trade":
+            self._run_ai_long_trade_strategy(snapshot)
+        elif current_mode == "Scalping_Bot":
+            self._run_scalping_strategy(snapshot)
+        elif current_mode == "Sniper_Bot": # Panggil strategi sniper
+            self._run_sniper_strategy(snapshot)
+
+    @profiled("strategy.ai_long_trade")
+    def _run_ai_long_trade_strategy(self, snapshot):
+        """
+        Menganalisis pasar dan mengeksekusi trading untuk strategi AI Long Trade.
+        Strategi ini menggabungkan analisis teknikal (70%) dan fundamental (30%).
+        Fokus pada hold posisi untuk target profit pips yang lebih besar (30-50 pips)
+        dan manajemen uang berbasis USD.
+        Args:
+            snapshot (MarketSnapshot): Snapshot pasar siklus ini.
+        """
+        pipeline = self.pipeline_for(snapshot.symbol)
+        
+        open_positions = snapshot.positions
+        has_open_position = snapshot.has_open_position
+
+        try:
+            df = snapshot.frame(AI_TRADING_TIMEFRAME, 100)
+            df_higher_tf = snapshot.frame(AI_HIGHER_TIMEFRAME, 50)
+            
+            if df is None or df_higher_tf is None:
+                self.log("Gagal mendapatkan data candle untuk analisis AI Long Trade.")
+                return
+
+            if 'tick_volume' not in df.columns or df['tick_volume'].isnull().all(): df['obv'] = 0
+            df = df.dropna()
+
+            if df.empty:
+                self.log("Data candlestick M5 tidak cukup untuk analisis AI Long Trade.")
+                return
+            
+            if not df_higher_tf.empty:
+                df_higher_tf = df_higher_tf.dropna(subset=['sma20', 'sma50'])
+
+            higher_tf_trend = "Sideways"
+            if not df_higher_tf.empty:
+                last_higher_tf = df_higher_tf.iloc[-1]
+                if last_higher_tf['sma20'] > last_higher_tf['sma50']: higher_tf_trend = "Up Trend"
+                elif last_higher_tf['sma20'] < last_higher_tf['sma50']: higher_tf_trend = "Down Trend"
+            
+            latest = df.iloc[-1:]
+            features = latest[AI_FEATURE_COLUMNS]
+            
+            if pipeline.model is None:
+                self.log("Model AI belum dilatih. Tidak dapat melakukan prediksi AI Long Trade.")
+                return
+
+            # Satu pass pohon untuk kelas dan probabilitas (lihat CompiledForest)
+            with profiler.span("model.predict"):
+                signal, proba = self.compiled_model(pipeline).predict(features.to_numpy(dtype=np.float32)[0])
+            confidence = max(proba)
+            
+            tick = snapshot.tick
+            current_price = tick.ask if signal == 1 else tick.bid
+
+            self.log(f"📢 AI Long Trade: Sinyal AI {'BELI' if signal == 1 else 'JUAL'} terdeteksi. Keyakinan: {confidence:.2%}, Tren H1: {higher_tf_trend}")
+            
+            if has_open_position:
+                for pos in open_positions:
+                    target_profit_usd_value = self.trading_settings['target_profit_usd']
+                    target_loss_usd_value = self.trading_settings['target_loss_usd']
+                    max_hold_duration = self.trading_settings['max_hold_duration']
+
+                    # Jam broker: pos.time dan tick.time sama-sama waktu server (juga jam replay SimulatedBroker)
+                    time_in_position = (snapshot.tick.time - pos.time) / 60
+
+                    # Dihapus: Logika penutupan posisi berdasarkan berita
+                    
+                    if pos.profit <= -target_loss_usd_value:
+                        self.log(f"🔴 AI Long Trade: Posisi #{pos.ticket} rugi mencapai target (${pos.profit:.2f}). Menutup untuk cut loss.")
+                        self.close_position(pos)
+                        continue
+                    
+                    if pos.profit >= target_profit_usd_value:
+                        self.log(f"✅ AI Long Trade: Posisi #{pos.ticket} profit mencapai target (${pos.profit:.2f}). Menutup posisi.")
+                        self.close_position(pos)
+                        continue
+                    
+                    is_ai_signal_opposite = (pos.type == mt5.ORDER_TYPE_BUY and signal == 0) or \
+                                             (pos.type == mt5.ORDER_TYPE_SELL and signal == 1)
+                    if is_ai_signal_opposite and confidence >= 0.65 and pos.profit > 0:
+                        self.log(f"🔶 AI Long Trade: Sinyal AI berbalik kuat ({confidence:.2%}). Menutup posisi #{pos.ticket} dengan profit (${pos.profit:.2f}).")
+                        self.close_position(pos)
+                        continue
+
+                    if time_in_position >= max_hold_duration * 4 and pos.profit < 0:
+                        self.log(f"⏰ AI Long Trade: Posisi #{pos.ticket} terlalu lama dipegang tanpa profit. Menutup.")
+                        self.close_position(pos)
+                        continue
+                        
+                    self.log(f"⚪ AI Long Trade: Posisi #{pos.ticket} sedang dipegang (${pos.profit:.2f}). Sinyal AI berlawanan: {is_ai_signal_opposite}, Conf: {confidence:.2%}")
+
+            else: # No open positions, consider opening a new one
+                equity = snapshot.account.equity
+                risk_amount_usd_per_trade = equity * (self.trading_settings['risk_percent'] / 100.0)
+                
+                sl_pips_for_lot_calc = self.trading_settings['sl_pips']
+                calculated_lot_size = self.calculate_lot_size_by_risk(risk_amount_usd_per_trade, sl_pips_for_lot_calc, current_price,
+                                                                      symbol_info=snapshot.symbol_info)
+                
+                if calculated_lot_size <= 0:
+                    self.log("AI Long Trade: Ukuran lot yang dihitung terlalu kecil atau tidak valid. Tidak melakukan entry.")
+                    return
+
+                current_spread_points = snapshot.spread_points
+                liquidity_is_good = (current_spread_points <= self.trading_settings['max_spread'] * 0.75)
+
+                if confidence >= 0.70 and higher_tf_trend == ("Up Trend" if signal == 1 else "Down Trend") and liquidity_is_good:
+                    # Dihapus: Logika penundaan entry berdasarkan berita
+                    self.log(f"✅ AI Long Trade: Melakukan entry {('BELI' if signal == 1 else 'JUAL')} dengan {calculated_lot_size:.2f} lot.")
+                        
+                    tp_pips_final = self.trading_settings['tp_pips']
+                    sl_pips_final = self.trading_settings['sl_pips']
+
+                    self.log(f"    TP: {tp_pips_final:.1f} pips | SL: {sl_pips_final:.1f} pips")
+                        
+                    self.execute_trade(signal, current_price, df,
+                                       lot_size_override=calculated_lot_size,
+                                       tp_pips_override=tp_pips_final,
+                                       sl_pips_override=sl_pips_final,
+                                       symbol_info=snapshot.symbol_info,
+                                       symbol_name=snapshot.symbol)
+                else:
+                    self.log(f"🚫 AI Long Trade: Kondisi tidak ideal untuk entry (Conf: {confidence:.2%}, Tren H1: {higher_tf_trend}, Likuiditas: {'OK' if liquidity_is_good else 'BURUK'}).")
+
+        except Exception as e:
+            self.log(f"⚠️ Error dalam AI Long Trade: {str(e)}")
+
+    @profiled("strategy.scalping")
+    def _run_scalping_strategy(self, snapshot):
+        """
+        Menganalisis pasar dan mengeksekusi trading untuk strategi Scalping (M1).
+        Strategi ini fokus pada RSI overbought/oversold, profit tipis ($0.30 - $2.00),
+        dan manajemen risiko yang ketat.
+        Tidak menunggu likuiditas dan tidak terpaku pada tren candle.
+        Args:
+            snapshot (MarketSnapshot): Snapshot pasar siklus ini.
+        """
+        global current_news_impact
+        
+        open_positions = snapshot.positions
+        has_open_position = snapshot.has_open_position
+
+        try:
+            scalping_min_profit_usd = self.trading_settings.get('target_profit_usd', 0.3)
+            scalping_max_profit_usd = max(scalping_min_profit_usd * self.trading_settings['scalping_max_profit_multiplier'], 2.0)
+            scalping_max_loss_usd = self.trading_settings.get('target_loss_usd', 2.0)
+            be_plus_profit_pips = self.trading_settings['scalping_bep_offset_pips']
+
+            df_m1 = snapshot.frame(SCALPING_TIMEFRAME, 50)
+            df_m5_for_trend = snapshot.frame(SCALPING_HIGHER_TIMEFRAME, 50)
+            
+            if df_m1 is None or df_m5_for_trend is None:
+                self.log("Gagal mendapatkan data candle untuk analisis Scalping.")
+                return
+
+            if 'tick_volume' not in df_m1.columns or df_m1['tick_volume'].isnull().all(): df_m1['obv'] = 0
+            df_m1 = df_m1.dropna(subset=['rsi', 'atr', 'obv'])
+
+            if df_m1.empty or len(df_m1) < 2:
+                self.log("Data candlestick M1 tidak cukup untuk analisis Scalping.")
+                return
+            
+            if not df_m5_for_trend.empty:
+                df_m5_for_trend = df_m5_for_trend.dropna(subset=['sma20', 'sma50'])
+
+            higher_tf_trend_scalping = "Sideways"
+            if not df_m5_for_trend.empty:
+                last_m5_candle = df_m5_for_trend.iloc[-1]
+                if last_m5_candle['sma20'] > last_m5_candle['sma50']: higher_tf_trend_scalping = "Up Trend"
+                elif last_m5_candle['sma20'] < last_m5_candle['sma50']: higher_tf_trend_scalping = "Down Trend"
+            
+            tick = snapshot.tick
+            current_price_ask = tick.ask
+            current_price_bid = tick.bid
+            point = snapshot.symbol_info.point
+
+            self.log(f"⚡ Scalping: M1 Analisis, Tren M5: {higher_tf_trend_scalping}")
+
+            if has_open_position:
+                for pos in open_positions:
+                    pips_gain = (current_price_bid - pos.price_open) / point / 10 if pos.type == mt5.ORDER_TYPE_BUY else (pos.price_open - current_price_ask) / point / 10
+                    
+                    # Jam broker: pos.time dan tick.time sama-sama waktu server (juga jam replay SimulatedBroker)
+                    time_in_position = (snapshot.tick.time - pos.time) / 60
+
+                    if current_news_impact == "High":
+                        self.log(f"🔴 Scalping: BERITA BERDAMPAK TINGGI terdeteksi. Menutup posisi #{pos.ticket} untuk keamanan.")
+                        self.close_position(pos)
+                        continue
+                    
+                    if pos.profit <= -scalping_max_loss_usd:
+                        self.log(f"🔴 Scalping: Posisi #{pos.ticket} rugi mentok (${pos.profit:.2f}). Menutup.")
+                        self.close_position(pos)
+                        continue
+                    
+                    if pos.profit >= scalping_min_profit_usd:
+                        if pos.profit >= scalping_max_profit_usd:
+                            self.log(f"✅ Scalping: Posisi #{pos.ticket} profit max tercapai (${pos.profit:.2f}). Menutup.")
+                            self.close_position(pos)
+                            continue
+                        elif pos.profit >= scalping_min_profit_usd and self._is_bearish_engulfing(df_m1) and pos.type == mt5.ORDER_TYPE_BUY:
+                            self.log(f"✅ Scalping: Posisi #{pos.ticket} profit min tercapai, ada bearish engulfing. Menutup.")
+                            self.close_position(pos)
+                            continue
+                        elif pos.profit >= scalping_min_profit_usd and self._is_bullish_engulfing(df_m1) and pos.type == mt5.ORDER_TYPE_SELL:
+                            self.log(f"✅ Scalping: Posisi #{pos.ticket} profit min tercapai, ada bullish engulfing. Menutup.")
+                            self.close_position(pos)
+                            continue
+                        
+                        # Implement Trailing Stop/Break Even Plus here (if not already at BEP+)
+                        # This checks if SL is still at or below original entry (for buy) or above (for sell)
+                        # And if pips_gain is at least 1 pip.
+                        if pips_gain >= 1 and ((pos.type == mt5.ORDER_TYPE_BUY and pos.sl < pos.price_open + (be_plus_profit_pips * point * 10)) or \
+                                                (pos.type == mt5.ORDER_TYPE_SELL and pos.sl > pos.price_open - (be_plus_profit_pips * point * 10)) or pos.sl == 0.0):
+                            if pos.type == mt5.ORDER_TYPE_BUY:
+                                new_sl_price = pos.price_open + (be_plus_profit_pips * point * 10)
+                            else: # SELL
+                                new_sl_price = pos.price_open - (be_plus_profit_pips * point * 10)
+                            
+                            self.modify_sl_tp(pos.ticket, new_sl_price, pos.tp, "Scalping BEP+")
+
+                    if time_in_position >= self.trading_settings['max_hold_duration']:
+                        self.log(f"⏰ Scalping: Posisi #{pos.ticket} melebihi batas waktu {self.trading_settings['max_hold_duration']} menit. Menutup posisi.")
+                        self.close_position(pos)
+                        continue
+                        
+                    self.log(f"⚪ Scalping: Posisi #{pos.ticket} dipegang (${pos.profit:.2f}).")
+
+            else: # No open positions, consider opening a new one
+                last_m1_candle = df_m1.iloc[-1]
+                
+                last_m1_atr = df_m1['atr'].iloc[-1] if not df_m1['atr'].isnull().iloc[-1] else 0.5
+                sl_pips_dynamic = max(round(last_m1_atr * 10 / point), self.trading_settings['scalping_min_sl_pips'])
+
+                calculated_lot_scalping = self.calculate_lot_size_by_risk(scalping_max_loss_usd, sl_pips_dynamic, current_price_ask,
+                                                                          symbol_info=snapshot.symbol_info)
+                
+                target_profit_usd_scalping = np.random.uniform(scalping_min_profit_usd, scalping_max_profit_usd)
+                tp_pips_dynamic = target_profit_usd_scalping / (calculated_lot_scalping * 10.0) if calculated_lot_scalping > 0 else 1.0
+                tp_pips_dynamic = round(tp_pips_dynamic)
+
+                if calculated_lot_scalping <= 0:
+                    self.log("Scalping: Ukuran lot yang dihitung terlalu kecil atau tidak valid.")
+                    return
+
+                if current_news_impact in ["High", "Medium"]:
+                    self.log("🚫 Scalping: Berita berdampak tinggi/menengah aktif. Menunda entry.")
+                    return
                 
-                result = mt5.order_send(request)
+                entry_signal = None
+                rsi_val = df_m1['rsi'].iloc[-1]
                 
-                if result is None:
-                    self.log(f"❌ Hasil order_send (MOC) adalah None. Kemungkinan masalah koneksi atau server. Percobaan {attempt+1}/{max_retry}")
-                    if attempt < max_retry:
-                        time.sleep(1)
-                        continue
-                    else:
-                        return None
+                # Simplified RSI-based entry logic
+                if rsi_val < self.trading_settings['scalping_rsi_oversold'] and (higher_tf_trend_scalping == "Up Trend" or higher_tf_trend_scalping == "Sideways"):
+                    entry_signal = 1 # Buy on oversold in an uptrend or sideways market
+                    self.log(f"💡 Scalping: RSI Oversold ({rsi_val:.2f}) dan Tren M5 {higher_tf_trend_scalping} (BUY).")
+                elif rsi_val > self.trading_settings['scalping_rsi_overbought'] and (higher_tf_trend_scalping == "Down Trend" or higher_tf_trend_scalping == "Sideways"):
+                    entry_signal = 0 # Sell on overbought in a downtrend or sideways market
+                    self.log(f"💡 Scalping: RSI Overbought ({rsi_val:.2f}) dan Tren M5 {higher_tf_trend_scalping} (SELL).")
 
-                if result.retcode == mt5.TRADE_RETCODE_DONE or attempt == max_retry:
-                    self.handle_order_result(result, "Market on Close", attempt+1)
-                    return result
-                        
-                time.sleep(1)
-                self.log(f"🔄 Retry {attempt+1}/{max_retry} for Market on Close...")
-                        
-            return result
+                if entry_signal is not None:
+                    self.log(f"✅ Scalping: Melakukan entry {('BELI' if entry_signal == 1 else 'JUAL')} dengan {calculated_lot_scalping:.2f} lot.")
+                    self.log(f"    TP: {tp_pips_dynamic:.1f} pips (${target_profit_usd_scalping:.2f}) | SL: {sl_pips_dynamic:.1f} pips (${scalping_max_loss_usd:.2f})")
+                    
+                    self.execute_trade(entry_signal, current_price_ask if entry_signal == 1 else current_price_bid, df_m1, # Use current_price_ask for BUY, current_price_bid for SELL
+                                       lot_size_override=calculated_lot_scalping,
+                                       tp_pips_override=tp_pips_dynamic,
+                                       sl_pips_override=sl_pips_dynamic,
+                                       symbol_info=snapshot.symbol_info,
+                                       symbol_name=snapshot.symbol)
+                else:
+                    self.log("🚫 Scalping: Kondisi RSI/Tren tidak ideal untuk entry.")
+
+        except Exception as e:
+            self.log(f"⚠️ Error dalam Scalping: {str(e)}")
+
+    def _is_bullish_engulfing(self, df):
+        """
+        Mendeteksi pola Bullish Engulfing.
+        Pola pembalikan bullish yang kuat: Candle bullish besar menelan candle bearish sebelumnya.
+        Args:
+            df (DataFrame): DataFrame data candle.
+        Returns:
+            bool: True jika pola terdeteksi, False jika tidak.
+        """
+        return last_bar_patterns(df, ("bullish_engulfing",))["bullish_engulfing"]
+
+    def _is_bearish_engulfing(self, df):
+        """
+        Mendeteksi pola Bearish Engulfing.
+        Pola pembalikan bearish yang kuat: Candle bearish besar menelan candle bullish sebelumnya.
+        Args:
+            df (DataFrame): DataFrame data candle.
+        Returns:
+            bool: True jika pola terdeteksi, False jika tidak.
+        """
+        return last_bar_patterns(df, ("bearish_engulfing",))["bearish_engulfing"]
+
+    def _is_hammer_inverted_hammer(self, df):
+        """
+        Mendeteksi pola Hammer atau Inverted Hammer.
+        Keduanya adalah sinyal pembalikan bullish, sering muncul di akhir downtrend.
+        Hammer: body kecil di atas, sumbu bawah panjang.
+        Inverted Hammer: body kecil di bawah, sumbu atas panjang.
+        Args:
+            df (DataFrame): DataFrame data candle.
+        Returns:
+            bool: True jika pola terdeteksi, False jika tidak.
+        """
+        found = last_bar_patterns(df, ("hammer", "inverted_hammer"))
+        return found["hammer"] or found["inverted_hammer"]
+
+    def _is_shooting_star_hanging_man(self, df):
+        """
+        Mendeteksi pola Shooting Star atau Hanging Man.
+        Keduanya adalah sinyal pembalikan bearish, sering muncul di akhir uptrend/downtrend.
+        Shooting Star: body kecil di bawah, sumbu atas panjang.
+        Hanging Man: body kecil di atas, sumbu bawah panjang.
+        Args:
+            df (DataFrame): DataFrame data candle.
+        Returns:
+            bool: True jika pola terdeteksi, False jika tidak.
+        """
+        found = last_bar_patterns(df, ("inverted_hammer", "hammer")) # Bentuk shooting star / hanging man
+        return found["inverted_hammer"] or found["hammer"]
+
+    @profiled("order.modify_sl_tp")
+    def modify_sl_tp(self, ticket, new_sl, new_tp, comment=""):
+        """
+        Mengubah harga Stop Loss (SL) dan Take Profit (TP) untuk posisi yang sudah ada.
+        Args:
+            ticket (int): Nomor tiket posisi yang akan diubah.
+            new_sl (float): Harga Stop Loss yang baru.
+            new_tp (float): Harga Take Profit yang baru.
+            comment (str): Komentar untuk operasi ini.
+        """
+        request = {
+            "action": mt5.TRADE_ACTION_SLTP,
+            "position": ticket,
+            "sl": new_sl,
+            "tp": new_tp,
+            "magic": 123456,
+            "comment": comment,
+        }
+        result = self.send_order("Modify SL/TP", request)
+        if result is None:
+            self.log(f"❌ Modify SL/TP None: Posisi #{ticket}. Mungkin masalah koneksi.")
+        elif result.retcode == mt5.TRADE_RETCODE_DONE:
+            self.log(f"✅ SL/TP posisi #{ticket} berhasil diubah. SL: {new_sl:.2f}, TP: {new_tp:.2f}.")
+        else:
+            self.log(f"❌ Gagal mengubah SL/TP posisi #{ticket}: {self.get_error_message(result.retcode)}")
+
+
+    def _close_request(self, position, volume, tick, filling=mt5.ORDER_FILLING_FOK, comment="Closed by AI Trading Bot"):
+        """
+        Membuat request order_send untuk menutup (sebagian) posisi pada harga tick.
+        Args:
+            position (mt5.TradePosition): Posisi yang ditutup.
+            volume (float): Volume yang ditutup.
+            tick (Tick): Tick terbaru; bid untuk menutup BUY, ask untuk menutup SELL.
+            filling (int): Mode pengisian order.
+            comment (str): Komentar order.
+        Returns:
+            dict: Request order_send.
+        """
+        return {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": position.symbol,
+            "volume": volume,
+            "type": mt5.ORDER_TYPE_SELL if position.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY, # Opposite of current position type
+            "position": position.ticket,
+            "price": tick.bid if position.type == mt5.ORDER_TYPE_BUY else tick.ask, # Bid for closing buy, Ask for closing sell
+            "deviation": 10, # Max price deviation in points
+            "magic": position.magic,
+            "comment": comment,
+            "type_time": mt5.ORDER_TIME_GTC, # Good Till Cancel
+            "type_filling": filling,
+        }
+
+    @profiled("order.close_ticket")
+    def _close_ticket(self, position, max_attempts=CLOSE_ALL_MAX_ATTEMPTS):
+        """
+        Menutup satu posisi sampai habis untuk close_all_positions. Setiap percobaan memakai tick baru;
+        requote/harga berubah/gangguan koneksi dicoba ulang dengan backoff, fill sebagian dilanjutkan
+        untuk sisa volume, dan broker yang menolak FOK dicoba ulang dengan IOC.
+        Args:
+            position (mt5.TradePosition): Posisi yang ditutup.
+            max_attempts (int): Jumlah percobaan maksimum.
+        Returns:
+            CloseResult: Hasil penutupan tiket.
+        """
+        started = time.perf_counter()
+        remaining = position.volume
+        filling = mt5.ORDER_FILLING_FOK
+        attempts = 0
+        retcode = None
+        while remaining > 1e-9 and attempts < max_attempts:
+            if attempts > 0 and retcode not in (mt5.TRADE_RETCODE_DONE_PARTIAL, mt5.TRADE_RETCODE_INVALID_FILL):
+                time.sleep(min(CLOSE_ALL_RETRY_DELAY_SECONDS * ORDER_RETRY_BACKOFF_FACTOR ** (attempts - 1),
+                               ORDER_RETRY_MAX_DELAY_SECONDS))
+            attempts += 1
+            tick = broker.symbol_info_tick(position.symbol)
+            if tick is None:
+                retcode = None
+                continue
+            request = self._close_request(position, remaining, tick, filling, "Close All by AI Trading Bot")
+            result = self.send_order("Close All", request, attempt=attempts)
+            retcode = None if result is None else result.retcode
+            if retcode in (mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_DONE_PARTIAL):
+                filled = result.volume if result.volume else (remaining if retcode == mt5.TRADE_RETCODE_DONE else 0.0)
+                remaining = round(remaining - filled, 8)
+            elif retcode == mt5.TRADE_RETCODE_POSITION_CLOSED:
+                remaining = 0.0 # Sudah ditutup di antara pengambilan posisi dan order (misalnya kena SL/TP)
+            elif retcode == mt5.TRADE_RETCODE_INVALID_FILL and filling != mt5.ORDER_FILLING_IOC:
+                filling = mt5.ORDER_FILLING_IOC
+            elif result is not None and retcode not in CLOSE_RETRY_RETCODES:
+                break # Penolakan permanen (pasar tutup, trading dinonaktifkan, dll.)
+        return CloseResult(position.ticket, position.symbol, position.volume, round(position.volume - remaining, 8),
+                           attempts, retcode, time.perf_counter() - started)
+
+    @profiled("order.close_position")
+    def close_position(self, position):
+        """
+        Menutup posisi trading tunggal.
+        Args:
+            position (mt5.TradePosition): Objek posisi yang akan ditutup.
+        Returns:
+            bool: True jika posisi berhasil ditutup, False jika gagal.
+        """
+        tick = broker.symbol_info_tick(position.symbol)
+        if tick is None:
+            self.log(f"Gagal mendapatkan tick untuk menutup posisi #{position.ticket}")
+            return False
+
+        close_request = self._close_request(position, position.volume, tick)
+        result = self.send_order("Close", close_request)
+        if result is None:
+            self.log(f"❌ Hasil order_send (Close Position #{position.ticket}) adalah None. Kemungkinan masalah koneksi atau server.")
+            return False
+
+        if result.retcode == mt5.TRADE_RETCODE_DONE:
+            self.log(f"✅ Posisi #{position.ticket} berhasil ditutup. Profit: ${position.profit:.2f}")
+            self.position_tracker.sync(force=True) # Win/loss dihitung dari deal penutupan (lihat _on_position_closed)
+            self.publish_account()
+            return True
+        else:
+            error_msg = self.get_error_message(result.retcode)
+            self.log(f"❌ Gagal menutup posisi #{position.ticket}: {error_msg}. Retcode: {result.retcode}")
+            global last_trade_result
+            last_trade_result = "Gagal Tutup"
+            self.publish_trade_stats() # Perbarui label hasil trade
+            return False
+
+    def get_error_message(self, retcode):
+        """
+        Mengembalikan pesan kesalahan yang dapat dibaca manusia dari kode pengembalian MT5.
+        Args:
+            retcode (int): Kode pengembalian dari operasi MT5.
+        Returns:
+            str: Deskripsi pesan kesalahan.
+        """
+        errors = {
+            mt5.TRADE_RETCODE_REQUOTE: "Harga berubah (requote)",
+            mt5.TRADE_RETCODE_REJECT: "Order ditolak",
+            mt5.TRADE_RETCODE_CANCEL: "Order dibatalkan",
+            mt5.TRADE_RETCODE_PLACED: "Order sudah diproses",
+            mt5.TRADE_RETCODE_DONE: "Order berhasil",
+            mt5.TRADE_RETCODE_DONE_PARTIAL: "Order parsial",
+            mt5.TRADE_RETCODE_ERROR: "Error umum",
+            mt5.TRADE_RETCODE_TIMEOUT: "Timeout",
+            mt5.TRADE_RETCODE_INVALID: "Parameter tidak valid",
+            mt5.TRADE_RETCODE_INVALID_VOLUME: "Volume tidak valid",
+            mt5.TRADE_RETCODE_INVALID_PRICE: "Harga tidak valid",
+            mt5.TRADE_RETCODE_INVALID_STOPS: "Stop Loss/Take Profit tidak valid",
+            mt5.TRADE_RETCODE_TRADE_DISABLED: "Trading dinonaktifkan",
+            mt5.TRADE_RETCODE_MARKET_CLOSED: "Market tutup",
+            mt5.TRADE_RETCODE_NO_MONEY: "Dana tidak cukup",
+            mt5.TRADE_RETCODE_PRICE_CHANGED: "Harga berubah",
+            mt5.TRADE_RETCODE_PRICE_OFF: "Harga tidak sesuai",
+            mt5.TRADE_RETCODE_INVALID_EXPIRATION: "Kadaluarsa tidak valid",
+            mt5.TRADE_RETCODE_ORDER_CHANGED: "Order diubah",
+            mt5.TRADE_RETCODE_TOO_MANY_REQUESTS: "Terlalu banyak permintaan",
+            mt5.TRADE_RETCODE_NO_CHANGES: "Tidak ada perubahan",
+            mt5.TRADE_RETCODE_SERVER_DISABLES_AT: "Auto trading dinonaktifkan di server",
+            mt5.TRADE_RETCODE_CLIENT_DISABLES_AT: "Auto trading dinonaktifkan di klien",
+            mt5.TRADE_RETCODE_LOCKED: "Akun terkunci",
+            mt5.TRADE_RETCODE_FROZEN: "Akun beku",
+            mt5.TRADE_RETCODE_INVALID_FILL: "Tipe pengisian tidak valid",
+            mt5.TRADE_RETCODE_CONNECTION: "Tidak ada koneksi",
+            mt5.TRADE_RETCODE_ONLY_REAL: "Hanya akun real",
+            mt5.TRADE_RETCODE_LIMIT_ORDERS: "Terlalu banyak order",
+            mt5.TRADE_RETCODE_LIMIT_VOLUME: "Volume melebihi batas",
+            mt5.TRADE_RETCODE_INVALID_ORDER: "Order tidak valid",
+            mt5.TRADE_RETCODE_POSITION_CLOSED: "Posisi sudah ditutup"
+        }
+        return errors.get(retcode, f"Error tidak diketahui (kode: {retcode})")
+
+
+class TradingSettingsDialog(QDialog):
+    """
+    Dialog UI untuk mengatur parameter trading bot.
+    Memungkinkan pengguna untuk mengubah ukuran lot, risiko, TP/SL, dll.
+    """
+    def __init__(self, parent=None, settings={}):
+        """
+        Inisialisasi dialog pengaturan.
+        Args:
+            parent: Parent widget (biasanya jendela utama bot).
+            settings (dict): Kamus berisi pengaturan trading saat ini untuk ditampilkan sebagai default.
+        """
+        super().__init__(parent)
+        self.setWindowTitle("⚙️ Pengaturan Trading")
+        self.setGeometry(200, 200, 400, 450)
+        
+        self.layout = QGridLayout(self)
+
+        self.lot_size_input = QDoubleSpinBox(); self.lot_size_input.setRange(0.01, 100.0); self.lot_size_input.setSingleStep(0.01)
+        self.risk_percent_input = QDoubleSpinBox(); self.risk_percent_input.setRange(0.1, 10.0); self.risk_percent_input.setSingleStep(0.1)
+        
+        self.target_profit_usd_input = QDoubleSpinBox(); self.target_profit_usd_input.setRange(0.1, 1000.0); self.target_profit_usd_input.setSingleStep(0.1)
+        self.target_loss_usd_input = QDoubleSpinBox(); self.target_loss_usd_input.setRange(1.0, 5000.0); self.target_loss_usd_input.setSingleStep(1.0)
+
+        self.tp_pips_input = QDoubleSpinBox(); self.tp_pips_input.setRange(1, 1000); self.tp_pips_input.setSingleStep(1)
+        self.sl_pips_input = QDoubleSpinBox(); self.sl_pips_input.setRange(1, 1000); self.sl_pips_input.setSingleStep(1)
+        self.max_hold_duration_input = QDoubleSpinBox(); self.max_hold_duration_input.setRange(1, 120); self.max_hold_duration_input.setSingleStep(1)
+        self.entry_method_combo = QComboBox(); self.entry_method_combo.addItems(["Instant", "Pending Order", "Stop Limit", "Market on Close"])
+        self.retry_input = QDoubleSpinBox(); self.retry_input.setRange(0, 10); self.retry_input.setSingleStep(1)
+        self.max_spread_input = QDoubleSpinBox(); self.max_spread_input.setRange(1, 200); self.max_spread_input.setSingleStep(1)
+        
+        self.min_tick_volume_scalping_input = QDoubleSpinBox(); self.min_tick_volume_scalping_input.setRange(0, 5000); self.min_tick_volume_scalping_input.setSingleStep(100); self.min_tick_volume_scalping_input.setValue(100)
+        self.scalping_pattern_confidence_input = QDoubleSpinBox(); self.scalping_pattern_confidence_input.setRange(0.0, 1.0); self.scalping_pattern_confidence_input.setSingleStep(0.05); self.scalping_pattern_confidence_input.setValue(0.7)
+
+        # Mengatur nilai awal input berdasarkan pengaturan yang diterima
+        self.lot_size_input.setValue(settings.get('lot_size', 0.1))
+        self.risk_percent_input.setValue(settings.get('risk_percent', 1.0))
+        self.target_profit_usd_input.setValue(settings.get('target_profit_usd', 1.0))
+        self.target_loss_usd_input.setValue(settings.get('target_loss_usd', 30.0))
+        self.tp_pips_input.setValue(settings.get('tp_pips', 50))
+        self.sl_pips_input.setValue(settings.get('sl_pips', 30))
+        self.max_hold_duration_input.setValue(settings.get('max_hold_duration', 15))
+        self.entry_method_combo.setCurrentText(settings.get('entry_method', "Instant"))
+        self.retry_input.setValue(settings.get('max_retry', 3))
+        self.max_spread_input.setValue(settings.get('max_spread', 50))
+        self.min_tick_volume_scalping_input.setValue(settings.get('min_tick_volume_scalping', 100))
+        self.scalping_pattern_confidence_input.setValue(settings.get('scalping_pattern_confidence', 0.7))
+
+        # Menambahkan label dan input ke layout grid
+        row = 0
+        self.layout.addWidget(QLabel("Ukuran Lot:"), row, 0); self.layout.addWidget(self.lot_size_input, row, 1); row += 1
+        self.layout.addWidget(QLabel("Risiko per Trade (%):"), row, 0); self.layout.addWidget(self.risk_percent_input, row, 1); row += 1
+        self.layout.addWidget(QLabel("Target Profit ($):"), row, 0); self.layout.addWidget(self.target_profit_usd_input, row, 1); row += 1
+        self.layout.addWidget(QLabel("Target Loss ($):"), row, 0); self.layout.addWidget(self.target_loss_usd_input, row, 1); row += 1
+        self.layout.addWidget(QLabel("TP (Pips):"), row, 0); self.layout.addWidget(self.tp_pips_input, row, 1); row += 1
+        self.layout.addWidget(QLabel("SL (Pips):"), row, 0); self.layout.addWidget(self.sl_pips_input, row, 1); row += 1
+        self.layout.addWidget(QLabel("Max Hold (min):"), row, 0); self.layout.addWidget(self.max_hold_duration_input, row, 1); row += 1
+        self.layout.addWidget(QLabel("Metode Entry:"), row, 0); self.layout.addWidget(self.entry_method_combo, row, 1); row += 1
+        self.layout.addWidget(QLabel("Max Retry:"), row, 0); self.layout.addWidget(self.retry_input, row, 1); row += 1
+        self.layout.addWidget(QLabel("Max Spread (points):"), row, 0); self.layout.addWidget(self.max_spread_input, row, 1); row += 1
+        self.layout.addWidget(QLabel("Min Tick Volume (Scalping):"), row, 0); self.layout.addWidget(self.min_tick_volume_scalping_input, row, 1); row += 1
+        self.layout.addWidget(QLabel("Conf. Pola (Scalping):"), row, 0); self.layout.addWidget(self.scalping_pattern_confidence_input, row, 1); row += 1
 
-    def handle_order_result(self, result, order_type, attempt=1):
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        self.layout.addWidget(button_box, row, 0, 1, 2)
+        self.setLayout(self.layout)
+
+    def get_settings(self):
         """
-        Memproses hasil dari operasi order_send dan mencatatnya ke log.
-        Args:
-            result (mt5.TradeRequestResult): Objek hasil dari order_send.
-            order_type (str): Tipe order (misalnya, "Instant", "Pending").
-            attempt (int): Nomor percobaan order.
+        Mengambil semua nilai pengaturan dari input dialog dan mengembalikannya dalam bentuk kamus.
+        Returns:
+            dict: Kamus berisi pengaturan trading yang diatur oleh pengguna.
         """
-        global win_count, loss_count, last_trade_result
-        
-        if result.retcode != mt5.TRADE_RETCODE_DONE:
-            error_msg = self.get_error_message(result.retcode)
-            self.log(f"❌ Gagal mengeksekusi order {order_type} (Percobaan {attempt}): {error_msg}. Retcode: {result.retcode}")
-            last_trade_result = "Gagal"
-        else:
-            self.log(f"🎯 {order_type} {'BELI' if result.request.type==mt5.ORDER_TYPE_BUY else 'JUAL'} @ {result.price:.2f}")
-            self.log(f"    TP: {result.request.tp:.2f} | SL: {result.request.sl:.2f} | Lot: {result.request.volume:.2f}")
-            last_trade_result = "Berhasil"
-            
-        self.update_account_info()
-        self.update_last_trade_result_label() # Perbarui label hasil trade
+        return {
+            'lot_size': self.lot_size_input.value(),
+            'risk_percent': self.risk_percent_input.value(),
+            'target_profit_usd': self.target_profit_usd_input.value(),
+            'target_loss_usd': self.target_loss_usd_input.value(),
+            'tp_pips': self.tp_pips_input.value(),
+            'sl_pips': self.sl_pips_input.value(),
+            'max_hold_duration': self.max_hold_duration_input.value(),
+            'entry_method': self.entry_method_combo.currentText(),
+            'max_retry': self.retry_input.value(),
+            'max_spread': self.max_spread_input.value(),
+            'min_tick_volume_scalping': self.min_tick_volume_scalping_input.value(),
+            'scalping_pattern_confidence': self.scalping_pattern_confidence_input.value()
+        }
 
-    def check_economic_news(self):
+class EngineEventBridge(QObject):
+    """
+    Meneruskan event TradingEngine ke thread GUI.
+    Sinyal dipancarkan dari thread engine; Qt mengirimkannya sebagai queued connection
+    sehingga slot GUI selalu berjalan di thread GUI.
+    """
+    event_received = pyqtSignal(str, object)
+
+    def __init__(self, ignored_events=()):
         """
-        Mengecek berita ekonomi yang disimulasikan dan memperbarui status dampak berita.
-        Fungsi ini mensimulasikan pengambilan data berita ekonomi, dalam aplikasi nyata
-        ini akan memanggil API berita eksternal.
+        Args:
+            ignored_events (iterable): Event yang tidak diteruskan (misalnya "log", yang ditarik GUI dari buffer).
         """
-        global current_news_impact, news_event_time, last_high_impact_news_time
-        
-        self.news_status_label.setText("Mengecek berita...")
-        self.news_status_label.setStyleSheet("font-weight: bold; color: gray;")
+        super().__init__()
+        self.ignored_events = frozenset(ignored_events)
 
-        # Simpan dampak berita aktual untuk tujuan tampilan UI saja
-        display_news_impact = "None"
-        display_news_impact_color = "green"
+    def __call__(self, event, payload):
+        if event not in self.ignored_events:
+            self.event_received.emit(event, payload)
 
-        try:
-            news_data = self._simulate_economic_news()
-            
-            next_event_time = None
-            next_event_details = "N/A"
-            
-            current_time_wib = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7)))
-            
-            news_data.sort(key=lambda x: datetime.datetime.strptime(x['time'], "%Y-%m-%d %H:%M:%S"))
 
-            for news_item in news_data:
-                news_time = datetime.datetime.strptime(news_item['time'], "%Y-%m-%d %H:%M:%S")
+class TradingBotGUI(QWidget):
+    """
+    Kelas utama untuk GUI AI Trading Bot.
+    Hanya mengelola tampilan dan interaksi pengguna; logika trading berjalan di TradingEngine
+    dan GUI berlangganan ke aliran state-nya.
+    """
+    def __init__(self, initial_mode="Monitoring"):
+        """
+        Inisialisasi jendela GUI utama bot dan menjalankan engine di thread terpisah.
+        Args:
+            initial_mode (str): Mode awal engine setelah model dilatih.
+        """
+        super().__init__()
+        self.setWindowTitle("🔥 AI TRADING BOT - XAUUSD REALTIME")
+        self.resize(1000, 800)
 
-                if news_time > current_time_wib.replace(tzinfo=None):
-                    # Ditemukan event berita di masa depan, simpan yang paling awal
-                    if next_event_time is None or news_time < next_event_time:
-                        next_event_time = news_time
-                        next_event_details = f"{news_item['headline']} ({news_item['impact']}) pada {news_time.strftime('%H:%M')}"
-                        self.next_news_label.setStyleSheet("font-weight: bold; color: orange;")
+        # Area log dibatasi LOG_BUFFER_LINES baris; baris baru ditarik dari buffer engine LOG_UI_FPS kali per detik
+        self.log_output = QPlainTextEdit()
+        self.log_output.setReadOnly(True)
+        self.log_output.setMaximumBlockCount(LOG_BUFFER_LINES)
+        self.log_output.setStyleSheet("font-family: Consolas; font-size: 11px;")
+        self._log_seq = 0
 
-                # Cek dampak berita yang aktif HANYA UNTUK TAMPILAN
-                if current_time_wib.replace(tzinfo=None) >= news_time and \
-                   (current_time_wib.replace(tzinfo=None) - news_time).total_seconds() / 60 < news_effect_duration_minutes:
-                    if news_item['impact'] == 'High':
-                        display_news_impact = "TINGGI"
-                        display_news_impact_color = "red"
-                        self.log(f"🔥 BERITA BERDAMPAK TINGGI: {news_item['headline']} pada {news_time.strftime('%H:%M:%S')}")
-                        break # Dampak tinggi menimpa yang lain untuk tampilan
-                    elif news_item['impact'] == 'Medium':
-                        if display_news_impact not in ["TINGGI"]: # Menengah hanya jika tidak ada berita berdampak tinggi yang aktif untuk tampilan
-                            display_news_impact = "MENENGAH"
-                            display_news_impact_color = "darkorange"
-                            self.log(f"🔶 BERITA BERDAMPAK MENENGAH: {news_item['headline']} pada {news_time.strftime('%H:%M:%S')}")
-                    elif news_item['impact'] == 'Low':
-                        if display_news_impact not in ["TINGGI", "MENENGAH"]: # Rendah hanya jika tidak ada berita berdampak tinggi/menengah yang aktif untuk tampilan
-                            display_news_impact = "RENDAH"
-                            display_news_impact_color = "blue"
-                            self.log(f"💡 BERITA BERDAMPAK RENDAH: {news_item['headline']} pada {news_time.strftime('%H:%M:%S')}")
-            
-            # Perbarui label UI untuk dampak berita
-            self.news_impact_label.setText(f"Dampak Saat Ini: {display_news_impact}")
-            self.news_impact_label.setStyleSheet(f"font-weight: bold; color: {display_news_impact_color};")
+        # Event engine diteruskan ke thread GUI melalui sinyal Qt (kecuali log, lihat flush_log)
+        self.engine_bridge = EngineEventBridge(ignored_events=("log",))
+        self.engine_bridge.event_received.connect(self.on_engine_event)
+        self.engine = TradingEngine(subscribers=[self.engine_bridge])
 
-            if next_event_time is None:
-                self.next_news_label.setText("Berita Selanjutnya: N/A")
-                self.next_news_label.setStyleSheet("font-weight: bold;")
-            else:
-                self.next_news_label.setText(next_event_details)
+        self.setup_ui() # Membangun semua komponen UI
 
-            self.news_status_label.setText("Status: Data berita diperbarui")
-            self.news_status_label.setStyleSheet("font-weight: bold; color: darkgreen;")
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.flush_log)
+        self.log_timer.start(int(1000 / LOG_UI_FPS))
+        self.flush_log() # Log dari inisialisasi engine (load_settings)
 
-        except Exception as e:
-            self.log(f"Error mengambil/memproses berita: {str(e)}")
-            self.news_status_label.setText("Status: Error")
-            self.news_status_label.setStyleSheet("font-weight: bold; color: red;")
-        finally:
-            # PENTING: Setel ulang current_news_impact ke None untuk memastikan tidak memengaruhi logika trading
-            current_news_impact = "None"
+        self.engine_thread = self.engine.start_in_thread(initial_mode)
 
-    def _simulate_economic_news(self):
+    def save_settings(self):
         """
-        Mensimulasikan pengambilan data berita ekonomi.
-        Dalam aplikasi nyata, fungsi ini akan dihubungkan ke API berita ekonomi (misalnya, ForexFactory, Investing.com).
+        Menyimpan pengaturan trading melalui engine dan menampilkan hasilnya ke pengguna.
         """
-        current_time_wib = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=7)))
-        
-        simulated_news = [
-            {"event": "Pernyataan FOMC", "headline": "Ketua Fed Memberikan Pidato Penting", "time": (current_time_wib + datetime.timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "High"},
-            {"event": "Rilis Data CPI", "headline": "Inflasi AS Melonjak, Kekhawatiran Meningkat", "time": (current_time_wib - datetime.timedelta(minutes=2)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "High"},
-            {"event": "Klaim Pengangguran", "headline": "Klaim Pengangguran Mingguan Lebih Rendah dari Perkiraan", "time": (current_time_wib + datetime.timedelta(minutes=30)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "Medium"},
-            {"event": "PMI Manufaktur", "headline": "Sektor Manufaktur Menunjukkan Perlambatan", "time": (current_time_wib - datetime.timedelta(minutes=15)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "Low"},
-            {"event": "Pidato Gubernur Bank Sentral", "headline": "Gubernur Bank Sentral Bahas Kebijakan Moneter", "time": (current_time_wib + datetime.timedelta(minutes=60)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "High"},
-            {"event": "Data Penjualan Ritel", "headline": "Penjualan Ritel Melebihi Ekspektasi, Ekonomi Kuat", "time": (current_time_wib + datetime.timedelta(minutes=120)).strftime("%Y-%m-%d %H:%M:%S"), "impact": "Medium"},
-        ]
-        return simulated_news
+        try:
+            self.engine.save_settings()
+            QMessageBox.information(self, "Pengaturan Tersimpan", "Pengaturan trading Anda telah berhasil disimpan!")
+        except IOError as e:
+            QMessageBox.warning(self, "Error Menyimpan Pengaturan", f"Gagal menyimpan pengaturan: {e}\nPastikan Anda memiliki izin tulis di direktori:\n{os.path.dirname(SETTINGS_FILE)}")
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Terjadi kesalahan tak terduga saat menyimpan pengaturan: {e}")
 
-    def run_analysis(self):
+    def setup_ui(self):
         """
-        Fungsi dispatcher yang akan memicu strategi trading berdasarkan mode yang aktif.
-        Juga memastikan analisis fundamental dan teknikal terus diperbarui di UI.
+        Membangun semua elemen UI (label, tombol, grup box, dll.)
+        dan menempatkannya dalam tata letak.
         """
-        global current_mode
-        
-        if not is_running:
-            return
+        self.layout = QVBoxLayout(self)
         
-        self.update_market_data()
-        self.check_economic_news() # Update news info for UI
+        header = QHBoxLayout()
+        self.status_label = QLabel("🟢 BOT READY | Mode: Stopped")
+        self.status_label.setStyleSheet("font-size: 14px; font-weight: bold;")
+        self.winrate_label = QLabel("Winrate: 0% (0/0)")
+        self.winrate_label.setStyleSheet("font-size: 14px; font-weight: bold; color: blue;")
+        header.addWidget(self.status_label, 70)
+        header.addWidget(self.winrate_label, 30)
+        self.layout.addLayout(header)
 
-        # Perbarui label hasil trade terakhir
-        self.update_last_trade_result_label()
+        analysis_box = QGroupBox("📊 Analisis Pasar (Teknikal)")
+        analysis_layout = QGridLayout()
         
-        if current_mode == "AI_Long_Trade":
-            self._run_ai_long_trade_strategy()
-        elif current_mode == "Scalping_Bot":
-            self._run_scalping_strategy()
-        elif current_mode == "Sniper_Bot": # Panggil strategi sniper
-            self._run_sniper_strategy()
-        elif current_mode == "Monitoring":
-            self.log("--- Mode Monitoring ---")
-            self.log(f"Berita: Dampak Saat Ini: {self.news_impact_label.text().split(': ')[1]}")
-            self.log(f"Berita: Selanjutnya: {self.next_news_label.text().split(': ')[1]}")
-            self.log(f"M5: Tren {self.trend_label.text()} | RSI {self.rsi_label.text()} | OBV {self.obv_label.text()}")
-            self.log(f"H1: Tren {self.higher_tf_trend_label.text()} | SNR {self.snr_label.text()} | Likuiditas {self.liquidity_label.text()}")
-            self.log(f"Analisis Realtime Chart: {self.overall_analysis_label.text()}")
-            self.log("-----------------------")
-        else:
-            self.log(f"Mode tidak dikenal: {current_mode}. Menghentikan analisis.")
-            self.set_mode("Stopped")
-
-    def _run_ai_long_trade_strategy(self):
-        """
-        Menganalisis pasar dan mengeksekusi trading untuk strategi AI Long Trade.
-        Strategi ini menggabungkan analisis teknikal (70%) dan fundamental (30%).
-        Fokus pada hold posisi untuk target profit pips yang lebih besar (30-50 pips)
-        dan manajemen uang berbasis USD.
-        """
-        global model
+        self.price_label = QLabel("Harga: -")
+        self.rsi_label = QLabel("RSI: -")
+        self.macd_label = QLabel("MACD: -")
+        self.ema_label = QLabel("EMA20/50: -")
+        self.bb_label = QLabel("Lebar BB: -")
+        self.atr_label = QLabel("ATR: -")
+        self.trend_label = QLabel("Tren M5: -")
+        self.obv_label = QLabel("Tren OBV: -")
+        self.higher_tf_trend_label = QLabel("Tren H1: -")
+        self.snr_label = QLabel("SNR: N/A")
+        self.liquidity_label = QLabel("Likuiditas: N/A")
+        self.overall_analysis_label = QLabel("Analisis Realtime: Menunggu...")
+        self.last_trade_result_label = QLabel("Hasil Trade Terakhir: N/A") # Label baru
+        self.last_trade_result_label.setStyleSheet("font-weight: bold; color: black;") # Default color
         
-        open_positions = mt5.positions_get(symbol=symbol)
-        has_open_position = open_positions is not None and len(open_positions) > 0
-
-        try:
-            rates = mt5.copy_rates_from_pos(symbol, AI_TRADING_TIMEFRAME, 0, 100)
-            rates_higher_tf = mt5.copy_rates_from_pos(symbol, AI_HIGHER_TIMEFRAME, 0, 50)
-            
-            if rates is None or rates_higher_tf is None:
-                self.log("Gagal mendapatkan data candle untuk analisis AI Long Trade.")
-                return
-                
-            df = pd.DataFrame(rates)
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            df_higher_tf = pd.DataFrame(rates_higher_tf)
-            df_higher_tf['time'] = pd.to_datetime(df_higher_tf['time'], unit='s')
-
-            df['rsi'] = RSIIndicator(df['close'], window=14).rsi()
-            macd = MACD(df['close'])
-            df['macd'] = macd.macd()
-            df['macd_signal'] = macd.macd_signal()
-            df['macd_hist'] = macd.macd_diff()
-            df['ema20'] = EMAIndicator(df['close'], window=20).ema_indicator()
-            df['ema50'] = EMAIndicator(df['close'], window=50).ema_indicator()
-            bb = BollingerBands(df['close'], window=20, window_dev=2)
-            df['bb_upper'] = bb.bollinger_hband()
-            df['bb_lower'] = bb.bollinger_lband()
-            df['bb_middle'] = bb.bollinger_mavg()
-            df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / df['bb_middle']
-            df['atr'] = AverageTrueRange(df['high'], df['low'], df['close'], window=14).average_true_range()
-            if 'tick_volume' in df.columns and not df['tick_volume'].isnull().all():
-                df['obv'] = OnBalanceVolumeIndicator(df['close'], df['tick_volume']).on_balance_volume()
-            else: df['obv'] = 0
-            df = df.dropna()
-
-            if df.empty:
-                self.log("Data candlestick M5 tidak cukup untuk analisis AI Long Trade.")
-                return
-            
-            if not df_higher_tf.empty:
-                df_higher_tf['sma20'] = SMAIndicator(df_higher_tf['close'], window=20).sma_indicator()
-                df_higher_tf['sma50'] = SMAIndicator(df_higher_tf['close'], window=50).sma_indicator()
-                df_higher_tf = df_higher_tf.dropna()
-
-            higher_tf_trend = "Sideways"
-            if not df_higher_tf.empty:
-                last_higher_tf = df_higher_tf.iloc[-1]
-                if last_higher_tf['sma20'] > last_higher_tf['sma50']: higher_tf_trend = "Up Trend"
-                elif last_higher_tf['sma20'] < last_higher_tf['sma50']: higher_tf_trend = "Down Trend"
-            
-            latest = df.iloc[-1:]
-            features = latest[['open', 'high', 'low', 'close', 'rsi', 'macd',
-                               'macd_signal', 'macd_hist', 'ema20', 'ema50', 'bb_width', 'atr', 'obv']]
-            
-            if model is None:
-                self.log("Model AI belum dilatih. Tidak dapat melakukan prediksi AI Long Trade.")
-                return
-
-            signal = model.predict(features)[0]
-            proba = model.predict_proba(features)[0]
-            confidence = max(proba)
-            
-            tick = mt5.symbol_info_tick(symbol)
-            if tick is None:
-                self.log("Gagal mendapatkan data tick.")
-                return
-            current_price = tick.ask if signal == 1 else tick.bid
-
-            self.log(f"📢 AI Long Trade: Sinyal AI {'BELI' if signal == 1 else 'JUAL'} terdeteksi. Keyakinan: {confidence:.2%}, Tren H1: {higher_tf_trend}")
-            
-            if has_open_position:
-                for pos in open_positions:
-                    target_profit_usd_value = self.trading_settings['target_profit_usd']
-                    target_loss_usd_value = self.trading_settings['target_loss_usd']
-                    max_hold_duration = self.trading_settings['max_hold_duration']
-
-                    pos_open_time = datetime.datetime.fromtimestamp(pos.time)
-                    time_in_position = (datetime.datetime.now() - pos_open_time).total_seconds() / 60
-
-                    # Dihapus: Logika penutupan posisi berdasarkan berita
-                    
-                    if pos.profit <= -target_loss_usd_value:
-                        self.log(f"🔴 AI Long Trade: Posisi #{pos.ticket} rugi mencapai target (${pos.profit:.2f}). Menutup untuk cut loss.")
-                        self.close_position(pos)
-                        continue
-                    
-                    if pos.profit >= target_profit_usd_value:
-                        self.log(f"✅ AI Long Trade: Posisi #{pos.ticket} profit mencapai target (${pos.profit:.2f}). Menutup posisi.")
-                        self.close_position(pos)
-                        continue
-                    
-                    is_ai_signal_opposite = (pos.type == mt5.ORDER_TYPE_BUY and signal == 0) or \
-                                             (pos.type == mt5.ORDER_TYPE_SELL and signal == 1)
-                    if is_ai_signal_opposite and confidence >= 0.65 and pos.profit > 0:
-                        self.log(f"🔶 AI Long Trade: Sinyal AI berbalik kuat ({confidence:.2%}). Menutup posisi #{pos.ticket} dengan profit (${pos.profit:.2f}).")
-                        self.close_position(pos)
-                        continue
-
-                    if time_in_position >= max_hold_duration * 4 and pos.profit < 0:
-                        self.log(f"⏰ AI Long Trade: Posisi #{pos.ticket} terlalu lama dipegang tanpa profit. Menutup.")
-                        self.close_position(pos)
-                        continue
-                        
-                    self.log(f"⚪ AI Long Trade: Posisi #{pos.ticket} sedang dipegang (${pos.profit:.2f}). Sinyal AI berlawanan: {is_ai_signal_opposite}, Conf: {confidence:.2%}")
+        # Apply initial styling to all labels for consistency
+        for lbl in [self.price_label, self.rsi_label, self.macd_label,
+                     self.ema_label, self.bb_label, self.atr_label, self.trend_label,
+                     self.obv_label, self.higher_tf_trend_label, self.snr_label,
+                     self.liquidity_label, self.overall_analysis_label, self.last_trade_result_label]:
+            lbl.setStyleSheet("font-weight: bold;")
+            
+        # Row 0: Price and BB Width
+        analysis_layout.addWidget(QLabel("🟢 Harga:"), 0, 0)
+        analysis_layout.addWidget(self.price_label, 0, 1)
+        analysis_layout.addWidget(QLabel("📌 Lebar BB:"), 0, 2)
+        analysis_layout.addWidget(self.bb_label, 0, 3)
 
-            else: # No open positions, consider opening a new one
-                equity = mt5.account_info().equity
-                risk_amount_usd_per_trade = equity * (self.trading_settings['risk_percent'] / 100.0)
-                
-                sl_pips_for_lot_calc = self.trading_settings['sl_pips']
-                calculated_lot_size = self.calculate_lot_size_by_risk(risk_amount_usd_per_trade, sl_pips_for_lot_calc, current_price)
-                
-                if calculated_lot_size <= 0:
-                    self.log("AI Long Trade: Ukuran lot yang dihitung terlalu kecil atau tidak valid. Tidak melakukan entry.")
-                    return
+        # Row 1: RSI and ATR
+        analysis_layout.addWidget(QLabel("📈 RSI:"), 1, 0)
+        analysis_layout.addWidget(self.rsi_label, 1, 1)
+        analysis_layout.addWidget(QLabel("📌 ATR:"), 1, 2)
+        analysis_layout.addWidget(self.atr_label, 1, 3)
 
-                symbol_info_curr = mt5.symbol_info(symbol)
-                current_spread_points = (tick.ask - tick.bid) / symbol_info_curr.point
-                liquidity_is_good = (current_spread_points <= self.trading_settings['max_spread'] * 0.75)
+        # Row 2: MACD and M5 Trend
+        analysis_layout.addWidget(QLabel("📊 MACD Hist:"), 2, 0) # Changed label to be more specific
+        analysis_layout.addWidget(self.macd_label, 2, 1)
+        analysis_layout.addWidget(QLabel("📌 Tren M5:"), 2, 2)
+        analysis_layout.addWidget(self.trend_label, 2, 3)
 
-                if confidence >= 0.70 and higher_tf_trend == ("Up Trend" if signal == 1 else "Down Trend") and liquidity_is_good:
-                    # Dihapus: Logika penundaan entry berdasarkan berita
-                    self.log(f"✅ AI Long Trade: Melakukan entry {('BELI' if signal == 1 else 'JUAL')} dengan {calculated_lot_size:.2f} lot.")
-                        
-                    tp_pips_final = self.trading_settings['tp_pips']
-                    sl_pips_final = self.trading_settings['sl_pips']
+        # Row 3: EMA and OBV Trend
+        analysis_layout.addWidget(QLabel("📉 EMA20/50:"), 3, 0) # Changed label to be more specific
+        analysis_layout.addWidget(self.ema_label, 3, 1)
+        analysis_layout.addWidget(QLabel("⚖️ Tren OBV:"), 3, 2)
+        analysis_layout.addWidget(self.obv_label, 3, 3)
 
-                    self.log(f"    TP: {tp_pips_final:.1f} pips | SL: {sl_pips_final:.1f} pips")
-                        
-                    self.execute_trade(signal, current_price, df,
-                                       lot_size_override=calculated_lot_size,
-                                       tp_pips_override=tp_pips_final,
-                                       sl_pips_override=sl_pips_final)
-                else:
-                    self.log(f"🚫 AI Long Trade: Kondisi tidak ideal untuk entry (Conf: {confidence:.2%}, Tren H1: {higher_tf_trend}, Likuiditas: {'OK' if liquidity_is_good else 'BURUK'}).")
+        # Row 4: Higher TF Trend and SNR
+        analysis_layout.addWidget(QLabel("⬆️ Tren H1:"), 4, 0)
+        analysis_layout.addWidget(self.higher_tf_trend_label, 4, 1)
+        analysis_layout.addWidget(QLabel("📍 SNR:"), 4, 2)
+        analysis_layout.addWidget(self.snr_label, 4, 3)
 
-        except Exception as e:
-            self.log(f"⚠️ Error dalam AI Long Trade: {str(e)}")
+        # Row 5: Liquidity and Overall Analysis
+        analysis_layout.addWidget(QLabel("💧 Likuiditas:"), 5, 0)
+        analysis_layout.addWidget(self.liquidity_label, 5, 1)
+        analysis_layout.addWidget(QLabel("⚡ Analisis Realtime:"), 5, 2)
+        analysis_layout.addWidget(self.overall_analysis_label, 5, 3)
 
-    def _run_scalping_strategy(self):
-        """
-        Menganalisis pasar dan mengeksekusi trading untuk strategi Scalping (M1).
-        Strategi ini fokus pada RSI overbought/oversold, profit tipis ($0.30 - $2.00),
-        dan manajemen risiko yang ketat.
-        Tidak menunggu likuiditas dan tidak terpaku pada tren candle.
-        """
-        global current_news_impact
+        # Row 6: Last Trade Result (spanning across columns for visibility)
+        analysis_layout.addWidget(QLabel("🏆 Hasil Trade Terakhir:"), 6, 0)
+        analysis_layout.addWidget(self.last_trade_result_label, 6, 1, 1, 3) # Span across 3 columns
         
-        open_positions = mt5.positions_get(symbol=symbol)
-        has_open_position = open_positions is not None and len(open_positions) > 0
+        analysis_box.setLayout(analysis_layout)
+        self.layout.addWidget(analysis_box)
 
-        try:
-            scalping_min_profit_usd = self.trading_settings.get('target_profit_usd', 0.3)
-            scalping_max_profit_usd = scalping_min_profit_usd * 4.0 if scalping_min_profit_usd * 4.0 >= 2.0 else 2.0
-            scalping_max_loss_usd = self.trading_settings.get('target_loss_usd', 2.0)
+        news_box = QGroupBox("📰 Analisis Berita (Fundamental)")
+        news_layout = QGridLayout()
 
-            rates_m1 = mt5.copy_rates_from_pos(symbol, SCALPING_TIMEFRAME, 0, 50)
-            rates_m5_for_trend = mt5.copy_rates_from_pos(symbol, SCALPING_HIGHER_TIMEFRAME, 0, 50)
-            
-            if rates_m1 is None or rates_m5_for_trend is None:
-                self.log("Gagal mendapatkan data candle untuk analisis Scalping.")
-                return
-                
-            df_m1 = pd.DataFrame(rates_m1)
-            df_m1['time'] = pd.to_datetime(df_m1['time'], unit='s')
-            df_m5_for_trend = pd.DataFrame(rates_m5_for_trend)
-            df_m5_for_trend['time'] = pd.to_datetime(df_m5_for_trend['time'], unit='s')
-
-            df_m1['rsi'] = RSIIndicator(df_m1['close'], window=14).rsi()
-            df_m1['atr'] = AverageTrueRange(df_m1['high'], df_m1['low'], df_m1['close'], window=14).average_true_range()
-            if 'tick_volume' in df_m1.columns and not df_m1['tick_volume'].isnull().all():
-                df_m1['obv'] = OnBalanceVolumeIndicator(df_m1['close'], df_m1['tick_volume']).on_balance_volume()
-            else: df_m1['obv'] = 0
-            df_m1 = df_m1.dropna()
+        self.news_impact_label = QLabel("Dampak Saat Ini: None")
+        self.news_impact_label.setStyleSheet("font-weight: bold;")
+        self.next_news_label = QLabel("Berita Selanjutnya: N/A")
+        self.next_news_label.setStyleSheet("font-weight: bold;")
+        self.news_status_label = QLabel("Status: Mengecek...")
+        self.news_status_label.setStyleSheet("font-weight: bold;")
 
-            if df_m1.empty or len(df_m1) < 2:
-                self.log("Data candlestick M1 tidak cukup untuk analisis Scalping.")
-                return
-            
-            if not df_m5_for_trend.empty:
-                df_m5_for_trend['sma20'] = SMAIndicator(df_m5_for_trend['close'], window=20).sma_indicator()
-                df_m5_for_trend['sma50'] = SMAIndicator(df_m5_for_trend['close'], window=50).sma_indicator()
-                df_m5_for_trend = df_m5_for_trend.dropna()
+        news_layout.addWidget(QLabel("⚡ Dampak Berita:"), 0, 0)
+        news_layout.addWidget(self.news_impact_label, 0, 1)
+        news_layout.addWidget(QLabel("📅 Berita Selanjutnya:"), 1, 0)
+        news_layout.addWidget(self.next_news_label, 1, 1)
+        news_layout.addWidget(QLabel("ℹ️ Status Berita:"), 2, 0)
+        news_layout.addWidget(self.news_status_label, 2, 1)
 
-            higher_tf_trend_scalping = "Sideways"
-            if not df_m5_for_trend.empty:
-                last_m5_candle = df_m5_for_trend.iloc[-1]
-                if last_m5_candle['sma20'] > last_m5_candle['sma50']: higher_tf_trend_scalping = "Up Trend"
-                elif last_m5_candle['sma20'] < last_m5_candle['sma50']: higher_tf_trend_scalping = "Down Trend"
-            
-            tick = mt5.symbol_info_tick(symbol)
-            if tick is None:
-                self.log("Gagal mendapatkan data tick.")
-                return
-            current_price_ask = tick.ask
-            current_price_bid = tick.bid
+        news_box.setLayout(news_layout)
+        self.layout.addWidget(news_box)
 
-            self.log(f"⚡ Scalping: M1 Analisis, Tren M5: {higher_tf_trend_scalping}")
+        settings_box = QGroupBox("⚙️ Pengaturan Trading")
+        settings_layout = QHBoxLayout()
+        self.settings_button = QPushButton("Buka Pengaturan")
+        self.settings_button.setStyleSheet("background-color: #607D8B; color: white; font-weight: bold;")
+        self.settings_button.clicked.connect(self.open_settings_dialog)
+        settings_layout.addWidget(self.settings_button)
+        settings_box.setLayout(settings_layout)
+        self.layout.addWidget(settings_box)
 
-            if has_open_position:
-                for pos in open_positions:
-                    point = mt5.symbol_info(symbol).point
-                    pips_gain = (current_price_bid - pos.price_open) / point / 10 if pos.type == mt5.ORDER_TYPE_BUY else (pos.price_open - current_price_ask) / point / 10
-                    
-                    pos_open_time = datetime.datetime.fromtimestamp(pos.time)
-                    time_in_position = (datetime.datetime.now() - pos_open_time).total_seconds() / 60
+        account_box = QGroupBox("💼 Info Akun")
+        account_layout = QGridLayout()
+        
+        self.balance_label = QLabel("Balance: -")
+        self.equity_label = QLabel("Equity: -")
+        self.margin_label = QLabel("Margin: -")
+        self.free_margin_label = QLabel("Free Margin: -")
+        self.positions_label = QLabel("Open Positions: -")
+        self.profit_label = QLabel("Current Profit: -")
+        
+        for lbl in [self.balance_label, self.equity_label, self.margin_label,
+                     self.free_margin_label, self.positions_label, self.profit_label]:
+            lbl.setStyleSheet("font-weight: bold;")
+            
+        account_layout.addWidget(QLabel("💰 Balance:"), 0, 0)
+        account_layout.addWidget(self.balance_label, 0, 1)
+        account_layout.addWidget(QLabel("📊 Equity:"), 1, 0)
+        account_layout.addWidget(self.equity_label, 1, 1)
+        account_layout.addWidget(QLabel("💳 Margin:"), 2, 0)
+        account_layout.addWidget(self.margin_label, 2, 1)
+        account_layout.addWidget(QLabel("🆓 Free Margin:"), 0, 2)
+        account_layout.addWidget(self.free_margin_label, 0, 3)
+        account_layout.addWidget(QLabel("📌 Positions:"), 1, 2)
+        account_layout.addWidget(self.positions_label, 1, 3)
+        account_layout.addWidget(QLabel("💰 Current Profit:"), 2, 2)
+        account_layout.addWidget(self.profit_label, 2, 3)
+        
+        account_box.setLayout(account_layout)
+        self.layout.addWidget(account_box)
 
-                    if current_news_impact == "High":
-                        self.log(f"🔴 Scalping: BERITA BERDAMPAK TINGGI terdeteksi. Menutup posisi #{pos.ticket} untuk keamanan.")
-                        self.close_position(pos)
-                        continue
-                    
-                    if pos.profit <= -scalping_max_loss_usd:
-                        self.log(f"🔴 Scalping: Posisi #{pos.ticket} rugi mentok (${pos.profit:.2f}). Menutup.")
-                        self.close_position(pos)
-                        continue
-                    
-                    if pos.profit >= scalping_min_profit_usd:
-                        if pos.profit >= scalping_max_profit_usd:
-                            self.log(f"✅ Scalping: Posisi #{pos.ticket} profit max tercapai (${pos.profit:.2f}). Menutup.")
-                            self.close_position(pos)
-                            continue
-                        elif pos.profit >= scalping_min_profit_usd and self._is_bearish_engulfing(df_m1) and pos.type == mt5.ORDER_TYPE_BUY:
-                            self.log(f"✅ Scalping: Posisi #{pos.ticket} profit min tercapai, ada bearish engulfing. Menutup.")
-                            self.close_position(pos)
-                            continue
-                        elif pos.profit >= scalping_min_profit_usd and self._is_bullish_engulfing(df_m1) and pos.type == mt5.ORDER_TYPE_SELL:
-                            self.log(f"✅ Scalping: Posisi #{pos.ticket} profit min tercapai, ada bullish engulfing. Menutup.")
-                            self.close_position(pos)
-                            continue
-                        
-                        # Implement Trailing Stop/Break Even Plus here (if not already at BEP+)
-                        # This checks if SL is still at or below original entry (for buy) or above (for sell)
-                        # And if pips_gain is at least 1 pip.
-                        if pips_gain >= 1 and ((pos.type == mt5.ORDER_TYPE_BUY and pos.sl < pos.price_open + (0.5 * point * 10)) or \
-                                                (pos.type == mt5.ORDER_TYPE_SELL and pos.sl > pos.price_open - (0.5 * point * 10)) or pos.sl == 0.0):
-                            symbol_info_current = mt5.symbol_info(symbol)
-                            if symbol_info_current is not None:
-                                point_value = mt5.symbol_info(symbol).point
-                                be_plus_profit_pips = 0.5 # Example: move SL to +0.5 pips profit
-                                if pos.type == mt5.ORDER_TYPE_BUY:
-                                    new_sl_price = pos.price_open + (be_plus_profit_pips * point_value * 10)
-                                else: # SELL
-                                    new_sl_price = pos.price_open - (be_plus_profit_pips * point_value * 10)
-                                
-                                self.modify_sl_tp(pos.ticket, new_sl_price, pos.tp, "Scalping BEP+")
-                            else: self.log(f"Gagal mendapatkan info simbol untuk BEP SL #{pos.ticket}.")
+        control_box = QGroupBox("⚙️ Control Panel")
+        control_layout = QHBoxLayout()
+        
+        self.start_monitoring_button = QPushButton("👁️ Mulai Monitoring")
+        self.start_monitoring_button.setStyleSheet("background-color: #607D8B; color: white; font-weight: bold;")
+        self.start_monitoring_button.clicked.connect(self.toggle_monitoring_mode)
 
-                    if time_in_position >= self.trading_settings['max_hold_duration']:
-                        self.log(f"⏰ Scalping: Posisi #{pos.ticket} melebihi batas waktu {self.trading_settings['max_hold_duration']} menit. Menutup posisi.")
-                        self.close_position(pos)
-                        continue
-                        
-                    self.log(f"⚪ Scalping: Posisi #{pos.ticket} dipegang (${pos.profit:.2f}).")
+        self.start_ai_long_button = QPushButton("🚀 Mulai AI Long Trade")
+        self.start_ai_long_button.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
+        self.start_ai_long_button.clicked.connect(self.toggle_ai_long_trade_mode)
 
-            else: # No open positions, consider opening a new one
-                last_m1_candle = df_m1.iloc[-1]
-                
-                last_m1_atr = df_m1['atr'].iloc[-1] if not df_m1['atr'].isnull().iloc[-1] else 0.5
-                point_value = mt5.symbol_info(symbol).point
-                sl_pips_dynamic = max(round(last_m1_atr * 10 / point_value), 2) # SL min 2 pips
+        self.start_scalping_button = QPushButton("⚡ Mulai Scalping")
+        self.start_scalping_button.setStyleSheet("background-color: #FFC107; color: black; font-weight: bold;")
+        self.start_scalping_button.clicked.connect(self.toggle_scalping_mode)
+        
+        # Tombol baru untuk mode Sniper
+        self.start_sniper_button = QPushButton("🎯 Mulai Sniper")
+        self.start_sniper_button.setStyleSheet("background-color: #9C27B0; color: white; font-weight: bold;")
+        self.start_sniper_button.clicked.connect(self.toggle_sniper_mode)
 
-                calculated_lot_scalping = self.calculate_lot_size_by_risk(scalping_max_loss_usd, sl_pips_dynamic, current_price_ask)
-                
-                target_profit_usd_scalping = np.random.uniform(scalping_min_profit_usd, scalping_max_profit_usd)
-                tp_pips_dynamic = target_profit_usd_scalping / (calculated_lot_scalping * 10.0) if calculated_lot_scalping > 0 else 1.0
-                tp_pips_dynamic = round(tp_pips_dynamic)
+        self.train_button = QPushButton("🤖 Latih Model")
+        self.train_button.setStyleSheet("background-color: #2196F3; color: white; font-weight: bold;")
+        self.train_button.clicked.connect(lambda: self.engine.request_retrain("manual"))
 
-                if calculated_lot_scalping <= 0:
-                    self.log("Scalping: Ukuran lot yang dihitung terlalu kecil atau tidak valid.")
-                    return
+        self.rollback_model_button = QPushButton("↩️ Rollback Model")
+        self.rollback_model_button.setStyleSheet("background-color: #78909C; color: white; font-weight: bold;")
+        self.rollback_model_button.clicked.connect(lambda: self.engine.submit(self.engine.rollback_model))
+        self.rollback_model_button.setToolTip("Kembali ke model sebelum pelatihan ulang terakhir")
+        
+        self.close_all_button = QPushButton("❌ Tutup Semua")
+        self.close_all_button.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
+        self.close_all_button.clicked.connect(lambda: self.engine.submit(self.engine.close_all_positions))
+        self.close_all_button.setToolTip("Tutup semua posisi yang terbuka segera")
 
-                if current_news_impact in ["High", "Medium"]:
-                    self.log("🚫 Scalping: Berita berdampak tinggi/menengah aktif. Menunda entry.")
-                    return
-                
-                entry_signal = None
-                rsi_val = df_m1['rsi'].iloc[-1]
-                
-                # Simplified RSI-based entry logic
-                if rsi_val < 30 and (higher_tf_trend_scalping == "Up Trend" or higher_tf_trend_scalping == "Sideways"):
-                    entry_signal = 1 # Buy on oversold in an uptrend or sideways market
-                    self.log(f"💡 Scalping: RSI Oversold ({rsi_val:.2f}) dan Tren M5 {higher_tf_trend_scalping} (BUY).")
-                elif rsi_val > 70 and (higher_tf_trend_scalping == "Down Trend" or higher_tf_trend_scalping == "Sideways"):
-                    entry_signal = 0 # Sell on overbought in a downtrend or sideways market
-                    self.log(f"💡 Scalping: RSI Overbought ({rsi_val:.2f}) dan Tren M5 {higher_tf_trend_scalping} (SELL).")
+        self.execution_stats_button = QPushButton("📊 Statistik Eksekusi")
+        self.execution_stats_button.setStyleSheet("background-color: #795548; color: white; font-weight: bold;")
+        self.execution_stats_button.clicked.connect(self.engine.log_execution_report)
+        self.execution_stats_button.setToolTip("Tampilkan latensi, slippage, dan retry order (p50/p95/p99) di log")
 
-                if entry_signal is not None:
-                    self.log(f"✅ Scalping: Melakukan entry {('BELI' if entry_signal == 1 else 'JUAL')} dengan {calculated_lot_scalping:.2f} lot.")
-                    self.log(f"    TP: {tp_pips_dynamic:.1f} pips (${target_profit_usd_scalping:.2f}) | SL: {sl_pips_dynamic:.1f} pips (${scalping_max_loss_usd:.2f})")
-                    
-                    self.execute_trade(entry_signal, current_price_ask if entry_signal == 1 else current_price_bid, df_m1, # Use current_price_ask for BUY, current_price_bid for SELL
-                                       lot_size_override=calculated_lot_scalping,
-                                       tp_pips_override=tp_pips_dynamic,
-                                       sl_pips_override=sl_pips_dynamic)
-                else:
-                    self.log("🚫 Scalping: Kondisi RSI/Tren tidak ideal untuk entry.")
+        control_layout.addWidget(self.start_monitoring_button)
+        control_layout.addWidget(self.start_ai_long_button)
+        control_layout.addWidget(self.start_scalping_button)
+        control_layout.addWidget(self.start_sniper_button) # Tambahkan tombol sniper
+        control_layout.addWidget(self.train_button)
+        control_layout.addWidget(self.rollback_model_button)
+        control_layout.addWidget(self.close_all_button)
+        control_layout.addWidget(self.execution_stats_button)
+        control_box.setLayout(control_layout)
+        self.layout.addWidget(control_box)
 
-        except Exception as e:
-            self.log(f"⚠️ Error dalam Scalping: {str(e)}")
+        # Panel profiler tahap yang bisa dilipat; statistik dibaca dari profiler global hanya saat panel terbuka
+        self.profiler_toggle = QToolButton()
+        self.profiler_toggle.setText("⏱️ Profiler Tahap")
+        self.profiler_toggle.setCheckable(True)
+        self.profiler_toggle.setArrowType(Qt.ArrowType.RightArrow)
+        self.profiler_toggle.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextBesideIcon)
+        self.profiler_toggle.setStyleSheet("border: none; font-weight: bold;")
+        self.profiler_toggle.toggled.connect(self.toggle_profiler_panel)
+
+        self.profiler_enabled_checkbox = QCheckBox("Aktifkan sampling")
+        self.profiler_enabled_checkbox.setChecked(profiler.enabled)
+        self.profiler_enabled_checkbox.toggled.connect(self.set_profiling)
+        self.profiler_enabled_checkbox.setToolTip(f"Statistik juga ditulis ke {PROFILER_FILE} setiap {PROFILER_DUMP_SECONDS} detik")
+        profiler_reset_button = QPushButton("Reset")
+        profiler_reset_button.clicked.connect(profiler.reset)
+        profiler_reset_button.clicked.connect(self.refresh_profiler_panel)
+        self.profiler_output = QPlainTextEdit()
+        self.profiler_output.setReadOnly(True)
+        self.profiler_output.setMaximumHeight(200)
+        self.profiler_output.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.profiler_output.setStyleSheet("font-family: Consolas; font-size: 11px;")
+
+        self.profiler_panel = QWidget()
+        profiler_layout = QVBoxLayout(self.profiler_panel)
+        profiler_layout.setContentsMargins(0, 0, 0, 0)
+        profiler_controls = QHBoxLayout()
+        profiler_controls.addWidget(self.profiler_enabled_checkbox)
+        profiler_controls.addWidget(profiler_reset_button)
+        profiler_controls.addStretch()
+        profiler_layout.addLayout(profiler_controls)
+        profiler_layout.addWidget(self.profiler_output)
+        self.profiler_panel.setVisible(False)
+
+        self.profiler_timer = QTimer(self)
+        self.profiler_timer.timeout.connect(self.refresh_profiler_panel)
+
+        self.layout.addWidget(self.profiler_toggle)
+        self.layout.addWidget(self.profiler_panel)
 
-    def _is_bullish_engulfing(self, df):
-        """
-        Mendeteksi pola Bullish Engulfing.
-        Pola pembalikan bullish yang kuat: Candle bullish besar menelan candle bearish sebelumnya.
-        Args:
-            df (DataFrame): DataFrame data candle.
-        Returns:
-            bool: True jika pola terdeteksi, False jika tidak.
-        """
-        if len(df) < 2: return False
-        candle0 = df.iloc[-1]
-        candle1 = df.iloc[-2]
-        
-        return (candle0['close'] > candle0['open'] and # Current candle is bullish
-                candle1['close'] < candle1['open'] and # Previous candle is bearish
-                candle0['close'] >= candle1['open'] and # Bullish candle engulfs previous body (top)
-                candle0['open'] <= candle1['close'])    # Bullish candle engulfs previous body (bottom)
+        # Menambahkan log_output ke layout
+        self.layout.addWidget(self.log_output)
 
-    def _is_bearish_engulfing(self, df):
+        self.setLayout(self.layout)
+
+    def set_mode(self, mode):
         """
-        Mendeteksi pola Bearish Engulfing.
-        Pola pembalikan bearish yang kuat: Candle bearish besar menelan candle bullish sebelumnya.
+        Meminta engine mengganti mode operasi bot. Tampilan diperbarui saat event "mode" diterima.
         Args:
-            df (DataFrame): DataFrame data candle.
-        Returns:
-            bool: True jika pola terdeteksi, False jika tidak.
+            mode (str): Mode baru ('Stopped', 'Monitoring', 'AI_Long_Trade', 'Scalping_Bot', 'Sniper_Bot').
         """
-        if len(df) < 2: return False
-        candle0 = df.iloc[-1]
-        candle1 = df.iloc[-2]
-        
-        return (candle0['close'] < candle0['open'] and # Current candle is bearish
-                candle1['close'] > candle1['open'] and # Previous candle is bullish
-                candle0['close'] <= candle1['open'] and # Bearish candle engulfs previous body (bottom)
-                candle0['open'] >= candle1['close'])    # Bearish candle engulfs previous body (top)
+        self.engine.set_mode(mode)
 
-    def _is_hammer_inverted_hammer(self, df):
+    def update_mode_display(self, mode):
         """
-        Mendeteksi pola Hammer atau Inverted Hammer.
-        Keduanya adalah sinyal pembalikan bullish, sering muncul di akhir downtrend.
-        Hammer: body kecil di atas, sumbu bawah panjang.
-        Inverted Hammer: body kecil di bawah, sumbu atas panjang.
+        Memperbarui label status dan tombol kontrol sesuai mode aktif engine.
         Args:
-            df (DataFrame): DataFrame data candle.
-        Returns:
-            bool: True jika pola terdeteksi, False jika tidak.
+            mode (str): Mode yang sedang aktif.
         """
-        if len(df) < 1: return False
-        candle = df.iloc[-1]
-        
-        body = abs(candle['close'] - candle['open'])
-        lower_wick = min(candle['open'], candle['close']) - candle['low']
-        upper_wick = candle['high'] - max(candle['open'], candle['close'])
-        
-        if df['atr'].iloc[-1] == 0 or pd.isna(df['atr'].iloc[-1]): return False
-        is_small_body = body < (df['atr'].iloc[-1] * 0.3) # Body is small relative to ATR
-
-        is_hammer = (is_small_body and
-                     lower_wick > (2 * body) and # Long lower wick
-                     upper_wick < body)          # Very small or no upper wick
-        
-        is_inverted_hammer = (is_small_body and
-                              upper_wick > (2 * body) and # Long upper wick
-                              lower_wick < body)           # Very small or no lower wick
+        self.start_monitoring_button.setText("👁️ Mulai Monitoring")
+        self.start_monitoring_button.setStyleSheet("background-color: #607D8B; color: white; font-weight: bold;")
+        self.start_ai_long_button.setText("🚀 Mulai AI Long Trade")
+        self.start_ai_long_button.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold;")
+        self.start_scalping_button.setText("⚡ Mulai Scalping")
+        self.start_scalping_button.setStyleSheet("background-color: #FFC107; color: black; font-weight: bold;")
+        self.start_sniper_button.setText("🎯 Mulai Sniper") # Reset sniper button
+        self.start_sniper_button.setStyleSheet("background-color: #9C27B0; color: white; font-weight: bold;")
 
-        return is_hammer or is_inverted_hammer
+        if mode == "Stopped":
+            self.status_label.setText("🔴 BOT STOPPED")
+        elif mode == "Monitoring":
+            self.status_label.setText("🟢 BOT MONITORING")
+            self.start_monitoring_button.setText("⛔ Hentikan Monitoring")
+            self.start_monitoring_button.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
+        elif mode == "AI_Long_Trade":
+            self.status_label.setText("🟢 BOT BERJALAN | Mode: AI Long Trade")
+            self.start_ai_long_button.setText("⛔ Hentikan AI Long Trade")
+            self.start_ai_long_button.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
+        elif mode == "Scalping_Bot":
+            self.status_label.setText("🟢 BOT BERJALAN | Mode: Scalping")
+            self.start_scalping_button.setText("⛔ Hentikan Scalping")
+            self.start_scalping_button.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
+        elif mode == "Sniper_Bot": # Mode baru
+            self.status_label.setText("🟢 BOT BERJALAN | Mode: Sniper")
+            self.start_sniper_button.setText("⛔ Hentikan Sniper")
+            self.start_sniper_button.setStyleSheet("background-color: #f44336; color: white; font-weight: bold;")
 
-    def _is_shooting_star_hanging_man(self, df):
-        """
-        Mendeteksi pola Shooting Star atau Hanging Man.
-        Keduanya adalah sinyal pembalikan bearish, sering muncul di akhir uptrend/downtrend.
-        Shooting Star: body kecil di bawah, sumbu atas panjang.
-        Hanging Man: body kecil di atas, sumbu bawah panjang.
-        Args:
-            df (DataFrame): DataFrame data candle.
-        Returns:
-            bool: True jika pola terdeteksi, False jika tidak.
-        """
-        if len(df) < 1: return False
-        candle = df.iloc[-1]
+    def toggle_monitoring_mode(self):
+        """Mengubah antara mode Monitoring dan Stopped."""
+        if current_mode == "Monitoring":
+            self.set_mode("Stopped")
+        else:
+            self.set_mode("Monitoring")
 
-        body = abs(candle['close'] - candle['open'])
-        lower_wick = min(candle['open'], candle['close']) - candle['low']
-        upper_wick = candle['high'] - max(candle['open'], candle['close'])
+    def toggle_ai_long_trade_mode(self):
+        """Mengubah antara mode AI Long Trade dan Stopped."""
+        if current_mode == "AI_Long_Trade":
+            self.set_mode("Stopped")
+        else:
+            self.set_mode("AI_Long_Trade")
 
-        if df['atr'].iloc[-1] == 0 or pd.isna(df['atr'].iloc[-1]): return False
-        is_small_body = body < (df['atr'].iloc[-1] * 0.3)
+    def toggle_scalping_mode(self):
+        """Mengubah antara mode Scalping dan Stopped."""
+        if current_mode == "Scalping_Bot":
+            self.set_mode("Stopped")
+        else:
+            self.set_mode("Scalping_Bot")
 
-        is_shooting_star = (is_small_body and
-                            upper_wick > (2 * body) and # Long upper wick
-                            lower_wick < body)          # Very small or no lower wick
-        
-        is_hanging_man = (is_small_body and
-                          lower_wick > (2 * body) and # Long lower wick
-                          upper_wick < body)          # Very small or no upper wick
+    def toggle_sniper_mode(self): # Fungsi baru untuk toggle mode Sniper
+        """Mengubah antara mode Sniper dan Stopped."""
+        if current_mode == "Sniper_Bot":
+            self.set_mode("Stopped")
+        else:
+            self.set_mode("Sniper_Bot")
 
-        return is_shooting_star or is_hanging_man
+    def open_settings_dialog(self):
+        """
+        Membuka dialog pengaturan trading dan menyimpan pengaturan jika diterima.
+        """
+        # Pastikan dialog dibuka dengan pengaturan yang sedang aktif
+        dialog = TradingSettingsDialog(self, self.engine.trading_settings)
+        if dialog.exec() == QDialogButtonBox.StandardButton.Ok:
+            # Digabung agar pengaturan di luar dialog (mis. hasil --optimize) tidak hilang
+            self.engine.trading_settings = {**self.engine.trading_settings, **dialog.get_settings()}
+            self.save_settings()
 
-    def modify_sl_tp(self, ticket, new_sl, new_tp, comment=""):
+    def on_engine_event(self, event, payload):
         """
-        Mengubah harga Stop Loss (SL) dan Take Profit (TP) untuk posisi yang sudah ada.
+        Slot penerima aliran state engine (selalu dipanggil di thread GUI).
         Args:
-            ticket (int): Nomor tiket posisi yang akan diubah.
-            new_sl (float): Harga Stop Loss yang baru.
-            new_tp (float): Harga Take Profit yang baru.
-            comment (str): Komentar untuk operasi ini.
+            event (str): Nama event dari TradingEngine.
+            payload: Data event.
         """
-        request = {
-            "action": mt5.TRADE_ACTION_SLTP,
-            "position": ticket,
-            "sl": new_sl,
-            "tp": new_tp,
-            "magic": 123456,
-            "comment": comment,
+        if event == "status":
+            self.status_label.setText(payload)
+        elif event == "mode":
+            self.update_mode_display(payload)
+        elif event == "market":
+            self.update_market_labels(payload)
+        elif event == "account":
+            self.update_account_info(payload)
+        elif event == "news":
+            self.update_news_labels(payload)
+        elif event == "trade_stats":
+            self.update_winrate(payload)
+            self.update_last_trade_result_label(payload)
+
+    def _apply_label_state(self, label, text, color, style="color: {}; font-weight: bold;"):
+        """Mengatur teks label dan, jika warna diberikan, gayanya."""
+        label.setText(text)
+        if color is not None:
+            label.setStyleSheet(style.format(color))
+
+    def update_market_labels(self, market_state):
+        """
+        Memperbarui label analisis teknikal di UI dari hasil TradingEngine.analyze_market.
+        Args:
+            market_state (dict): Nama label -> (teks, warna).
+        """
+        labels = {
+            'price': self.price_label, 'rsi': self.rsi_label, 'macd': self.macd_label,
+            'ema': self.ema_label, 'bb': self.bb_label, 'atr': self.atr_label,
+            'trend': self.trend_label, 'obv': self.obv_label,
+            'higher_tf_trend': self.higher_tf_trend_label, 'snr': self.snr_label,
+            'liquidity': self.liquidity_label,
         }
-        result = mt5.order_send(request)
-        if result is None:
-            self.log(f"❌ Modify SL/TP None: Posisi #{ticket}. Mungkin masalah koneksi.")
-        elif result.retcode == mt5.TRADE_RETCODE_DONE:
-            self.log(f"✅ SL/TP posisi #{ticket} berhasil diubah. SL: {new_sl:.2f}, TP: {new_tp:.2f}.")
-        else:
-            self.log(f"❌ Gagal mengubah SL/TP posisi #{ticket}: {self.get_error_message(result.retcode)}")
+        for key, (text, color) in market_state.items():
+            if key == 'overall':
+                self._apply_label_state(self.overall_analysis_label, text, color, "font-weight: bold; color: {};")
+            elif key in labels:
+                self._apply_label_state(labels[key], text, color)
 
-
-    def close_position(self, position):
+    def update_account_info(self, account_state):
         """
-        Menutup posisi trading tunggal.
+        Memperbarui label info akun di UI.
         Args:
-            position (mt5.TradePosition): Objek posisi yang akan ditutup.
-        Returns:
-            bool: True jika posisi berhasil ditutup, False jika gagal.
+            account_state (dict): Ringkasan akun dari event "account" engine.
         """
-        tick = mt5.symbol_info_tick(symbol)
-        if tick is None:
-            self.log(f"Gagal mendapatkan tick untuk menutup posisi #{position.ticket}")
-            return False
+        self.balance_label.setText(f"${account_state['balance']:.2f}")
+        self.equity_label.setText(f"${account_state['equity']:.2f}")
+        self.margin_label.setText(f"${account_state['margin']:.2f}")
+        self.free_margin_label.setText(f"${account_state['margin_free']:.2f}")
+
+        if account_state['positions'] == 0:
+            self.positions_label.setText("0")
+            self.profit_label.setText("$0.00")
+            self.profit_label.setStyleSheet("color: black; font-weight: bold;")
+            return
 
-        close_request = {
-            "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": position.symbol,
-            "volume": position.volume,
-            "type": mt5.ORDER_TYPE_SELL if position.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY, # Opposite of current position type
-            "position": position.ticket,
-            "price": tick.bid if position.type == mt5.ORDER_TYPE_BUY else tick.ask, # Bid for closing buy, Ask for closing sell
-            "deviation": 10, # Max price deviation in points
-            "magic": position.magic,
-            "comment": "Closed by AI Trading Bot",
-            "type_time": mt5.ORDER_TIME_GTC, # Good Till Cancel
-            "type_filling": mt5.ORDER_FILLING_FOK, # Fill Or Kill
-        }
-        
-        result = mt5.order_send(close_request)
-        if result is None:
-            self.log(f"❌ Hasil order_send (Close Position #{position.ticket}) adalah None. Kemungkinan masalah koneksi atau server.")
-            return False
+        self.positions_label.setText(f"{account_state['positions']}")
+        total_profit = account_state['profit']
+        self.profit_label.setText(f"${total_profit:.2f}")
 
-        if result.retcode == mt5.TRADE_RETCODE_DONE:
-            self.log(f"✅ Posisi #{position.ticket} berhasil ditutup. Profit: ${position.profit:.2f}")
-            global last_trade_result
-            if position.profit > 0:
-                global win_count
-                win_count += 1
-                last_trade_result = "Win"
-            else:
-                global loss_count
-                loss_count += 1
-                last_trade_result = "Loss"
-            self.update_winrate()
-            self.update_account_info()
-            self.update_last_trade_result_label() # Perbarui label hasil trade
-            return True
+        if total_profit > 0:
+            self.profit_label.setStyleSheet("color: green; font-weight: bold;")
+            self.equity_label.setStyleSheet("color: green; font-weight: bold;")
+        elif total_profit < 0:
+            self.profit_label.setStyleSheet("color: red; font-weight: bold;")
+            self.equity_label.setStyleSheet("color: red; font-weight: bold;")
         else:
-            error_msg = self.get_error_message(result.retcode)
-            self.log(f"❌ Gagal menutup posisi #{position.ticket}: {error_msg}. Retcode: {result.retcode}")
-            last_trade_result = "Gagal Tutup"
-            self.update_last_trade_result_label() # Perbarui label hasil trade
-            return False
+            self.profit_label.setStyleSheet("color: black; font-weight: bold;")
+            self.equity_label.setStyleSheet("color: black; font-weight: bold;")
 
-    def get_error_message(self, retcode):
+    def update_news_labels(self, news_state):
         """
-        Mengembalikan pesan kesalahan yang dapat dibaca manusia dari kode pengembalian MT5.
+        Memperbarui label analisis berita di UI.
         Args:
-            retcode (int): Kode pengembalian dari operasi MT5.
-        Returns:
-            str: Deskripsi pesan kesalahan.
+            news_state (dict): Nama label ('impact', 'next', 'status') -> (teks, warna).
         """
-        errors = {
-            mt5.TRADE_RETCODE_REQUOTE: "Harga berubah (requote)",
-            mt5.TRADE_RETCODE_REJECT: "Order ditolak",
-            mt5.TRADE_RETCODE_CANCEL: "Order dibatalkan",
-            mt5.TRADE_RETCODE_PLACED: "Order sudah diproses",
-            mt5.TRADE_RETCODE_DONE: "Order berhasil",
-            mt5.TRADE_RETCODE_DONE_PARTIAL: "Order parsial",
-            mt5.TRADE_RETCODE_ERROR: "Error umum",
-            mt5.TRADE_RETCODE_TIMEOUT: "Timeout",
-            mt5.TRADE_RETCODE_INVALID: "Parameter tidak valid",
-            mt5.TRADE_RETCODE_INVALID_VOLUME: "Volume tidak valid",
-            mt5.TRADE_RETCODE_INVALID_PRICE: "Harga tidak valid",
-            mt5.TRADE_RETCODE_INVALID_STOPS: "Stop Loss/Take Profit tidak valid",
-            mt5.TRADE_RETCODE_TRADE_DISABLED: "Trading dinonaktifkan",
-            mt5.TRADE_RETCODE_MARKET_CLOSED: "Market tutup",
-            mt5.TRADE_RETCODE_NO_MONEY: "Dana tidak cukup",
-            mt5.TRADE_RETCODE_PRICE_CHANGED: "Harga berubah",
-            mt5.TRADE_RETCODE_PRICE_OFF: "Harga tidak sesuai",
-            mt5.TRADE_RETCODE_INVALID_EXPIRATION: "Kadaluarsa tidak valid",
-            mt5.TRADE_RETCODE_ORDER_CHANGED: "Order diubah",
-            mt5.TRADE_RETCODE_TOO_MANY_REQUESTS: "Terlalu banyak permintaan",
-            mt5.TRADE_RETCODE_NO_CHANGES: "Tidak ada perubahan",
-            mt5.TRADE_RETCODE_SERVER_DISABLES_AT: "Auto trading dinonaktifkan di server",
-            mt5.TRADE_RETCODE_CLIENT_DISABLES_AT: "Auto trading dinonaktifkan di klien",
-            mt5.TRADE_RETCODE_LOCKED: "Akun terkunci",
-            mt5.TRADE_RETCODE_FROZEN: "Akun beku",
-            mt5.TRADE_RETCODE_INVALID_FILL: "Tipe pengisian tidak valid",
-            mt5.TRADE_RETCODE_CONNECTION: "Tidak ada koneksi",
-            mt5.TRADE_RETCODE_ONLY_REAL: "Hanya akun real",
-            mt5.TRADE_RETCODE_LIMIT_ORDERS: "Terlalu banyak order",
-            mt5.TRADE_RETCODE_LIMIT_VOLUME: "Volume melebihi batas",
-            mt5.TRADE_RETCODE_INVALID_ORDER: "Order tidak valid",
-            mt5.TRADE_RETCODE_POSITION_CLOSED: "Posisi sudah ditutup"
-        }
-        return errors.get(retcode, f"Error tidak diketahui (kode: {retcode})")
+        labels = {'impact': self.news_impact_label, 'next': self.next_news_label, 'status': self.news_status_label}
+        for key, (text, color) in news_state.items():
+            self._apply_label_state(labels[key], text, color, "font-weight: bold; color: {};")
+
+    def update_winrate(self, trade_stats):
+        """
+        Memperbarui dan menampilkan persentase kemenangan di UI.
+        Args:
+            trade_stats (dict): Statistik trade dari event "trade_stats" engine.
+        """
+        wins, losses = trade_stats['win_count'], trade_stats['loss_count']
+        total = wins + losses
+        if total > 0:
+            winrate = (wins / total) * 100
+            self.winrate_label.setText(f"Winrate: {winrate:.1f}% ({wins}/{total})")
+            if winrate >= 50:
+                self.winrate_label.setStyleSheet("color: green; font-weight: bold;")
+            else:
+                self.winrate_label.setStyleSheet("color: red; font-weight: bold;")
+        else:
+            self.winrate_label.setText("Winrate: 0% (0/0)")
+            self.winrate_label.setStyleSheet("color: blue; font-weight: bold;")
 
-    def update_last_trade_result_label(self):
+    def update_last_trade_result_label(self, trade_stats):
         """
         Memperbarui label hasil trade terakhir di UI.
+        Args:
+            trade_stats (dict): Statistik trade dari event "trade_stats" engine.
         """
-        global last_trade_result
-        self.last_trade_result_label.setText(f"Hasil Trade Terakhir: {last_trade_result}")
-        if last_trade_result == "Win":
+        result = trade_stats['last_trade_result']
+        self.last_trade_result_label.setText(f"Hasil Trade Terakhir: {result}")
+        if result == "Win":
             self.last_trade_result_label.setStyleSheet("font-weight: bold; color: green;")
-        elif last_trade_result == "Loss" or last_trade_result == "Gagal Tutup":
+        elif result == "Loss" or result == "Gagal Tutup":
             self.last_trade_result_label.setStyleSheet("font-weight: bold; color: red;")
         else:
             self.last_trade_result_label.setStyleSheet("font-weight: bold; color: black;")
 
     def log(self, message):
         """
-        Menambahkan pesan ke area log UI dan memastikan area log menggulir ke bawah secara otomatis.
+        Mencatat pesan dari GUI ke log engine; pesan tampil di area log pada flush berikutnya.
         Args:
             message (str): Pesan yang akan ditambahkan ke log.
         """
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        self.log_output.append(f"[{timestamp}] {message}")
+        self.engine.log(message)
+
+    def toggle_profiler_panel(self, expanded):
+        """
+        Membuka/melipat panel profiler tahap; timer refresh hanya berjalan saat panel terbuka.
+        Args:
+            expanded (bool): True jika panel dibuka.
+        """
+        self.profiler_toggle.setArrowType(Qt.ArrowType.DownArrow if expanded else Qt.ArrowType.RightArrow)
+        self.profiler_panel.setVisible(expanded)
+        if expanded:
+            self.refresh_profiler_panel()
+            self.profiler_timer.start(PROFILER_UI_REFRESH_MS)
+        else:
+            self.profiler_timer.stop()
+
+    def set_profiling(self, enabled):
+        """
+        Menyalakan atau mematikan sampling profiler tahap.
+        Args:
+            enabled (bool): True untuk mulai sampling.
+        """
+        profiler.set_enabled(enabled)
+        self.log(f"⏱️ Profiler tahap {'aktif' if enabled else 'dimatikan'}.")
+        self.refresh_profiler_panel()
+
+    def refresh_profiler_panel(self):
+        """Menampilkan statistik bergulir per tahap dari profiler global."""
+        self.profiler_output.setPlainText(profiler.format_summary())
+
+    def flush_log(self):
+        """
+        Menarik baris log baru dari buffer engine dan menambahkannya ke area log dalam satu operasi,
+        lalu menggulir ke bawah. Dipanggil oleh log_timer.
+        """
+        self._log_seq, lines = self.engine.log_store.buffer.since(self._log_seq)
+        if not lines:
+            return
+        self.log_output.appendPlainText("\n".join(lines))
         self.log_output.ensureCursorVisible()
-        
-        QApplication.processEvents() # Process UI events to update immediately
 
     def closeEvent(self, event):
         """
         Menangani event penutupan aplikasi.
-        Memastikan timer dihentikan dan koneksi MT5 dimatikan dengan rapi.
+        Memastikan engine dihentikan dan koneksi MT5 dimatikan dengan rapi.
         """
-        global is_running
-        if is_running:
-            self.analysis_timer.stop()
-            self.data_timer.stop() # Stop data timer as well
-            self.news_timer.stop() # Stop news timer
-            is_running = False
-            
-        mt5.shutdown()
+        self.log_timer.stop()
+        self.profiler_timer.stop()
+        self.engine.stop()
+        self.engine_thread.join(timeout=10)
+        broker.shutdown()
         event.accept()
 
+
+def console_log_subscriber(event, payload):
+    """
+    Subscriber engine untuk mode headless: mencetak log dan perubahan status ke stdout.
+    Args:
+        event (str): Nama event dari TradingEngine.
+        payload: Data event.
+    """
+    timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+    if event == "log":
+        print(f"[{timestamp}] {payload}", flush=True)
+    elif event == "status":
+        print(f"[{timestamp}] {payload}", flush=True)
+
+
+# Konfigurasi micro-benchmark (lihat run_benchmarks)
+BENCHMARK_REPEATS = 7 # Jumlah ulangan per jalur; waktu terbaik (min) per panggilan yang dibandingkan dengan baseline
+BENCHMARK_REGRESSION_THRESHOLD = 0.25 # Gagal jika waktu terbaik lebih lambat dari baseline lebih dari 25%
+BENCHMARK_NOISE_FLOOR_US = 2.0 # Selisih absolut di bawah ini (µs) tidak dianggap regresi (jitter timer)
+BENCHMARK_SYNTHETIC_BARS = 20000 # Candle M1 sintetis jika tidak ada data rekaman (~14 hari, cukup untuk warmup simulator)
+BENCHMARK_MODES = ("Monitoring", "AI_Long_Trade", "Scalping_Bot", "Sniper_Bot") # Mode yang diukur satu siklus run_analysis
+
+
+def synthetic_rates(bars=BENCHMARK_SYNTHETIC_BARS, period=60, seed=BACKTEST_SEED, start_price=2000.0):
+    """
+    Membuat candle random walk yang deterministik untuk benchmark tanpa data rekaman.
+    Args:
+        bars (int): Jumlah candle.
+        period (int): Durasi candle dalam detik.
+        seed (int): Seed generator acak.
+        start_price (float): Harga awal.
+    Returns:
+        numpy.ndarray: Candle RATES_DTYPE yang berakhir di candle terakhir yang sudah selesai.
+    """
+    rng = np.random.default_rng(seed)
+    now = int(time.time())
+    end = now - now % period
+    rates = np.zeros(bars, dtype=RATES_DTYPE)
+    rates['time'] = end - period * np.arange(bars, 0, -1)
+    close = start_price + np.cumsum(rng.normal(0, 0.3, bars))
+    rates['open'] = np.r_[start_price, close[:-1]]
+    rates['close'] = close
+    rates['high'] = np.maximum(rates['open'], close) + rng.exponential(0.15, bars)
+    rates['low'] = np.minimum(rates['open'], close) - rng.exponential(0.15, bars)
+    rates['tick_volume'] = rng.integers(50, 500, bars)
+    rates['spread'] = SIM_DEFAULT_SPREAD_POINTS
+    return rates
+
+
+def benchmark_callable(fn, repeats=BENCHMARK_REPEATS):
+    """
+    Mengukur satu jalur kode dengan timeit: jumlah loop dikalibrasi (autorange, >= 0.2 detik per ulangan),
+    lalu diulang `repeats` kali.
+    Args:
+        fn (callable): Fungsi tanpa argumen yang diukur.
+        repeats (int): Jumlah ulangan.
+    Returns:
+        dict: median_us dan min_us per panggilan, serta loops dan repeats yang dipakai.
+    """
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    samples = [elapsed / loops * 1e6 for elapsed in timer.repeat(repeat=repeats, number=loops)]
+    return {'median_us': float(np.median(samples)), 'min_us': min(samples), 'loops': loops, 'repeats': repeats}
+
+
+def _benchmark_cases(engine, snapshot):
+    """
+    Jalur panas yang diukur, sebagai nama -> callable tanpa argumen.
+    Args:
+        engine (TradingEngine): Engine yang sudah terhubung ke broker simulasi dan punya model.
+        snapshot (MarketSnapshot): Snapshot pasar simbol utama.
+    Returns:
+        dict: Nama jalur -> callable.
+    """
+    rates = engine.market_data.rates(snapshot.symbol, AI_TRADING_TIMEFRAME, 200)
+    df_m1 = engine.market_data.frame(snapshot.symbol, SCALPING_TIMEFRAME, 50)
+    df_m5 = engine.market_data.frame(snapshot.symbol, AI_TRADING_TIMEFRAME, 200)
+    features = df_m5.iloc[-1:][AI_FEATURE_COLUMNS]
+    row = features.to_numpy(dtype=np.float32)[0]
+    pipeline_model = engine.primary.model
+    compiled = engine.compiled_model()
+    streaming = StreamingIndicators()
+    compute_indicator_array(rates['high'], rates['low'], rates['close'], rates['tick_volume'], engine=streaming)
+    last = rates[-1]
+    price = snapshot.tick.ask
+
+    cases = {
+        'indicators.compute_indicator_array': lambda: compute_indicator_array(
+            rates['high'], rates['low'], rates['close'], rates['tick_volume']),
+        'indicators.streaming_update': lambda: streaming.update(
+            last['high'], last['low'], last['close'], last['tick_volume'], revise=True),
+        'market.analyze_market': lambda: engine.analyze_market(snapshot),
+        'patterns.bullish_engulfing': lambda: engine._is_bullish_engulfing(df_m1),
+        'patterns.bearish_engulfing': lambda: engine._is_bearish_engulfing(df_m1),
+        'patterns.hammer_inverted_hammer': lambda: engine._is_hammer_inverted_hammer(df_m1),
+        'patterns.scan_patterns': lambda: scan_patterns(CandleArrays.from_frame(df_m5)),
+        'risk.calculate_lot_size_by_risk': lambda: engine.calculate_lot_size_by_risk(
+            engine.trading_settings['target_loss_usd'], 20, price, symbol_info=snapshot.symbol_info),
+        'model.predict': lambda: pipeline_model.predict(features),
+        'model.predict_proba': lambda: pipeline_model.predict_proba(features),
+        'model.compiled_predict': lambda: compiled.predict(row),
+        'news.check_economic_news': engine.check_economic_news,
+    }
+
+    def analysis_cycle(mode):
+        def run():
+            global current_mode
+            current_mode = mode
+            engine.run_analysis()
+        return run
+
+    for mode in BENCHMARK_MODES:
+        if mode == "Sniper_Bot" and not hasattr(engine, "_run_sniper_strategy"):
+            continue # Strategi Sniper belum diimplementasikan di engine ini
+        cases[f"analysis.run_analysis[{mode}]"] = analysis_cycle(mode)
+    return cases
+
+
+def run_benchmarks(data_dir=None, repeats=BENCHMARK_REPEATS, only=None):
+    """
+    Menjalankan micro-benchmark jalur panas bot secara offline di atas SimulatedBroker (jam manual).
+    Data diambil dari rekaman di `data_dir`, atau candle sintetis deterministik jika tidak ada.
+    Perekaman data pasar dan file log dinonaktifkan; model dilatih langsung tanpa disimpan ke ModelStore.
+    Args:
+        data_dir (str, optional): Direktori data rekaman (format SimulatedBroker); None untuk data sintetis.
+        repeats (int): Jumlah ulangan per jalur.
+        only (str, optional): Hanya jalur yang namanya mengandung teks ini.
+    Returns:
+        dict: Metadata run ('data', 'python', 'numpy', 'machine', 'created') dan 'results' (nama -> statistik).
+    Raises:
+        RuntimeError: Jika broker simulasi gagal dimuat atau snapshot awal tidak tersedia.
+    """
+    global current_mode, is_running
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as synthetic_dir:
+        if data_dir:
+            m1 = load_recorded_rates(data_dir, symbol, SCALPING_TIMEFRAME)
+            if m1 is None:
+                raise RuntimeError(f"Data candle {symbol} tidak ditemukan di {data_dir}.")
+            data = "recorded:" + hashlib.sha256(np.ascontiguousarray(m1).tobytes()).hexdigest()[:16]
+        else:
+            m1 = synthetic_rates()
+            pd.DataFrame(m1).to_csv(os.path.join(synthetic_dir, f"{symbol}_M1.csv"), index=False)
+            data_dir = synthetic_dir
+            data = f"synthetic:{BENCHMARK_SYNTHETIC_BARS}:{BACKTEST_SEED}"
+
+        adapter = create_broker("sim", data_dir=data_dir, symbols=[symbol])
+        if not connect_broker(adapter):
+            raise RuntimeError(f"Gagal memuat broker simulasi: {adapter.last_error()}")
+        engine = TradingEngine(log_dir=None) # Log benchmark tidak boleh masuk ke file log produksi
+        engine.recorder = None # Benchmark tidak boleh menambah rekaman MarketRecorder
+        previous_mode, previous_running = current_mode, is_running
+        try:
+            snapshot = engine.build_snapshot()
+            if snapshot is None:
+                raise RuntimeError("Snapshot pasar awal tidak tersedia dari broker simulasi.")
+            trained_model, _, _ = train_direction_model(engine.training_frame())
+            engine._set_model(engine.primary, trained_model, None)
+            engine.update_market_data(snapshot)
+            is_running = True
+
+            results = {}
+            for name, fn in _benchmark_cases(engine, snapshot).items():
+                if only and only not in name:
+                    continue
+                results[name] = benchmark_callable(fn, repeats)
+        finally:
+            current_mode, is_running = previous_mode, previous_running
+            engine.order_executor.shutdown()
+            engine.log_store.close()
+            for executor in (engine._data_executor, engine._trading_executor, engine._pipeline_executor,
+                             engine._model_executor):
+                executor.shutdown(wait=False, cancel_futures=True)
+            broker.shutdown()
+
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'data': data,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'machine': f"{platform.node()} {platform.machine()} ({os.cpu_count()} core)",
+        'results': results,
+    }
+
+
+def compare_benchmarks(run, baseline, threshold=BENCHMARK_REGRESSION_THRESHOLD, noise_floor_us=BENCHMARK_NOISE_FLOOR_US):
+    """
+    Membandingkan waktu terbaik per jalur dengan baseline. Nilai min dipakai (bukan median) karena
+    gangguan proses lain hanya bisa menambah waktu, sehingga min paling stabil antar run.
+    Args:
+        run (dict): Hasil run_benchmarks.
+        baseline (dict): Baseline tersimpan (format sama dengan run_benchmarks).
+        threshold (float): Batas perlambatan relatif (0.20 = 20%).
+        noise_floor_us (float): Selisih absolut minimum (µs) agar dianggap regresi.
+    Returns:
+        list: Tuple (nama, min_us, baseline min_us atau None, perubahan relatif atau None, regresi bool).
+    """
+    rows = []
+    for name, stats in run['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            rows.append((name, stats['min_us'], None, None, False))
+            continue
+        change = stats['min_us'] / base['min_us'] - 1 if base['min_us'] > 0 else 0.0
+        regressed = change > threshold and stats['min_us'] - base['min_us'] > noise_floor_us
+        rows.append((name, stats['min_us'], base['min_us'], change, regressed))
+    return rows
+
+
+def _format_duration_us(value):
+    """Durasi mikrodetik dalam satuan yang mudah dibaca (µs/ms/s)."""
+    if value >= 1e6:
+        return f"{value / 1e6:.2f} s"
+    if value >= 1e3:
+        return f"{value / 1e3:.2f} ms"
+    return f"{value:.1f} µs"
+
+
+def run_benchmark_cli(data_dir=None, save=False, threshold=BENCHMARK_REGRESSION_THRESHOLD, only=None):
+    """
+    Menjalankan micro-benchmark, mencetak hasil terhadap baseline, dan menyimpan JSON (dipakai oleh --benchmark).
+    Hasil selalu ditulis ke BENCHMARK_LATEST_FILE. Baseline (BENCHMARK_BASELINE_FILE, di-commit ke repo) hanya
+    ditulis jika `save`; tanpa baseline, run dinyatakan gagal agar checkout baru/CI tidak lolos tanpa pembanding.
+    Args:
+        data_dir (str, optional): Direktori data rekaman; None untuk data sintetis.
+        save (bool): Simpan hasil sebagai baseline baru.
+        threshold (float): Batas perlambatan relatif sebelum run dinyatakan gagal.
+        only (str, optional): Hanya jalur yang namanya mengandung teks ini.
+    Returns:
+        bool: False jika ada jalur yang melambat melewati threshold, baseline tidak ada (tanpa `save`),
+            atau benchmark gagal dijalankan.
+    """
+    try:
+        run = run_benchmarks(data_dir, only=only)
+    except (RuntimeError, ValueError) as e:
+        print(f"Benchmark gagal: {e}")
+        return False
+
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    with open(BENCHMARK_LATEST_FILE, 'w') as f:
+        json.dump(run, f, indent=2)
+    baseline_file = BENCHMARK_BASELINE_FILE
+    baseline = None
+    if os.path.exists(baseline_file) and not save:
+        with open(baseline_file, 'r') as f:
+            baseline = json.load(f)
+
+    print(f"⏱️ Benchmark ({run['data']}, Python {run['python']}, {run['machine']}):")
+    if baseline is not None and baseline.get('data') != run['data']:
+        print(f"⚠️ Baseline dibuat dari data berbeda ({baseline.get('data')}); jalankan ulang dengan --benchmark-save.")
+        return False
+
+    rows = compare_benchmarks(run, baseline or {}, threshold)
+    width = max(len(name) for name, *_ in rows) if rows else 0
+    for name, best_us, base_us, change, regressed in rows:
+        line = f"    {name:<{width}}  {_format_duration_us(best_us):>10} (median {_format_duration_us(run['results'][name]['median_us'])})"
+        if base_us is not None:
+            line += f"  baseline {_format_duration_us(base_us):>10}  {change:+7.1%}"
+            if regressed:
+                line += "  ❌ REGRESI"
+        print(line)
+
+    if baseline is None and not save:
+        print(f"❌ Baseline {baseline_file} belum ada; jalankan dengan --benchmark-save lalu commit file tersebut.")
+        return False
+
+    if save:
+        if only and os.path.exists(baseline_file):
+            with open(baseline_file, 'r') as f:
+                stored = json.load(f)
+            if stored.get('data') == run['data']:
+                stored['results'].update(run['results']) # Simpan ulang sebagian jalur tanpa membuang sisanya
+                run = {**run, 'results': stored['results']}
+        with open(baseline_file, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"💾 Baseline disimpan ke {baseline_file}")
+        return True
+
+    regressions = [name for name, *_, regressed in rows if regressed]
+    if regressions:
+        print(f"❌ {len(regressions)} jalur melambat lebih dari {threshold:.0%} dari baseline: {', '.join(regressions)}")
+        return False
+    print(f"✅ Tidak ada jalur yang melambat lebih dari {threshold:.0%} dari baseline.")
+    return True
+
+
+def run_ledger_report_cli(days=None, path=LEDGER_FILE):
+    """
+    Mencetak statistik buku besar trade per mode akun, strategi, dan simbol dari tabel rollup (dipakai oleh --ledger-report).
+    Args:
+        days (int, optional): Hanya N hari terakhir (UTC, termasuk hari ini); seluruh riwayat jika None.
+        path (str): File buku besar.
+    Returns:
+        bool: False jika file buku besar belum ada.
+    """
+    if not os.path.exists(path):
+        print(f"❌ Buku besar trade {path} belum ada.")
+        return False
+    since = None
+    if days is not None:
+        since = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=max(days, 1) - 1)).strftime('%Y-%m-%d')
+    ledger = TradeLedger(path)
+    started = time.perf_counter()
+    rows = [row for mode in ("live", "sim") for row in ledger.rollup(('mode', 'strategy', 'symbol'), since, mode)]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"📒 Buku besar trade {path} ({'sejak ' + since if since else 'seluruh riwayat'}, query {elapsed_ms:.1f} ms):")
+    if not rows:
+        print("    Belum ada trade yang ditutup.")
+    for row in rows:
+        print(f"    {row['mode']:<4} {row['strategy']:<14} {row['symbol']:<8} {row['trades']:>6} trade  "
+              f"winrate {row['winrate']:>6.1%}  profit ${row['profit']:>10.2f}  "
+              f"(+${row['gross_profit']:.2f} / -${-row['gross_loss']:.2f})")
+    return True
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI Trading Bot MT5")
+    parser.add_argument("--broker", default="mt5", choices=["mt5", "sim"],
+                        help="Broker: terminal MetaTrader 5 atau simulator dari data rekaman (default: mt5)")
+    parser.add_argument("--sim-data", default=os.path.join(BASE_DIR, "sim_data"),
+                        help="Direktori file candle/tick rekaman untuk --broker sim")
+    parser.add_argument("--sim-speed", type=float, default=60.0,
+                        help="Kecepatan replay simulator relatif terhadap jam dinding (default: 60x)")
+    parser.add_argument("--headless", action="store_true", help="Jalankan engine tanpa GUI (log ke konsol)")
+    parser.add_argument("--symbols", default=",".join(TRADING_SYMBOLS),
+                        help="Daftar simbol dipisah koma; simbol pertama ditampilkan di GUI (default: %(default)s)")
+    parser.add_argument("--log-level", default=LOG_LEVEL, choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help=f"Level minimum log yang dicatat ke GUI, konsol, dan file (default: {LOG_LEVEL})")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help=f"Aktifkan endpoint metrik Prometheus di http://{METRICS_HOST}:<port>/metrics")
+    parser.add_argument("--metrics-host", default=METRICS_HOST,
+                        help="Alamat bind endpoint metrik (default: %(default)s)")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Aktifkan profiler tahap sejak awal (statistik ditulis ke {PROFILER_FILE})")
+    parser.add_argument("--mode", default="Monitoring",
+                        choices=["Stopped", "Monitoring", "AI_Long_Trade", "Scalping_Bot", "Sniper_Bot"],
+                        help="Mode awal bot (default: Monitoring)")
+    parser.add_argument("--backtest", choices=["Scalping_Bot", "AI_Long_Trade"],
+                        help="Jalankan backtest historis strategi dari data --sim-data lalu keluar")
+    parser.add_argument("--walk-forward", action="store_true",
+                        help="Jalankan walk-forward training model AI dari data --sim-data lalu keluar")
+    parser.add_argument("--optimize", choices=["grid", "random"],
+                        help="Optimasi parameter Scalping (grid/random search) dari data --sim-data lalu keluar")
+    parser.add_argument("--samples", type=int, default=OPTIMIZER_RANDOM_SAMPLES,
+                        help="Jumlah kombinasi untuk --optimize random (default: %(default)s)")
+    parser.add_argument("--param-space",
+                        help="File JSON ruang pencarian --optimize (parameter -> daftar nilai); default SCALPING_PARAM_SPACE")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Jalankan micro-benchmark jalur panas (data --sim-data jika ada, selain itu sintetis), "
+                             "bandingkan dengan baseline, lalu keluar (kode 1 jika ada regresi)")
+    parser.add_argument("--benchmark-save", action="store_true",
+                        help="Simpan hasil --benchmark sebagai baseline baru (benchmarks/baseline.json, di-commit ke repo); "
+                             "tanpa baseline --benchmark gagal")
+    parser.add_argument("--benchmark-threshold", type=float, default=BENCHMARK_REGRESSION_THRESHOLD,
+                        help="Batas perlambatan relatif --benchmark sebelum gagal (default: %(default)s)")
+    parser.add_argument("--benchmark-filter",
+                        help="Hanya ukur jalur --benchmark yang namanya mengandung teks ini")
+    parser.add_argument("--flatten", action="store_true",
+                        help="Tutup semua posisi simbol --symbols secara bersamaan lalu keluar (kode 1 jika ada yang gagal)")
+    parser.add_argument("--ledger-report", type=int, nargs="?", const=0, metavar="HARI",
+                        help=f"Cetak statistik trade dari buku besar {os.path.basename(LEDGER_FILE)} "
+                             "(opsional hanya N hari terakhir) lalu keluar")
+    parser.add_argument("--data-from", type=cli_day, metavar="YYYY-MM-DD",
+                        help="Awal data --sim-data untuk --backtest/--walk-forward/--optimize, atau awal replay --broker sim")
+    parser.add_argument("--data-to", type=cli_day, metavar="YYYY-MM-DD",
+                        help="Hari terakhir data --sim-data (inklusif)")
+    parser.add_argument("--data-days", type=int, metavar="HARI",
+                        help="Hanya N hari sebelum --data-to (atau sebelum hari ini) "
+                             f"(default rekaman MarketRecorder: {RECORDER_DEFAULT_WINDOW_DAYS} hari terakhir)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Jumlah proses worker untuk --walk-forward dan --optimize (default: semua core)")
+    args = parser.parse_args()
+    LOG_LEVEL = args.log_level
+    profiler.set_enabled(args.profile)
+    METRICS_PORT, METRICS_HOST = args.metrics_port, args.metrics_host
+    TRADING_SYMBOLS = [name.strip() for name in args.symbols.split(",") if name.strip()] or TRADING_SYMBOLS
+    symbol = TRADING_SYMBOLS[0]
+    data_start = args.data_from
+    data_end = None if args.data_to is None else args.data_to + 86400 - 1
+    if args.data_days is not None and data_start is None:
+        data_start = (data_end + 1 if data_end is not None else int(time.time())) - args.data_days * 86400
+
+    if args.ledger_report is not None:
+        sys.exit(0 if run_ledger_report_cli(args.ledger_report or None) else 1)
+
+    if args.walk_forward:
+        sys.exit(0 if run_walk_forward_cli(args.sim_data, workers=args.workers, start=data_start, end=data_end) is not None else 1)
+
+    if args.backtest:
+        sys.exit(0 if run_backtest_cli(args.backtest, args.sim_data, start=data_start, end=data_end) is not None else 1)
+
+    if args.benchmark:
+        sys.exit(0 if run_benchmark_cli(args.sim_data if os.path.isdir(args.sim_data) else None,
+                                        save=args.benchmark_save, threshold=args.benchmark_threshold,
+                                        only=args.benchmark_filter) else 1)
+
+    if args.optimize:
+        sys.exit(0 if run_optimize_cli(args.optimize, args.sim_data, samples=args.samples, workers=args.workers,
+                                       space_file=args.param_space, start=data_start, end=data_end) is not None else 1)
+
+    # Penting: untuk --broker mt5, pastikan MetaTrader 5 sedang berjalan dan Anda sudah login ke akun.
+    if args.broker == "sim":
+        adapter = create_broker("sim", data_dir=args.sim_data, speed=args.sim_speed, start_time=data_start,
+                                end_time=data_end)
+    else:
+        adapter = create_broker("mt5")
+    if not connect_broker(adapter):
+        print(f"FATAL ERROR: Gagal terhubung ke broker ({args.broker}): {adapter.last_error()}")
+        print("Aplikasi akan keluar.")
+        sys.exit()
+
+    if args.flatten:
+        engine = TradingEngine(subscribers=[console_log_subscriber])
+        engine.open_ledger() # Penutupan tetap dicatat ke buku besar dan statistik win/loss
+        try:
+            results = engine.close_all_positions()
+        finally:
+            if engine.ledger is not None:
+                engine.ledger.close()
+            engine.log_store.close()
+            broker.shutdown()
+        sys.exit(0 if all(result.closed >= result.volume - 1e-9 for result in results) else 1)
+
+    if args.headless:
+        engine = TradingEngine(subscribers=[console_log_subscriber])
+        try:
+            asyncio.run(engine.run(args.mode))
+        except KeyboardInterrupt:
+            print("Engine dihentikan oleh pengguna.")
+        finally:
+            broker.shutdown()
+        sys.exit(0)
+
     app = QApplication(sys.argv)
-    bot = TradingBotGUI()
+    bot = TradingBotGUI(args.mode)
     bot.show()
     sys.exit(app.exec())
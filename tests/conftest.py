@@ -0,0 +1,97 @@
+"""
+Fixture bersama: modul bot dimuat sekali dari "TRADING BOT [V1].py" (tanpa terminal MT5), SimulatedBroker
+di atas candle M1 sintetis di direktori sementara, dan TradingEngine yang buku besar, model, dan log-nya
+juga ditulis ke direktori sementara.
+"""
+import functools
+import importlib.util
+import os
+import sys
+
+import pytest
+
+BOT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TRADING BOT [V1].py")
+START_TIME = 1_700_000_040 # Candle M1 pertama (kelipatan 60 detik)
+BARS = 600
+PRICE_STEP = 0.5 # Harga naik setiap candle, sehingga TP beli dan SL jual pasti tersentuh
+
+
+@pytest.fixture(scope="session")
+def bot():
+    spec = importlib.util.spec_from_file_location("trading_bot", BOT_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    yield module
+    sys.modules.pop(spec.name, None)
+
+
+@pytest.fixture
+def sim(bot, tmp_path):
+    """SimulatedBroker aktif di atas candle M1 yang naik terus, jam dimulai 120 candle setelah data pertama."""
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    lines = ["time,open,high,low,close,tick_volume,spread,real_volume"]
+    for i in range(BARS):
+        open_ = 2000.0 + i * PRICE_STEP
+        lines.append(f"{START_TIME + i * 60},{open_},{open_ + 0.4},{open_ - 0.1},{open_ + 0.3},100,20,0")
+    (data_dir / "XAUUSD_M1.csv").write_text("\n".join(lines) + "\n")
+    adapter = bot.create_broker("sim", data_dir=str(data_dir), start_time=START_TIME + 120 * 60)
+    assert bot.connect_broker(adapter)
+    yield adapter
+    bot.broker.shutdown()
+
+
+@pytest.fixture
+def engine(bot, sim, tmp_path, monkeypatch):
+    """TradingEngine dengan buku besar, model, dan log di direktori sementara; pelacak posisi sudah punya baseline."""
+    monkeypatch.setattr(bot, "LEDGER_FILE", str(tmp_path / "trade_ledger.db"))
+    monkeypatch.setattr(bot, "RECORDER_ENABLED", False)
+    monkeypatch.setattr(bot, "CLOSE_ALL_RETRY_DELAY_SECONDS", 0.0)
+    monkeypatch.setattr(bot, "EngineLog", functools.partial(bot.EngineLog, directory=None))
+    monkeypatch.setattr(bot, "ModelStore", functools.partial(bot.ModelStore, directory=str(tmp_path / "models")))
+    engine = bot.TradingEngine()
+    engine.open_ledger()
+    engine.position_tracker.sync(reference_time=bot.broker.symbol_info_tick("XAUUSD").time, force=True)
+    yield engine
+    if engine.ledger is not None:
+        engine.ledger.close()
+    engine.order_executor.shutdown()
+    engine.log_store.close()
+    for executor in (engine._data_executor, engine._trading_executor, engine._pipeline_executor,
+                     engine._model_executor):
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@pytest.fixture
+def open_market(bot, sim):
+    """Membuka posisi market di simulator: open_market(order_type, volume=0.1, sl=0.0, tp=0.0) -> hasil order_send."""
+    def open_market(order_type, volume=0.1, sl=0.0, tp=0.0):
+        tick = bot.broker.symbol_info_tick("XAUUSD")
+        result = bot.broker.order_send({
+            "action": bot.mt5.TRADE_ACTION_DEAL, "symbol": "XAUUSD", "volume": volume, "type": order_type,
+            "price": tick.ask if order_type == bot.mt5.ORDER_TYPE_BUY else tick.bid, "deviation": 10,
+            "sl": sl, "tp": tp, "magic": 1, "comment": "test",
+        })
+        assert result.retcode == bot.mt5.TRADE_RETCODE_DONE
+        return result
+    return open_market
+
+
+@pytest.fixture
+def sl_tp_closed(bot, sim, engine, open_market):
+    """
+    Membuka BUY dengan TP (entry dicatat sebagai Scalping_Bot) dan SELL dengan SL di atas harga, lalu memajukan
+    jam simulasi sampai keduanya tersentuh dan menyinkronkan pelacak posisi.
+    """
+    tick = bot.broker.symbol_info_tick("XAUUSD")
+    buy = open_market(bot.mt5.ORDER_TYPE_BUY, tp=round(tick.ask + 2.0, 2))
+    open_market(bot.mt5.ORDER_TYPE_SELL, sl=round(tick.ask + 2.0, 2))
+    engine.ledger.record_fill("XAUUSD", "Scalping_Bot", buy)
+    engine.position_tracker.invalidate()
+    engine.position_tracker.sync(reference_time=tick.time, force=True)
+    assert len(engine.position_tracker.all_positions()) == 2
+
+    sim.advance_to(tick.time + 10 * 60)
+    engine.position_tracker.sync(reference_time=bot.broker.symbol_info_tick("XAUUSD").time, force=True)
+    return engine
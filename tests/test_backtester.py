@@ -0,0 +1,65 @@
+"""Uji jalur exit Backtester: SL/TP di dalam candle untuk kedua sisi, aturan exit strategi, dan akhir data."""
+import numpy as np
+import pytest
+
+START_TIME = 1_700_000_040
+
+
+def trending_rates(bot, n=20, step=1.0):
+    rates = np.zeros(n, dtype=bot.RATES_DTYPE)
+    rates['time'] = START_TIME + np.arange(n) * 60
+    rates['open'] = 2000.0 + np.arange(n) * step
+    rates['close'] = rates['open'] + step / 2
+    rates['high'] = np.maximum(rates['open'], rates['close']) + 0.1
+    rates['low'] = np.minimum(rates['open'], rates['close']) - 0.1
+    return rates
+
+
+@pytest.mark.parametrize("side, sl_offset, tp_offset, step, rule_bar, reason", [
+    (1, -5.0, 3.0, 1.0, None, "tp"),
+    (1, -3.0, 50.0, -1.0, None, "sl"),
+    (-1, 3.0, -50.0, 1.0, None, "sl"),
+    (-1, 5.0, -3.0, -1.0, None, "tp"),
+    (1, 0.0, 0.0, 1.0, 4, "rule"),
+    (1, 0.0, 0.0, 1.0, None, "end"),
+])
+def test_backtester_exit_paths(bot, side, sl_offset, tp_offset, step, rule_bar, reason):
+    rates = trending_rates(bot, step=step)
+    entry = float(rates['close'][0])
+    mask = np.zeros(len(rates), dtype=bool)
+    mask[0] = True
+
+    def open_trade(i, balance):
+        return {'side': side, 'volume': 0.1, 'price': entry,
+                'sl': entry + sl_offset if sl_offset else 0.0, 'tp': entry + tp_offset if tp_offset else 0.0}
+
+    def exit_rule(position, j, bid, ask):
+        return "rule" if j == rule_bar else None
+
+    result = bot.Backtester()._run("Test", rates, 60, mask, open_trade, exit_rule, 0.0)
+    trade = result.trades.iloc[0]
+
+    assert len(result.trades) == 1
+    assert trade['reason'] == reason
+    expected_exit = {
+        "tp": entry + tp_offset, "sl": entry + sl_offset,
+        "rule": rates['close'][rule_bar or 0], "end": rates['close'][-1],
+    }[reason]
+    assert trade['exit_price'] == pytest.approx(expected_exit)
+    contract = bot.SIM_SYMBOL_DEFAULTS['trade_contract_size']
+    assert trade['profit'] == pytest.approx(side * (expected_exit - entry) * 0.1 * contract)
+
+
+def test_backtester_reenters_on_sl_tp_bar(bot):
+    rates = trending_rates(bot, n=12)
+    mask = np.ones(len(rates), dtype=bool)
+
+    def open_trade(i, balance):
+        price = float(rates['close'][i])
+        return {'side': 1, 'volume': 0.1, 'price': price, 'sl': 0.0, 'tp': price + 1.5}
+
+    result = bot.Backtester()._run("Test", rates, 60, mask, open_trade, lambda *args: None, 0.0)
+
+    # TP tersentuh di dalam candle berikutnya; entry baru dievaluasi di penutupan candle yang sama
+    assert list(result.trades['reason'][:-1]) == ["tp"] * (len(result.trades) - 1)
+    assert list(result.trades['bars_held'][:-1]) == [2] * (len(result.trades) - 1)
@@ -0,0 +1,87 @@
+"""Uji pola candlestick vektor: registry, scan_patterns, dan last_bar_patterns sama dengan aturan per baris lama."""
+import numpy as np
+import pandas as pd
+import pytest
+
+# Satu contoh setiap pola; ATR 2.0 sehingga body "kecil" jika < 0.6
+CANDLES = pd.DataFrame([
+    # open,   high,   low,    close,  atr
+    (2010.0, 2011.0, 2004.0, 2005.0, 2.0),   # 0 bearish besar
+    (2004.0, 2012.0, 2003.0, 2011.0, 2.0),   # 1 bullish engulfing
+    (2011.0, 2014.0, 2010.5, 2013.0, 2.0),   # 2 bullish biasa
+    (2014.0, 2015.0, 2008.0, 2009.0, 2.0),   # 3 bearish engulfing
+    (2008.0, 2008.5, 2006.0, 2008.4, 2.0),   # 4 hammer
+    (2008.5, 2010.5, 2008.4, 2008.9, 2.0),   # 5 inverted hammer
+    (2009.0, 2012.0, 2008.5, 2011.5, 2.0),   # 6 bullish biasa
+    (2011.0, 2011.5, 2009.0, 2011.4, np.nan),  # 7 bentuk hammer tanpa ATR: bukan pola
+], columns=['open', 'high', 'low', 'close', 'atr'])
+
+EXPECTED_ROWS = {'bullish_engulfing': [1], 'bearish_engulfing': [3], 'hammer': [4], 'inverted_hammer': [5]}
+
+
+def legacy_patterns(df):
+    """Aturan per baris sebelum deteksi vektor (iloc pada candle terakhir DataFrame)."""
+    candle0 = df.iloc[-1]
+    found = dict.fromkeys(EXPECTED_ROWS, False)
+    if len(df) >= 2:
+        candle1 = df.iloc[-2]
+        found['bullish_engulfing'] = bool(candle0['close'] > candle0['open'] and candle1['close'] < candle1['open'] and
+                                          candle0['close'] >= candle1['open'] and candle0['open'] <= candle1['close'])
+        found['bearish_engulfing'] = bool(candle0['close'] < candle0['open'] and candle1['close'] > candle1['open'] and
+                                          candle0['close'] <= candle1['open'] and candle0['open'] >= candle1['close'])
+    atr = df['atr'].iloc[-1]
+    if atr != 0 and not pd.isna(atr):
+        body = abs(candle0['close'] - candle0['open'])
+        lower_wick = min(candle0['open'], candle0['close']) - candle0['low']
+        upper_wick = candle0['high'] - max(candle0['open'], candle0['close'])
+        is_small_body = body < atr * 0.3
+        found['hammer'] = bool(is_small_body and lower_wick > 2 * body and upper_wick < body)
+        found['inverted_hammer'] = bool(is_small_body and upper_wick > 2 * body and lower_wick < body)
+    return found
+
+
+def test_fixture_has_one_instance_of_each_pattern():
+    legacy = [legacy_patterns(CANDLES.iloc[:i + 1]) for i in range(len(CANDLES))]
+
+    assert {name: [i for i, row in enumerate(legacy) if row[name]] for name in EXPECTED_ROWS} == EXPECTED_ROWS
+
+
+def test_registry_contains_patterns(bot):
+    assert set(EXPECTED_ROWS) <= set(bot.CANDLE_PATTERNS)
+    assert bot.CANDLE_PATTERNS['bullish_engulfing'].bars == 2
+    assert bot.CANDLE_PATTERNS['hammer'].bars == 1
+
+
+def test_scan_patterns_matches_legacy_rules(bot):
+    masks = bot.scan_patterns(bot.CandleArrays.from_frame(CANDLES), EXPECTED_ROWS)
+
+    for i in range(len(CANDLES)):
+        legacy = legacy_patterns(CANDLES.iloc[:i + 1])
+        assert {name: bool(mask[i]) for name, mask in masks.items()} == legacy, f"candle {i}"
+
+
+def test_scan_patterns_from_rates(bot):
+    rates = np.zeros(len(CANDLES), dtype=bot.RATES_DTYPE)
+    for column in ('open', 'high', 'low', 'close'):
+        rates[column] = CANDLES[column]
+
+    masks = bot.scan_patterns(bot.CandleArrays.from_rates(rates, CANDLES['atr'].to_numpy()))
+
+    assert {name: list(np.flatnonzero(masks[name])) for name in EXPECTED_ROWS} == EXPECTED_ROWS
+
+
+@pytest.mark.parametrize("end", range(1, len(CANDLES) + 1))
+def test_last_bar_patterns_and_engine_checks_match_legacy(bot, end):
+    df = CANDLES.iloc[:end]
+    legacy = legacy_patterns(df)
+
+    assert bot.last_bar_patterns(df, EXPECTED_ROWS) == legacy
+    engine = bot.TradingEngine # Pemeriksaan pola tidak memakai state engine
+    assert engine._is_bullish_engulfing(None, df) == legacy['bullish_engulfing']
+    assert engine._is_bearish_engulfing(None, df) == legacy['bearish_engulfing']
+    assert engine._is_hammer_inverted_hammer(None, df) == (legacy['hammer'] or legacy['inverted_hammer'])
+    assert engine._is_shooting_star_hanging_man(None, df) == (legacy['hammer'] or legacy['inverted_hammer'])
+
+
+def test_last_bar_patterns_empty_frame(bot):
+    assert bot.last_bar_patterns(CANDLES.iloc[:0], EXPECTED_ROWS) == dict.fromkeys(EXPECTED_ROWS, False)
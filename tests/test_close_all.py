@@ -0,0 +1,102 @@
+"""Uji penutupan tiket close_all_positions: fill sebagian, requote, fallback IOC, dan penolakan permanen."""
+import pytest
+
+
+def only_position(bot):
+    positions = bot.broker.positions_get(symbol="XAUUSD")
+    assert len(positions) == 1
+    return positions[0]
+
+
+def scripted_order_send(sim, monkeypatch, script):
+    """Mengganti order_send simulator: `script` dipanggil per request dan boleh mengembalikan hasil sendiri."""
+    requests = []
+    send = sim.order_send
+
+    def order_send(request):
+        requests.append(dict(request))
+        result = script(len(requests), request, send)
+        return send(request) if result is None else result
+
+    monkeypatch.setattr(sim, "order_send", order_send)
+    return requests
+
+
+def rejected(bot, retcode, request):
+    return bot.SimOrderSendResult(retcode=retcode, deal=0, order=0, volume=0.0, price=0.0, bid=0.0, ask=0.0,
+                                  comment="Request rejected", request_id=0, request=request)
+
+
+def test_close_ticket_continues_after_partial_fill(bot, sim, engine, open_market, monkeypatch):
+    open_market(bot.mt5.ORDER_TYPE_BUY, volume=0.2)
+    position = only_position(bot)
+
+    def partial_first(call, request, send):
+        if call == 1:
+            result = send(dict(request, volume=round(request["volume"] / 2, 2)))
+            return result._replace(retcode=bot.mt5.TRADE_RETCODE_DONE_PARTIAL)
+        return None
+
+    requests = scripted_order_send(sim, monkeypatch, partial_first)
+    result = engine._close_ticket(position)
+
+    assert result.closed == pytest.approx(0.2)
+    assert result.attempts == 2
+    assert [request["volume"] for request in requests] == [0.2, pytest.approx(0.1)]
+    assert bot.broker.positions_get(symbol="XAUUSD") == ()
+
+
+def test_close_ticket_retries_requote_then_succeeds(bot, sim, engine, open_market, monkeypatch):
+    open_market(bot.mt5.ORDER_TYPE_SELL)
+    position = only_position(bot)
+    requests = scripted_order_send(
+        sim, monkeypatch,
+        lambda call, request, send: rejected(bot, bot.mt5.TRADE_RETCODE_REQUOTE, request) if call == 1 else None)
+
+    result = engine._close_ticket(position)
+
+    assert (result.closed, result.attempts, result.retcode) == (pytest.approx(0.1), 2, bot.mt5.TRADE_RETCODE_DONE)
+    assert len(requests) == 2
+    assert bot.broker.positions_get(symbol="XAUUSD") == ()
+
+
+def test_close_ticket_switches_to_ioc_on_invalid_fill(bot, sim, engine, open_market, monkeypatch):
+    open_market(bot.mt5.ORDER_TYPE_BUY)
+    position = only_position(bot)
+
+    def fok_unsupported(call, request, send):
+        if request["type_filling"] == bot.mt5.ORDER_FILLING_FOK:
+            return rejected(bot, bot.mt5.TRADE_RETCODE_INVALID_FILL, request)
+        return None
+
+    requests = scripted_order_send(sim, monkeypatch, fok_unsupported)
+    result = engine._close_ticket(position)
+
+    assert result.closed == pytest.approx(0.1)
+    assert [request["type_filling"] for request in requests] == [bot.mt5.ORDER_FILLING_FOK, bot.mt5.ORDER_FILLING_IOC]
+
+
+def test_close_ticket_stops_on_permanent_rejection(bot, sim, engine, open_market, monkeypatch):
+    open_market(bot.mt5.ORDER_TYPE_BUY)
+    position = only_position(bot)
+    requests = scripted_order_send(
+        sim, monkeypatch, lambda call, request, send: rejected(bot, bot.mt5.TRADE_RETCODE_MARKET_CLOSED, request))
+
+    result = engine._close_ticket(position)
+
+    assert (result.closed, result.attempts) == (0.0, 1)
+    assert len(requests) == 1
+    assert len(bot.broker.positions_get(symbol="XAUUSD")) == 1
+
+
+def test_close_all_positions_counts_closes(bot, sim, engine, open_market):
+    for order_type in (bot.mt5.ORDER_TYPE_BUY, bot.mt5.ORDER_TYPE_SELL, bot.mt5.ORDER_TYPE_BUY):
+        open_market(order_type)
+
+    results = engine.close_all_positions()
+
+    assert len(results) == 3 and all(result.closed == pytest.approx(0.1) for result in results)
+    stats = engine.position_tracker.stats()
+    assert stats['closes_by_reason'] == {'expert': 3}
+    assert stats['open_positions'] == 0
+    assert engine.ledger.totals()['trades'] == 3
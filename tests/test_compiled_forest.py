@@ -0,0 +1,58 @@
+"""Uji CompiledForest: kelas dan probabilitas harus identik dengan RandomForestClassifier sumbernya."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(600, 12)) * [1, 10, 100, 0.01, 1, 1, 1, 1, 1, 1, 1, 1] + 2000 * (np.arange(12) < 4)
+    y = (X[:, 4] + 0.5 * X[:, 5] - X[:, 6] + rng.normal(scale=0.5, size=len(X)) > 0).astype(int)
+    return X, y
+
+
+@pytest.fixture(scope="module", params=[{'max_depth': None}, {'max_depth': 4}], ids=["full-depth", "shallow"])
+def forest(request, data):
+    X, y = data
+    return RandomForestClassifier(n_estimators=25, random_state=42, **request.param).fit(X[:400], y[:400])
+
+
+def test_matrix_matches_sklearn(bot, data, forest):
+    X = data[0][400:].astype(np.float32)
+    compiled = bot.CompiledForest(forest)
+
+    classes, proba = compiled.predict(X)
+
+    np.testing.assert_allclose(compiled.predict_proba(X), forest.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(proba, forest.predict_proba(X), rtol=0, atol=1e-12)
+    assert np.array_equal(classes, forest.predict(X))
+
+
+def test_vector_matches_sklearn(bot, data, forest):
+    compiled = bot.CompiledForest(forest)
+
+    for row in data[0][400:450].astype(np.float32):
+        expected = forest.predict_proba(row[None, :])[0]
+        classes, proba = compiled.predict(row)
+        np.testing.assert_allclose(compiled.predict_proba(row), expected, rtol=0, atol=1e-12)
+        assert classes == forest.predict(row[None, :])[0]
+        assert proba.shape == expected.shape
+
+
+def test_float64_input_rounds_like_sklearn(bot, data, forest):
+    # Fitur live berupa float64; sklearn membulatkan ke float32 sebelum membandingkan threshold
+    X = data[0][400:]
+    compiled = bot.CompiledForest(forest)
+
+    np.testing.assert_allclose(compiled.predict_proba(X), forest.predict_proba(X), rtol=0, atol=1e-12)
+    assert np.array_equal(compiled.predict(X)[0], forest.predict(X))
+
+
+def test_non_integer_class_labels(bot, data):
+    X, y = data
+    forest = RandomForestClassifier(n_estimators=10, random_state=0).fit(X[:400], np.where(y[:400], "BUY", "SELL"))
+
+    classes, _ = bot.CompiledForest(forest).predict(X[400:].astype(np.float32))
+
+    assert np.array_equal(classes, forest.predict(X[400:].astype(np.float32)))
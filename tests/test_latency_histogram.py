@@ -0,0 +1,93 @@
+"""Uji LogLinearHistogram dan ExecutionStats: persentil dalam batas galat bucket, nilai bertanda, dan penggabungan."""
+import numpy as np
+import pytest
+
+MAX_US = 60 * 1000 * 1000
+
+
+def within_bucket_error(bot, actual, expected):
+    # Nilai tengah bucket berjarak paling jauh setengah lebar bucket: 1 / 2^sub_bucket_bits relatif, plus pembulatan
+    bound = abs(expected) / (1 << bot.HISTOGRAM_SUB_BUCKET_BITS) + 1
+    return abs(actual - expected) <= bound
+
+
+@pytest.fixture(scope="module")
+def latencies():
+    rng = np.random.default_rng(13)
+    return np.round(rng.lognormal(mean=9.0, sigma=1.2, size=20000)) # Sekitar 8 ms, ekor panjang sampai detik
+
+
+@pytest.mark.parametrize("percent", [1, 50, 90, 99, 99.9])
+def test_percentiles_within_bucket_error(bot, latencies, percent):
+    histogram = bot.LogLinearHistogram(MAX_US)
+    for value in latencies:
+        histogram.record(value)
+
+    expected = np.percentile(latencies, percent, method='inverted_cdf')
+
+    assert histogram.total == len(latencies)
+    assert within_bucket_error(bot, histogram.percentile(percent), expected)
+
+
+def test_small_values_are_exact(bot):
+    histogram = bot.LogLinearHistogram(1000)
+    for value in [0, 1, 1, 2, 3, 5, 8, 13, 21, 34]:
+        histogram.record(value)
+
+    assert [histogram.percentile(p) for p in (10, 50, 100)] == [0.0, 3.0, 34.0]
+
+
+def test_signed_values_and_clamping(bot):
+    rng = np.random.default_rng(17)
+    values = np.round(rng.normal(scale=400, size=5000))
+    histogram = bot.LogLinearHistogram(100000, signed=True)
+    for value in values:
+        histogram.record(value)
+    histogram.record(10 ** 9) # Dijepit ke max_value
+
+    samples = np.append(values, 100000)
+    for percent in (1, 25, 50, 75, 99):
+        assert within_bucket_error(bot, histogram.percentile(percent), np.percentile(samples, percent, method='inverted_cdf'))
+    assert histogram.percentile(100) == pytest.approx(100000, rel=1.0 / 64)
+    assert bot.LogLinearHistogram(10).percentile(50) is None
+
+
+def test_merge_matches_single_histogram(bot, latencies):
+    combined = bot.LogLinearHistogram(MAX_US)
+    parts = [bot.LogLinearHistogram(MAX_US) for _ in range(3)]
+    for i, value in enumerate(latencies):
+        combined.record(value)
+        parts[i % 3].record(value)
+
+    merged = bot.LogLinearHistogram(MAX_US)
+    for part in parts + [bot.LogLinearHistogram(MAX_US)]: # Histogram kosong tidak mengubah apa pun
+        merged.merge(part)
+
+    assert np.array_equal(merged.counts, combined.counts)
+    assert (merged.total, merged.min, merged.max) == (combined.total, combined.min, combined.max)
+    assert [merged.percentile(p) for p in (50, 99)] == [combined.percentile(p) for p in (50, 99)]
+    with pytest.raises(ValueError):
+        merged.merge(bot.LogLinearHistogram(MAX_US, signed=True))
+
+
+def test_execution_stats_summary_and_merge(bot, latencies):
+    first, second = bot.ExecutionStats(), bot.ExecutionStats()
+    seconds = latencies / 1e6
+    for i, latency in enumerate(seconds):
+        target = first if i % 2 else second
+        target.record("Instant", latency, 10009, slippage_points=(i % 21) - 10, retries=i % 3)
+    second.record("Close", 0.02, None)
+
+    first.merge(second)
+    summary = first.summary()
+
+    assert set(summary) == {"Instant", "Close"}
+    instant = summary["Instant"]
+    assert instant['count'] == len(latencies)
+    assert instant['retcodes'] == {10009: len(latencies)}
+    for value, percent in zip(instant['latency_ms'], (50, 95, 99)):
+        expected_us = np.percentile(latencies, percent, method='inverted_cdf')
+        assert within_bucket_error(bot, value * 1e3, expected_us)
+    assert instant['slippage_points'] == (0.0, 9.0, 10.0)
+    assert instant['retries'] == (1.0, 2.0, 2.0)
+    assert summary["Close"]['retcodes'] == {None: 1}
@@ -0,0 +1,77 @@
+"""Uji MarketRecorder: round trip append/read, batas hari UTC, dedup lewat last_time, dan rentang read_rates."""
+import os
+
+import numpy as np
+import pytest
+
+DAY = 86400
+DAY_START = 1_700_006_400 # 2023-11-15 00:00 UTC
+
+
+def m1_rates(bot, start, n):
+    rates = np.zeros(n, dtype=bot.RATES_DTYPE)
+    rates['time'] = start + np.arange(n) * 60
+    rates['open'] = 2000.0 + np.arange(n)
+    rates['high'] = rates['open'] + 1.0
+    rates['low'] = rates['open'] - 1.0
+    rates['close'] = rates['open'] + 0.5
+    rates['tick_volume'] = np.arange(n) + 1
+    rates['spread'] = 20
+    return rates
+
+
+@pytest.fixture
+def recorded(bot, tmp_path):
+    """Dua hari candle M1 (sore hari pertama sampai pagi hari kedua), direkam dalam dua append yang tumpang tindih."""
+    rates = m1_rates(bot, DAY_START + DAY - 120 * 60, 240)
+    recorder = bot.MarketRecorder(str(tmp_path))
+    assert recorder.append_bars("XAUUSD", bot.mt5.TIMEFRAME_M1, rates[:150]) == 150
+    assert recorder.append_bars("XAUUSD", bot.mt5.TIMEFRAME_M1, rates[100:]) == 90 # 50 candle sudah terekam
+    return recorder, rates
+
+
+def test_append_read_round_trip_across_days(bot, recorded):
+    recorder, rates = recorded
+
+    assert recorder.days("XAUUSD", "M1") == ["2023-11-15", "2023-11-16"]
+    assert np.array_equal(recorder.read_rates("XAUUSD", bot.mt5.TIMEFRAME_M1), rates)
+    assert [len(part['time']) for part in recorder.segments("XAUUSD", "M1")] == [120, 120]
+
+
+def test_reappend_after_reopen_skips_recorded_bars(bot, recorded, tmp_path):
+    _, rates = recorded
+    reopened = bot.MarketRecorder(str(tmp_path)) # last_time dibaca dari disk, bukan dari memori
+
+    assert reopened.last_time("XAUUSD", "M1") == int(rates['time'][-1])
+    assert reopened.append_bars("XAUUSD", bot.mt5.TIMEFRAME_M1, rates[-30:]) == 0
+    more = m1_rates(bot, int(rates['time'][-1]) + 60, 5)
+    assert reopened.append_bars("XAUUSD", bot.mt5.TIMEFRAME_M1, np.concatenate([rates[-3:], more])) == 5
+    assert np.array_equal(reopened.read_rates("XAUUSD", bot.mt5.TIMEFRAME_M1), np.concatenate([rates, more]))
+
+
+@pytest.mark.parametrize("start, end, count", [
+    (None, None, 10),
+    (None, None, 130), # Melewati batas hari
+    (DAY_START + DAY - 30 * 60, DAY_START + DAY + 30 * 60, None),
+    (DAY_START + DAY - 30 * 60, DAY_START + DAY + 30 * 60, 45),
+    (None, DAY_START + DAY - 1, 5), # Berakhir tepat di candle terakhir hari pertama
+    (DAY_START + 2 * DAY, None, None), # Setelah data terakhir
+    (None, None, 0),
+])
+def test_read_rates_window(bot, recorded, start, end, count):
+    recorder, rates = recorded
+
+    window = recorder.read_rates("XAUUSD", bot.mt5.TIMEFRAME_M1, start, end, count)
+
+    assert np.array_equal(window, bot.slice_rates(rates, start, end, count))
+    if count:
+        assert len(window) == count
+
+
+def test_reader_ignores_torn_write(bot, recorded, tmp_path):
+    recorder, rates = recorded
+    close_file = os.path.join(str(tmp_path), "XAUUSD", "M1", "2023-11-16", "close.bin")
+    with open(close_file, 'ab') as f:
+        f.write(b"\0" * 4) # Penulisan terputus di tengah nilai
+
+    assert np.array_equal(bot.MarketRecorder(str(tmp_path)).read_rates("XAUUSD", bot.mt5.TIMEFRAME_M1), rates)
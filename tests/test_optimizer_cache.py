@@ -0,0 +1,57 @@
+"""Uji cache run_scalping_optimization: rerun memakai hasil per hash parameter dan melewati baris JSONL terpotong."""
+import glob
+import os
+
+import pytest
+
+SPACE = {'scalping_rsi_oversold': [25, 30], 'scalping_rsi_overbought': [70, 75], 'max_hold_duration': [5, 15]}
+
+
+@pytest.fixture(scope="module")
+def rates(bot):
+    m1 = bot.synthetic_rates(bars=1500, seed=3)
+    return m1, bot.resample_rates(m1, 300)
+
+
+def optimize(bot, rates, cache_dir, **kwargs):
+    kwargs = {'method': "random", 'samples': 2, 'workers': 1, 'space': SPACE, **kwargs}
+    return bot.run_scalping_optimization(*rates, cache_dir=str(cache_dir), **kwargs)
+
+
+def cache_lines(cache_dir):
+    (cache_file,) = glob.glob(os.path.join(str(cache_dir), "scalping_*.jsonl"))
+    with open(cache_file) as f:
+        return cache_file, f.read().splitlines()
+
+
+def test_rerun_uses_cache(bot, rates, tmp_path):
+    first = optimize(bot, rates, tmp_path)
+    second = optimize(bot, rates, tmp_path)
+
+    assert (first.evaluated, first.cached) == (2, 0)
+    assert (second.evaluated, second.cached) == (0, 2)
+    assert second.table.equals(first.table)
+    assert len(cache_lines(tmp_path)[1]) == 2
+
+
+def test_cache_is_keyed_by_parameter_hash(bot, rates, tmp_path):
+    optimize(bot, rates, tmp_path)
+
+    wider = optimize(bot, rates, tmp_path, samples=4) # Prefix permutasi sama: dua kombinasi pertama dari cache
+    other_settings = optimize(bot, rates, tmp_path, settings={'max_spread': 25})
+
+    assert (wider.evaluated, wider.cached) == (2, 2)
+    assert (other_settings.evaluated, other_settings.cached) == (2, 0)
+
+
+def test_truncated_line_is_skipped_and_not_extended(bot, rates, tmp_path):
+    optimize(bot, rates, tmp_path)
+    cache_file, lines = cache_lines(tmp_path)
+    with open(cache_file, 'w') as f:
+        f.write(lines[0] + "\n" + lines[1][:len(lines[1]) // 2]) # Run dihentikan saat menulis entri kedua
+
+    resumed = optimize(bot, rates, tmp_path)
+    again = optimize(bot, rates, tmp_path)
+
+    assert (resumed.evaluated, resumed.cached) == (1, 1)
+    assert (again.evaluated, again.cached) == (0, 2)
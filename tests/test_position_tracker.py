@@ -0,0 +1,28 @@
+"""Uji PositionTracker: penutupan oleh SL/TP dihitung per alasan dari riwayat deal simulator."""
+import pytest
+
+
+def test_tracker_counts_sl_and_tp_closes_by_reason(bot, sim, sl_tp_closed):
+    stats = sl_tp_closed.position_tracker.stats()
+
+    assert stats['closes_by_reason'] == {'sl': 1, 'tp': 1}
+    assert (stats['wins'], stats['losses'], stats['open_positions']) == (1, 1, 0)
+    realized = sum(deal.profit for deal in sim.deals if deal.entry == bot.mt5.DEAL_ENTRY_OUT)
+    assert stats['realized_profit'] == pytest.approx(realized)
+    assert (bot.win_count, bot.loss_count) == (1, 1)
+
+
+def test_tracker_revalues_open_positions_without_refetch(bot, sim, engine, open_market):
+    open_market(bot.mt5.ORDER_TYPE_BUY)
+    tracker = engine.position_tracker
+    tracker.invalidate()
+    tracker.sync(reference_time=bot.broker.symbol_info_tick("XAUUSD").time, force=True)
+    fetches = tracker.stats()['full_fetches']
+
+    sim.advance_to(bot.broker.symbol_info_tick("XAUUSD").time + 5 * 60)
+    tick = bot.broker.symbol_info_tick("XAUUSD")
+    positions = tracker.positions("XAUUSD", tick=tick, symbol_info=bot.broker.symbol_info("XAUUSD"))
+
+    assert len(positions) == 1
+    assert positions[0].profit == pytest.approx(bot.broker.positions_get(symbol="XAUUSD")[0].profit)
+    assert tracker.stats()['full_fetches'] == fetches
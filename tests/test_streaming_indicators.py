@@ -0,0 +1,104 @@
+"""Uji StreamingIndicators: nilai inkremental (termasuk revisi candle dan resync jendela bergulir) sama dengan indikator `ta`."""
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator
+from ta.trend import MACD, EMAIndicator, SMAIndicator
+from ta.volatility import AverageTrueRange, BollingerBands
+from ta.volume import OnBalanceVolumeIndicator
+
+BARS = 2600 # Lebih dari dua kali ROLLING_RESYNC_INTERVAL
+WARMUP = 100 # Candle awal yang dilewati (seed EMA/Wilder berbeda sampai konvergen)
+
+
+@pytest.fixture(scope="module")
+def candles():
+    rng = np.random.default_rng(11)
+    close = 2000.0 + np.cumsum(rng.normal(scale=0.8, size=BARS))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(scale=0.6, size=(2, BARS)))
+    return pd.DataFrame({
+        'high': np.maximum(open_, close) + spread[0],
+        'low': np.minimum(open_, close) - spread[1],
+        'close': close,
+        'tick_volume': rng.integers(50, 500, size=BARS).astype(np.uint64),
+    })
+
+
+@pytest.fixture(scope="module")
+def expected(bot, candles):
+    """Indikator batch `ta` seperti yang dihitung sebelum engine streaming, dalam urutan INDICATOR_COLUMNS."""
+    close = candles['close']
+    macd = MACD(close)
+    bb = BollingerBands(close, window=20, window_dev=2)
+    obv = OnBalanceVolumeIndicator(close, candles['tick_volume'].astype(float)).on_balance_volume()
+    df = pd.DataFrame({
+        'rsi': RSIIndicator(close, window=14).rsi(),
+        'macd': macd.macd(),
+        'macd_signal': macd.macd_signal(),
+        'macd_hist': macd.macd_diff(),
+        'ema20': EMAIndicator(close, window=20).ema_indicator(),
+        'ema50': EMAIndicator(close, window=50).ema_indicator(),
+        'bb_upper': bb.bollinger_hband(),
+        'bb_lower': bb.bollinger_lband(),
+        'bb_middle': bb.bollinger_mavg(),
+        'atr': AverageTrueRange(candles['high'], candles['low'], close, window=14).average_true_range(),
+        'obv': obv,
+        'obv_sma': SMAIndicator(obv, window=10).sma_indicator(),
+        'sma20': SMAIndicator(close, window=20).sma_indicator(),
+        'sma50': SMAIndicator(close, window=50).sma_indicator(),
+    })
+    df['bb_width'] = (df['bb_upper'] - df['bb_lower']) / df['bb_middle']
+    return df[bot.INDICATOR_COLUMNS].to_numpy()
+
+
+def assert_matches_ta(values, expected):
+    np.testing.assert_allclose(values[WARMUP:], expected[WARMUP:], rtol=1e-9, atol=1e-8)
+
+
+def test_compute_indicator_array_matches_ta(bot, candles, expected):
+    values = bot.compute_indicator_array(candles['high'], candles['low'], candles['close'], candles['tick_volume'])
+
+    assert values.shape == (BARS, len(bot.INDICATOR_COLUMNS))
+    assert_matches_ta(values, expected)
+
+
+def test_resumed_engine_matches_single_pass(bot, candles, expected):
+    engine = bot.StreamingIndicators()
+    head = candles[:1500]
+    tail = candles[1500:]
+
+    first = bot.compute_indicator_array(head['high'], head['low'], head['close'], head['tick_volume'], engine=engine)
+    rest = bot.compute_indicator_array(tail['high'], tail['low'], tail['close'], tail['tick_volume'], engine=engine)
+
+    assert engine.count == BARS
+    assert_matches_ta(np.vstack([first, rest]), expected)
+
+
+def test_revised_candles_match_final_values(bot, candles, expected):
+    # Setiap candle pertama kali dikirim sebagai candle yang masih terbentuk, lalu direvisi dua kali
+    rng = np.random.default_rng(3)
+    engine = bot.StreamingIndicators()
+    values = np.empty_like(expected)
+    for i, (high, low, close, volume) in enumerate(candles.itertuples(index=False)):
+        partial_close = low + (high - low) * rng.random()
+        engine.update(partial_close + 0.1, partial_close - 0.1, partial_close, volume / 3)
+        engine.update(high, low, (close + partial_close) / 2, volume / 2, revise=True)
+        values[i] = engine.update(high, low, close, float(volume), revise=True)
+
+    assert engine.count == BARS
+    assert_matches_ta(values, expected)
+
+
+def test_rolling_state_resync_keeps_precision(bot):
+    rng = np.random.default_rng(5)
+    series = 1e6 + np.cumsum(rng.normal(scale=0.01, size=3 * bot.ROLLING_RESYNC_INTERVAL + 7))
+    state = bot._RollingState(20)
+
+    for i, x in enumerate(series):
+        state.push(x + 5.0)
+        state.push(x, revise=True)
+        if i >= 19:
+            window = series[i - 19:i + 1]
+            assert state.mean() == pytest.approx(window.mean(), rel=0, abs=1e-9)
+            assert state.std() == pytest.approx(window.std(), rel=0, abs=1e-6)
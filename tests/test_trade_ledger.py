@@ -0,0 +1,43 @@
+"""Uji TradeLedger: rollup dan atribusi strategi setelah dibuka ulang, serta thread penulis yang tahan error."""
+import pytest
+
+
+def test_ledger_rollup_survives_reopen(bot, sl_tp_closed):
+    ledger = sl_tp_closed.ledger
+    totals = ledger.totals()
+    ledger.flush()
+    by_strategy = {row['strategy']: row for row in ledger.rollup(('strategy',))}
+    ledger.close()
+
+    reopened = bot.TradeLedger(ledger.path, "sim")
+    reopened.open()
+    try:
+        assert reopened.totals() == pytest.approx(totals)
+        assert totals['trades'] == 2 and totals['wins'] == 1 and totals['losses'] == 1
+        assert {row['strategy']: row for row in reopened.rollup(('strategy',))} == by_strategy
+        assert by_strategy['Scalping_Bot']['wins'] == 1 # Strategi diambil dari fill entry posisi
+        assert by_strategy['eksternal']['losses'] == 1
+        assert reopened.last_result == ledger.last_result
+    finally:
+        reopened.close()
+
+
+def test_ledger_writer_survives_failed_batch(bot, tmp_path, monkeypatch):
+    errors = []
+    ledger = bot.TradeLedger(str(tmp_path / "ledger.db"), "sim", flush_seconds=0.01, on_error=errors.append)
+    ledger.open()
+    try:
+        def broken(conn, row):
+            raise KeyError("trade")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(ledger, "_insert_close", broken)
+            ledger.record_close(bot.ClosedTrade(1, "XAUUSD", 0.1, 5.0, "tp"))
+            ledger.flush()
+        ledger.record_close(bot.ClosedTrade(2, "XAUUSD", 0.1, -3.0, "sl"))
+        ledger.flush()
+
+        assert ledger.write_errors == 1 and len(errors) == 1
+        assert [row['trades'] for row in ledger.rollup(('symbol',))] == [1]
+    finally:
+        ledger.close()